@@ -3,11 +3,24 @@ from aws_cdk import (
     aws_ec2 as ec2,
     aws_iam as iam,
     aws_fsx as fsx,
+    aws_ssm as ssm,
     CfnOutput,
     Fn,
 )
 from constructs import Construct
 
+from .bootstrap_scripts import DOMAIN_NAME, WINDOWS_STEP_LOG_PATH, windows_client_script
+from .boot_timeline import WINDOWS_CLIENT_READY, BootTimeline
+from .branch_cache import DEFAULT_MODE as DEFAULT_BRANCH_CACHE_MODE, BranchCache, validate_mode
+from .client_fleet import DEFAULT_POOL_STATE, ClientFleet
+from .config_documents import ConfigAssociation, domain_join_document, windows_client_document
+from .fsx_delegation import ou_distinguished_name
+from .fsx_restore import restore_storage_capacity
+from .fsx_shares import FsxShares, parse_shares
+from .instance_profiles import annotate, client_bandwidth_findings
+from .maintenance_windows import validate_fsx_windows
+from .smb_canary import SmbCanary
+
 class AdApplicationStack(Stack):
     """
     Application Stack: Windows EC2, FSx などのアプリケーション層リソース
@@ -15,7 +28,13 @@ class AdApplicationStack(Stack):
     このスタックには以下が含まれます:
     - Windows EC2インスタンス（ドメインメンバー用）
     - FSx for Windows File Server（AD統合）
-    - アプリケーション関連のセキュリティグループルール
+    - State Managerによる構成ドキュメントの適用
+    - Windowsクライアントフリート（オプション、ウォームプール付きAuto Scaling）
+    - SMBレイテンシーカナリアと操作ごとのp99 SLOアラーム（オプション）
+    - 起動タイムライン（ステップログと起動イベント）のCloudWatch Logsへの送信（オプション）
+    - BranchCacheによる読み取りキャッシュとホスト型キャッシュサーバー（オプション）
+    - FSxのバックアップからの復元による環境の複製（オプション）
+    - 宣言的な共有リストによるSMB共有の一括作成・更新（オプション）
     """
 
     def __init__(self, scope: Construct, construct_id: str, 
@@ -26,19 +45,45 @@ class AdApplicationStack(Stack):
                  fsx_storage_type: str = "SSD",
                  fsx_deployment_type: str = "SINGLE_AZ_2",
                  fsx_throughput_capacity: int = 8,
+                 fsx_ssd_iops: int = None,
+                 fsx_backup_start_time: str = "17:00",
+                 fsx_maintenance_start_time: str = "6:19:00",
+                 fsx_backup: dict = None,
+                 dns_forwarding: bool = False,
+                 smb_client_profile: str = "baseline",
+                 instance_type: str = "t3.large",
+                 client_fleet_max_size: int = 0,
+                 client_warm_pool_size: int = 1,
+                 client_warm_pool_state: str = DEFAULT_POOL_STATE,
+                 smb_canary: bool = True,
+                 smb_canary_slo_ms: dict = None,
+                 boot_timeline: bool = True,
+                 branch_cache: str = DEFAULT_BRANCH_CACHE_MODE,
+                 fsx_shares: list = None,
+                 fsx_delegated_ou: bool = False,
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # バックアップ・メンテナンスウィンドウ（UTC、デフォルトはJSTの毎日02:00と日曜04:00）
+        # maintenance_windows.py でメトリクスから選定した値をcdk.jsonで指定可能。重なる場合はエラー
+        validate_fsx_windows(fsx_backup_start_time, fsx_maintenance_start_time)
+        validate_mode(branch_cache)
+        shares = parse_shares(fsx_shares)
+        # BranchCacheは既定の共有 share のキャッシュモードを BranchCache に設定するため、共有リストと競合させない
+        # （caching-mode 未指定の場合は既存の値を維持するため競合しない）
+        if branch_cache != "off" and any(
+            s.name.lower() == "share" and s.caching_mode not in (None, "BranchCache") for s in shares
+        ):
+            raise ValueError("fsx-shares 'share' must use caching-mode 'BranchCache' when branch-cache is enabled")
+
         # Network Stackからの参照
         vpc_id = Fn.import_value("AdWindowsFsx-VpcId")
-        vpc_cidr_block = Fn.import_value("AdWindowsFsx-VpcCidrBlock")
         private_subnet_id1 = Fn.import_value("AdWindowsFsx-PrivateSubnetId1")
         private_subnet_id2 = Fn.import_value("AdWindowsFsx-PrivateSubnetId2")
         private_route_table_id1 = Fn.import_value("AdWindowsFsx-PrivateRouteTableId1")
         private_route_table_id2 = Fn.import_value("AdWindowsFsx-PrivateRouteTableId2")
         windows_security_group_id = Fn.import_value("AdWindowsFsx-WindowsSecurityGroupId")
         fsx_security_group_id = Fn.import_value("AdWindowsFsx-FsxSecurityGroupId")
-        ad_security_group_id = Fn.import_value("AdWindowsFsx-AdSecurityGroupId")
         ec2_role_arn = Fn.import_value("AdWindowsFsx-Ec2RoleArn")
 
         # AD Stackからの参照
@@ -76,130 +121,13 @@ class AdApplicationStack(Stack):
             os=ec2.OperatingSystemType.WINDOWS
         )
 
-        # AD内部通信用ポート設定
-        ad_ports = [
-            (53, "DNS"),
-            (88, "Kerberos"),  
-            (135, "RPC Endpoint Mapper"),
-            (389, "LDAP"),
-            (445, "SMB"),
-            (636, "LDAPS"),
-            (3268, "Global Catalog"),
-            (3269, "Global Catalog SSL"),
-            (9389, "AD DS Web Services")  # Single-AZ 2/Multi-AZ必須
-        ]
-
-        # Windows EC2用ユーザーデータ（AD DC IPアドレスを取得）
-        windows_user_data = ec2.UserData.for_windows()
-        
-        # CloudFormation関数でAD DC IPを取得
-        ad_dc_ip_ref = Fn.import_value("AdWindowsFsx-AdDcPrivateIp")
-        
-        windows_user_data.add_commands(
-            "# Windows EC2 セットアップログ出力開始",
-            "Write-Host \"Starting Windows EC2 setup process...\"",
-            "$LogFile = 'C:\\Windows\\Temp\\windows-setup.log'",
-            "Start-Transcript -Path $LogFile -Append",
-            "",
-            "# インターネット接続テスト",
-            "Write-Host \"Testing internet connectivity...\"",
-            "try {",
-            "    $connectTest = Test-NetConnection -ComputerName microsoft.com -Port 443 -WarningAction SilentlyContinue",
-            "    if ($connectTest.TcpTestSucceeded) {",
-            "        Write-Host \"Internet connectivity: SUCCESS\"",
-            "    } else {",
-            "        Write-Host \"Internet connectivity: FAILED\"",
-            "    }",
-            "} catch {",
-            "    Write-Host \"Internet connectivity test failed: $($_.Exception.Message)\"",
-            "}",
-            "",
-            "# Windows Update有効性確認",
-            "Write-Host \"Checking Windows Update service...\"",
-            "try {",
-            "    $wuService = Get-Service -Name wuauserv",
-            "    Write-Host \"Windows Update service status: $($wuService.Status)\"",
-            "} catch {",
-            "    Write-Host \"Windows Update service check failed: $($_.Exception.Message)\"",
-            "}",
-            "",
-            "# AD DC 接続テスト",
-            "$AdDcIp = '${AdDcPrivateIp}'",
-            "Write-Host \"Testing connection to AD DC: $AdDcIp\"",
-            "try {",
-            "    $adTest = Test-NetConnection -ComputerName $AdDcIp -Port 389 -WarningAction SilentlyContinue",
-            "    if ($adTest.TcpTestSucceeded) {",
-            "        Write-Host \"AD DC connectivity: SUCCESS\"",
-            "    } else {",
-            "        Write-Host \"AD DC connectivity: FAILED\"",
-            "    }",
-            "} catch {",
-            "    Write-Host \"AD DC connectivity test failed: $($_.Exception.Message)\"",
-            "}",
-            "",
-            "# リモートデスクトップを有効化",
-            "Set-ItemProperty -Path \"HKLM:\\System\\CurrentControlSet\\Control\\Terminal Server\" -Name \"fDenyTSConnections\" -Value 0",
-            "Enable-NetFirewallRule -DisplayGroup \"Remote Desktop\"",
-            "",
-            "# タイムゾーンを東京時間に変更", 
-            "tzutil /s \"Tokyo Standard Time\"",
-            "",
-            "# 一般ユーザーを作成",
-            "net user winuser Password123! /add",
-            "net localgroup administrators winuser /add", 
-            "net localgroup \"Remote Desktop Users\" winuser /add",
-            "",
-            "# DNS設定をAD DCに変更",
-            "$AdDcIp = '${AdDcPrivateIp}'",
-            "Write-Host \"Setting DNS server to AD DC: $AdDcIp\"",
-            "try {",
-            "    $adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'}",
-            "    if ($adapter) {",
-            "        Set-DnsClientServerAddress -InterfaceIndex $adapter.InterfaceIndex -ServerAddresses $AdDcIp",
-            "        Write-Host \"DNS server set successfully to: $AdDcIp\"",
-            "    } else {",
-            "        Write-Host \"ERROR: No suitable network adapter found\"",
-            "    }",
-            "} catch {",
-            "    Write-Host \"ERROR setting DNS: $($_.Exception.Message)\"",
-            "}",
-            "",
-            "# DNS設定確認",
-            "Write-Host \"Current DNS configuration:\"",
-            "Get-DnsClientServerAddress -AddressFamily IPv4",
-            "",
-            "# ドメイン参加（自動実行）",
-            "Write-Host \"Starting domain join process...\"",
-            "$domainName = 'example.com'",
-            "$domainUser = 'Administrator'",
-            "$domainPassword = ConvertTo-SecureString 'Password123!' -AsPlainText -Force",
-            "$credential = New-Object System.Management.Automation.PSCredential($domainUser, $domainPassword)",
-            "",
-            "# ドメイン参加前にAD DCとの接続を再度確認",
-            "Write-Host \"Final connectivity test to AD DC before domain join...\"",
-            "try {",
-            "    $finalTest = Test-NetConnection -ComputerName $AdDcIp -Port 389 -WarningAction SilentlyContinue",
-            "    if ($finalTest.TcpTestSucceeded) {",
-            "        Write-Host \"AD DC connectivity confirmed. Proceeding with domain join...\"",
-            "        ",
-            "        # ドメイン参加実行",
-            "        try {",
-            "            Add-Computer -DomainName $domainName -Credential $credential -Force -Restart",
-            "            Write-Host \"Domain join initiated successfully. System will restart...\"",
-            "        } catch {",
-            "            Write-Host \"ERROR during domain join: $($_.Exception.Message)\"",
-            "            Write-Host \"Manual domain join may be required using: Add-Computer -DomainName $domainName -Credential (Get-Credential) -Restart\"",
-            "        }",
-            "    } else {",
-            "        Write-Host \"ERROR: Cannot connect to AD DC. Domain join skipped.\"",
-            "        Write-Host \"Manual domain join required after connectivity is established.\"",
-            "    }",
-            "} catch {",
-            "    Write-Host \"ERROR during connectivity test: $($_.Exception.Message)\"",
-            "}",
-            "",
-            "Stop-Transcript",
-            "Write-Host \"Windows EC2 setup completed\""
+        # Windows EC2用ユーザーデータ（ユーザー作成・DNS設定・ドメイン参加のブートストラップ処理）
+        # RDP・タイムゾーン・疎通確認・SMB設定などの再適用可能な設定はState Managerで管理
+        # DNS転送を有効にした場合はVPCリゾルバーのままADドメインを解決できるためDNS設定を省略
+        windows_user_data = windows_client_script(set_dns_server=not dns_forwarding).to_user_data(
+            self, "WindowsUserData",
+            role=ec2_role,
+            substitutions={"AdDcPrivateIp": ad_dc_private_ip}
         )
 
         # プライベートサブネットをインポート（ルートテーブルID情報を含む）
@@ -209,6 +137,13 @@ class AdApplicationStack(Stack):
             availability_zone="ap-northeast-1a",
             route_table_id=private_route_table_id1
         )
+
+        private_subnet2 = ec2.Subnet.from_subnet_attributes(
+            self, "ImportedPrivateSubnet2",
+            subnet_id=private_subnet_id2,
+            availability_zone="ap-northeast-1c",
+            route_table_id=private_route_table_id2
+        )
         
         # VPCをインポート（ルートテーブルID情報を含む）
         vpc_import = ec2.Vpc.from_vpc_attributes(
@@ -219,73 +154,199 @@ class AdApplicationStack(Stack):
             private_subnet_route_table_ids=[private_route_table_id1, private_route_table_id2]
         )
 
-        # UserDataにCloudFormation変数を置換
-        user_data_with_substitution = ec2.UserData.custom(
-            Fn.sub(
-                windows_user_data.render(),
-                {
-                    "AdDcPrivateIp": ad_dc_private_ip
-                }
-            )
-        )
-
         # Windows EC2インスタンスの作成時のパラメータ準備
         instance_params = {
-            "instance_type": ec2.InstanceType.of(ec2.InstanceClass.T3, ec2.InstanceSize.LARGE),
+            "instance_type": ec2.InstanceType(instance_type),  # cdk.jsonのinstance-profile / client-instance-typeから設定
             "machine_image": windows_ami,
             "vpc": vpc_import,
             "vpc_subnets": ec2.SubnetSelection(subnets=[private_subnet1]),
             "security_group": windows_security_group,
             "role": ec2_role,
-            "user_data": user_data_with_substitution
+            "user_data": windows_user_data
         }
         
         # キーペア名が指定されている場合のみkey_pairを追加
-        if key_pair_name:
-            instance_params["key_pair"] = ec2.KeyPair.from_key_pair_name(self, "KeyPair", key_pair_name)
+        key_pair = ec2.KeyPair.from_key_pair_name(self, "KeyPair", key_pair_name) if key_pair_name else None
+        if key_pair:
+            instance_params["key_pair"] = key_pair
         
         # Windows EC2インスタンスの作成
         self.windows_instance = ec2.Instance(self, "WindowsInstance", **instance_params)
+        # クライアントのベースライン帯域がFSxのスループット容量を下回る場合は合成時に警告
+        annotate(self.windows_instance, client_bandwidth_findings(instance_type, fsx_throughput_capacity))
+
+        # 再適用可能な設定（RDP、タイムゾーン、エージェント設定、疎通確認、SMBクライアント設定）
+        # SMBクライアントはcdk.jsonのsmb-client-profileに従い、マルチチャネルはFSxのデプロイメントタイプに合わせる
+        windows_config = ConfigAssociation(
+            self, "WindowsConfig",
+            document=windows_client_document(
+                smb_profile=smb_client_profile,
+                fsx_deployment_type=fsx_deployment_type
+            ),
+            instance_id=self.windows_instance.instance_id,
+            parameters={"AdDcIp": ad_dc_private_ip}
+        )
+
+        # ドメイン参加（AD DCの準備が整うまで定期的に再試行し、参加済みなら何もしない）
+        domain_join = ConfigAssociation(
+            self, "DomainJoin",
+            document=domain_join_document(DOMAIN_NAME),
+            instance_id=self.windows_instance.instance_id,
+            parameters={"AdDcIp": ad_dc_private_ip},
+            schedule_expression="rate(30 minutes)"
+        )
+
+        # 起動タイムライン（ユーザーデータのステップ、ドメイン参加の再起動、グループポリシー適用までの時間）
+        if boot_timeline:
+            self.boot_timeline = BootTimeline(
+                self, "BootTimeline",
+                instance_id=self.windows_instance.instance_id,
+                role=ec2_role,
+                step_log_path=WINDOWS_STEP_LOG_PATH,
+                ready_marker=WINDOWS_CLIENT_READY
+            )
+
+            CfnOutput(
+                self, "BootTimelineLogGroupName",
+                value=self.boot_timeline.log_group.log_group_name,
+                description="CloudWatch Logs group with the Windows EC2 boot timeline"
+            )
 
         # デプロイメントタイプに応じたサブネット設定
-        if fsx_deployment_type == "MULTI_AZ":
+        if fsx_deployment_type.startswith("MULTI_AZ"):
             fsx_subnet_ids = [private_subnet_id1, private_subnet_id2]  # Multi-AZは2つのサブネット
         else:  # SINGLE_AZ_1 または SINGLE_AZ_2
             fsx_subnet_ids = [private_subnet_id1]  # Single-AZは1つのサブネット
 
+        # バックアップから復元する場合はストレージ容量をバックアップ元から引き継ぐ（拡張時のみ指定）
+        if fsx_backup:
+            fsx_storage_capacity = restore_storage_capacity(fsx_backup, fsx_storage_capacity)
+
         # FSx for Windows File Serverの作成
         self.fsx_file_system = fsx.CfnFileSystem(
             self, "FsxFileSystem",
             file_system_type="WINDOWS",
             subnet_ids=fsx_subnet_ids,
             security_group_ids=[fsx_security_group.security_group_id],
+            backup_id=fsx_backup["BackupId"] if fsx_backup else None,  # fsx_restore.pyで解決
             storage_capacity=fsx_storage_capacity,  # cdk.jsonから設定
             storage_type=fsx_storage_type,  # cdk.jsonから設定
             windows_configuration=fsx.CfnFileSystem.WindowsConfigurationProperty(
                 # Self-managed Active Directory設定
                 self_managed_active_directory_configuration=fsx.CfnFileSystem.SelfManagedActiveDirectoryConfigurationProperty(
-                    domain_name="example.com",
+                    domain_name=DOMAIN_NAME,
                     dns_ips=[ad_dc_private_ip],  # AD DCのプライベートIP
                     file_system_administrators_group="Domain Admins",
-                    # organizational_unit_distinguished_name を省略（デフォルトのComputersコンテナを使用）
+                    # Domain StackのAutomationでfsxuserに権限委任済みのOU（未指定時は既定の CN=Computers）
+                    # 既存のFSxでは変更すると置き換え（ファイルシステムの再作成）になるためオプトイン
+                    organizational_unit_distinguished_name=(
+                        ou_distinguished_name(DOMAIN_NAME) if fsx_delegated_ou else None
+                    ),
                     user_name="fsxuser",  # ドメイン修飾名を使用
                     password="Password123!"  # 本番環境では AWS Secrets Manager を使用推奨
                 ),
                 deployment_type=fsx_deployment_type,  # cdk.jsonから設定
                 throughput_capacity=fsx_throughput_capacity,  # cdk.jsonから設定
+                # SSD IOPS（未指定時はストレージ容量に応じた自動プロビジョニング: 3 IOPS/GiB）
+                disk_iops_configuration=fsx.CfnFileSystem.DiskIopsConfigurationProperty(
+                    mode="USER_PROVISIONED",
+                    iops=fsx_ssd_iops
+                ) if fsx_ssd_iops else None,
                 automatic_backup_retention_days=7,
                 copy_tags_to_backups=True,
-                daily_automatic_backup_start_time="03:00",
-                weekly_maintenance_start_time="7:03:00"
+                daily_automatic_backup_start_time=fsx_backup_start_time,  # cdk.jsonから設定
+                weekly_maintenance_start_time=fsx_maintenance_start_time  # cdk.jsonから設定
             )
         )
 
+        # SMBレイテンシーカナリア（Windows EC2から1分ごとにFSx共有を計測し、p99がSLOを超えたらアラーム）
+        if smb_canary:
+            self.smb_canary = SmbCanary(
+                self, "SmbCanary",
+                instance_id=self.windows_instance.instance_id,
+                role=ec2_role,
+                file_system_id=self.fsx_file_system.ref,
+                fsx_dns_name=self.fsx_file_system.attr_dns_name,
+                slo_ms=smb_canary_slo_ms
+            )
 
-        # アプリケーション関連のセキュリティグループルールを設定
-        self._setup_application_security_rules(
-            windows_security_group_id, fsx_security_group_id, 
-            ad_security_group_id, ad_ports, vpc_cidr_block
-        )
+        # BranchCache（distributed: クライアントごとのローカルキャッシュ、hosted: 専用のホスト型キャッシュサーバーで共有）
+        if branch_cache != "off":
+            hosted_cache_instance_id = hosted_cache_location = None
+            if branch_cache == "hosted":
+                # Windows EC2と同じ構成・ユーザーデータで起動し、同じドキュメントでドメインに参加
+                self.branch_cache_host = ec2.Instance(self, "BranchCacheHostedServer", **instance_params)
+                ssm.CfnAssociation(
+                    self, "BranchCacheHostedServerDomainJoin",
+                    name=domain_join.document.ref,
+                    targets=[ssm.CfnAssociation.TargetProperty(
+                        key="InstanceIds",
+                        values=[self.branch_cache_host.instance_id]
+                    )],
+                    parameters={"AdDcIp": [ad_dc_private_ip]},
+                    schedule_expression="rate(30 minutes)"
+                )
+                hosted_cache_instance_id = self.branch_cache_host.instance_id
+                hosted_cache_location = self.branch_cache_host.instance_private_ip
+
+            self.branch_cache = BranchCache(
+                self, "BranchCache",
+                mode=branch_cache,
+                domain_name=DOMAIN_NAME,
+                ad_dc_instance_id=Fn.import_value("AdWindowsFsx-AdDcInstanceId"),
+                instance_id=self.windows_instance.instance_id,
+                role=ec2_role,
+                file_system_id=self.fsx_file_system.ref,
+                hosted_cache_instance_id=hosted_cache_instance_id,
+                hosted_cache_location=hosted_cache_location,
+                fsx_delegated_ou=fsx_delegated_ou
+            )
+
+            CfnOutput(
+                self, "BranchCacheBenchmarkDocumentName",
+                value=self.branch_cache.benchmark_document.ref,
+                description="SSM document that measures FSx origin bytes for cold and warm BranchCache reads"
+            )
+
+        # SMB共有の一括作成・更新（Windows EC2からFSxのリモート管理エンドポイントに1つのセッションで適用）
+        if shares:
+            self.fsx_shares = FsxShares(
+                self, "FsxShares",
+                shares=shares,
+                domain_name=DOMAIN_NAME,
+                instance_id=self.windows_instance.instance_id,
+                role=ec2_role,
+                file_system_id=self.fsx_file_system.ref
+            )
+
+        # Windowsクライアントフリート（client-fleet-max-size > 0 の場合のみ）
+        # FSxと同じAZ（Multi-AZは両AZ）に配置し、AZ間通信を避ける
+        if client_fleet_max_size > 0:
+            self.client_fleet = ClientFleet(
+                self, "ClientFleet",
+                vpc=vpc_import,
+                subnets=[private_subnet1, private_subnet2] if fsx_deployment_type.startswith("MULTI_AZ") else [private_subnet1],
+                machine_image=windows_ami,
+                instance_type=instance_type,
+                security_group=windows_security_group,
+                role=ec2_role,
+                user_data=windows_user_data,
+                domain_name=DOMAIN_NAME,
+                fsx_dns_name=self.fsx_file_system.attr_dns_name,
+                ad_dc_ip=ad_dc_private_ip,
+                domain_join_document_name=domain_join.document.ref,
+                config_document_name=windows_config.document.ref,
+                max_size=client_fleet_max_size,
+                warm_pool_size=client_warm_pool_size,
+                pool_state=client_warm_pool_state,
+                key_pair=key_pair
+            )
+
+            CfnOutput(
+                self, "ClientFleetName",
+                value=self.client_fleet.auto_scaling_group.auto_scaling_group_name,
+                description="Windows client Auto Scaling group (warm pool enabled)"
+            )
 
         # 出力値
         CfnOutput(
@@ -300,252 +361,9 @@ class AdApplicationStack(Stack):
             description="FSx File System ID"
         )
 
-
-    def _setup_application_security_rules(self, windows_sg_id, fsx_sg_id, ad_sg_id, ad_ports, vpc_cidr_block):
-        """アプリケーション関連のセキュリティグループルールを設定"""
-        
-        # Windows EC2用インバウンドルール（AD DCからの応答受信用）
-        for port, desc in ad_ports:
-            ec2.CfnSecurityGroupIngress(
-                self, f"AdToWindowsRule{port}",
-                group_id=windows_sg_id,
-                source_security_group_id=ad_sg_id,
-                ip_protocol="tcp",
-                from_port=port,
-                to_port=port,
-                description=f"{desc} - AD to Windows EC2 (response)"
-            )
-        
-        # Windows EC2用追加インバウンドルール（RDP、管理用）
-        ec2.CfnSecurityGroupIngress(
-            self, "WindowsInboundRdp",
-            group_id=windows_sg_id,
-            cidr_ip=vpc_cidr_block,
-            ip_protocol="tcp", 
-            from_port=3389,
-            to_port=3389,
-            description="RDP - Remote Desktop access from VPC"
-        )
-
-        # Windows EC2用インバウンドルール（ICMP）
-        ec2.CfnSecurityGroupIngress(
-            self, "WindowsInboundIcmp",
-            group_id=windows_sg_id,
-            cidr_ip=vpc_cidr_block,
-            ip_protocol="icmp",
-            from_port=-1,
-            to_port=-1,
-            description="ICMP - Network connectivity from VPC"
-        )
-
-        # Windows EC2からADへのアクセス許可（アウトバウンド用のインバウンド許可）
-        for port, desc in ad_ports:
-            ec2.CfnSecurityGroupIngress(
-                self, f"WindowsToAdRule{port}",
-                group_id=ad_sg_id,
-                source_security_group_id=windows_sg_id,
-                ip_protocol="tcp",
-                from_port=port,
-                to_port=port,
-                description=f"{desc} - Windows EC2 to AD"
-            )
-
-        # FSxからADへのアクセス許可はDomain Stackで管理（重複を回避）
-        # Domain StackでFSx→ADの全ルール（TCP/UDP/ICMP）を設定済み
-
-        # FSxファイル共有アクセス用ポート（Windows EC2からのアクセス）
-        ec2.CfnSecurityGroupIngress(
-            self, "WindowsToFsxRuleSMB",
-            group_id=fsx_sg_id,
-            cidr_ip=vpc_cidr_block,
-            ip_protocol="tcp",
-            from_port=445,
-            to_port=445,
-            description="SMB - Windows EC2 to FSx (VPC CIDR)"
-        )
-
-        ec2.CfnSecurityGroupIngress(
-            self, "WindowsToFsxRuleRPC",
-            group_id=fsx_sg_id,
-            source_security_group_id=windows_sg_id,
-            ip_protocol="tcp",
-            from_port=135,
-            to_port=135,
-            description="RPC - Windows EC2 to FSx"
-        )
-
-        ec2.CfnSecurityGroupIngress(
-            self, "WindowsToFsxRuleRpcDynamic",
-            group_id=fsx_sg_id,
-            source_security_group_id=windows_sg_id,
-            ip_protocol="tcp",
-            from_port=49152,
-            to_port=65535,
-            description="RPC dynamic ports - Windows EC2 to FSx"
-        )
-
-        # FSxファイル共有アクセス用ポート（AD DCからのアクセス）
-        ec2.CfnSecurityGroupIngress(
-            self, "AdToFsxRuleSMB",
-            group_id=fsx_sg_id,
-            cidr_ip=vpc_cidr_block,
-            ip_protocol="tcp",
-            from_port=445,
-            to_port=445,
-            description="SMB - AD DC to FSx (VPC CIDR)"
-        )
-
-        ec2.CfnSecurityGroupIngress(
-            self, "AdToFsxRuleRPC",
-            group_id=fsx_sg_id,
-            source_security_group_id=ad_sg_id,
-            ip_protocol="tcp",
-            from_port=135,
-            to_port=135,
-            description="RPC - AD DC to FSx"
-        )
-
-        ec2.CfnSecurityGroupIngress(
-            self, "AdToFsxRuleRpcDynamic",
-            group_id=fsx_sg_id,
-            source_security_group_id=ad_sg_id,
-            ip_protocol="tcp",
-            from_port=49152,
-            to_port=65535,
-            description="RPC dynamic ports - AD DC to FSx"
-        )
-
-        # ICMP通信許可（AD DC ↔ FSx）
-        ec2.CfnSecurityGroupIngress(
-            self, "AdToFsxRuleIcmp",
-            group_id=fsx_sg_id,
-            source_security_group_id=ad_sg_id,
-            ip_protocol="icmp",
-            from_port=-1,
-            to_port=-1,
-            description="ICMP - AD DC to FSx (network connectivity)"
-        )
-
-        # ICMP通信許可（Windows EC2 ↔ FSx）
-        ec2.CfnSecurityGroupIngress(
-            self, "WindowsToFsxRuleIcmp",
-            group_id=fsx_sg_id,
-            source_security_group_id=windows_sg_id,
-            ip_protocol="icmp",
-            from_port=-1,
-            to_port=-1,
-            description="ICMP - Windows EC2 to FSx (network connectivity)"
-        )
-
-
-        # Windows EC2からADへのアウトバウンドルール（ドメイン参加用）
-        for port, desc in ad_ports:
-            ec2.CfnSecurityGroupEgress(
-                self, f"WindowsEgressToAd{port}",
-                group_id=windows_sg_id,
-                destination_security_group_id=ad_sg_id,
-                ip_protocol="tcp",
-                from_port=port,
-                to_port=port,
-                description=f"{desc} - Windows EC2 to AD"
+        if fsx_backup:
+            CfnOutput(
+                self, "FsxRestoredFromBackupId",
+                value=fsx_backup["BackupId"],
+                description="FSx backup the file system was restored from"
             )
-
-        # Windows EC2からADへのアウトバウンドルール（UDP）
-        udp_ad_ports = [
-            (53, "DNS"),
-            (88, "Kerberos"),
-            (123, "NTP"), 
-            (389, "LDAP"),
-            (464, "Kerberos Password Change")
-        ]
-        
-        for port, desc in udp_ad_ports:
-            ec2.CfnSecurityGroupEgress(
-                self, f"WindowsEgressToAdUdp{port}",
-                group_id=windows_sg_id,
-                destination_security_group_id=ad_sg_id,
-                ip_protocol="udp",
-                from_port=port,
-                to_port=port,
-                description=f"{desc} - Windows EC2 to AD (UDP)"
-            )
-
-        # Windows EC2からADへのICMP通信
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressToAdIcmp",
-            group_id=windows_sg_id,
-            destination_security_group_id=ad_sg_id,
-            ip_protocol="icmp",
-            from_port=-1,
-            to_port=-1,
-            description="ICMP - Windows EC2 to AD (network connectivity)"
-        )
-
-        # Windows EC2用基本アウトバウンドルール
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressHttps",
-            group_id=windows_sg_id,
-            cidr_ip="0.0.0.0/0",
-            ip_protocol="tcp",
-            from_port=443,
-            to_port=443,
-            description="HTTPS - Windows Update and software downloads"
-        )
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressDns",
-            group_id=windows_sg_id,
-            cidr_ip="0.0.0.0/0",
-            ip_protocol="udp",
-            from_port=53,
-            to_port=53,
-            description="DNS - External DNS resolution"
-        )
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressNtp",
-            group_id=windows_sg_id,
-            cidr_ip="0.0.0.0/0",
-            ip_protocol="udp",
-            from_port=123,
-            to_port=123,
-            description="NTP - Time synchronization"
-        )
-
-        # Windows EC2からFSxへのアウトバウンドルール（SMB通信用）
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressToFsxSMB",
-            group_id=windows_sg_id,
-            cidr_ip=vpc_cidr_block,
-            ip_protocol="tcp",
-            from_port=445,
-            to_port=445,
-            description="SMB - Windows EC2 to FSx (VPC CIDR)"
-        )
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressToFsxRPC",
-            group_id=windows_sg_id,
-            destination_security_group_id=fsx_sg_id,
-            ip_protocol="tcp",
-            from_port=135,
-            to_port=135,
-            description="RPC - Windows EC2 to FSx"
-        )
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressToFsxRpcDynamic",
-            group_id=windows_sg_id,
-            destination_security_group_id=fsx_sg_id,
-            ip_protocol="tcp",
-            from_port=49152,
-            to_port=65535,
-            description="RPC dynamic ports - Windows EC2 to FSx"
-        )
-        ec2.CfnSecurityGroupEgress(
-            self, "WindowsEgressToFsxIcmp",
-            group_id=windows_sg_id,
-            destination_security_group_id=fsx_sg_id,
-            ip_protocol="icmp",
-            from_port=-1,
-            to_port=-1,
-            description="ICMP - Windows EC2 to FSx (network connectivity)"
-        )
-
-        # FSx用アウトバウンドルールはDomain Stackで一元管理
\ No newline at end of file
@@ -1,11 +1,35 @@
 from aws_cdk import (
+    Duration,
+    RemovalPolicy,
     Stack,
     aws_ec2 as ec2,
     aws_iam as iam,
+    aws_route53resolver as route53resolver,
+    aws_s3 as s3,
     CfnOutput,
 )
 from constructs import Construct
 
+from .bootstrap_scripts import DOMAIN_NAME
+from .flow_log_analyzer import FLOW_LOG_FIELDS
+
+from .network_topology import (
+    DEFAULT_NAT_TOPOLOGY,
+    format_egress_paths,
+    nat_count,
+    validate_topology,
+)
+
+# cdk.json の vpc-interface-endpoints で追加できるインターフェースエンドポイント
+# キー: (Construct ID, サービス)
+OPTIONAL_INTERFACE_ENDPOINTS = {
+    "logs": ("LogsVpcEndpoint", ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS),
+    "monitoring": ("MonitoringVpcEndpoint", ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_MONITORING),
+    "kms": ("KmsVpcEndpoint", ec2.InterfaceVpcEndpointAwsService.KMS),
+    "secretsmanager": ("SecretsManagerVpcEndpoint", ec2.InterfaceVpcEndpointAwsService.SECRETS_MANAGER),
+    "fsx": ("FsxVpcEndpoint", ec2.InterfaceVpcEndpointAwsService.FSX),
+}
+
 class AdNetworkStack(Stack):
     """
     Network Stack: AD + Windows + FSx環境の基盤ネットワークリソース
@@ -13,18 +37,43 @@ class AdNetworkStack(Stack):
     このスタックには以下が含まれます:
     - VPC, Subnets, Internet Gateway, NAT Gateway
     - セキュリティグループ（ルールは他スタックで追加）
-    - VPCエンドポイント（SSM, EC2, S3）
+    - VPCエンドポイント（SSM, EC2, S3ゲートウェイ、任意でLogs/Monitoring/KMS/Secrets Manager/FSx）
+    - Route 53 Resolver アウトバウンドエンドポイントとDHCPオプション（任意）
+    - VPCフローログ（任意、S3に出力して flow_log_analyzer.py で解析）
     - 共通IAMロール
     """
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str,
+                 interface_endpoints: list = None,
+                 nat_topology: str = DEFAULT_NAT_TOPOLOGY,
+                 dns_forwarding: bool = False,
+                 flow_logs: bool = False,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        unknown_endpoints = set(interface_endpoints or []) - set(OPTIONAL_INTERFACE_ENDPOINTS)
+        if unknown_endpoints:
+            raise ValueError(
+                f"Unknown vpc-interface-endpoints: {sorted(unknown_endpoints)} "
+                f"(allowed: {sorted(OPTIONAL_INTERFACE_ENDPOINTS)})"
+            )
+
+        validate_topology(nat_topology)
+
+        # NATインスタンスモード（開発用）: VPC内からの通信のみ許可するため後でルールを追加
+        nat_provider = None
+        if nat_topology == "instance":
+            nat_provider = ec2.NatProvider.instance_v2(
+                instance_type=ec2.InstanceType.of(ec2.InstanceClass.T4G, ec2.InstanceSize.NANO),
+                default_allowed_traffic=ec2.NatTrafficDirection.OUTBOUND_ONLY
+            )
+
         # VPCの作成
         self.vpc = ec2.Vpc(
             self, "AdWindowsFsxVpc",
             max_azs=2,
-            nat_gateways=1,  # NAT Gatewayを有効化（インターネットアクセス用）
+            nat_gateways=nat_count(nat_topology),  # cdk.jsonのnat-topologyで決定（single / per-az / instance）
+            nat_gateway_provider=nat_provider,
             subnet_configuration=[
                 ec2.SubnetConfiguration(
                     subnet_type=ec2.SubnetType.PUBLIC,
@@ -39,6 +88,13 @@ class AdNetworkStack(Stack):
             ]
         )
 
+        if nat_provider:
+            nat_provider.connections.allow_from(
+                ec2.Peer.ipv4(self.vpc.vpc_cidr_block),
+                ec2.Port.all_traffic(),
+                "All traffic from VPC to NAT instance"
+            )
+
         # Active Directory用セキュリティグループ
         self.ad_security_group = ec2.SecurityGroup(
             self, "AdSecurityGroup", 
@@ -157,6 +213,74 @@ class AdNetworkStack(Stack):
             subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
         )
 
+        # S3ゲートウェイエンドポイント（Windows Update、エージェント、アセット等のS3通信をNAT経由にしない）
+        self.vpc.add_gateway_endpoint(
+            "S3GatewayEndpoint",
+            service=ec2.GatewayVpcEndpointAwsService.S3,
+            subnets=[ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)]
+        )
+
+        # 任意のインターフェースエンドポイント（cdk.jsonのvpc-interface-endpointsで指定）
+        for endpoint_key in interface_endpoints or []:
+            endpoint_id, service = OPTIONAL_INTERFACE_ENDPOINTS[endpoint_key]
+            self.vpc.add_interface_endpoint(
+                endpoint_id,
+                service=service,
+                subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
+            )
+
+        # Route 53 Resolver によるADドメインのDNS転送（cdk.jsonのdns-forwardingで有効化）
+        # 転送ルール（宛先はAD DC）はDomain Stackで作成し、ADドメイン以外はVPCリゾルバーで解決
+        if dns_forwarding:
+            self.resolver_security_group = ec2.SecurityGroup(
+                self, "ResolverSecurityGroup",
+                vpc=self.vpc,
+                description="Security group for Route 53 Resolver outbound endpoint",
+                allow_all_outbound=False
+            )
+
+            self.resolver_endpoint = route53resolver.CfnResolverEndpoint(
+                self, "ResolverOutboundEndpoint",
+                direction="OUTBOUND",
+                ip_addresses=[
+                    route53resolver.CfnResolverEndpoint.IpAddressRequestProperty(subnet_id=subnet.subnet_id)
+                    for subnet in self.vpc.private_subnets
+                ],
+                security_group_ids=[self.resolver_security_group.security_group_id],
+                name=f"{self.stack_name}-outbound"
+            )
+
+            # クライアントはVPCリゾルバー（AmazonProvidedDNS）のままADドメインを解決できる
+            dhcp_options = ec2.CfnDHCPOptions(
+                self, "DhcpOptions",
+                domain_name=DOMAIN_NAME,
+                domain_name_servers=["AmazonProvidedDNS"]
+            )
+            ec2.CfnVPCDHCPOptionsAssociation(
+                self, "DhcpOptionsAssociation",
+                dhcp_options_id=dhcp_options.ref,
+                vpc_id=self.vpc.vpc_id
+            )
+
+        # VPCフローログ（cdk.jsonのvpc-flow-logsで有効化）
+        # pkt-srcaddr/pkt-dstaddr・tcp-flagsを含むカスタムフォーマットで出力
+        if flow_logs:
+            self.flow_log_bucket = s3.Bucket(
+                self, "FlowLogBucket",
+                encryption=s3.BucketEncryption.S3_MANAGED,
+                block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                enforce_ssl=True,
+                lifecycle_rules=[s3.LifecycleRule(expiration=Duration.days(30))],
+                removal_policy=RemovalPolicy.DESTROY,
+                auto_delete_objects=True
+            )
+            self.vpc.add_flow_log(
+                "FlowLog",
+                destination=ec2.FlowLogDestination.to_s3(self.flow_log_bucket),
+                traffic_type=ec2.FlowLogTrafficType.ALL,
+                max_aggregation_interval=ec2.FlowLogMaxAggregationInterval.ONE_MINUTE,
+                log_format=[ec2.LogFormat.custom(f"${{{field}}}") for field in FLOW_LOG_FIELDS]
+            )
 
         # クロススタック参照用の出力値
         CfnOutput(
@@ -202,6 +326,13 @@ class AdNetworkStack(Stack):
             export_name="AdWindowsFsx-PrivateRouteTableId2"
         )
 
+        # プライベートサブネットごとの想定エグレス経路（AZ間通信の有無）
+        CfnOutput(
+            self, "EgressPaths",
+            value=format_egress_paths(nat_topology),
+            description=f"Expected internet egress path per private subnet (nat-topology: {nat_topology})"
+        )
+
         CfnOutput(
             self, "AdSecurityGroupId",
             value=self.ad_security_group.security_group_id,
@@ -224,6 +355,28 @@ class AdNetworkStack(Stack):
         )
 
 
+        if dns_forwarding:
+            CfnOutput(
+                self, "ResolverEndpointId",
+                value=self.resolver_endpoint.attr_resolver_endpoint_id,
+                description="Route 53 Resolver outbound endpoint ID",
+                export_name="AdWindowsFsx-ResolverEndpointId"
+            )
+
+            CfnOutput(
+                self, "ResolverSecurityGroupId",
+                value=self.resolver_security_group.security_group_id,
+                description="Security Group ID for Route 53 Resolver outbound endpoint",
+                export_name="AdWindowsFsx-ResolverSecurityGroupId"
+            )
+
+        if flow_logs:
+            CfnOutput(
+                self, "FlowLogBucketName",
+                value=self.flow_log_bucket.bucket_name,
+                description="S3 bucket for VPC flow logs (analyze with ad_windows_fsx.flow_log_analyzer)"
+            )
+
         CfnOutput(
             self, "Ec2RoleArn",
             value=self.ec2_role.role_arn,
@@ -0,0 +1,582 @@
+from aws_cdk import (
+    Stack,
+    aws_ec2 as ec2,
+    Fn,
+)
+from constructs import Construct
+
+class AdSecurityRulesStack(Stack):
+    """
+    Security Rules Stack: AD / Windows EC2 / FSx 間のセキュリティグループルール
+    
+    このスタックには以下が含まれます:
+    - AD DC用のインバウンド・アウトバウンドルール
+    - Windows EC2・FSx用のインバウンド・アウトバウンドルール
+    - Route 53 Resolver アウトバウンドエンドポイントからAD DCへのDNSルール（任意）
+    - BranchCacheのコンテンツ取得・ホスト型キャッシュ用ルール（任意）
+    - Windows EC2からFSxのリモート管理エンドポイント（WinRM）へのルール（任意）
+    
+    セキュリティグループ本体はNetwork Stackで作成し、ルールのみをこのスタックで管理します。
+    ステートフルなリソース（AD DC、FSx）を含まないため、ポート変更は数秒で反映できます。
+    """
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 dns_forwarding: bool = False,
+                 branch_cache: str = "off",
+                 fsx_remote_admin: bool = False,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        # Network Stackからの参照
+        vpc_cidr_block = Fn.import_value("AdWindowsFsx-VpcCidrBlock")
+        ad_security_group_id = Fn.import_value("AdWindowsFsx-AdSecurityGroupId")
+        windows_security_group_id = Fn.import_value("AdWindowsFsx-WindowsSecurityGroupId")
+        fsx_security_group_id = Fn.import_value("AdWindowsFsx-FsxSecurityGroupId")
+
+        # AD関連セキュリティグループルールの設定
+        self._setup_ad_security_rules(ad_security_group_id, fsx_security_group_id, vpc_cidr_block)
+
+        # アプリケーション関連のセキュリティグループルールを設定
+        self._setup_application_security_rules(
+            windows_security_group_id, fsx_security_group_id,
+            ad_security_group_id, vpc_cidr_block
+        )
+
+        # DNS転送用のルール（Network Stackでリゾルバーエンドポイントを作成した場合）
+        if dns_forwarding:
+            resolver_security_group_id = Fn.import_value("AdWindowsFsx-ResolverSecurityGroupId")
+            self._setup_resolver_security_rules(resolver_security_group_id, ad_security_group_id)
+
+        # BranchCache用のルール（Application StackでBranchCacheを有効にした場合）
+        if branch_cache != "off":
+            self._setup_branch_cache_security_rules(windows_security_group_id)
+
+        # FSxのリモート管理用のルール（BranchCacheの共有設定、fsx-sharesの共有の作成・更新）
+        if fsx_remote_admin or branch_cache != "off":
+            self._setup_fsx_remote_admin_rules(windows_security_group_id, fsx_security_group_id)
+
+    def _setup_ad_security_rules(self, ad_sg_id, fsx_sg_id, vpc_cidr_block):
+        """AD関連のセキュリティグループルールを設定"""
+
+        # AD内部通信用ポート設定
+        ad_ports = [
+            (53, "DNS"),
+            (88, "Kerberos"),  
+            (135, "RPC Endpoint Mapper"),
+            (389, "LDAP"),
+            (445, "SMB"),
+            (464, "Kerberos Password Change"),  # FSx必須ポート追加
+            (636, "LDAPS"),
+            (3268, "Global Catalog"),
+            (3269, "Global Catalog SSL"),
+            (9389, "AD DS Web Services")  # Single-AZ 2/Multi-AZ必須
+        ]
+        
+        # AD内部通信ルール（CfnSecurityGroupIngressで循環参照を回避）
+        for port, desc in ad_ports:
+            ec2.CfnSecurityGroupIngress(
+                self, f"AdInternalRule{port}",
+                group_id=ad_sg_id,
+                source_security_group_id=ad_sg_id,
+                ip_protocol="tcp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - AD internal communication"
+            )
+            
+        # FSxからAD DCへのTCP通信許可
+        for port, desc in ad_ports:
+            ec2.CfnSecurityGroupIngress(
+                self, f"FsxToAdRuleTcp{port}",
+                group_id=ad_sg_id,
+                source_security_group_id=fsx_sg_id,
+                ip_protocol="tcp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - FSx to AD (TCP)"
+            )
+
+        # RPC動的ポート範囲（AD内部通信）
+        ec2.CfnSecurityGroupIngress(
+            self, "AdInternalRuleRpc",
+            group_id=ad_sg_id,
+            source_security_group_id=ad_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - AD internal communication"
+        )
+        
+        # FSxからAD DCへのUDP通信許可（FSx必須ポート）
+        fsx_ad_udp_ports = [
+            (53, "DNS"),
+            (88, "Kerberos"),
+            (123, "NTP"),
+            (389, "LDAP"),
+            (464, "Kerberos Password Change")
+        ]
+        
+        for port, desc in fsx_ad_udp_ports:
+            ec2.CfnSecurityGroupIngress(
+                self, f"FsxToAdRuleUdp{port}",
+                group_id=ad_sg_id,
+                source_security_group_id=fsx_sg_id,
+                ip_protocol="udp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - FSx to AD (UDP)"
+            )
+        
+        # FSxからAD DCへのRPC動的ポート範囲
+        ec2.CfnSecurityGroupIngress(
+            self, "FsxToAdRuleRpcDynamic",
+            group_id=ad_sg_id,
+            source_security_group_id=fsx_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - FSx to AD"
+        )
+        
+        # FSxからAD DCへのICMP通信許可（ネットワーク疎通確認・Path MTU Discovery用）
+        ec2.CfnSecurityGroupIngress(
+            self, "FsxToAdRuleIcmp",
+            group_id=ad_sg_id,
+            source_security_group_id=fsx_sg_id,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - FSx to AD (network connectivity and Path MTU Discovery)"
+        )
+
+        # AD DC用アウトバウンドルール（CfnSecurityGroupEgressで循環参照を回避）
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressHttps",
+            group_id=ad_sg_id,
+            cidr_ip="0.0.0.0/0",
+            ip_protocol="tcp",
+            from_port=443,
+            to_port=443,
+            description="HTTPS - Windows Update and license activation"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressDns",
+            group_id=ad_sg_id,
+            cidr_ip="0.0.0.0/0",
+            ip_protocol="udp",
+            from_port=53,
+            to_port=53,
+            description="DNS - External DNS resolution"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressNtp",
+            group_id=ad_sg_id,
+            cidr_ip="0.0.0.0/0",
+            ip_protocol="udp",
+            from_port=123,
+            to_port=123,
+            description="NTP - Time synchronization"
+        )
+
+        # AD DCからFSxへのアウトバウンドルール（SMB通信用）
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressToFsxSMB",
+            group_id=ad_sg_id,
+            cidr_ip=vpc_cidr_block,
+            ip_protocol="tcp",
+            from_port=445,
+            to_port=445,
+            description="SMB - AD DC to FSx (VPC CIDR)"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressToFsxRPC",
+            group_id=ad_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="tcp",
+            from_port=135,
+            to_port=135,
+            description="RPC - AD DC to FSx"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressToFsxRpcDynamic",
+            group_id=ad_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - AD DC to FSx"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "AdEgressToFsxIcmp",
+            group_id=ad_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - AD DC to FSx (network connectivity)"
+        )
+
+        # FSxアウトバウンドルールはNetwork Stackで管理
+
+    def _setup_resolver_security_rules(self, resolver_sg_id, ad_sg_id):
+        """Route 53 Resolver アウトバウンドエンドポイント → AD DC のDNSルールを設定"""
+
+        for protocol in ["tcp", "udp"]:
+            ec2.CfnSecurityGroupEgress(
+                self, f"ResolverEgressToAdDns{protocol.title()}",
+                group_id=resolver_sg_id,
+                destination_security_group_id=ad_sg_id,
+                ip_protocol=protocol,
+                from_port=53,
+                to_port=53,
+                description=f"DNS - Resolver endpoint to AD ({protocol.upper()})"
+            )
+            ec2.CfnSecurityGroupIngress(
+                self, f"ResolverToAdRuleDns{protocol.title()}",
+                group_id=ad_sg_id,
+                source_security_group_id=resolver_sg_id,
+                ip_protocol=protocol,
+                from_port=53,
+                to_port=53,
+                description=f"DNS - Resolver endpoint to AD ({protocol.upper()})"
+            )
+
+    def _setup_branch_cache_security_rules(self, windows_sg_id):
+        """BranchCache（Windows EC2間のコンテンツ取得・ホスト型キャッシュ）のルールを設定"""
+
+        # コンテンツ取得（HTTP 80）とホスト型キャッシュへの提供（HTTPS 443、アウトバウンドは基本ルールで許可済み）
+        for port, desc in [(80, "BranchCache content retrieval"), (443, "BranchCache hosted cache")]:
+            ec2.CfnSecurityGroupIngress(
+                self, f"WindowsToWindowsRule{port}",
+                group_id=windows_sg_id,
+                source_security_group_id=windows_sg_id,
+                ip_protocol="tcp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - Windows EC2 to Windows EC2"
+            )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToWindows80",
+            group_id=windows_sg_id,
+            destination_security_group_id=windows_sg_id,
+            ip_protocol="tcp",
+            from_port=80,
+            to_port=80,
+            description="BranchCache content retrieval - Windows EC2 to Windows EC2"
+        )
+
+    def _setup_fsx_remote_admin_rules(self, windows_sg_id, fsx_sg_id):
+        """Windows EC2からFSxのリモート管理エンドポイント（WinRM、共有の作成・設定用）へのルールを設定"""
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsToFsxRuleWinRm",
+            group_id=fsx_sg_id,
+            source_security_group_id=windows_sg_id,
+            ip_protocol="tcp",
+            from_port=5985,
+            to_port=5985,
+            description="WinRM - Windows EC2 to FSx remote administration"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToFsxWinRm",
+            group_id=windows_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="tcp",
+            from_port=5985,
+            to_port=5985,
+            description="WinRM - Windows EC2 to FSx remote administration"
+        )
+
+    def _setup_application_security_rules(self, windows_sg_id, fsx_sg_id, ad_sg_id, vpc_cidr_block):
+        """アプリケーション関連のセキュリティグループルールを設定"""
+
+        # Windows EC2 ↔ AD通信用ポート設定
+        ad_ports = [
+            (53, "DNS"),
+            (88, "Kerberos"),  
+            (135, "RPC Endpoint Mapper"),
+            (389, "LDAP"),
+            (445, "SMB"),
+            (464, "Kerberos Password Change"),
+            (636, "LDAPS"),
+            (3268, "Global Catalog"),
+            (3269, "Global Catalog SSL"),
+            (9389, "AD DS Web Services")  # Single-AZ 2/Multi-AZ必須
+        ]
+        
+        # Windows EC2用インバウンドルール（AD DCからの応答受信用）
+        for port, desc in ad_ports:
+            ec2.CfnSecurityGroupIngress(
+                self, f"AdToWindowsRule{port}",
+                group_id=windows_sg_id,
+                source_security_group_id=ad_sg_id,
+                ip_protocol="tcp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - AD to Windows EC2 (response)"
+            )
+        
+        # Windows EC2用追加インバウンドルール（RDP、管理用）
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsInboundRdp",
+            group_id=windows_sg_id,
+            cidr_ip=vpc_cidr_block,
+            ip_protocol="tcp", 
+            from_port=3389,
+            to_port=3389,
+            description="RDP - Remote Desktop access from VPC"
+        )
+
+        # Windows EC2用インバウンドルール（ICMP）
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsInboundIcmp",
+            group_id=windows_sg_id,
+            cidr_ip=vpc_cidr_block,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - Network connectivity from VPC"
+        )
+
+        # Windows EC2からADへのアクセス許可（アウトバウンド用のインバウンド許可）
+        for port, desc in ad_ports:
+            ec2.CfnSecurityGroupIngress(
+                self, f"WindowsToAdRule{port}",
+                group_id=ad_sg_id,
+                source_security_group_id=windows_sg_id,
+                ip_protocol="tcp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - Windows EC2 to AD"
+            )
+
+        # Windows EC2からADへのUDP通信許可
+        udp_ad_ports = [
+            (53, "DNS"),
+            (88, "Kerberos"),
+            (123, "NTP"), 
+            (389, "LDAP"),
+            (464, "Kerberos Password Change")
+        ]
+
+        for port, desc in udp_ad_ports:
+            ec2.CfnSecurityGroupIngress(
+                self, f"WindowsToAdRuleUdp{port}",
+                group_id=ad_sg_id,
+                source_security_group_id=windows_sg_id,
+                ip_protocol="udp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - Windows EC2 to AD (UDP)"
+            )
+
+        # Windows EC2からADへのRPC動的ポート範囲（ドメイン参加・Netlogon用）
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsToAdRuleRpcDynamic",
+            group_id=ad_sg_id,
+            source_security_group_id=windows_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - Windows EC2 to AD"
+        )
+
+        # FSxからADへのアクセス許可は_setup_ad_security_rulesで管理（重複を回避）
+
+        # FSxファイル共有アクセス用ポート（Windows EC2からのアクセス）
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsToFsxRuleSMB",
+            group_id=fsx_sg_id,
+            cidr_ip=vpc_cidr_block,
+            ip_protocol="tcp",
+            from_port=445,
+            to_port=445,
+            description="SMB - Windows EC2 to FSx (VPC CIDR)"
+        )
+
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsToFsxRuleRPC",
+            group_id=fsx_sg_id,
+            source_security_group_id=windows_sg_id,
+            ip_protocol="tcp",
+            from_port=135,
+            to_port=135,
+            description="RPC - Windows EC2 to FSx"
+        )
+
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsToFsxRuleRpcDynamic",
+            group_id=fsx_sg_id,
+            source_security_group_id=windows_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - Windows EC2 to FSx"
+        )
+
+        # FSxファイル共有アクセス用ポート（AD DCからのアクセス）
+        ec2.CfnSecurityGroupIngress(
+            self, "AdToFsxRuleSMB",
+            group_id=fsx_sg_id,
+            cidr_ip=vpc_cidr_block,
+            ip_protocol="tcp",
+            from_port=445,
+            to_port=445,
+            description="SMB - AD DC to FSx (VPC CIDR)"
+        )
+
+        ec2.CfnSecurityGroupIngress(
+            self, "AdToFsxRuleRPC",
+            group_id=fsx_sg_id,
+            source_security_group_id=ad_sg_id,
+            ip_protocol="tcp",
+            from_port=135,
+            to_port=135,
+            description="RPC - AD DC to FSx"
+        )
+
+        ec2.CfnSecurityGroupIngress(
+            self, "AdToFsxRuleRpcDynamic",
+            group_id=fsx_sg_id,
+            source_security_group_id=ad_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - AD DC to FSx"
+        )
+
+        # ICMP通信許可（AD DC ↔ FSx）
+        ec2.CfnSecurityGroupIngress(
+            self, "AdToFsxRuleIcmp",
+            group_id=fsx_sg_id,
+            source_security_group_id=ad_sg_id,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - AD DC to FSx (network connectivity)"
+        )
+
+        # ICMP通信許可（Windows EC2 ↔ FSx）
+        ec2.CfnSecurityGroupIngress(
+            self, "WindowsToFsxRuleIcmp",
+            group_id=fsx_sg_id,
+            source_security_group_id=windows_sg_id,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - Windows EC2 to FSx (network connectivity)"
+        )
+
+
+        # Windows EC2からADへのアウトバウンドルール（ドメイン参加用）
+        for port, desc in ad_ports:
+            ec2.CfnSecurityGroupEgress(
+                self, f"WindowsEgressToAd{port}",
+                group_id=windows_sg_id,
+                destination_security_group_id=ad_sg_id,
+                ip_protocol="tcp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - Windows EC2 to AD"
+            )
+
+        # Windows EC2からADへのアウトバウンドルール（UDP）
+        for port, desc in udp_ad_ports:
+            ec2.CfnSecurityGroupEgress(
+                self, f"WindowsEgressToAdUdp{port}",
+                group_id=windows_sg_id,
+                destination_security_group_id=ad_sg_id,
+                ip_protocol="udp",
+                from_port=port,
+                to_port=port,
+                description=f"{desc} - Windows EC2 to AD (UDP)"
+            )
+
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToAdRpcDynamic",
+            group_id=windows_sg_id,
+            destination_security_group_id=ad_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - Windows EC2 to AD"
+        )
+
+        # Windows EC2からADへのICMP通信
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToAdIcmp",
+            group_id=windows_sg_id,
+            destination_security_group_id=ad_sg_id,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - Windows EC2 to AD (network connectivity)"
+        )
+
+        # Windows EC2用基本アウトバウンドルール
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressHttps",
+            group_id=windows_sg_id,
+            cidr_ip="0.0.0.0/0",
+            ip_protocol="tcp",
+            from_port=443,
+            to_port=443,
+            description="HTTPS - Windows Update and software downloads"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressDns",
+            group_id=windows_sg_id,
+            cidr_ip="0.0.0.0/0",
+            ip_protocol="udp",
+            from_port=53,
+            to_port=53,
+            description="DNS - External DNS resolution"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressNtp",
+            group_id=windows_sg_id,
+            cidr_ip="0.0.0.0/0",
+            ip_protocol="udp",
+            from_port=123,
+            to_port=123,
+            description="NTP - Time synchronization"
+        )
+
+        # Windows EC2からFSxへのアウトバウンドルール（SMB通信用）
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToFsxSMB",
+            group_id=windows_sg_id,
+            cidr_ip=vpc_cidr_block,
+            ip_protocol="tcp",
+            from_port=445,
+            to_port=445,
+            description="SMB - Windows EC2 to FSx (VPC CIDR)"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToFsxRPC",
+            group_id=windows_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="tcp",
+            from_port=135,
+            to_port=135,
+            description="RPC - Windows EC2 to FSx"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToFsxRpcDynamic",
+            group_id=windows_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="tcp",
+            from_port=49152,
+            to_port=65535,
+            description="RPC dynamic ports - Windows EC2 to FSx"
+        )
+        ec2.CfnSecurityGroupEgress(
+            self, "WindowsEgressToFsxIcmp",
+            group_id=windows_sg_id,
+            destination_security_group_id=fsx_sg_id,
+            ip_protocol="icmp",
+            from_port=-1,
+            to_port=-1,
+            description="ICMP - Windows EC2 to FSx (network connectivity)"
+        )
+
+        # FSx用アウトバウンドルールはNetwork Stackで一元管理
@@ -0,0 +1,264 @@
+"""
+クラウドアセンブリのキャッシュ（内容ハッシュによる合成・デプロイのスキップ）
+
+スタックごとに以下の入力からキャッシュキー（SHA-256）を計算し、合成済みのクラウドアセンブリを
+ローカルディスク（.cdk-cache/assemblies/<キー>）に保存します。
+- スタックのソースモジュール（エントリーポイントからimportをたどったファイル、stack_graph.py）
+- 解決済みのコンテキスト（cdk.json の context と cdk.context.json）
+- ライブラリのバージョン（aws-cdk-lib、constructs、jsii、Python、CDK CLI）
+- スタックがimportする上流スタックのエクスポート値（aws cloudformation list-exports の出力）
+- デプロイ先（アカウント、リージョン、スタック名に使用するユーザー名）
+
+deploy_stacks.sh は最後に成功したデプロイのキーと一致するスタックの合成・デプロイをスキップし、
+キャッシュにアセンブリがある場合は合成せずにそのアセンブリをデプロイします。
+キャッシュの合計サイズが上限（cdk.json の assembly-cache-max-mb）を超えた場合は、
+使用日時の古いアセンブリから削除します（デプロイ済みのキーは残します）。
+
+使用例:
+    aws cloudformation list-exports --output json > exports.json
+    python -m ad_windows_fsx.assembly_cache key app_domain.py --exports exports.json --account 123456789012 --region ap-northeast-1
+    python -m ad_windows_fsx.assembly_cache deployed AdWindowsFsxDomainStack-<your-name> <キー>
+    python -m ad_windows_fsx.assembly_cache lookup <キー>     # アセンブリのパス（未キャッシュの場合は終了コード1）
+    python -m ad_windows_fsx.assembly_cache record AdWindowsFsxDomainStack-<your-name> <キー>
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+from datetime import datetime, timezone
+from importlib import metadata
+
+from .stack_graph import SHARED_INPUTS, STACK_APPS, stack_sources
+
+DEFAULT_CACHE_DIR = ".cdk-cache"
+DEFAULT_MAX_MB = 512
+
+# バージョンをキーに含めるライブラリ
+LIBRARIES = ["aws-cdk-lib", "constructs", "jsii"]
+
+# デプロイ済みのキー（スタック名ごと）
+STATE_FILE = "deployed.json"
+
+
+def resolve_stack(name):
+    """スタックのキー（"domain"）またはエントリーポイント（"app_domain.py"）からスタックのキー"""
+    if name in STACK_APPS:
+        return name
+    module = os.path.splitext(os.path.basename(name))[0]
+    for key, app in STACK_APPS.items():
+        if app == module:
+            return key
+    raise ValueError(f"Unknown stack: {name} (expected one of {', '.join(STACK_APPS)} or app_*.py)")
+
+
+def load_context(root="."):
+    """解決済みのコンテキスト（cdk.json の context に cdk.context.json のルックアップ結果を重ねたもの）"""
+    context = {}
+    for name, section in (("cdk.json", "context"), ("cdk.context.json", None)):
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            context.update(data.get(section, {}) if section else data)
+    return context
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def imported_exports(root, files):
+    """ソースファイル中の Fn.import_value("...") で参照しているエクスポート名"""
+    names = set()
+    for path in files:
+        if not path.endswith(".py"):
+            continue
+        with open(os.path.join(root, path), encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr == "import_value" and node.args
+                    and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+                names.add(node.args[0].value)
+    return sorted(names)
+
+
+def export_values(exports):
+    """aws cloudformation list-exports の出力を {名前: 値} に変換"""
+    return {item["Name"]: item["Value"] for item in (exports or {}).get("Exports", [])}
+
+
+def library_versions(cli_version=None):
+    versions = {"python": platform.python_version()}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    if cli_version:
+        versions["aws-cdk"] = cli_version
+    return versions
+
+
+def key_inputs(root, stack, exports=None, environment=None, versions=None):
+    """キャッシュキーの元になる入力（差分の確認用に辞書で返す）"""
+    files = [path for path in stack_sources(root)[stack] if path not in SHARED_INPUTS]
+    values = export_values(exports)
+    return {
+        "stack": stack,
+        "sources": {path: file_digest(os.path.join(root, path)) for path in files},
+        "context": load_context(root),
+        "libraries": versions if versions is not None else library_versions(),
+        # 未デプロイのエクスポートは None（上流のデプロイ後にキーが変わる）
+        "exports": {name: values.get(name) for name in imported_exports(root, files)},
+        "environment": environment or {},
+    }
+
+
+def cache_key(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:32]
+
+
+class AssemblyCache:
+    """合成済みアセンブリとデプロイ済みキーの保存先"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+
+    @property
+    def assemblies_dir(self):
+        return os.path.join(self.cache_dir, "assemblies")
+
+    def assembly_path(self, key):
+        return os.path.join(self.assemblies_dir, key)
+
+    def lookup(self, key):
+        """キャッシュ済みのアセンブリのパス（なければ None）。使用日時を更新する"""
+        path = self.assembly_path(key)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            return None
+        os.utime(path)
+        return path
+
+    def _load_state(self):
+        path = os.path.join(self.cache_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def deployed_key(self, stack_name):
+        return self._load_state().get(stack_name, {}).get("key")
+
+    def record(self, stack_name, key):
+        """デプロイの成功を記録"""
+        state = self._load_state()
+        state[stack_name] = {"key": key, "deployed_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, STATE_FILE), "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+    def entries(self):
+        """[(キー, サイズ, 使用日時)]（使用日時の古い順）"""
+        if not os.path.isdir(self.assemblies_dir):
+            return []
+        entries = []
+        for key in os.listdir(self.assemblies_dir):
+            path = self.assembly_path(key)
+            size = sum(
+                os.path.getsize(os.path.join(directory, name))
+                for directory, _, names in os.walk(path) for name in names
+            )
+            entries.append((key, size, os.path.getmtime(path)))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def prune(self):
+        """合計サイズが上限以下になるまで古いアセンブリを削除し、削除したキーを返す"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        protected = {entry.get("key") for entry in self._load_state().values()}
+        removed = []
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key in protected:
+                continue
+            shutil.rmtree(self.assembly_path(key))
+            total -= size
+            removed.append(key)
+        return removed
+
+
+def main(argv=None):
+    context = load_context()
+    parser = argparse.ArgumentParser(description="Content-hashed cloud assembly cache for deploy_stacks.sh")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    key_parser = commands.add_parser("key", help="print the cache key of a stack")
+    key_parser.add_argument("stack", help=f"{', '.join(STACK_APPS)} or app_*.py")
+    key_parser.add_argument("--exports", help="output of aws cloudformation list-exports (JSON)")
+    key_parser.add_argument("--account", default=os.getenv("CDK_DEFAULT_ACCOUNT"))
+    key_parser.add_argument("--region", default=os.getenv("CDK_DEFAULT_REGION"))
+    key_parser.add_argument("--cli-version", help="output of cdk --version")
+    key_parser.add_argument("--explain", action="store_true", help="print the key inputs instead of the key")
+
+    lookup_parser = commands.add_parser("lookup", help="print the assembly path (exit 1 if not cached)")
+    lookup_parser.add_argument("key")
+
+    deployed_parser = commands.add_parser(
+        "deployed", help="exit 0 if the key matches the last successful deploy (any deploy if no key is given)")
+    deployed_parser.add_argument("stack_name")
+    deployed_parser.add_argument("key", nargs="?")
+
+    record_parser = commands.add_parser("record", help="record a successful deploy and evict old assemblies")
+    record_parser.add_argument("stack_name")
+    record_parser.add_argument("key")
+
+    commands.add_parser("prune", help="evict old assemblies over the size limit")
+    args = parser.parse_args(argv)
+
+    cache = AssemblyCache(args.cache_dir, int(context.get("assembly-cache-max-mb") or DEFAULT_MAX_MB))
+
+    if args.command == "key":
+        exports = None
+        if args.exports:
+            with open(args.exports, encoding="utf-8") as f:
+                exports = json.load(f)
+        environment = {
+            "account": args.account,
+            "region": args.region,
+            # スタック名の接尾辞（app_*.py と同じ）
+            "user": os.getenv("USER", "Unknown").replace(".", "-"),
+        }
+        inputs = key_inputs(".", resolve_stack(args.stack), exports, environment,
+                            library_versions(args.cli_version))
+        print(json.dumps(inputs, indent=2, sort_keys=True) if args.explain else cache_key(inputs))
+        return 0
+
+    if args.command == "lookup":
+        path = cache.lookup(args.key)
+        print(path or cache.assembly_path(args.key))
+        return 0 if path else 1
+
+    if args.command == "deployed":
+        deployed = cache.deployed_key(args.stack_name)
+        return 0 if deployed and (args.key is None or deployed == args.key) else 1
+
+    if args.command == "record":
+        cache.record(args.stack_name, args.key)
+
+    for key in cache.prune():
+        print(f"Evicted cached assembly {key}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
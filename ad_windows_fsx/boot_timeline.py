@@ -0,0 +1,397 @@
+"""
+インスタンス起動タイムラインの収集・分析
+
+ユーザーデータの各ステップは開始・終了を構造化ログ（*-steps.jsonl、powershell_script.py）に出力します。
+State Managerの関連付け（30分ごと）で、未送信の行とWindowsイベントログの起動関連イベントを
+CloudWatch Logs（ロググループはスタックごと、ログストリームはインスタンスID）に送信します。
+- Boot / Shutdown / RestartRequested: OSの起動・シャットダウン・再起動要求（Install-ADDSForest の再起動を含む）
+- Ready: 利用可能になった時点（AD DCはADWSの開始、Windows EC2はドメイン参加後のグループポリシー適用）
+- Instance: AMI ID とインスタンスタイプ（比較用）
+
+イベントはイベントログ上の時刻で送信するため、収集の間隔はタイムラインの精度に影響しません。
+分析ツールは再起動をまたいでインスタンスごとのタイムライン（ステップと待ち時間）を再構成し、
+AMIやインスタンスタイプごとに比較します。
+
+使用例:
+    aws logs filter-log-events --log-group-name <BootTimelineLogGroupName> > events.json
+    python -m ad_windows_fsx.boot_timeline show events.json
+    python -m ad_windows_fsx.boot_timeline compare events.json --by instance-type
+    # インスタンスから取得した *-steps.jsonl も入力にできます（ステップのみ）
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from aws_cdk import (
+    RemovalPolicy,
+    aws_iam as iam,
+    aws_logs as logs,
+)
+from constructs import Construct
+
+from .config_documents import ConfigAssociation, _run_powershell, build_document
+
+# 送信の間隔（State Managerの最短スケジュール）
+SHIP_SCHEDULE = "rate(30 minutes)"
+
+STATE_DIR = "C:\\ProgramData\\BootTimeline"
+
+# (ステップ名, ログ名, プロバイダー名, イベントID)
+Marker = namedtuple("Marker", ["step", "log_name", "provider", "ids"])
+
+BOOT_MARKERS = [
+    Marker("Boot", "System", "Microsoft-Windows-Kernel-General", [12]),
+    Marker("Shutdown", "System", "Microsoft-Windows-Kernel-General", [13]),
+    Marker("RestartRequested", "System", "User32", [1074]),
+]
+
+# 利用可能になった時点（最初の発生をReadyとする）
+DOMAIN_CONTROLLER_READY = Marker("Ready", "Active Directory Web Services", "ADWS", [1200])
+WINDOWS_CLIENT_READY = Marker("Ready", "System", "Microsoft-Windows-GroupPolicy", [1500, 1502])
+
+# これより短い隙間は待ち時間として扱わない（秒）
+MIN_WAIT_SECONDS = 1
+
+Span = namedtuple("Span", ["label", "kind", "start", "end", "status"])
+Timeline = namedtuple("Timeline", ["instance", "role", "ami_id", "instance_type", "spans", "ready"])
+
+
+def _marker_literal(marker):
+    ids = ", ".join(str(i) for i in marker.ids)
+    return (
+        f"    @{{ Step = '{marker.step}'; LogName = '{marker.log_name}'; "
+        f"ProviderName = '{marker.provider}'; Id = @({ids}) }}"
+    )
+
+
+def ship_commands(ready_marker, state_dir=STATE_DIR):
+    """未送信のステップログと起動関連イベントをCloudWatch Logsに送信するPowerShell"""
+    markers = BOOT_MARKERS + [ready_marker]
+    return [
+        "$ErrorActionPreference = 'Stop'",
+        "Import-Module AWSPowerShell -ErrorAction SilentlyContinue",
+        "$LogGroupName = '{{ LogGroupName }}'",
+        "$StepLogPath = '{{ StepLogPath }}'",
+        f"$StatePath = '{state_dir}\\state.json'",
+        f"New-Item -ItemType Directory -Force -Path '{state_dir}' | Out-Null",
+        "$Token = Invoke-RestMethod -Method Put -Uri 'http://169.254.169.254/latest/api/token' "
+        "-Headers @{ 'X-aws-ec2-metadata-token-ttl-seconds' = '60' }",
+        "function Get-Metadata([string]$Path) {",
+        "    Invoke-RestMethod -Uri \"http://169.254.169.254/latest/meta-data/$Path\" -Headers @{ 'X-aws-ec2-metadata-token' = $Token }",
+        "}",
+        "$InstanceId = Get-Metadata 'instance-id'",
+        "$Region = Get-Metadata 'placement/region'",
+        "if (Test-Path $StatePath) {",
+        "    $State = Get-Content -Path $StatePath -Raw | ConvertFrom-Json",
+        "} else {",
+        "    # 初回はインスタンスのセットアップ（sysprepの特殊化）以降のイベントのみ（AMI作成時のイベントを除外）",
+        "    $InstallDate = (Get-CimInstance Win32_OperatingSystem).InstallDate.ToUniversalTime().AddMinutes(-10)",
+        "    $State = [pscustomobject]@{ Lines = 0; EventsAfter = $InstallDate.ToString('o'); Identified = $false }",
+        "}",
+        "$Records = New-Object System.Collections.Generic.List[object]",
+        "function Add-Record([datetime]$Time, [System.Collections.IDictionary]$Fields) {",
+        "    $Time = $Time.ToUniversalTime()",
+        "    $Fields['timestamp'] = $Time.ToString('o')",
+        "    $Records.Add([pscustomobject]@{ Time = $Time; Message = ($Fields | ConvertTo-Json -Compress) })",
+        "}",
+        "if (-not $State.Identified) {",
+        "    Add-Record (Get-Date) ([ordered]@{ script = 'Instance'; step = 'Instance'; phase = 'event'; "
+        "ami_id = (Get-Metadata 'ami-id'); instance_type = (Get-Metadata 'instance-type') })",
+        "}",
+        "# ステップログ（前回までに送信した行は除く）",
+        "$LineCount = [int]$State.Lines",
+        "if (Test-Path $StepLogPath) {",
+        "    $Lines = @(Get-Content -Path $StepLogPath | Where-Object { $_ })",
+        "    foreach ($Line in ($Lines | Select-Object -Skip $LineCount)) {",
+        "        $Records.Add([pscustomobject]@{ Time = ([datetime]($Line | ConvertFrom-Json).timestamp).ToUniversalTime(); Message = $Line })",
+        "    }",
+        "    $LineCount = $Lines.Count",
+        "}",
+        "# 起動・シャットダウン・再起動要求・Readyのイベント",
+        "$EventsAfter = [datetime]$State.EventsAfter",
+        "$Latest = $EventsAfter",
+        "$Markers = @(",
+        *[_marker_literal(marker) + ("," if i < len(markers) - 1 else "") for i, marker in enumerate(markers)],
+        ")",
+        "foreach ($Marker in $Markers) {",
+        "    $Filter = @{ LogName = $Marker.LogName; ProviderName = $Marker.ProviderName; Id = $Marker.Id; StartTime = $EventsAfter }",
+        "    foreach ($WinEvent in @(Get-WinEvent -FilterHashtable $Filter -ErrorAction SilentlyContinue)) {",
+        "        Add-Record $WinEvent.TimeCreated ([ordered]@{ script = 'System'; step = $Marker.Step; phase = 'event'; "
+        "message = (\"$($WinEvent.Message)\" -split \"`r?`n\")[0] })",
+        "        if ($WinEvent.TimeCreated -gt $Latest) { $Latest = $WinEvent.TimeCreated }",
+        "    }",
+        "}",
+        "if ($Records.Count -gt 0) {",
+        "    try {",
+        "        New-CWLLogStream -LogGroupName $LogGroupName -LogStreamName $InstanceId -Region $Region",
+        "    } catch {",
+        "        if (\"$($_.Exception.Message)\" -notlike '*already exists*') { throw }",
+        "    }",
+        "    # PutLogEvents は時刻順のイベントを要求する",
+        "    $Sorted = @($Records | Sort-Object Time)",
+        "    for ($Index = 0; $Index -lt $Sorted.Count; $Index += 500) {",
+        "        $Batch = $Sorted[$Index..([Math]::Min($Index + 499, $Sorted.Count - 1))] | ForEach-Object {",
+        "            $LogEvent = New-Object Amazon.CloudWatchLogs.Model.InputLogEvent",
+        "            $LogEvent.Timestamp = $_.Time",
+        "            $LogEvent.Message = $_.Message",
+        "            $LogEvent",
+        "        }",
+        "        Write-CWLLogEvent -LogGroupName $LogGroupName -LogStreamName $InstanceId -LogEvent $Batch -Region $Region | Out-Null",
+        "    }",
+        "}",
+        "# StartTime は境界を含むため、最後のイベントの直後から次回の対象とする",
+        "[pscustomobject]@{ Lines = $LineCount; EventsAfter = $Latest.ToUniversalTime().AddMilliseconds(1).ToString('o'); Identified = $true } |",
+        "    ConvertTo-Json | Set-Content -Path $StatePath",
+        "Write-Host \"Shipped $($Records.Count) boot timeline records to $LogGroupName/$InstanceId\"",
+    ]
+
+
+def boot_timeline_document(ready_marker):
+    """起動タイムラインを送信する構成ドキュメント"""
+    return build_document(
+        "Ship setup step logs and boot events to CloudWatch Logs",
+        [_run_powershell("ShipBootTimeline", ship_commands(ready_marker))],
+        parameters={
+            "LogGroupName": "CloudWatch Logs group for boot timelines",
+            "StepLogPath": "Structured step log written by the user data",
+        }
+    )
+
+
+class BootTimeline(Construct):
+    """起動タイムラインのロググループ、書き込み権限、送信用の関連付け"""
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 instance_id: str,
+                 role: iam.IRole,
+                 step_log_path: str,
+                 ready_marker: Marker) -> None:
+        super().__init__(scope, construct_id)
+
+        self.log_group = logs.LogGroup(
+            self, "LogGroup",
+            retention=logs.RetentionDays.ONE_MONTH,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        # インポートしたロールにログストリームの作成・書き込み権限を追加
+        self.log_group.grant_write(role)
+
+        self.config = ConfigAssociation(
+            self, "BootTimelineShipping",
+            document=boot_timeline_document(ready_marker),
+            instance_id=instance_id,
+            parameters={
+                "LogGroupName": self.log_group.log_group_name,
+                "StepLogPath": step_log_path,
+            },
+            schedule_expression=SHIP_SCHEDULE
+        )
+
+
+def _timestamp(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def load_records(path):
+    """
+    filter-log-events の出力（ログストリーム=インスタンスID）またはJSON Linesのステップログを読み込む
+
+    JSON Linesの場合はファイル名（拡張子を除く）をインスタンス名とします。
+    """
+    text = Path(path).read_text(encoding="utf-8-sig")
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict) and "events" in data:
+        entries = [(event["logStreamName"], event["message"]) for event in data["events"]]
+    else:
+        entries = [(Path(path).stem, line) for line in text.splitlines() if line.strip()]
+
+    records = []
+    for instance, message in entries:
+        record = json.loads(message)
+        record["instance"] = instance
+        record["timestamp"] = _timestamp(record["timestamp"])
+        records.append(record)
+    return records
+
+
+def build_timelines(records):
+    """レコードからインスタンスごとのタイムラインを再構成（時刻は最初の起動からの秒数）"""
+    by_instance = {}
+    for record in records:
+        by_instance.setdefault(record["instance"], []).append(record)
+    return [_build_timeline(instance, rows) for instance, rows in sorted(by_instance.items())]
+
+
+def _build_timeline(instance, records):
+    records = sorted(records, key=lambda r: r["timestamp"])
+    boots = [r for r in records if r.get("script") == "System" and r["step"] == "Boot"]
+    origin = (boots[0] if boots else records[0])["timestamp"]
+
+    def offset(record):
+        return (record["timestamp"] - origin).total_seconds()
+
+    spans, open_steps = [], {}
+    role = ami_id = instance_type = ready = None
+    boot_count = 0
+
+    def close_open_steps(at, status):
+        for (_, step), start in sorted(open_steps.items(), key=lambda item: item[1]):
+            spans.append(Span(step, "step", start, at, status))
+        open_steps.clear()
+
+    for record in records:
+        at = offset(record)
+        script, step = record.get("script"), record["step"]
+        if script == "Instance":
+            ami_id, instance_type = record.get("ami_id"), record.get("instance_type")
+        elif script == "System":
+            if step in ("Boot", "Shutdown"):
+                # 再起動で終了ログを出力できなかったステップ（Install-ADDSForest など）
+                close_open_steps(at, "interrupted")
+            if step == "Boot":
+                boot_count += 1
+                step = f"Boot#{boot_count}"
+            elif step == "Ready":
+                if ready is not None:
+                    continue
+                ready = at
+            spans.append(Span(step, "event", at, at, ""))
+        elif record.get("phase") == "start":
+            role = role or script
+            open_steps[(script, step)] = at
+        elif record.get("phase") == "end":
+            start = open_steps.pop((script, step), None)
+            if start is not None:
+                spans.append(Span(step, "step", start, at, record.get("status", "")))
+    close_open_steps(offset(records[-1]), "incomplete")
+
+    return Timeline(instance, role or "unknown", ami_id, instance_type, _with_waits(spans), ready)
+
+
+def _with_waits(spans):
+    """ステップ・イベントの間で何も実行されていない区間を待ち時間として追加"""
+    spans = sorted(spans, key=lambda s: (s.start, s.end))
+    result, cursor, previous = [], None, None
+    for span in spans:
+        if cursor is not None and span.start - cursor >= MIN_WAIT_SECONDS:
+            result.append(Span(f"{previous} -> {span.label}", "wait", cursor, span.start, ""))
+        result.append(span)
+        if cursor is None or span.end >= cursor:
+            cursor, previous = span.end, span.label
+    return result
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(abs(seconds), 3600)
+    text = f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+    return f"-{text}" if seconds < 0 else text
+
+
+def format_timeline(timeline, width=40):
+    total = max([span.end for span in timeline.spans] + [1])
+    ready = format_duration(timeline.ready) if timeline.ready is not None else "not ready"
+    lines = [
+        f"{timeline.instance} ({timeline.role}, {timeline.ami_id or '-'}, {timeline.instance_type or '-'}): ready {ready}",
+    ]
+    for span in timeline.spans:
+        begin = min(int(span.start / total * width), width - 1)
+        bar = " " * begin + ("|" if span.kind == "event" else
+                             ("." if span.kind == "wait" else "#") * max(1, int(span.end / total * width) - begin))
+        status = f" [{span.status}]" if span.status not in ("", "success") else ""
+        lines.append(
+            f"  +{format_duration(span.start):>8}  {format_duration(span.end - span.start):>8}  "
+            f"{bar:<{width}}  {span.label}{status}"
+        )
+    return "\n".join(lines)
+
+
+def compare(timelines, by="ami"):
+    """
+    ロールと比較キー（ami / instance-type）ごとに、ステップ・待ち時間・Readyまでの時間の中央値を求める
+
+    戻り値: {ロール: ([グループ], [(ラベル, {グループ: 秒})])}
+    """
+    attribute = {"ami": "ami_id", "instance-type": "instance_type"}[by]
+    groups = {}
+    for timeline in timelines:
+        key = getattr(timeline, attribute) or "-"
+        groups.setdefault(timeline.role, {}).setdefault(key, []).append(timeline)
+
+    result = {}
+    for role, role_groups in sorted(groups.items()):
+        labels, durations = [], {}
+        for key, members in role_groups.items():
+            for timeline in members:
+                for span in timeline.spans:
+                    if span.kind == "event":
+                        continue
+                    if span.label not in labels:
+                        labels.append(span.label)
+                    durations.setdefault((span.label, key), []).append(span.end - span.start)
+                if timeline.ready is not None:
+                    durations.setdefault(("TimeToReady", key), []).append(timeline.ready)
+        names = [f"{key} (n={len(members)})" for key, members in sorted(role_groups.items())]
+        rows = [
+            (label, {
+                name: statistics.median(durations[(label, key)])
+                for name, key in zip(names, sorted(role_groups))
+                if (label, key) in durations
+            })
+            for label in labels + ["TimeToReady"]
+        ]
+        result[role] = (names, rows)
+    return result
+
+
+def format_comparison(comparison):
+    lines = []
+    for role, (names, rows) in comparison.items():
+        columns = names + (["delta"] if len(names) == 2 else [])
+        label_width = max(len(label) for label, _ in rows + [("STEP", None)])
+        widths = [max(len(name), 8) for name in columns]
+        lines.append(f"{role}:")
+        lines.append("  " + "STEP".ljust(label_width) + "".join(f"  {c:>{w}}" for c, w in zip(columns, widths)))
+        for label, values in rows:
+            cells = [format_duration(values[name]) if name in values else "-" for name in names]
+            if len(names) == 2:
+                cells.append(format_duration(values[names[1]] - values[names[0]])
+                             if len(values) == 2 else "-")
+            lines.append("  " + label.ljust(label_width) + "".join(f"  {c:>{w}}" for c, w in zip(cells, widths)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstruct and compare instance boot timelines")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show = subparsers.add_parser("show", help="print per-instance timelines")
+    show.add_argument("inputs", nargs="+", help="filter-log-events JSON or *-steps.jsonl files")
+    show.add_argument("--instance", action="append", help="limit to this instance (repeatable)")
+
+    compare_parser = subparsers.add_parser("compare", help="compare median durations across AMIs or instance types")
+    compare_parser.add_argument("inputs", nargs="+", help="filter-log-events JSON or *-steps.jsonl files")
+    compare_parser.add_argument("--by", choices=["ami", "instance-type"], default="ami")
+
+    args = parser.parse_args(argv)
+    records = [record for path in args.inputs for record in load_records(path)]
+    timelines = build_timelines(records)
+
+    if args.command == "show":
+        selected = [t for t in timelines if not args.instance or t.instance in args.instance]
+        print("\n\n".join(format_timeline(timeline) for timeline in selected))
+    else:
+        print(format_comparison(compare(timelines, args.by)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
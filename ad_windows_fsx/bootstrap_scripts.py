@@ -0,0 +1,89 @@
+"""
+AD DC・Windows EC2の初回起動用ブートストラップスクリプト定義
+
+再適用可能な設定は config_documents.py（State Manager）で管理し、
+ここには初回起動時にしか実行できない処理のみを定義します。
+"""
+
+from .powershell_script import (
+    PowerShellScript,
+    ScriptStep,
+    feature_install,
+    local_user,
+)
+
+DOMAIN_NAME = "example.com"
+
+# ログ出力先（トランスクリプトと構造化ステップログ）
+AD_DC_TRANSCRIPT_PATH = "C:\\Windows\\Temp\\ad-setup.log"
+AD_DC_STEP_LOG_PATH = "C:\\Windows\\Temp\\ad-setup-steps.jsonl"
+WINDOWS_TRANSCRIPT_PATH = "C:\\Windows\\Temp\\windows-setup.log"
+WINDOWS_STEP_LOG_PATH = "C:\\Windows\\Temp\\windows-setup-steps.jsonl"
+
+
+def domain_controller_script():
+    """AD DC用ブートストラップスクリプト（機能インストールとフォレスト作成）"""
+    script = PowerShellScript(
+        "AdDcSetup",
+        transcript_path=AD_DC_TRANSCRIPT_PATH,
+        step_log_path=AD_DC_STEP_LOG_PATH
+    )
+    script.add(
+        feature_install("AD-Domain-Services", description="Active Directory Domain Services の機能をインストール"),
+        feature_install("DNS", description="DNS Server機能をインストール"),
+        local_user(
+            "fsxuser", "Password123!",
+            groups=["administrators", "Remote Desktop Users"],
+            description="管理者用ユーザーを作成（フォレスト作成後はドメインユーザーになる）"
+        ),
+        ScriptStep(
+            name="InstallAdForest",
+            description="新しいフォレストとドメインを作成（完了後に自動再起動）",
+            commands=[
+                f"$DomainName = '{DOMAIN_NAME}'",
+                "$SafeModePassword = ConvertTo-SecureString 'Password123!' -AsPlainText -Force",
+                "Import-Module ADDSDeployment",
+                "Write-Host \"Installing AD Forest: $DomainName\"",
+                "Install-ADDSForest -DomainName $DomainName -SafeModeAdministratorPassword $SafeModePassword -DomainMode WinThreshold -ForestMode WinThreshold -InstallDns:$true -Force",
+                "Write-Host \"AD Forest installation command executed - server will restart\"",
+            ]
+        ),
+    )
+    return script
+
+
+def windows_client_script(set_dns_server=True):
+    """
+    Windows EC2用ブートストラップスクリプト（DNS設定、ドメイン参加はState Managerで実行）
+
+    set_dns_server=False の場合はDNSをAD DCに変更しません（Route 53 ResolverでADドメインを転送する構成）。
+    """
+    script = PowerShellScript(
+        "WindowsSetup",
+        transcript_path=WINDOWS_TRANSCRIPT_PATH,
+        step_log_path=WINDOWS_STEP_LOG_PATH,
+        variables={"AdDcIp": "${AdDcPrivateIp}"}
+    )
+    script.add(
+        local_user(
+            "winuser", "Password123!",
+            groups=["administrators", "Remote Desktop Users"],
+            description="一般ユーザーを作成"
+        ),
+    )
+    if set_dns_server:
+        script.add(ScriptStep(
+            name="SetDnsServer",
+            description="DNS設定をAD DCに変更",
+            commands=[
+                "Write-Host \"Setting DNS server to AD DC: $AdDcIp\"",
+                "$adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'}",
+                "if (-not $adapter) {",
+                "    throw \"No suitable network adapter found\"",
+                "}",
+                "Set-DnsClientServerAddress -InterfaceIndex $adapter.InterfaceIndex -ServerAddresses $AdDcIp",
+                "Write-Host \"DNS server set successfully to: $AdDcIp\"",
+                "Get-DnsClientServerAddress -AddressFamily IPv4",
+            ]
+        ))
+    return script
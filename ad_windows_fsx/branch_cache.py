@@ -0,0 +1,407 @@
+"""
+BranchCacheによるクライアント側の読み取りキャッシュ
+
+同じ大きなファイルを繰り返し読み取るワークロード向けに、FSx共有のハッシュ（コンテンツ情報）を公開し、
+クライアントはファイル本体をBranchCacheのキャッシュから取得します（cdk.jsonのbranch-cache）。
+- distributed: 各クライアントのローカルキャッシュ（VPCはマルチキャストを転送しないため、WS-Discoveryによるピア間の共有は行われません）
+- hosted: 専用のホスト型キャッシュサーバー（Windows EC2）をクライアント間で共有
+
+設定はすべてAD DCのグループポリシーで配布します。
+- クライアント用GPO（ドメインにリンク）: BranchCacheの有効化、モード、コンテンツ情報V2、ネットワークファイルの遅延しきい値0ms
+  （既定の80msではVPC内のSMBでBranchCacheが使われないため）
+- ハッシュ公開用GPO（FSxのOUにリンク、fsx-delegated-ou が無効の場合はドメイン）: BranchCacheを有効にした共有のハッシュ公開、V1・V2のハッシュ
+共有のキャッシュモードはFSxのリモート管理エンドポイント（PowerShell）で BranchCache に設定します。
+
+ベンチマーク（SSM Commandドキュメント）は新しい内容のファイルを共有に作成し、キャッシュが空の状態（cold）と
+キャッシュ済みの状態（warm）で読み取ったときのFSxからの転送量（origin bytes）を比較します。
+
+使用例:
+    aws ssm send-command --document-name <BranchCacheBenchmarkDocumentName> --instance-ids <WindowsInstanceId> \\
+        --parameters FsxDnsName=<FsxDnsName>
+    aws ssm list-command-invocations --command-id <CommandId> --details > invocations.json
+    python -m ad_windows_fsx.branch_cache report invocations.json
+"""
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+from aws_cdk import (
+    Aws,
+    Stack,
+    aws_iam as iam,
+    aws_ssm as ssm,
+)
+from constructs import Construct
+
+from .config_documents import ConfigAssociation, _run_powershell, build_document
+from .fsx_delegation import domain_distinguished_name, ou_distinguished_name
+from .powershell_script import ps_quote
+
+MODES = ["off", "distributed", "hosted"]
+
+DEFAULT_MODE = "off"
+
+CLIENT_GPO_NAME = "AdWindowsFsx BranchCache Clients"
+SERVER_GPO_NAME = "AdWindowsFsx BranchCache Hash Publication"
+
+# ホスト型キャッシュサーバーのキャッシュに割り当てるディスクの割合（%）
+HOSTED_CACHE_PERCENTAGE = 50
+
+# 共有のキャッシュモードの確認・再適用の間隔（ドメイン参加前は何もしない）
+APPLY_SCHEDULE = "rate(30 minutes)"
+
+_PEERDIST_KEY = "HKLM\\Software\\Policies\\Microsoft\\PeerDist"
+_NETCACHE_KEY = "HKLM\\Software\\Policies\\Microsoft\\Windows\\NetCache"
+_LANMAN_SERVER_KEY = "HKLM\\Software\\Policies\\Microsoft\\Windows\\LanmanServer"
+
+# key: レジストリキー、name: 値の名前、type: Set-GPRegistryValue の -Type、value: 値
+PolicyValue = namedtuple("PolicyValue", ["key", "name", "type", "value"])
+
+BenchmarkResult = namedtuple("BenchmarkResult", ["instance", "mode", "file_mb", "cold", "warm", "reduction"])
+
+
+def validate_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f"Unknown branch-cache: {mode!r} (allowed: {', '.join(MODES)})")
+    return mode
+
+
+def client_policy(mode):
+    """クライアント用GPOのレジストリ値"""
+    validate_mode(mode)
+    values = [
+        PolicyValue(f"{_PEERDIST_KEY}\\Service", "Enable", "DWord", 1),
+        PolicyValue(f"{_PEERDIST_KEY}\\Service\\Versioning", "PreferredContentInformationVersion", "DWord", 2),
+        # ネットワークファイル（SMB）でBranchCacheを使う往復遅延のしきい値（ミリ秒）
+        PolicyValue(_NETCACHE_KEY, "PeerCachingLatencyThreshold", "DWord", 0),
+    ]
+    if mode == "distributed":
+        values.append(PolicyValue(f"{_PEERDIST_KEY}\\CooperativeCaching", "Enable", "DWord", 1))
+    elif mode == "hosted":
+        values.append(PolicyValue(f"{_PEERDIST_KEY}\\HostedCache\\Connection", "Location", "String",
+                                  "{{ HostedCacheLocation }}"))
+    return values
+
+
+def server_policy():
+    """ハッシュ公開用GPOのレジストリ値（0: BranchCacheを有効にした共有のみ公開、3: V1・V2）"""
+    return [
+        PolicyValue(_LANMAN_SERVER_KEY, "HashPublicationForPeerCaching", "DWord", 0),
+        PolicyValue(_LANMAN_SERVER_KEY, "HashSupportVersion", "DWord", 3),
+    ]
+
+
+def _policy_literal(value):
+    literal = value.value if isinstance(value.value, int) else ps_quote(value.value)
+    return (
+        f"    @{{ Key = {ps_quote(value.key)}; ValueName = {ps_quote(value.name)}; "
+        f"Type = {ps_quote(value.type)}; Value = {literal} }}"
+    )
+
+
+def _gpo_commands(name, target, managed_keys, values):
+    literals = [_policy_literal(v) + ("," if i < len(values) - 1 else "") for i, v in enumerate(values)]
+    keys = ", ".join(ps_quote(key) for key in managed_keys)
+    return [
+        f"Set-ManagedGpo -Name {ps_quote(name)} -Target {ps_quote(target)} -ManagedKeys @({keys}) -Values @(",
+        *literals,
+        ")",
+    ]
+
+
+def group_policy_commands(mode, domain_dn, fsx_ou_dn):
+    """AD DCでクライアント用・ハッシュ公開用のGPOを作成・更新・リンクするPowerShell"""
+    return [
+        "$ErrorActionPreference = 'Stop'",
+        "Import-Module GroupPolicy",
+        "function Set-ManagedGpo([string]$Name, [string]$Target, [string[]]$ManagedKeys, [object[]]$Values) {",
+        "    if (-not (Get-GPO -Name $Name -ErrorAction SilentlyContinue)) {",
+        "        New-GPO -Name $Name -Comment 'Managed by AdWindowsFsx (branch-cache)' | Out-Null",
+        "    }",
+        "    # モード変更時に前の値が残らないよう、管理対象のキーを削除してから設定する",
+        "    foreach ($Key in $ManagedKeys) {",
+        "        Remove-GPRegistryValue -Name $Name -Key $Key -ErrorAction SilentlyContinue | Out-Null",
+        "    }",
+        "    foreach ($Value in $Values) {",
+        "        Set-GPRegistryValue -Name $Name -Key $Value.Key -ValueName $Value.ValueName -Type $Value.Type -Value $Value.Value | Out-Null",
+        "    }",
+        "    if (-not ((Get-GPInheritance -Target $Target).GpoLinks | Where-Object { $_.DisplayName -eq $Name })) {",
+        "        New-GPLink -Name $Name -Target $Target | Out-Null",
+        "    }",
+        "    Write-Host \"GPO '$Name': $($Values.Count) values, linked to $Target\"",
+        "}",
+        *_gpo_commands(CLIENT_GPO_NAME, domain_dn, [_PEERDIST_KEY, _NETCACHE_KEY], client_policy(mode)),
+        *_gpo_commands(SERVER_GPO_NAME, fsx_ou_dn, [_LANMAN_SERVER_KEY], server_policy()),
+    ]
+
+
+def _install_feature_commands():
+    return [
+        "if (-not (Get-WindowsFeature -Name BranchCache).Installed) {",
+        "    Install-WindowsFeature -Name BranchCache | Out-Null",
+        "}",
+    ]
+
+
+def _domain_joined_guard():
+    return [
+        "if (-not (Get-WmiObject -Class Win32_ComputerSystem).PartOfDomain) {",
+        "    Write-Host 'Not joined to the domain yet; BranchCache settings will be applied on the next run'",
+        "    exit 0",
+        "}",
+        "gpupdate /target:computer /force | Out-Null",
+    ]
+
+
+def share_caching_commands(domain_name, share_name="share"):
+    """FSxのリモート管理エンドポイントで共有のキャッシュモードを BranchCache に設定するPowerShell"""
+    return [
+        "$Endpoint = (Get-FSXFileSystem -FileSystemId '{{ FileSystemId }}' -Region '{{ Region }}').WindowsConfiguration.RemoteAdministrationEndpoint",
+        "$Password = ConvertTo-SecureString 'Password123!' -AsPlainText -Force",
+        f"$Credential = New-Object System.Management.Automation.PSCredential('Administrator@{domain_name}', $Password)",
+        "$CachingMode = Invoke-Command -ComputerName $Endpoint -ConfigurationName FSxRemoteAdmin -Credential $Credential -ScriptBlock {",
+        f"    if ((Get-FSxSmbShare -Name {ps_quote(share_name)}).CachingMode -ne 'BranchCache') {{",
+        f"        Set-FSxSmbShare -Name {ps_quote(share_name)} -CachingMode BranchCache -Force",
+        "    }",
+        f"    (Get-FSxSmbShare -Name {ps_quote(share_name)}).CachingMode",
+        "}",
+        f"Write-Host \"Share {share_name} caching mode: $CachingMode\"",
+    ]
+
+
+def client_document(domain_name):
+    """クライアント: BranchCache機能のインストール、ポリシーの反映、共有のハッシュ公開"""
+    return build_document(
+        "Enable BranchCache on the client and publish hashes on the FSx share",
+        [_run_powershell("ConfigureBranchCacheClient", [
+            "$ErrorActionPreference = 'Stop'",
+            *_install_feature_commands(),
+            *_domain_joined_guard(),
+            *share_caching_commands(domain_name),
+            "Write-Host \"BranchCache client mode: $((Get-BCStatus).ClientConfiguration.CurrentClientMode)\"",
+        ])],
+        parameters={
+            "FileSystemId": "FSx file system ID",
+            "Region": "Region of the FSx file system",
+        }
+    )
+
+
+def hosted_server_document(cache_percentage=HOSTED_CACHE_PERCENTAGE):
+    """ホスト型キャッシュサーバー: BranchCache機能のインストールとホスト型キャッシュモードの有効化"""
+    return build_document(
+        "Run this instance as a BranchCache hosted cache server",
+        [_run_powershell("ConfigureHostedCache", [
+            "$ErrorActionPreference = 'Stop'",
+            *_install_feature_commands(),
+            *_domain_joined_guard(),
+            "if ((Get-BCStatus).HostedCacheServerConfiguration.HostedCacheServerIsEnabled -ne $true) {",
+            "    Enable-BCHostedServer -Force",
+            "}",
+            f"Set-BCCache -Percentage {cache_percentage} -Force",
+            "Write-Host \"Hosted cache server enabled: $((Get-BCStatus).HostedCacheServerConfiguration.HostedCacheServerIsEnabled)\"",
+        ])]
+    )
+
+
+def benchmark_commands(share_name="share"):
+    """cold / warm の読み取りでFSxからの転送量を計測し、結果をJSONで出力するPowerShell"""
+    return [
+        "$ErrorActionPreference = 'Stop'",
+        "$Mode = [string](Get-BCStatus).ClientConfiguration.CurrentClientMode",
+        f"$Dir = \"\\\\{{{{ FsxDnsName }}}}\\{share_name}\\branchcache-benchmark\\$env:COMPUTERNAME\"",
+        "$Local = Join-Path $env:TEMP 'branchcache-benchmark'",
+        "New-Item -ItemType Directory -Force -Path $Dir | Out-Null",
+        "# どのキャッシュにも存在しない新しい内容のファイル",
+        "$Name = \"bench-$([guid]::NewGuid().ToString('N')).bin\"",
+        "$Buffer = New-Object byte[] (1MB)",
+        "$Random = New-Object System.Random",
+        "$Stream = [System.IO.File]::Create((Join-Path $Dir $Name))",
+        "try {",
+        "    for ($i = 0; $i -lt {{ FileSizeMb }}; $i++) { $Random.NextBytes($Buffer); $Stream.Write($Buffer, 0, $Buffer.Length) }",
+        "} finally {",
+        "    $Stream.Dispose()",
+        "}",
+        "# パフォーマンスカウンター（WMIのクラス名・プロパティ名はOSの言語に依存しない）",
+        "function Get-Transfer {",
+        "    $Counters = Get-CimInstance -ClassName Win32_PerfRawData_PeerDistSvc_BranchCache",
+        "    $Network = (Get-NetAdapterStatistics | Measure-Object -Property ReceivedBytes -Sum).Sum",
+        "    @{ Server = [long]$Counters.SMBBytesfromserver; Cache = [long]$Counters.SMBBytesfromcache; Network = [long]$Network }",
+        "}",
+        "function Measure-Read([string]$Phase) {",
+        "    Remove-Item -Recurse -Force $Local -ErrorAction SilentlyContinue",
+        "    $Before = Get-Transfer",
+        "    $Timer = [System.Diagnostics.Stopwatch]::StartNew()",
+        "    # /J: バッファーなしI/O（クライアントのファイルキャッシュから読み取らない）",
+        "    robocopy $Dir $Local $Name /J /NJH /NJS /NP /R:0 | Out-Null",
+        "    if ($LASTEXITCODE -ge 8) { throw \"robocopy failed with exit code $LASTEXITCODE\" }",
+        "    $Seconds = $Timer.Elapsed.TotalSeconds",
+        "    $After = Get-Transfer",
+        "    [ordered]@{",
+        "        seconds = [math]::Round($Seconds, 2)",
+        "        bytes_from_server = $After.Server - $Before.Server",
+        "        bytes_from_cache = $After.Cache - $Before.Cache",
+        "        network_bytes = $After.Network - $Before.Network",
+        "    }",
+        "}",
+        "try {",
+        "    Clear-BCCache -Force",
+        "    $Cold = Measure-Read 'cold'",
+        "    if ($Mode -eq 'HostedCacheClient') {",
+        "        # ホスト型キャッシュへの提供を待ち、ローカルキャッシュを消去してホスト型キャッシュからの取得を計測",
+        "        Start-Sleep -Seconds {{ WaitSeconds }}",
+        "        Clear-BCCache -Force",
+        "    }",
+        "    $Warm = Measure-Read 'warm'",
+        "} finally {",
+        "    Remove-Item -Force (Join-Path $Dir $Name) -ErrorAction SilentlyContinue",
+        "    Remove-Item -Recurse -Force $Local -ErrorAction SilentlyContinue",
+        "}",
+        "[ordered]@{ mode = $Mode; file_mb = {{ FileSizeMb }}; cold = $Cold; warm = $Warm } | ConvertTo-Json -Compress",
+    ]
+
+
+def benchmark_document():
+    document = build_document(
+        "Measure FSx origin bytes for cold and warm BranchCache reads",
+        [_run_powershell("BranchCacheBenchmark", benchmark_commands())],
+        parameters={
+            "FsxDnsName": "FSx DNS name",
+            "FileSizeMb": "Size of the test file (MB)",
+            "WaitSeconds": "Seconds to wait for the hosted cache to receive the content",
+        }
+    )
+    document["parameters"]["FileSizeMb"]["default"] = "512"
+    document["parameters"]["WaitSeconds"]["default"] = "60"
+    return document
+
+
+class BranchCache(Construct):
+    """
+    BranchCacheのGPO（AD DC）、クライアント・ホスト型キャッシュサーバーの構成、ベンチマーク用ドキュメント
+
+    クライアント用GPOはドメインに、ハッシュ公開用GPOはFSxのOU（fsx_delegation.py）にリンクします。
+    FSxをOUに参加させない場合（fsx_delegated_ou=False）、GPOはComputersコンテナーにリンクできないため
+    ハッシュ公開用GPOもドメインにリンクします（BranchCacheのキャッシュモードを設定した共有のみが対象）。
+    hosted モードでは hosted_cache_instance_id と hosted_cache_location
+    （クライアントが接続するホスト型キャッシュサーバーのアドレス）が必要です。
+    """
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 mode: str,
+                 domain_name: str,
+                 ad_dc_instance_id: str,
+                 instance_id: str,
+                 role: iam.IRole,
+                 file_system_id: str,
+                 hosted_cache_instance_id: str = None,
+                 hosted_cache_location: str = None,
+                 fsx_delegated_ou: bool = False) -> None:
+        super().__init__(scope, construct_id)
+
+        if validate_mode(mode) == "off":
+            raise ValueError("BranchCache construct requires branch-cache 'distributed' or 'hosted'")
+        if mode == "hosted" and not (hosted_cache_instance_id and hosted_cache_location):
+            raise ValueError("branch-cache 'hosted' requires a hosted cache instance")
+
+        self.policy = ConfigAssociation(
+            self, "BranchCachePolicy",
+            document=build_document(
+                f"BranchCache group policies ({mode})",
+                [_run_powershell("ConfigureBranchCachePolicy", group_policy_commands(
+                    mode, domain_distinguished_name(domain_name),
+                    ou_distinguished_name(domain_name) if fsx_delegated_ou else domain_distinguished_name(domain_name)
+                ))],
+                parameters={"HostedCacheLocation": "Hosted cache server address"} if mode == "hosted" else None
+            ),
+            instance_id=ad_dc_instance_id,
+            parameters={"HostedCacheLocation": hosted_cache_location} if mode == "hosted" else None
+        )
+
+        self.client = ConfigAssociation(
+            self, "BranchCacheClient",
+            document=client_document(domain_name),
+            instance_id=instance_id,
+            parameters={"FileSystemId": file_system_id, "Region": Aws.REGION},
+            schedule_expression=APPLY_SCHEDULE
+        )
+
+        if mode == "hosted":
+            self.hosted_server = ConfigAssociation(
+                self, "BranchCacheHostedServer",
+                document=hosted_server_document(),
+                instance_id=hosted_cache_instance_id,
+                schedule_expression=APPLY_SCHEDULE
+            )
+
+        # リモート管理エンドポイントの取得
+        role.add_to_principal_policy(iam.PolicyStatement(
+            actions=["fsx:DescribeFileSystems"],
+            resources=["*"]
+        ))
+
+        self.benchmark_document = ssm.CfnDocument(
+            self, "BenchmarkDocument",
+            content=benchmark_document(),
+            document_type="Command",
+            name=f"{Stack.of(self).stack_name}-BranchCacheBenchmark",
+            update_method="NewVersion"
+        )
+
+
+def parse_invocations(data):
+    """list-command-invocations --details の出力からベンチマーク結果を取り出す"""
+    results = []
+    for invocation in data.get("CommandInvocations", []):
+        for plugin in invocation.get("CommandPlugins", []):
+            lines = [line for line in plugin.get("Output", "").splitlines() if line.startswith("{")]
+            if not lines:
+                continue
+            result = json.loads(lines[-1])
+            cold, warm = result["cold"], result["warm"]
+            # SMBのカウンターが0（ハッシュが公開されていない等）の場合はNICの受信バイト数で比較
+            metric = "bytes_from_server" if cold["bytes_from_server"] > 0 else "network_bytes"
+            reduction = 1 - warm[metric] / cold[metric] if cold[metric] > 0 else None
+            results.append(BenchmarkResult(
+                invocation["InstanceId"], result["mode"], result["file_mb"], cold, warm, reduction
+            ))
+    return results
+
+
+def format_report(results):
+    def mib(value):
+        return f"{value / (1024 * 1024):.1f}"
+
+    rows = [("INSTANCE", "MODE", "FILE MB", "COLD ORIGIN MiB", "WARM ORIGIN MiB", "WARM CACHE MiB",
+             "COLD s", "WARM s", "REDUCTION")]
+    for r in results:
+        rows.append((
+            r.instance, r.mode, str(r.file_mb),
+            mib(r.cold["bytes_from_server"]), mib(r.warm["bytes_from_server"]), mib(r.warm["bytes_from_cache"]),
+            str(r.cold["seconds"]), str(r.warm["seconds"]),
+            f"{r.reduction:.0%}" if r.reduction is not None else "-",
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize BranchCache benchmark results")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report = subparsers.add_parser("report", help="summarize list-command-invocations --details output")
+    report.add_argument("invocations", help="JSON from aws ssm list-command-invocations --details")
+    args = parser.parse_args(argv)
+
+    with open(args.invocations, encoding="utf-8") as f:
+        results = parse_invocations(json.load(f))
+    if not results:
+        print("No benchmark results found", file=sys.stderr)
+        return 1
+    print(format_report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+FSx・インスタンス構成のキャパシティプランナー（オフライン）
+
+ワークロードの記述（アクティブユーザー数、ワーキングセット、読み書き比率、平均ファイルサイズ、
+ピークスループット・IOPS）から、FSx for Windows File Server の性能表に基づいて
+cdk.json に貼り付けられるコンテキストブロックと、各ディメンションの余裕度を出力します。
+
+使用例:
+    python -m ad_windows_fsx.capacity_planner workload.json
+    python -m ad_windows_fsx.capacity_planner --active-users 300 --working-set-gb 800 \\
+        --peak-mbps 400 --peak-iops 12000 --read-ratio 0.8 --avg-file-size-kb 512
+
+workload.json の例:
+    {"active_users": 300, "working_set_gb": 800, "read_ratio": 0.8,
+     "avg_file_size_kb": 512, "peak_mbps": 400, "peak_iops": 12000, "highly_available": false}
+"""
+
+import argparse
+import json
+import math
+import sys
+from collections import namedtuple
+
+from .instance_profiles import baseline_mbps
+
+# FSx for Windows File Server の性能表（スループット容量ごと）
+# network_mbps: ネットワークスループット（ベースライン）、cache_gb: インメモリキャッシュ、
+# disk_mbps: ディスクスループット（ベースライン）、disk_iops: ディスクIOPS上限
+# 参考: https://docs.aws.amazon.com/fsx/latest/WindowsGuide/performance.html
+Tier = namedtuple("Tier", ["throughput_capacity", "network_mbps", "cache_gb", "disk_mbps", "disk_iops"])
+
+FSX_PERFORMANCE_TABLE = [
+    Tier(8, 8, 0.5, 8, 400),
+    Tier(16, 16, 1, 16, 800),
+    Tier(32, 32, 2, 32, 2000),
+    Tier(64, 64, 4, 64, 4000),
+    Tier(128, 150, 8, 128, 6000),
+    Tier(256, 300, 16, 256, 12000),
+    Tier(512, 600, 32, 512, 20000),
+    Tier(1024, 1500, 72, 1024, 40000),
+    Tier(2048, 3125, 144, 2048, 80000),
+    Tier(4608, 9375, 192, 4608, 150000),
+    Tier(6144, 12500, 256, 6144, 200000),
+    Tier(9216, 18750, 384, 9216, 300000),
+    Tier(12288, 21250, 512, 12288, 400000),
+]
+
+# SINGLE_AZ_2 / MULTI_AZ_1 の最小スループット容量
+MIN_THROUGHPUT_CAPACITY = 32
+
+# SSDストレージ: 容量範囲、自動プロビジョニングのIOPS（GiBあたり）とユーザープロビジョニングの上限
+SSD_MIN_GIB = 32
+SSD_MAX_GIB = 65536
+SSD_AUTOMATIC_IOPS_PER_GIB = 3
+SSD_MAX_IOPS_PER_GIB = 500
+
+# 目標使用率（ピーク時でもこの割合を超えないように選定）
+TARGET_UTILIZATION = 0.8
+
+# ワーキングセットに対するストレージの余裕（増加分）
+STORAGE_GROWTH = 0.3
+
+# アクティブユーザー数に応じたAD DCのインスタンスタイプ
+DC_SIZING = [
+    (100, "t3.medium"),
+    (2000, "m6i.large"),
+    (None, "m6i.xlarge"),
+]
+
+# クライアント候補（非バースト、ベースライン帯域の小さい順）
+CLIENT_CANDIDATES = [
+    "m6i.large", "m6i.xlarge", "m6i.2xlarge", "m6in.large", "m6in.xlarge", "m6in.2xlarge",
+]
+
+Workload = namedtuple("Workload", [
+    "active_users", "working_set_gb", "read_ratio", "avg_file_size_kb",
+    "peak_mbps", "peak_iops", "highly_available",
+])
+
+Headroom = namedtuple("Headroom", ["dimension", "demand", "capacity", "unit"])
+
+Plan = namedtuple("Plan", ["context", "headroom", "shards", "notes"])
+
+
+def load_workload(values):
+    """辞書からWorkloadを生成（未指定の項目はデフォルト値）"""
+    workload = Workload(
+        active_users=int(values.get("active_users", 50)),
+        working_set_gb=float(values["working_set_gb"]),
+        read_ratio=float(values.get("read_ratio", 0.7)),
+        avg_file_size_kb=float(values.get("avg_file_size_kb", 256)),
+        peak_mbps=float(values["peak_mbps"]),
+        peak_iops=float(values["peak_iops"]),
+        highly_available=bool(values.get("highly_available", False)),
+    )
+    if not 0 <= workload.read_ratio <= 1:
+        raise ValueError("read_ratio must be between 0 and 1")
+    return workload
+
+
+def _per_shard(workload, shards):
+    return workload._replace(
+        active_users=math.ceil(workload.active_users / shards),
+        working_set_gb=workload.working_set_gb / shards,
+        peak_mbps=workload.peak_mbps / shards,
+        peak_iops=workload.peak_iops / shards,
+    )
+
+
+def _storage_gib(workload):
+    needed = math.ceil(workload.working_set_gb * (1 + STORAGE_GROWTH))
+    # IOPSがGiBあたりの上限を超える場合は容量を増やす
+    needed = max(needed, math.ceil(workload.peak_iops / TARGET_UTILIZATION / SSD_MAX_IOPS_PER_GIB))
+    return max(SSD_MIN_GIB, needed)
+
+
+def _disk_mbps_demand(workload, tier):
+    """ディスクに到達するスループット（ワーキングセットがキャッシュに収まる場合の読み取りは除く）"""
+    writes = workload.peak_mbps * (1 - workload.read_ratio)
+    reads = workload.peak_mbps * workload.read_ratio
+    return writes if workload.working_set_gb <= tier.cache_gb else writes + reads
+
+
+def _select_tier(workload, min_capacity):
+    for tier in FSX_PERFORMANCE_TABLE:
+        if tier.throughput_capacity < min_capacity:
+            continue
+        if (workload.peak_mbps <= tier.network_mbps * TARGET_UTILIZATION
+                and _disk_mbps_demand(workload, tier) <= tier.disk_mbps * TARGET_UTILIZATION
+                and workload.peak_iops <= tier.disk_iops * TARGET_UTILIZATION):
+            return tier
+    return None
+
+
+def _client_instance(peak_mbps):
+    for instance_type in CLIENT_CANDIDATES:
+        if baseline_mbps(instance_type) * TARGET_UTILIZATION >= peak_mbps:
+            return instance_type
+    return CLIENT_CANDIDATES[-1]
+
+
+def _dc_instance(active_users):
+    for limit, instance_type in DC_SIZING:
+        if limit is None or active_users <= limit:
+            return instance_type
+
+
+def _smb_profile(workload):
+    if workload.avg_file_size_kb < 64:
+        return "metadata"
+    if workload.peak_mbps >= 128:
+        return "throughput"
+    return "baseline"
+
+
+def plan(workload):
+    """推奨構成を計算"""
+    deployment_type = "MULTI_AZ_1" if workload.highly_available else "SINGLE_AZ_2"
+    notes = []
+
+    # 1台で収まらない場合はファイルシステムを分割（均等分割を仮定）
+    shards = 1
+    while True:
+        shard = _per_shard(workload, shards)
+        tier = _select_tier(shard, MIN_THROUGHPUT_CAPACITY)
+        storage = _storage_gib(shard)
+        if tier and storage <= SSD_MAX_GIB:
+            break
+        shards += 1
+    if shards > 1:
+        notes.append(f"Workload exceeds a single file system; split into {shards} file systems (DFS namespace)")
+
+    iops_needed = math.ceil(shard.peak_iops / TARGET_UTILIZATION)
+    ssd_iops = None
+    if iops_needed > storage * SSD_AUTOMATIC_IOPS_PER_GIB:
+        ssd_iops = min(iops_needed, tier.disk_iops, storage * SSD_MAX_IOPS_PER_GIB)
+    provisioned_iops = ssd_iops or storage * SSD_AUTOMATIC_IOPS_PER_GIB
+
+    client_type = _client_instance(shard.peak_mbps)
+    context = {
+        "fsx-deployment-type": deployment_type,
+        "fsx-throughput-capacity": tier.throughput_capacity,
+        "fsx-storage-type": "SSD",
+        "fsx-storage-capacity": storage,
+        "fsx-ssd-iops": ssd_iops,
+        "dc-instance-type": _dc_instance(workload.active_users),
+        "client-instance-type": client_type,
+        "smb-client-profile": _smb_profile(workload),
+    }
+
+    headroom = [
+        Headroom("network throughput", shard.peak_mbps, tier.network_mbps, "MB/s"),
+        Headroom("disk throughput", _disk_mbps_demand(shard, tier), tier.disk_mbps, "MB/s"),
+        Headroom("disk IOPS", shard.peak_iops, min(tier.disk_iops, provisioned_iops), "IOPS"),
+        Headroom("storage", shard.working_set_gb, storage, "GiB"),
+        Headroom("client bandwidth", shard.peak_mbps, baseline_mbps(client_type), "MB/s"),
+    ]
+    if shard.working_set_gb > tier.cache_gb:
+        notes.append(f"Working set exceeds the {tier.cache_gb} GB in-memory cache; reads are served from disk")
+    if baseline_mbps(client_type) < shard.peak_mbps:
+        notes.append(f"A single {client_type} client cannot drive the peak; use multiple clients for load tests")
+    return Plan(context, headroom, shards, notes)
+
+
+def format_headroom(items):
+    lines = [f"{'dimension':<20} {'demand':>12} {'capacity':>12} {'headroom':>9}"]
+    for item in items:
+        headroom = (item.capacity - item.demand) / item.capacity * 100 if item.capacity else 0
+        lines.append(
+            f"{item.dimension:<20} {item.demand:>8,.0f} {item.unit:<4}"
+            f"{item.capacity:>8,.0f} {item.unit:<4}{headroom:>8.0f}%"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend FSx and instance configuration for a workload")
+    parser.add_argument("spec", nargs="?", help="workload JSON file")
+    parser.add_argument("--active-users", type=int)
+    parser.add_argument("--working-set-gb", type=float)
+    parser.add_argument("--read-ratio", type=float)
+    parser.add_argument("--avg-file-size-kb", type=float)
+    parser.add_argument("--peak-mbps", type=float)
+    parser.add_argument("--peak-iops", type=float)
+    parser.add_argument("--highly-available", action="store_true", default=None)
+    args = parser.parse_args(argv)
+
+    values = {}
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            values = json.load(f)
+    for key in Workload._fields:
+        if getattr(args, key, None) is not None:
+            values[key] = getattr(args, key)
+    missing = [k for k in ("working_set_gb", "peak_mbps", "peak_iops") if k not in values]
+    if missing:
+        parser.error(f"missing workload values: {', '.join(missing)}")
+
+    result = plan(load_workload(values))
+    print(format_headroom(result.headroom))
+    for note in result.notes:
+        print(f"NOTE: {note}")
+    print()
+    print("cdk.json context:")
+    print(json.dumps({k: v for k, v in result.context.items() if v is not None}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
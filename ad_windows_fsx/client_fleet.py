@@ -0,0 +1,315 @@
+"""
+Windows EC2クライアントフリート（Auto Scaling ウォームプール）
+
+セットアップ・ドメイン参加済みのインスタンスを休止（Hibernated）または停止状態でウォームプールに保持し、
+スケールアウト時はウォームプールから再開させることで、起動・ユーザーデータ・ドメイン参加・再起動の
+待ち時間なしにクライアントを追加します。
+
+起動ライフサイクルフックはEventBridge経由でSSM Automationを実行します。
+- 新規起動（Origin: EC2）: ドメイン参加と構成ドキュメントの適用後、SMB接続を検証してウォームプールへ
+- ウォームプールからの再開（Origin: WarmPool）: SMB接続（セキュアチャネル、FSxの445、共有へのアクセス）の検証のみ
+検証に失敗したインスタンスはABANDONで終了され、Auto Scalingが代わりのインスタンスを起動します。
+"""
+
+import json
+
+from aws_cdk import (
+    Aws,
+    Duration,
+    aws_autoscaling as autoscaling,
+    aws_ec2 as ec2,
+    aws_events as events,
+    aws_iam as iam,
+    aws_ssm as ssm,
+)
+from constructs import Construct
+
+# ウォームプールのインスタンス状態（cdk.jsonのclient-warm-pool-state）
+POOL_STATES = {
+    "Hibernated": autoscaling.PoolState.HIBERNATED,
+    "Stopped": autoscaling.PoolState.STOPPED,
+    "Running": autoscaling.PoolState.RUNNING,
+}
+
+DEFAULT_POOL_STATE = "Hibernated"
+
+# 休止にはメモリ内容を保存できる暗号化されたルートボリュームが必要
+ROOT_VOLUME_GIB = 50
+
+# 新規起動時はドメイン参加後の再起動を含むため長めに設定
+LAUNCH_HOOK_TIMEOUT = Duration.minutes(60)
+
+
+def validate_pool_state(pool_state):
+    if pool_state not in POOL_STATES:
+        raise ValueError(f"Unknown client-warm-pool-state: {pool_state!r} (allowed: {', '.join(POOL_STATES)})")
+    return pool_state
+
+
+def smb_validation_commands(domain_name, fsx_dns_name, share_name="share", wait_seconds=60):
+    """ドメインのセキュアチャネルとFSx共有へのSMBアクセスを検証するPowerShell（行のリスト）"""
+    unc_path = f"\\\\{fsx_dns_name}\\{share_name}"
+    return [
+        "$ErrorActionPreference = 'Stop'",
+        "if (-not (Test-ComputerSecureChannel)) {",
+        f"    throw \"Secure channel to {domain_name} is broken\"",
+        "}",
+        f"$Deadline = (Get-Date).AddSeconds({wait_seconds})",
+        f"while (-not (Test-NetConnection -ComputerName '{fsx_dns_name}' -Port 445 -WarningAction SilentlyContinue).TcpTestSucceeded) {{",
+        "    if ((Get-Date) -gt $Deadline) { throw \"FSx is not reachable on SMB (445)\" }",
+        "    Start-Sleep -Seconds 5",
+        "}",
+        # コンピューターアカウント（SYSTEM）でKerberos認証し、共有の一覧を取得
+        f"Get-ChildItem -Path '{unc_path}' | Out-Null",
+        f"Write-Host \"SMB connectivity to {unc_path}: OK\"",
+    ]
+
+
+def _complete_lifecycle_action(name, result):
+    return {
+        "name": name,
+        "action": "aws:executeAwsApi",
+        "isEnd": True,
+        "inputs": {
+            "Service": "autoscaling",
+            "Api": "CompleteLifecycleAction",
+            "AutoScalingGroupName": "{{ AutoScalingGroupName }}",
+            "LifecycleHookName": "{{ LifecycleHookName }}",
+            "LifecycleActionToken": "{{ LifecycleActionToken }}",
+            "LifecycleActionResult": result,
+            "InstanceId": "{{ InstanceId }}"
+        }
+    }
+
+
+def _run_command(name, document_name, parameters, timeout_seconds):
+    return {
+        "name": name,
+        "action": "aws:runCommand",
+        "timeoutSeconds": timeout_seconds,
+        "onFailure": "step:AbandonLaunch",
+        "inputs": {
+            "DocumentName": document_name,
+            "InstanceIds": ["{{ InstanceId }}"],
+            "Parameters": parameters
+        }
+    }
+
+
+def fleet_readiness_document(domain_name, fsx_dns_name, ad_dc_ip,
+                             domain_join_document_name, config_document_name,
+                             automation_role_arn):
+    """
+    起動ライフサイクルフックから実行するSSM Automationドキュメント（schemaVersion 0.3）
+
+    ウォームプールからの再開時はドメイン参加・構成の適用を省略し、SMB接続の検証のみ行います。
+    """
+    return {
+        "schemaVersion": "0.3",
+        "description": "Prepare or re-validate a Windows client before it enters service",
+        "assumeRole": "{{ AutomationAssumeRole }}",
+        "parameters": {
+            "InstanceId": {"type": "String", "description": "Launching instance ID"},
+            "AutoScalingGroupName": {"type": "String", "description": "Auto Scaling group name"},
+            "LifecycleHookName": {"type": "String", "description": "Lifecycle hook name"},
+            "LifecycleActionToken": {"type": "String", "description": "Lifecycle action token"},
+            "Origin": {
+                "type": "String",
+                "description": "EC2 for a new instance, WarmPool for a resumed instance",
+                "default": "EC2"
+            },
+            "AutomationAssumeRole": {
+                "type": "String",
+                "description": "Role assumed by the automation",
+                "default": automation_role_arn
+            }
+        },
+        "mainSteps": [
+            {
+                "name": "WaitForSsmAgent",
+                "action": "aws:waitForAwsResourceProperty",
+                "timeoutSeconds": 900,
+                "onFailure": "step:AbandonLaunch",
+                "inputs": {
+                    "Service": "ssm",
+                    "Api": "DescribeInstanceInformation",
+                    "InstanceInformationFilterList": [
+                        {"key": "InstanceIds", "valueSet": ["{{ InstanceId }}"]}
+                    ],
+                    "PropertySelector": "$.InstanceInformationList[0].PingStatus",
+                    "DesiredValues": ["Online"]
+                }
+            },
+            {
+                "name": "CheckOrigin",
+                "action": "aws:branch",
+                "inputs": {
+                    "Choices": [
+                        {"NextStep": "ValidateSmb", "Variable": "{{ Origin }}", "StringEquals": "WarmPool"}
+                    ],
+                    "Default": "JoinDomain"
+                }
+            },
+            _run_command("JoinDomain", domain_join_document_name, {"AdDcIp": [ad_dc_ip]}, 3600),
+            _run_command("ApplyConfig", config_document_name, {"AdDcIp": [ad_dc_ip]}, 1800),
+            _run_command("ValidateSmb", "AWS-RunPowerShellScript", {
+                "commands": smb_validation_commands(domain_name, fsx_dns_name),
+                "executionTimeout": "300"
+            }, 300),
+            _complete_lifecycle_action("CompleteLaunch", "CONTINUE"),
+            _complete_lifecycle_action("AbandonLaunch", "ABANDON"),
+        ]
+    }
+
+
+class ClientFleet(Construct):
+    """
+    ウォームプール付きのWindowsクライアントAuto Scalingグループ
+
+    ドメイン参加と構成の適用はアプリケーションスタックの構成ドキュメント（DomainJoin / WindowsConfig）を
+    Run Commandで実行するため、単体のWindows EC2と同じ手順でセットアップされます。
+    """
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 vpc: ec2.IVpc,
+                 subnets: list,
+                 machine_image: ec2.IMachineImage,
+                 instance_type: str,
+                 security_group: ec2.ISecurityGroup,
+                 role: iam.IRole,
+                 user_data: ec2.UserData,
+                 domain_name: str,
+                 fsx_dns_name: str,
+                 ad_dc_ip: str,
+                 domain_join_document_name: str,
+                 config_document_name: str,
+                 max_size: int,
+                 warm_pool_size: int = 1,
+                 pool_state: str = DEFAULT_POOL_STATE,
+                 key_pair: ec2.IKeyPair = None) -> None:
+        super().__init__(scope, construct_id)
+
+        validate_pool_state(pool_state)
+
+        launch_template = ec2.LaunchTemplate(
+            self, "LaunchTemplate",
+            machine_image=machine_image,
+            instance_type=ec2.InstanceType(instance_type),
+            security_group=security_group,
+            role=role,
+            user_data=user_data,
+            key_pair=key_pair,
+            hibernation_configured=pool_state == "Hibernated",
+            block_devices=[ec2.BlockDevice(
+                device_name="/dev/sda1",
+                volume=ec2.BlockDeviceVolume.ebs(
+                    ROOT_VOLUME_GIB,
+                    encrypted=True,
+                    volume_type=ec2.EbsDeviceVolumeType.GP3
+                )
+            )]
+        )
+
+        self.auto_scaling_group = autoscaling.AutoScalingGroup(
+            self, "Group",
+            vpc=vpc,
+            vpc_subnets=ec2.SubnetSelection(subnets=subnets),
+            launch_template=launch_template,
+            min_capacity=0,
+            max_capacity=max_size
+        )
+
+        # スケールイン時はインスタンスを終了せずウォームプールに戻す
+        self.auto_scaling_group.add_warm_pool(
+            min_size=warm_pool_size,
+            pool_state=POOL_STATES[pool_state],
+            reuse_on_scale_in=True
+        )
+
+        hook = self.auto_scaling_group.add_lifecycle_hook(
+            "LaunchHook",
+            lifecycle_transition=autoscaling.LifecycleTransition.INSTANCE_LAUNCHING,
+            default_result=autoscaling.DefaultResult.ABANDON,
+            heartbeat_timeout=LAUNCH_HOOK_TIMEOUT
+        )
+
+        # Automationの実行ロール（Run Commandとライフサイクルアクションの完了）
+        automation_role = iam.Role(
+            self, "AutomationRole",
+            assumed_by=iam.ServicePrincipal("ssm.amazonaws.com")
+        )
+        automation_role.add_to_policy(iam.PolicyStatement(
+            actions=[
+                "ssm:SendCommand",
+                "ssm:ListCommands",
+                "ssm:ListCommandInvocations",
+                "ssm:DescribeInstanceInformation"
+            ],
+            resources=["*"]
+        ))
+        automation_role.add_to_policy(iam.PolicyStatement(
+            actions=["autoscaling:CompleteLifecycleAction"],
+            resources=[self.auto_scaling_group.auto_scaling_group_arn]
+        ))
+
+        self.readiness_document = ssm.CfnDocument(
+            self, "ReadinessDocument",
+            content=fleet_readiness_document(
+                domain_name, fsx_dns_name, ad_dc_ip,
+                domain_join_document_name, config_document_name,
+                automation_role.role_arn
+            ),
+            document_type="Automation",
+            update_method="NewVersion"
+        )
+
+        # ライフサイクルフックのイベント → Automationの実行
+        events_role = iam.Role(
+            self, "EventsRole",
+            assumed_by=iam.ServicePrincipal("events.amazonaws.com")
+        )
+        automation_definition_arn = (
+            f"arn:{Aws.PARTITION}:ssm:{Aws.REGION}:{Aws.ACCOUNT_ID}:"
+            f"automation-definition/{self.readiness_document.ref}:$DEFAULT"
+        )
+        events_role.add_to_policy(iam.PolicyStatement(
+            actions=["ssm:StartAutomationExecution"],
+            resources=[automation_definition_arn]
+        ))
+        events_role.add_to_policy(iam.PolicyStatement(
+            actions=["iam:PassRole"],
+            resources=[automation_role.role_arn]
+        ))
+
+        events.CfnRule(
+            self, "LaunchHookRule",
+            event_pattern={
+                "source": ["aws.autoscaling"],
+                "detail-type": ["EC2 Instance-launch Lifecycle Action"],
+                "detail": {
+                    "AutoScalingGroupName": [self.auto_scaling_group.auto_scaling_group_name],
+                    "LifecycleHookName": [hook.lifecycle_hook_name]
+                }
+            },
+            targets=[events.CfnRule.TargetProperty(
+                id="Readiness",
+                arn=automation_definition_arn,
+                role_arn=events_role.role_arn,
+                input_transformer=events.CfnRule.InputTransformerProperty(
+                    input_paths_map={
+                        "instance": "$.detail.EC2InstanceId",
+                        "group": "$.detail.AutoScalingGroupName",
+                        "hook": "$.detail.LifecycleHookName",
+                        "token": "$.detail.LifecycleActionToken",
+                        "origin": "$.detail.Origin"
+                    },
+                    input_template=json.dumps({
+                        "InstanceId": ["<instance>"],
+                        "AutoScalingGroupName": ["<group>"],
+                        "LifecycleHookName": ["<hook>"],
+                        "LifecycleActionToken": ["<token>"],
+                        "Origin": ["<origin>"]
+                    })
+                )
+            )]
+        )
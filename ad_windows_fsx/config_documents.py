@@ -0,0 +1,235 @@
+"""
+SSM State Manager用の構成ドキュメント
+
+ユーザーデータは初回起動時にしか実行されないため、変更するとインスタンスの置き換えが必要になります。
+再実行しても問題のない設定手順（RDP有効化、タイムゾーン、疎通確認、エージェント設定、SMB設定）は
+SSM Commandドキュメントとして生成し、State Managerの関連付けで適用します。
+ドキュメント内容の変更は関連付けの更新（インプレース）として数秒で反映されます。
+"""
+
+import hashlib
+import json
+
+from aws_cdk import (
+    Stack,
+    aws_ssm as ssm,
+)
+from constructs import Construct
+
+from .smb_tuning import DEFAULT_SMB_PROFILE, render_tuning_commands
+
+# SSM Commandドキュメントのスキーマバージョン
+DOCUMENT_SCHEMA_VERSION = "2.2"
+
+
+def _run_powershell(name, commands):
+    """aws:runPowerShellScript ステップを生成"""
+    return {
+        "action": "aws:runPowerShellScript",
+        "name": name,
+        "inputs": {
+            "runCommand": list(commands)
+        }
+    }
+
+
+def enable_rdp_step():
+    """リモートデスクトップを有効化するステップ"""
+    return _run_powershell("EnableRemoteDesktop", [
+        "Set-ItemProperty -Path \"HKLM:\\System\\CurrentControlSet\\Control\\Terminal Server\" -Name \"fDenyTSConnections\" -Value 0",
+        "Enable-NetFirewallRule -DisplayGroup \"Remote Desktop\"",
+        "Write-Host \"Remote Desktop: ENABLED\""
+    ])
+
+
+def time_zone_step(time_zone="Tokyo Standard Time"):
+    """タイムゾーンを設定するステップ"""
+    return _run_powershell("SetTimeZone", [
+        f"tzutil /s \"{time_zone}\"",
+        "Write-Host \"Time zone: $(tzutil /g)\""
+    ])
+
+
+def connectivity_check_step(name, targets):
+    """
+    TCP疎通確認ステップ
+
+    targets: (ホスト名またはIP, ポート, 表示名) のリスト。
+    ホストには {{ Parameter }} 形式のドキュメントパラメータも指定できます。
+    """
+    commands = []
+    for host, port, label in targets:
+        commands += [
+            f"Write-Host \"Testing {label} connectivity ({host}:{port})...\"",
+            "try {",
+            f"    $result = Test-NetConnection -ComputerName '{host}' -Port {port} -WarningAction SilentlyContinue",
+            "    if ($result.TcpTestSucceeded) {",
+            f"        Write-Host \"{label} connectivity: SUCCESS\"",
+            "    } else {",
+            f"        Write-Host \"{label} connectivity: FAILED\"",
+            "    }",
+            "} catch {",
+            f"    Write-Host \"{label} connectivity test failed: $($_.Exception.Message)\"",
+            "}",
+        ]
+    return _run_powershell(name, commands)
+
+
+def windows_update_check_step():
+    """Windows Updateサービスの状態確認ステップ"""
+    return _run_powershell("CheckWindowsUpdateService", [
+        "try {",
+        "    $wuService = Get-Service -Name wuauserv",
+        "    Write-Host \"Windows Update service status: $($wuService.Status)\"",
+        "} catch {",
+        "    Write-Host \"Windows Update service check failed: $($_.Exception.Message)\"",
+        "}"
+    ])
+
+
+def agent_config_step():
+    """SSM Agentを自動起動・障害時自動再起動に設定するステップ"""
+    return _run_powershell("ConfigureSsmAgent", [
+        "Set-Service -Name AmazonSSMAgent -StartupType Automatic",
+        "sc.exe failure AmazonSSMAgent reset= 86400 actions= restart/60000/restart/60000/restart/60000 | Out-Null",
+        "Write-Host \"SSM Agent service: $((Get-Service -Name AmazonSSMAgent).Status)\""
+    ])
+
+
+def smb_client_step(profile=DEFAULT_SMB_PROFILE, deployment_type="SINGLE_AZ_2"):
+    """SMBクライアントのチューニングプロファイルを適用・検証するステップ（smb_tuning.py）"""
+    return _run_powershell("ConfigureSmbClient", render_tuning_commands(profile, deployment_type))
+
+
+def domain_join_step(domain_name, wait_minutes=20):
+    """
+    ドメイン参加ステップ（参加済みなら何もしない）
+
+    AD DCのLDAPが応答するまで待機してから参加し、exit 3010 でSSM Agentに再起動を任せます。
+    """
+    return _run_powershell("JoinDomain", [
+        "if ((Get-WmiObject -Class Win32_ComputerSystem).PartOfDomain) {",
+        "    Write-Host \"Already joined to domain: $((Get-WmiObject -Class Win32_ComputerSystem).Domain)\"",
+        "    exit 0",
+        "}",
+        f"$Deadline = (Get-Date).AddMinutes({wait_minutes})",
+        "while (-not (Test-NetConnection -ComputerName '{{ AdDcIp }}' -Port 389 -WarningAction SilentlyContinue).TcpTestSucceeded) {",
+        "    if ((Get-Date) -gt $Deadline) { throw \"AD DC is not reachable on LDAP (389)\" }",
+        "    Write-Host \"Waiting for AD DC...\"",
+        "    Start-Sleep -Seconds 30",
+        "}",
+        "$domainPassword = ConvertTo-SecureString 'Password123!' -AsPlainText -Force",
+        "$credential = New-Object System.Management.Automation.PSCredential('Administrator', $domainPassword)",
+        f"Add-Computer -DomainName '{domain_name}' -Credential $credential -Force",
+        f"Write-Host \"Joined domain {domain_name}. Rebooting...\"",
+        "exit 3010"
+    ])
+
+
+def build_document(description, steps, parameters=None):
+    """
+    SSM Commandドキュメント（schemaVersion 2.2）を生成
+
+    parameters: {名前: 説明} の辞書。すべて文字列パラメータとして定義されます。
+    """
+    document = {
+        "schemaVersion": DOCUMENT_SCHEMA_VERSION,
+        "description": description,
+    }
+    if parameters:
+        document["parameters"] = {
+            name: {"type": "String", "description": desc}
+            for name, desc in parameters.items()
+        }
+    document["mainSteps"] = list(steps)
+    return document
+
+
+def document_hash(document):
+    """ドキュメント内容のハッシュ（関連付け名に含めて変更時に即時再適用させる）"""
+    canonical = json.dumps(document, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class ConfigAssociation(Construct):
+    """
+    構成ドキュメントとState Manager関連付けのペア
+
+    ドキュメントは固定名で作成し、内容変更時は新しいバージョンとして更新します。
+    関連付け名に内容ハッシュを含めるため、変更時は関連付けがインプレース更新され即時に再適用されます。
+    """
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 document: dict,
+                 instance_id: str,
+                 parameters: dict = None,
+                 schedule_expression: str = None) -> None:
+        super().__init__(scope, construct_id)
+
+        stack_name = Stack.of(self).stack_name
+
+        self.document = ssm.CfnDocument(
+            self, "Document",
+            content=document,
+            document_type="Command",
+            name=f"{stack_name}-{construct_id}",
+            update_method="NewVersion"
+        )
+
+        self.association = ssm.CfnAssociation(
+            self, "Association",
+            name=self.document.ref,
+            association_name=f"{stack_name}-{construct_id}-{document_hash(document)}",
+            document_version="$LATEST",
+            targets=[ssm.CfnAssociation.TargetProperty(
+                key="InstanceIds",
+                values=[instance_id]
+            )],
+            parameters={name: [value] for name, value in (parameters or {}).items()} or None,
+            schedule_expression=schedule_expression
+        )
+
+
+def domain_controller_document(time_zone="Tokyo Standard Time"):
+    """AD DC用の構成ドキュメント"""
+    return build_document(
+        "AD DC configuration applied by State Manager",
+        [
+            enable_rdp_step(),
+            time_zone_step(time_zone),
+            agent_config_step(),
+            connectivity_check_step("CheckConnectivity", [
+                ("google.com", 443, "Internet")
+            ])
+        ]
+    )
+
+
+def windows_client_document(time_zone="Tokyo Standard Time",
+                            smb_profile=DEFAULT_SMB_PROFILE,
+                            fsx_deployment_type="SINGLE_AZ_2"):
+    """Windows EC2（ドメインメンバー）用の構成ドキュメント"""
+    return build_document(
+        "Windows EC2 configuration applied by State Manager",
+        [
+            enable_rdp_step(),
+            time_zone_step(time_zone),
+            agent_config_step(),
+            windows_update_check_step(),
+            connectivity_check_step("CheckConnectivity", [
+                ("microsoft.com", 443, "Internet"),
+                ("{{ AdDcIp }}", 389, "AD DC")
+            ]),
+            smb_client_step(smb_profile, fsx_deployment_type)
+        ],
+        parameters={"AdDcIp": "AD Domain Controller private IP address"}
+    )
+
+
+def domain_join_document(domain_name):
+    """Windows EC2のドメイン参加ドキュメント（定期実行で未参加時のみ再試行）"""
+    return build_document(
+        f"Join the instance to {domain_name}",
+        [domain_join_step(domain_name)],
+        parameters={"AdDcIp": "AD Domain Controller private IP address"}
+    )
@@ -0,0 +1,473 @@
+"""
+デプロイ前の置き換え影響・所要時間の予測（オフライン）
+
+デプロイ済みのテンプレート（aws cloudformation get-template の出力、または保存した以前のテンプレート）と
+新しく合成したテンプレートを比較し、変更されたリソースごとに更新動作を分類します。
+- no-op: プロパティの変更なし（メタデータ等のみ）
+- in-place: 中断なしの更新
+- interruption: 同じリソースのまま更新されるが、停止・再起動等の中断を伴う（EC2のインスタンスタイプ、ユーザーデータ等）
+- replacement: 新しいリソースの作成と古いリソースの削除（論理IDの変更を含む）
+分類はプロパティ単位の規則表（UPDATE_RULES、CloudFormationリソースリファレンスの "Update requires"）に基づきます。
+
+SSMパラメータ（最新のWindows AMI等）はデプロイ時に解決されるため、テンプレートが同じでも
+AMIの更新でAD DCが置き換えられます。デプロイ済みスタックの解決値と現在の値を渡すと、この変更も検出します。
+
+所要時間はリソースの種類・操作ごとの過去の実績（スタックイベントから記録）の中央値、
+実績がない場合は既定値を使い、依存関係に沿ったクリティカルパスで見積もります。
+AD DC（AdDcInstance）またはFSx（FsxFileSystem）が置き換え・削除される場合は終了コード2を返し、
+deploy_stacks.sh は明示的な確認（または --allow-replacement）を求めます。
+
+使用例:
+    aws cloudformation get-template --stack-name AdWindowsFsxDomainStack-<your-name> --output json > deployed.json
+    python -m ad_windows_fsx.deploy_impact analyze deployed.json cdk.out/AdWindowsFsxDomainStack-<your-name>.template.json
+    # 所要時間の実績を記録（デプロイ後）
+    aws cloudformation describe-stack-events --stack-name AdWindowsFsxDomainStack-<your-name> --output json > events.json
+    python -m ad_windows_fsx.deploy_impact record events.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+# 更新動作（影響の小さい順）
+NO_OP = "no-op"
+IN_PLACE = "in-place"
+INTERRUPTION = "interruption"
+REPLACEMENT = "replacement"
+ADD = "add"
+REMOVE = "remove"
+
+SEVERITY = {NO_OP: 0, ADD: 1, IN_PLACE: 1, INTERRUPTION: 2, REPLACEMENT: 3, REMOVE: 3}
+
+# プロパティごとの更新動作（ドット区切りでネストしたプロパティを指定、"*" は in_place 以外のすべて）
+# 記載のないプロパティは中断なしの更新として扱う
+UPDATE_RULES = {
+    "AWS::EC2::Instance": {
+        REPLACEMENT: ["AvailabilityZone", "ImageId", "SubnetId", "PrivateIpAddress", "KeyName",
+                      "NetworkInterfaces", "LaunchTemplate", "HibernationOptions", "CpuOptions",
+                      "PlacementGroupName", "SecurityGroups", "Ipv6Addresses", "ElasticGpuSpecifications",
+                      "BlockDeviceMappings"],
+        INTERRUPTION: ["InstanceType", "UserData", "EbsOptimized", "KernelId", "RamdiskId"],
+    },
+    "AWS::FSx::FileSystem": {
+        REPLACEMENT: ["FileSystemType", "SubnetIds", "SecurityGroupIds", "StorageType", "KmsKeyId", "BackupId",
+                      "WindowsConfiguration.DeploymentType",
+                      "WindowsConfiguration.PreferredSubnetId",
+                      "WindowsConfiguration.ActiveDirectoryId",
+                      "WindowsConfiguration.CopyTagsToBackups",
+                      "WindowsConfiguration.SelfManagedActiveDirectoryConfiguration.DomainName",
+                      "WindowsConfiguration.SelfManagedActiveDirectoryConfiguration.OrganizationalUnitDistinguishedName",
+                      "WindowsConfiguration.SelfManagedActiveDirectoryConfiguration.FileSystemAdministratorsGroup"],
+        # Single-AZではスループット変更中にファイルシステムが数分間利用できなくなる
+        INTERRUPTION: ["WindowsConfiguration.ThroughputCapacity"],
+    },
+    "AWS::EC2::LaunchTemplate": {REPLACEMENT: ["LaunchTemplateName"]},
+    "AWS::AutoScaling::AutoScalingGroup": {REPLACEMENT: ["AutoScalingGroupName", "InstanceId"]},
+    "AWS::AutoScaling::LifecycleHook": {REPLACEMENT: ["AutoScalingGroupName", "LifecycleHookName"]},
+    "AWS::AutoScaling::WarmPool": {REPLACEMENT: ["AutoScalingGroupName"]},
+    "AWS::IAM::Role": {REPLACEMENT: ["RoleName", "Path"]},
+    "AWS::IAM::InstanceProfile": {REPLACEMENT: ["InstanceProfileName", "Path"]},
+    "AWS::SSM::Document": {REPLACEMENT: ["Name", "DocumentType"]},
+    "AWS::Events::Rule": {REPLACEMENT: ["Name", "EventBusName"]},
+    "AWS::S3::Bucket": {REPLACEMENT: ["BucketName"]},
+    "AWS::EC2::VPC": {REPLACEMENT: ["CidrBlock", "Ipv4IpamPoolId"]},
+    "AWS::EC2::Subnet": {REPLACEMENT: ["AvailabilityZone", "AvailabilityZoneId", "CidrBlock", "VpcId"]},
+    "AWS::EC2::SecurityGroup": {REPLACEMENT: ["GroupDescription", "GroupName", "VpcId"]},
+    "AWS::EC2::SecurityGroupIngress": {REPLACEMENT: ["*"], IN_PLACE: ["Description"]},
+    "AWS::EC2::SecurityGroupEgress": {REPLACEMENT: ["*"], IN_PLACE: ["Description"]},
+    "AWS::EC2::VPCEndpoint": {REPLACEMENT: ["ServiceName", "VpcId", "VpcEndpointType"]},
+    "AWS::EC2::NatGateway": {REPLACEMENT: ["AllocationId", "ConnectivityType", "SubnetId"]},
+    "AWS::EC2::Route": {REPLACEMENT: ["RouteTableId", "DestinationCidrBlock"]},
+    "AWS::EC2::FlowLog": {REPLACEMENT: ["*"], IN_PLACE: ["Tags"]},
+    "AWS::Route53Resolver::ResolverEndpoint": {REPLACEMENT: ["Direction", "SecurityGroupIds"]},
+    "AWS::Route53Resolver::ResolverRule": {REPLACEMENT: ["DomainName", "RuleType"]},
+}
+
+# 置き換え・削除に明示的な確認が必要なリソース（論理IDの接頭辞: 影響）
+CRITICAL_RESOURCES = {
+    "AdDcInstance": "AD DC is replaced: the forest must be rebuilt and FSx and clients must rejoin the domain",
+    "FsxFileSystem": "FSx file system is replaced: share data must be restored from a backup",
+}
+
+# 実績がない場合の所要時間（秒）: (リソースの種類, 操作)
+DEFAULT_DURATIONS = {
+    ("AWS::FSx::FileSystem", "create"): 1800,
+    ("AWS::FSx::FileSystem", "update"): 1200,
+    ("AWS::FSx::FileSystem", "delete"): 900,
+    ("AWS::EC2::Instance", "create"): 300,
+    ("AWS::EC2::Instance", "update"): 180,
+    ("AWS::EC2::Instance", "delete"): 180,
+    ("AWS::EC2::NatGateway", "create"): 120,
+    ("AWS::EC2::NatGateway", "delete"): 60,
+    ("AWS::EC2::VPCEndpoint", "create"): 120,
+    ("AWS::Route53Resolver::ResolverEndpoint", "create"): 180,
+    ("AWS::AutoScaling::AutoScalingGroup", "create"): 300,
+    ("AWS::AutoScaling::WarmPool", "create"): 300,
+}
+DEFAULT_DURATION = 30
+
+# 記録する実績の件数（リソースの種類・操作ごと）
+HISTORY_LIMIT = 20
+
+Change = namedtuple("Change", ["logical_id", "resource_type", "action", "properties", "critical"])
+
+
+def template_body(document):
+    """get-template の出力（TemplateBody）またはテンプレート本体"""
+    body = document.get("TemplateBody", document)
+    return json.loads(body) if isinstance(body, str) else body
+
+
+def flatten(value, prefix=""):
+    """ネストした辞書をドット区切りのパスに展開（リストは1つの値として扱う）"""
+    if isinstance(value, dict) and (value or not prefix) and not _is_intrinsic(value):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {prefix: value}
+
+
+def _is_intrinsic(value):
+    return len(value) == 1 and next(iter(value)).startswith(("Ref", "Fn::"))
+
+
+def changed_properties(before, after):
+    """変更されたプロパティのパス"""
+    old, new = flatten(before or {}), flatten(after or {})
+    return sorted(path for path in set(old) | set(new) if old.get(path) != new.get(path))
+
+
+def _matches(rule, path):
+    return rule == "*" or path == rule or path.startswith(rule + ".")
+
+
+def _without_delete_on_termination(mappings):
+    if not isinstance(mappings, list):
+        return mappings
+    return [
+        {**m, "Ebs": {k: v for k, v in m["Ebs"].items() if k != "DeleteOnTermination"}}
+        if isinstance(m, dict) and isinstance(m.get("Ebs"), dict) else m
+        for m in mappings
+    ]
+
+
+def property_action(resource_type, path, before=None, after=None):
+    """プロパティの変更による更新動作"""
+    rules = UPDATE_RULES.get(resource_type, {})
+    if any(_matches(rule, path) for rule in rules.get(IN_PLACE, [])):
+        return IN_PLACE
+    # EC2のブロックデバイスは DeleteOnTermination のみの変更であれば置き換えにならない
+    if resource_type == "AWS::EC2::Instance" and path == "BlockDeviceMappings":
+        if before is not None and _without_delete_on_termination(before) == _without_delete_on_termination(after):
+            return IN_PLACE
+    # FSxのストレージ容量は増加のみ可能（減少は置き換え）
+    if resource_type == "AWS::FSx::FileSystem" and path == "StorageCapacity":
+        if isinstance(before, int) and isinstance(after, int) and after < before:
+            return REPLACEMENT
+    for action in (REPLACEMENT, INTERRUPTION):
+        if any(_matches(rule, path) for rule in rules.get(action, [])):
+            return action
+    return IN_PLACE
+
+
+def _document_action(before, after, paths):
+    # UpdateMethod が NewVersion でない場合、内容の変更は置き換え
+    if "Content" in paths and (after or {}).get("UpdateMethod") != "NewVersion":
+        return REPLACEMENT
+    return None
+
+
+def is_critical(logical_id):
+    return next((name for name in CRITICAL_RESOURCES if re.fullmatch(rf"{name}([0-9A-F]{{8}})?", logical_id)), None)
+
+
+def resolve_parameters(template, values):
+    """Ref で参照しているパラメータを値に置き換えたテンプレート（解決値がわかるもののみ）"""
+    if not values:
+        return template
+
+    def resolve(value):
+        if isinstance(value, dict):
+            if set(value) == {"Ref"} and value["Ref"] in values:
+                return values[value["Ref"]]
+            return {key: resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        return value
+
+    return {**template, "Resources": resolve(template.get("Resources", {}))}
+
+
+def ssm_parameter_names(template):
+    """SSMパラメータ型のパラメータ {パラメータ名: SSMパラメータのパス}"""
+    return {
+        name: parameter["Default"]
+        for name, parameter in template.get("Parameters", {}).items()
+        if parameter.get("Type", "").startswith("AWS::SSM::Parameter::Value") and "Default" in parameter
+    }
+
+
+def deployed_parameter_values(parameters):
+    """describe-stacks の Parameters（ResolvedValue を優先）を {パラメータ名: 値} に変換"""
+    if isinstance(parameters, dict):
+        parameters = parameters.get("Stacks", [{}])[0].get("Parameters", [])
+    return {
+        item["ParameterKey"]: item.get("ResolvedValue", item.get("ParameterValue"))
+        for item in parameters or []
+    }
+
+
+def current_parameter_values(template, ssm_parameters):
+    """aws ssm get-parameters の出力から、テンプレートのパラメータの現在の値"""
+    values = {item["Name"]: item["Value"] for item in (ssm_parameters or {}).get("Parameters", [])}
+    return {
+        name: values[path] for name, path in ssm_parameter_names(template).items() if path in values
+    }
+
+
+def classify(old_template, new_template):
+    """リソースごとの変更と更新動作"""
+    old = old_template.get("Resources", {})
+    new = new_template.get("Resources", {})
+    changes = []
+    for logical_id in sorted(set(old) | set(new)):
+        before, after = old.get(logical_id), new.get(logical_id)
+        resource_type = (after or before)["Type"]
+        critical = is_critical(logical_id)
+        if before is None:
+            changes.append(Change(logical_id, resource_type, ADD, [], critical))
+            continue
+        if after is None:
+            changes.append(Change(logical_id, resource_type, REMOVE, [], critical))
+            continue
+        if before["Type"] != after["Type"]:
+            changes.append(Change(logical_id, resource_type, REPLACEMENT, ["Type"], critical))
+            continue
+
+        old_properties, new_properties = before.get("Properties", {}), after.get("Properties", {})
+        paths = changed_properties(old_properties, new_properties)
+        old_flat, new_flat = flatten(old_properties), flatten(new_properties)
+        action = NO_OP
+        for path in paths:
+            candidate = property_action(resource_type, path, old_flat.get(path), new_flat.get(path))
+            if SEVERITY[candidate] > SEVERITY[action]:
+                action = candidate
+        if resource_type == "AWS::SSM::Document":
+            action = _document_action(old_properties, new_properties, {p.split(".")[0] for p in paths}) or action
+        changes.append(Change(logical_id, resource_type, action, paths, critical))
+
+    return _detect_renames(changes, old, new)
+
+
+def _detect_renames(changes, old, new):
+    # 論理IDの変更（同じ構成パス・種類のリソースの削除と追加）は置き換えとして表示
+    def key(resources, change):
+        path = resources[change.logical_id].get("Metadata", {}).get("aws:cdk:path")
+        return (change.resource_type, path) if path else None
+
+    added = {key(new, c): c for c in changes if c.action == ADD and key(new, c)}
+    renamed = {}
+    for change in changes:
+        if change.action == REMOVE and key(old, change) in added:
+            renamed[change.logical_id] = added[key(old, change)].logical_id
+    result = []
+    for change in changes:
+        if change.logical_id in renamed:
+            change = change._replace(action=REPLACEMENT, properties=[f"LogicalId -> {renamed[change.logical_id]}"])
+        elif change.logical_id in renamed.values():
+            continue
+        result.append(change)
+    return result
+
+
+def load_history(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def duration(history, resource_type, operation):
+    samples = history.get(resource_type, {}).get(operation)
+    if samples:
+        return statistics.median(samples)
+    return DEFAULT_DURATIONS.get((resource_type, operation), DEFAULT_DURATION)
+
+
+def _dependencies(resource):
+    found = set()
+
+    def walk(value):
+        if isinstance(value, dict):
+            if "Ref" in value and isinstance(value["Ref"], str):
+                found.add(value["Ref"])
+            if "Fn::GetAtt" in value:
+                target = value["Fn::GetAtt"]
+                found.add(target[0] if isinstance(target, list) else target.split(".")[0])
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(resource.get("Properties", {}))
+    depends_on = resource.get("DependsOn", [])
+    found.update([depends_on] if isinstance(depends_on, str) else depends_on)
+    return found
+
+
+def estimate_duration(changes, new_template, history=None):
+    """
+    所要時間の見積もり（秒）と、クリティカルパス上のリソース
+
+    作成・更新は依存関係に沿って順に、削除（置き換え前のリソースを含む）は最後のクリーンアップで並列に行われるものとします。
+    """
+    history = history or {}
+    resources = new_template.get("Resources", {})
+    operations = {ADD: "create", IN_PLACE: "update", INTERRUPTION: "update", REPLACEMENT: "create"}
+    pending = {c.logical_id: c for c in changes if c.action in operations and c.logical_id in resources}
+    finish = {}
+
+    def finish_time(logical_id, visiting=()):
+        if logical_id not in finish:
+            change = pending[logical_id]
+            start, path = max(
+                (finish_time(d, visiting + (logical_id,))
+                 for d in _dependencies(resources[logical_id]) if d in pending and d not in visiting),
+                default=(0, []),
+            )
+            finish[logical_id] = (
+                start + duration(history, change.resource_type, operations[change.action]),
+                path + [logical_id],
+            )
+        return finish[logical_id]
+
+    total, critical_path = max((finish_time(logical_id) for logical_id in pending), default=(0, []))
+    cleanup = max(
+        (duration(history, c.resource_type, "delete") for c in changes if c.action in (REMOVE, REPLACEMENT)),
+        default=0,
+    )
+    return total + cleanup, critical_path
+
+
+def stack_operation_timings(events):
+    """最新のスタック操作のイベントから、リソースごとの所要時間 [(種類, 操作, 秒)]"""
+    events = sorted(events.get("StackEvents", events), key=lambda e: e["Timestamp"])
+    starts = [
+        index for index, event in enumerate(events)
+        if event["ResourceType"] == "AWS::CloudFormation::Stack"
+        and event["ResourceStatus"] in ("CREATE_IN_PROGRESS", "UPDATE_IN_PROGRESS")
+    ]
+    timings = []
+    in_progress = {}
+    for event in events[starts[-1] if starts else 0:]:
+        if event["ResourceType"] == "AWS::CloudFormation::Stack":
+            continue
+        operation, _, status = event["ResourceStatus"].partition("_")
+        if operation not in ("CREATE", "UPDATE", "DELETE"):
+            continue
+        key = (event["LogicalResourceId"], operation)
+        timestamp = datetime.fromisoformat(event["Timestamp"])
+        if status == "IN_PROGRESS":
+            in_progress.setdefault(key, timestamp)
+        elif status == "COMPLETE" and key in in_progress:
+            seconds = (timestamp - in_progress.pop(key)).total_seconds()
+            timings.append((event["ResourceType"], operation.lower(), seconds))
+    return timings
+
+
+def record_timings(history, timings):
+    for resource_type, operation, seconds in timings:
+        samples = history.setdefault(resource_type, {}).setdefault(operation, [])
+        samples.append(seconds)
+        del samples[:-HISTORY_LIMIT]
+    return history
+
+
+def _minutes(seconds):
+    return f"{seconds / 60:.0f}m" if seconds >= 60 else f"{seconds:.0f}s"
+
+
+def format_report(changes, estimate, critical_path):
+    lines = []
+    for change in changes:
+        if change.action == NO_OP:
+            continue
+        detail = ", ".join(change.properties[:4]) + (" ..." if len(change.properties) > 4 else "")
+        lines.append(f"{change.action:<13} {change.resource_type:<40} {change.logical_id:<40} {detail}")
+    if not lines:
+        lines.append("No resource changes")
+    lines.append("")
+    lines.append(f"Estimated duration: {_minutes(estimate)}"
+                 + (f" (critical path: {' -> '.join(critical_path)})" if critical_path else ""))
+    for change in blocking_changes(changes):
+        lines.append(f"!! {change.logical_id}: {CRITICAL_RESOURCES[change.critical]}")
+    return "\n".join(lines)
+
+
+def blocking_changes(changes):
+    """確認が必要な変更（AD DC・FSxの置き換えまたは削除）"""
+    return [c for c in changes if c.critical and c.action in (REPLACEMENT, REMOVE)]
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict replacements and deploy duration before cdk deploy")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze_parser = commands.add_parser("analyze", help="compare the deployed template with a new one")
+    analyze_parser.add_argument("deployed", help="aws cloudformation get-template output or a saved template")
+    analyze_parser.add_argument("new", help="newly synthesized template")
+    analyze_parser.add_argument("--deployed-parameters", help="aws cloudformation describe-stacks parameters (JSON)")
+    analyze_parser.add_argument("--ssm-parameters", help="aws ssm get-parameters output for the new template")
+    analyze_parser.add_argument("--history", default=".cdk-cache/deploy-timings.json")
+    analyze_parser.add_argument("--allow-replacement", action="store_true",
+                                help="exit 0 even if AdDcInstance or FsxFileSystem is replaced")
+
+    record_parser = commands.add_parser("record", help="record per-resource timings from stack events")
+    record_parser.add_argument("events", help="aws cloudformation describe-stack-events output (JSON)")
+    record_parser.add_argument("--history", default=".cdk-cache/deploy-timings.json")
+
+    names_parser = commands.add_parser("ssm-names", help="print the SSM parameter paths used by a template")
+    names_parser.add_argument("template")
+    args = parser.parse_args(argv)
+
+    if args.command == "ssm-names":
+        print(" ".join(sorted(set(ssm_parameter_names(template_body(_load(args.template))).values()))))
+        return 0
+
+    if args.command == "record":
+        history = record_timings(load_history(args.history), stack_operation_timings(_load(args.events)))
+        os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2, sort_keys=True)
+        return 0
+
+    old_template = template_body(_load(args.deployed))
+    new_template = template_body(_load(args.new))
+    if args.deployed_parameters and args.ssm_parameters:
+        # 両方の値がわかるパラメータのみ解決（AMIの更新による置き換えを検出）
+        old_values = deployed_parameter_values(_load(args.deployed_parameters))
+        new_values = current_parameter_values(new_template, _load(args.ssm_parameters))
+        names = set(old_values) & set(new_values)
+        old_template = resolve_parameters(old_template, {name: old_values[name] for name in names})
+        new_template = resolve_parameters(new_template, {name: new_values[name] for name in names})
+
+    changes = classify(old_template, new_template)
+    estimate, critical_path = estimate_duration(changes, new_template, load_history(args.history))
+    print(format_report(changes, estimate, critical_path))
+    return 2 if blocking_changes(changes) and not args.allow_replacement else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+開発用ウォッチモード（スタック単位のインクリメンタル再合成）
+
+1つのPythonプロセス（jsiiランタイム）を起動したままソースファイルの変更を監視し、
+変更されたファイルに依存するスタックだけを再合成して、前回のテンプレートとの差分を表示します。
+例えば ad_domain_stack.py を変更した場合は AdDomainStack のみ再合成されます（cdk.json・cdk.context.json の変更は全スタック）。
+
+変更されたモジュールと、それをimportしているモジュールは依存順に importlib.reload で再読み込みします。
+デプロイは行いません（deploy_stacks.sh を使用してください）。
+
+使用例:
+    python -m ad_windows_fsx.dev_watch                 # 全スタック
+    python -m ad_windows_fsx.dev_watch domain application
+"""
+
+import argparse
+import difflib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+import aws_cdk as cdk
+
+from .assembly_cache import load_context
+from .stack_graph import SHARED_INPUTS, STACK_APPS, affected_stacks, closure, import_graph, module_path, stack_sources
+
+# 差分を比較するテンプレートのセクション
+TEMPLATE_SECTIONS = ["Parameters", "Conditions", "Resources", "Outputs"]
+
+
+def template_diff(old, new):
+    """テンプレートの差分（追加 +、削除 -、変更 ~ と変更された行）"""
+    lines = []
+    for section in TEMPLATE_SECTIONS:
+        before, after = old.get(section, {}), new.get(section, {})
+        for name in sorted(set(before) | set(after)):
+            label = f"{section}.{name}"
+            resource_type = (after.get(name) or before.get(name) or {}).get("Type") if section == "Resources" else None
+            if resource_type:
+                label += f" ({resource_type})"
+            if name not in before:
+                lines.append(f"+ {label}")
+            elif name not in after:
+                lines.append(f"- {label}")
+            elif before[name] != after[name]:
+                lines.append(f"~ {label}")
+                old_lines = json.dumps(before[name], indent=2, sort_keys=True, ensure_ascii=False).splitlines()
+                new_lines = json.dumps(after[name], indent=2, sort_keys=True, ensure_ascii=False).splitlines()
+                lines += [
+                    f"    {line}" for line in difflib.unified_diff(old_lines, new_lines, lineterm="", n=0)
+                    if line[:1] in "+-" and not line.startswith(("+++", "---"))
+                ]
+    return lines
+
+
+def reload_order(graph, changed_modules):
+    """変更されたモジュールとその依存元を、依存される側から順に並べる"""
+    targets = {
+        module for module in graph
+        if closure(graph, module) & set(changed_modules)
+    }
+    ordered = []
+
+    def visit(module):
+        if module in ordered:
+            return
+        for dependency in sorted(graph.get(module, ())):
+            if dependency in targets:
+                visit(dependency)
+        ordered.append(module)
+
+    for module in sorted(targets):
+        visit(module)
+    return ordered
+
+
+class StackWatcher:
+    """スタックごとのテンプレートを保持し、変更の影響を受けるスタックのみ再合成する"""
+
+    def __init__(self, root=".", keys=None):
+        self.root = os.path.abspath(root)
+        self.keys = list(keys or STACK_APPS)
+        self.outdir = tempfile.mkdtemp(prefix="dev-watch-")
+        self.context = load_context(self.root)
+        self.graph = import_graph(self.root)
+        self.sources = stack_sources(self.root, self.graph)
+        self.templates = {}
+        self.mtimes = self._scan()
+
+    def _watched_files(self):
+        return sorted({path for key in self.keys for path in self.sources[key]})
+
+    def _scan(self):
+        mtimes = {}
+        for path in self._watched_files():
+            try:
+                mtimes[path] = os.stat(os.path.join(self.root, path)).st_mtime_ns
+            except FileNotFoundError:
+                mtimes[path] = None
+        return mtimes
+
+    def changed_files(self):
+        """前回の確認以降に更新されたファイル"""
+        current = self._scan()
+        changed = [path for path, mtime in current.items() if self.mtimes.get(path) != mtime]
+        self.mtimes = current
+        return changed
+
+    def _module_for(self, path):
+        for module in self.graph:
+            candidate = module_path(self.root, module)
+            if candidate and os.path.relpath(candidate, self.root) == os.path.normpath(path):
+                return module
+        return None
+
+    def reload(self, changed_paths):
+        """変更されたモジュールを再読み込みし、依存関係を更新"""
+        changed_modules = [m for m in map(self._module_for, changed_paths) if m]
+        for module in reload_order(self.graph, changed_modules):
+            if module in sys.modules:
+                importlib.reload(sys.modules[module])
+        # cdk.context.json のルックアップ結果（fsx-backup-id "latest" 等）も cdk deploy と同じく重ねる
+        if any(os.path.normpath(path) in SHARED_INPUTS for path in changed_paths):
+            self.context = load_context(self.root)
+        # importの追加・削除に追従
+        self.graph = import_graph(self.root)
+        self.sources = stack_sources(self.root, self.graph)
+
+    def synth(self, key):
+        """スタックを1つだけ合成してテンプレートを返す"""
+        app_module = importlib.import_module(STACK_APPS[key])
+        app = cdk.App(context=self.context, outdir=os.path.join(self.outdir, key))
+        stack = app_module.build(app)
+        template = app.synth().get_stack_by_name(stack.stack_name).template
+        self.templates[key] = template
+        return template
+
+    def rebuild(self, changed_paths):
+        """
+        変更されたファイルの影響を受けるスタックを再合成
+
+        戻り値: [(スタック, 差分の行, 所要秒数)]。合成に失敗した場合は差分の代わりにエラーを返し、
+        前回のテンプレートを保持します。
+        """
+        self.reload(changed_paths)
+        results = []
+        for key in affected_stacks(changed_paths, self.sources):
+            if key not in self.keys:
+                continue
+            previous = self.templates.get(key, {})
+            started = time.perf_counter()
+            try:
+                lines = template_diff(previous, self.synth(key))
+            except Exception:
+                lines = ["! synth failed:"] + traceback.format_exc().splitlines()
+            results.append((key, lines, time.perf_counter() - started))
+        return results
+
+    def run(self, interval=0.5):
+        started = time.perf_counter()
+        for key in self.keys:
+            self.synth(key)
+        print(f"Watching {len(self.mtimes)} files for {', '.join(self.keys)} "
+              f"(initial synth {time.perf_counter() - started:.1f}s). Ctrl+C to stop.")
+        while True:
+            time.sleep(interval)
+            changed = self.changed_files()
+            if not changed:
+                continue
+            print(f"\nChanged: {', '.join(changed)}")
+            for key, lines, seconds in self.rebuild(changed):
+                print(f"[{key}] re-synthesized in {seconds:.2f}s"
+                      f"{'' if lines else ' (no template changes)'}")
+                for line in lines:
+                    print(f"  {line}")
+            # 依存関係の変化で監視対象が増減した場合に備えて再取得
+            self.mtimes = self._scan()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-synthesize only the stacks affected by source changes")
+    parser.add_argument("stacks", nargs="*",
+                        help=f"stacks to watch ({', '.join(STACK_APPS)}; default: all)")
+    parser.add_argument("--interval", type=float, default=0.5, help="polling interval in seconds")
+    args = parser.parse_args(argv)
+
+    unknown = [key for key in args.stacks if key not in STACK_APPS]
+    if unknown:
+        parser.error(f"unknown stacks: {', '.join(unknown)}")
+
+    sys.path.insert(0, os.getcwd())
+    try:
+        StackWatcher(".", args.stacks or None).run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
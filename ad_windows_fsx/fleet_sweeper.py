@@ -0,0 +1,229 @@
+"""
+全ユーザー環境のドリフト検出・状態確認（並列スイープ）
+
+アカウント内の AdWindowsFsx*Stack-<ユーザー名> スタックを検出し、ユーザーごとの環境にまとめて
+ドリフト検出（DetectStackDrift）と状態確認を並列に実行します。結果は1つの表にまとめて表示します。
+- drift: 手動変更されたリソース（MODIFIED / DELETED）と変更されたプロパティ
+- failed: 失敗・ロールバック状態のスタック
+- idle: 一定期間（--idle-days）更新されていない環境
+- error: API呼び出しに失敗したスタック
+
+同時に実行するスタック数は --concurrency、AWS CLIの同時実行数はクライアント側のプールで制限します
+（DetectStackDrift のスロットリングを避けるため）。CloudFormationへの呼び出しはクライアントに集約しているため、
+テストではローカルのフェイク実装に差し替えられます。
+
+使用例:
+    python -m ad_windows_fsx.fleet_sweeper --profile your-profile-name
+    python -m ad_windows_fsx.fleet_sweeper --concurrency 8 --idle-days 7
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+# 環境を構成するスタック（デプロイ順）
+STACK_PATTERN = re.compile(r"^AdWindowsFsx(Network|SecurityRules|Domain|Application)Stack-(.+)$")
+
+# 削除済み以外の状態（list-stacks のフィルタ）
+ACTIVE_STATUSES = [
+    "CREATE_IN_PROGRESS", "CREATE_FAILED", "CREATE_COMPLETE",
+    "ROLLBACK_IN_PROGRESS", "ROLLBACK_FAILED", "ROLLBACK_COMPLETE",
+    "DELETE_IN_PROGRESS", "DELETE_FAILED",
+    "UPDATE_IN_PROGRESS", "UPDATE_COMPLETE_CLEANUP_IN_PROGRESS", "UPDATE_COMPLETE",
+    "UPDATE_FAILED", "UPDATE_ROLLBACK_IN_PROGRESS", "UPDATE_ROLLBACK_FAILED",
+    "UPDATE_ROLLBACK_COMPLETE_CLEANUP_IN_PROGRESS", "UPDATE_ROLLBACK_COMPLETE",
+    "IMPORT_IN_PROGRESS", "IMPORT_COMPLETE", "IMPORT_ROLLBACK_IN_PROGRESS",
+    "IMPORT_ROLLBACK_FAILED", "IMPORT_ROLLBACK_COMPLETE",
+]
+
+# 失敗として報告する状態（作成失敗後のROLLBACK_COMPLETE、更新失敗後のUPDATE_ROLLBACK_COMPLETEを含む）
+FAILED_STATUSES = {status for status in ACTIVE_STATUSES if status.endswith("_FAILED")} | {
+    "ROLLBACK_COMPLETE", "UPDATE_ROLLBACK_COMPLETE", "IMPORT_ROLLBACK_COMPLETE",
+}
+
+# ドリフト検出を実行できる状態
+DRIFT_STATUSES = {"CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE", "IMPORT_COMPLETE"}
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_IDLE_DAYS = 14
+DEFAULT_POLL_INTERVAL = 5
+# ドリフト検出の待機上限（秒）
+DRIFT_TIMEOUT = 600
+
+Stack = namedtuple("Stack", ["name", "user", "layer", "status", "updated"])
+Finding = namedtuple("Finding", ["user", "stack", "kind", "resource", "detail"])
+
+
+class AwsCliCloudFormation:
+    """AWS CLI によるCloudFormationクライアント（同時に実行するプロセス数をプールで制限）"""
+
+    def __init__(self, profile=None, region=None, max_calls=8):
+        self.options = (["--profile", profile] if profile else []) + (["--region", region] if region else [])
+        self._pool = asyncio.Semaphore(max_calls)
+
+    async def _call(self, *args):
+        async with self._pool:
+            process = await asyncio.create_subprocess_exec(
+                "aws", "cloudformation", *args, *self.options, "--output", "json",
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode().strip() or f"aws cloudformation {args[0]} failed")
+        return json.loads(stdout or b"{}")
+
+    async def list_stacks(self):
+        result = await self._call("list-stacks", "--stack-status-filter", *ACTIVE_STATUSES)
+        return result.get("StackSummaries", [])
+
+    async def detect_stack_drift(self, stack_name):
+        result = await self._call("detect-stack-drift", "--stack-name", stack_name)
+        return result["StackDriftDetectionId"]
+
+    async def describe_stack_drift_detection_status(self, detection_id):
+        return await self._call("describe-stack-drift-detection-status",
+                                "--stack-drift-detection-id", detection_id)
+
+    async def describe_stack_resource_drifts(self, stack_name):
+        result = await self._call("describe-stack-resource-drifts", "--stack-name", stack_name,
+                                  "--stack-resource-drift-status-filters", "MODIFIED", "DELETED")
+        return result.get("StackResourceDrifts", [])
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def discover(summaries, users=None):
+    """list-stacks の結果から環境を構成するスタック"""
+    stacks = []
+    for summary in summaries:
+        match = STACK_PATTERN.match(summary["StackName"])
+        if not match or (users and match.group(2) not in users):
+            continue
+        stacks.append(Stack(
+            name=summary["StackName"],
+            user=match.group(2),
+            layer=match.group(1),
+            status=summary["StackStatus"],
+            updated=_timestamp(summary.get("LastUpdatedTime") or summary["CreationTime"]),
+        ))
+    return sorted(stacks, key=lambda stack: (stack.user, stack.name))
+
+
+def _drift_detail(drift):
+    paths = [difference["PropertyPath"] for difference in drift.get("PropertyDifferences", [])]
+    status = drift["StackResourceDriftStatus"]
+    return f"{status}: {', '.join(paths)}" if paths else status
+
+
+async def detect_drift(client, stack, poll_interval=DEFAULT_POLL_INTERVAL, timeout=DRIFT_TIMEOUT):
+    """スタックのドリフトを検出し、ドリフトしたリソースを返す"""
+    detection_id = await client.detect_stack_drift(stack.name)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        status = await client.describe_stack_drift_detection_status(detection_id)
+        if status["DetectionStatus"] != "DETECTION_IN_PROGRESS":
+            break
+        if loop.time() > deadline:
+            raise TimeoutError(f"drift detection {detection_id} did not finish in {timeout}s")
+        await asyncio.sleep(poll_interval)
+    if status["DetectionStatus"] == "DETECTION_FAILED":
+        raise RuntimeError(status.get("DetectionStatusReason", "drift detection failed"))
+    if status.get("StackDriftStatus") == "IN_SYNC":
+        return []
+    return [
+        Finding(
+            user=stack.user,
+            stack=stack.name,
+            kind="drift",
+            resource=f"{drift['LogicalResourceId']} ({drift['ResourceType']})",
+            detail=_drift_detail(drift),
+        )
+        for drift in await client.describe_stack_resource_drifts(stack.name)
+    ]
+
+
+async def check_stack(client, stack, poll_interval=DEFAULT_POLL_INTERVAL):
+    """スタック1つの状態確認とドリフト検出"""
+    if stack.status in FAILED_STATUSES:
+        return [Finding(stack.user, stack.name, "failed", "-", stack.status)]
+    if stack.status not in DRIFT_STATUSES:
+        # 処理中のスタックはドリフト検出できない
+        return []
+    try:
+        return await detect_drift(client, stack, poll_interval)
+    except Exception as error:
+        return [Finding(stack.user, stack.name, "error", "-", str(error))]
+
+
+def idle_environments(stacks, now, idle_days=DEFAULT_IDLE_DAYS):
+    """最後の更新から idle_days 日以上経過した環境"""
+    latest = {}
+    for stack in stacks:
+        latest[stack.user] = max(latest.get(stack.user, stack.updated), stack.updated)
+    return [
+        Finding(user, "-", "idle", "-", f"no updates for {(now - updated).days} days (last {updated:%Y-%m-%d})")
+        for user, updated in sorted(latest.items())
+        if now - updated >= timedelta(days=idle_days)
+    ]
+
+
+async def sweep(client, concurrency=DEFAULT_CONCURRENCY, idle_days=DEFAULT_IDLE_DAYS, users=None,
+                now=None, poll_interval=DEFAULT_POLL_INTERVAL):
+    """すべての環境をスイープし、(スタック, 検出結果) を返す"""
+    stacks = discover(await client.list_stacks(), users)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def bounded(stack):
+        async with limit:
+            return await check_stack(client, stack, poll_interval)
+
+    results = await asyncio.gather(*(bounded(stack) for stack in stacks))
+    findings = [finding for result in results for finding in result]
+    findings += idle_environments(stacks, now or datetime.now(timezone.utc), idle_days)
+    return stacks, sorted(findings, key=lambda f: (f.user, f.stack, f.kind, f.resource))
+
+
+def format_table(stacks, findings):
+    environments = sorted({stack.user for stack in stacks})
+    lines = [f"Environments: {len(environments)}, stacks: {len(stacks)}, findings: {len(findings)}"]
+    if not findings:
+        return "\n".join(lines + ["All stacks are in sync"])
+    rows = [("USER", "STACK", "KIND", "RESOURCE", "DETAIL")] + [tuple(finding) for finding in findings]
+    widths = [max(len(str(row[i])) for row in rows) for i in range(4)]
+    lines += [
+        "  ".join(str(value).ljust(width) for value, width in zip(row[:4], widths)) + "  " + str(row[4])
+        for row in rows
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep all AdWindowsFsx environments for drift and failed stacks")
+    parser.add_argument("--profile", help="AWS profile name")
+    parser.add_argument("--region", help="AWS region")
+    parser.add_argument("--user", action="append", help="limit to the environment of this user (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="stacks checked in parallel")
+    parser.add_argument("--idle-days", type=int, default=DEFAULT_IDLE_DAYS)
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    async def run():
+        client = AwsCliCloudFormation(args.profile, args.region, max_calls=args.concurrency * 2)
+        return await sweep(client, args.concurrency, args.idle_days, args.user, poll_interval=args.poll_interval)
+
+    stacks, findings = asyncio.run(run())
+    print(format_table(stacks, findings))
+    return 1 if any(finding.kind in ("drift", "failed", "error") for finding in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
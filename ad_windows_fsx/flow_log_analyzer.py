@@ -0,0 +1,207 @@
+"""
+VPCフローログのオフライン解析（SMB / LDAP / Kerberos / RPC）
+
+Network Stackでvpc-flow-logsを有効にするとS3に出力されるフローログファイルを、
+ジェネレーターのパイプラインで1行ずつ処理し、(SGロール, サービス) ごとに
+バイト数・パケット数・レコード数・REJECT数を集計します。
+ファイル全体をメモリに読み込まないため、数GBのログでもメモリ使用量は一定です。
+
+VPC全体のフローログではVPC内の通信がクライアント側（egress）とサーバー側（ingress）の両方のENIで記録されるため、
+flow-direction を使ってサーバー側のENIのレコードのみを集計します（同じ通信を二重に数えない）。
+
+使用例:
+    aws s3 sync s3://<FlowLogBucketName>/AWSLogs/ ./flow-logs/
+    python -m ad_windows_fsx.flow_log_analyzer --roles roles.json flow-logs/**/*.log.gz
+
+roles.json はENI IDまたはIPアドレスからSGロールへの対応表です（例: {"10.0.2.15": "ad", "eni-0abc": "fsx"}）。
+対応表にないアドレスは "other" として集計します。
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import sys
+from collections import namedtuple
+
+# Network Stackのカスタムフォーマット（${フィールド名} の順に出力される）
+FLOW_LOG_FIELDS = [
+    "version",
+    "interface-id",
+    "srcaddr",
+    "dstaddr",
+    "pkt-srcaddr",
+    "pkt-dstaddr",
+    "srcport",
+    "dstport",
+    "protocol",
+    "packets",
+    "bytes",
+    "start",
+    "end",
+    "action",
+    "tcp-flags",
+    "flow-direction",
+    "log-status",
+]
+
+# 集計対象のサービス（名前, 開始ポート, 終了ポート）
+SERVICES = [
+    ("SMB", 445, 445),
+    ("LDAP", 389, 389),
+    ("Kerberos", 88, 88),
+    ("RPC", 49152, 65535),
+]
+
+FlowRecord = namedtuple("FlowRecord", [
+    "interface_id", "srcaddr", "dstaddr", "srcport", "dstport",
+    "protocol", "packets", "bytes", "action", "tcp_flags", "flow_direction",
+])
+
+Stats = namedtuple("Stats", ["bytes", "packets", "records", "rejects"])
+
+# tcp-flags のSYN(2) + ACK(16)
+_SYN_ACK = 18
+
+
+def read_lines(paths):
+    """フローログファイル（.gz 対応）を1行ずつ返す"""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield line
+
+
+def parse_records(lines):
+    """
+    行をFlowRecordに変換
+
+    ヘッダー行（フィールド名の並び）が現れるたびに列の位置を更新します。
+    NODATA / SKIPDATA などポート情報のない行は読み飛ばします。
+    """
+    index = {name: i for i, name in enumerate(FLOW_LOG_FIELDS)}
+    for line in lines:
+        values = line.split()
+        if not values:
+            continue
+        if values[0] == "version":
+            index = {name: i for i, name in enumerate(values)}
+            continue
+        try:
+            srcport = int(values[index["srcport"]])
+            dstport = int(values[index["dstport"]])
+            record = FlowRecord(
+                interface_id=values[index["interface-id"]],
+                srcaddr=values[index.get("pkt-srcaddr", index["srcaddr"])],
+                dstaddr=values[index.get("pkt-dstaddr", index["dstaddr"])],
+                srcport=srcport,
+                dstport=dstport,
+                protocol=int(values[index["protocol"]]),
+                packets=int(values[index["packets"]]),
+                bytes=int(values[index["bytes"]]),
+                action=values[index["action"]],
+                tcp_flags=int(values[index["tcp-flags"]]) if "tcp-flags" in index else 0,
+                flow_direction=values[index["flow-direction"]] if "flow-direction" in index else "-",
+            )
+        except (ValueError, IndexError, KeyError):
+            continue
+        yield record
+
+
+def service_for(port):
+    for name, start, end in SERVICES:
+        if start <= port <= end:
+            return name
+    return None
+
+
+def server_side(record, server):
+    """
+    サーバー側のENIで記録されたレコードか（宛先がサーバーの ingress、送信元がサーバーの egress）
+
+    flow-direction がないフォーマットでは判定できないため、すべてのレコードを対象とします。
+    """
+    if record.flow_direction == "ingress":
+        return record.dstaddr == server
+    if record.flow_direction == "egress":
+        return record.srcaddr == server
+    return True
+
+
+def classify(records, roles=None):
+    """
+    レコードを ((SGロール, サービス), レコード) に変換
+
+    サービスポート側（サーバー側）のアドレスのロールを使います。
+    クライアントのエフェメラルポートもRPC動的ポートと同じ範囲のため、
+    RPCは両方のポートがRPC範囲の場合のみ対象とし、tcp-flags（SYN / SYN-ACK）でサーバー側を判定します。
+    クライアント側のENIのレコードは、サーバー側のENIのレコードと重複するため除外します。
+    """
+    roles = roles or {}
+    for record in records:
+        dst_service = service_for(record.dstport)
+        src_service = service_for(record.srcport)
+        if dst_service not in (None, "RPC"):
+            server, service = record.dstaddr, dst_service
+        elif src_service not in (None, "RPC"):
+            server, service = record.srcaddr, src_service
+        elif dst_service == "RPC" and src_service == "RPC":
+            # SYN-ACKを送信した側がサーバー（フラグ不明の場合は宛先側）
+            syn_ack = record.tcp_flags & _SYN_ACK == _SYN_ACK
+            server, service = (record.srcaddr if syn_ack else record.dstaddr), "RPC"
+        else:
+            continue
+        if not server_side(record, server):
+            continue
+        role = roles.get(server) or roles.get(record.interface_id) or "other"
+        yield (role, service), record
+
+
+def aggregate(classified):
+    """(ロール, サービス) ごとの集計（メモリ使用量はキーの数のみに比例）"""
+    totals = {}
+    for key, record in classified:
+        stats = totals.get(key, Stats(0, 0, 0, 0))
+        totals[key] = Stats(
+            stats.bytes + record.bytes,
+            stats.packets + record.packets,
+            stats.records + 1,
+            stats.rejects + (record.action == "REJECT"),
+        )
+    return totals
+
+
+def analyze(paths, roles=None):
+    """ファイル一覧を解析して集計結果を返す"""
+    return aggregate(classify(parse_records(read_lines(paths)), roles))
+
+
+def format_report(totals):
+    lines = [f"{'role':<10} {'service':<10} {'bytes':>15} {'packets':>12} {'records':>10} {'rejects':>8}"]
+    for (role, service), stats in sorted(totals.items(), key=lambda item: -item[1].bytes):
+        lines.append(
+            f"{role:<10} {service:<10} {stats.bytes:>15,} {stats.packets:>12,} "
+            f"{stats.records:>10,} {stats.rejects:>8,}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate VPC flow logs for SMB/LDAP/Kerberos/RPC traffic")
+    parser.add_argument("paths", nargs="+", help="flow log files (.log or .log.gz, glob patterns allowed)")
+    parser.add_argument("--roles", help="JSON file mapping ENI IDs or IP addresses to SG roles")
+    args = parser.parse_args(argv)
+
+    roles = {}
+    if args.roles:
+        with open(args.roles, encoding="utf-8") as f:
+            roles = json.load(f)
+
+    paths = [p for pattern in args.paths for p in sorted(glob.glob(pattern, recursive=True)) or [pattern]]
+    print(format_report(analyze(paths, roles)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+FSx用サービスアカウントへの権限委任
+
+FSx for Windows File Server がセルフマネージドADに参加するために必要な権限を、
+参加先のコンテナーに対するACEとして生成します。生成処理はAWSに依存しないためオフラインでテストできます。
+- 既定: FSxの既定の参加先 CN=Computers に委任（OUを指定しない従来の構成）
+- fsx-delegated-ou: 専用OU（OU=FSx）を作成して委任し、FSxをそのOUに参加させる
+  （既存のFSxではOUの変更が置き換え＝ファイルシステムの再作成になるため、新規環境向け）
+
+参考: https://docs.aws.amazon.com/fsx/latest/WindowsGuide/assign-permissions-to-service-account.html
+"""
+
+from collections import namedtuple
+
+# ADスキーマ・拡張権限のGUID
+COMPUTER_OBJECT_GUID = "bf967a86-0de6-11d0-a285-00aa003049e2"
+RESET_PASSWORD_GUID = "00299570-246d-11d0-a768-00aa006e0529"
+ACCOUNT_RESTRICTIONS_GUID = "4c164200-20c0-11d0-a768-00aa006e0529"
+VALIDATED_DNS_HOST_NAME_GUID = "72e39547-7b18-11d1-adef-00c04fd8d5cd"
+VALIDATED_SPN_GUID = "f3a64788-5306-11d1-a9c5-00c04fd8d5cd"
+ALL_OBJECTS_GUID = "00000000-0000-0000-0000-000000000000"
+
+# 委任先OUとサービスアカウントのデフォルト
+DEFAULT_OU_NAME = "FSx"
+COMPUTERS_CONTAINER_NAME = "Computers"
+DEFAULT_SERVICE_ACCOUNT = "fsxuser"
+
+# rights: ActiveDirectoryRights、inheritance: ActiveDirectorySecurityInheritance の列挙名
+Ace = namedtuple("Ace", ["description", "rights", "object_type", "inheritance", "inherited_object_type"])
+
+
+def delegation_aces():
+    """
+    FSxサービスアカウントに必要な6つの権限をACEとして返す
+
+    - Create / Delete computer objects（OU自身と配下）
+    - Reset password、Read and write Account Restrictions、
+      Validated write to DNS host name / service principal name（配下のコンピューターオブジェクト）
+    """
+    return [
+        Ace("Create and delete computer objects", "CreateChild, DeleteChild",
+            COMPUTER_OBJECT_GUID, "All", ALL_OBJECTS_GUID),
+        Ace("Reset password", "ExtendedRight",
+            RESET_PASSWORD_GUID, "Descendents", COMPUTER_OBJECT_GUID),
+        Ace("Read and write Account Restrictions", "ReadProperty, WriteProperty",
+            ACCOUNT_RESTRICTIONS_GUID, "Descendents", COMPUTER_OBJECT_GUID),
+        Ace("Validated write to DNS host name", "Self",
+            VALIDATED_DNS_HOST_NAME_GUID, "Descendents", COMPUTER_OBJECT_GUID),
+        Ace("Validated write to service principal name", "Self",
+            VALIDATED_SPN_GUID, "Descendents", COMPUTER_OBJECT_GUID),
+    ]
+
+
+def domain_distinguished_name(domain_name):
+    """example.com -> DC=example,DC=com"""
+    return ",".join(f"DC={label}" for label in domain_name.split("."))
+
+
+def ou_distinguished_name(domain_name, ou_name=DEFAULT_OU_NAME):
+    """委任先OUの識別名"""
+    return f"OU={ou_name},{domain_distinguished_name(domain_name)}"
+
+
+def computers_container_distinguished_name(domain_name):
+    """OU未指定時のFSxの参加先（既定のComputersコンテナー）の識別名"""
+    return f"CN={COMPUTERS_CONTAINER_NAME},{domain_distinguished_name(domain_name)}"
+
+
+def delegation_target(domain_name, ou_name=None):
+    """fsxuserに権限を委任するコンテナーの識別名（ou_name が None の場合は CN=Computers）"""
+    if ou_name:
+        return ou_distinguished_name(domain_name, ou_name)
+    return computers_container_distinguished_name(domain_name)
+
+
+def render_delegation_script(domain_name, ou_name=DEFAULT_OU_NAME,
+                             service_account=DEFAULT_SERVICE_ACCOUNT,
+                             wait_minutes=30):
+    """
+    OU作成とACE付与を行うPowerShellスクリプト（行のリスト）を生成
+
+    ou_name が None の場合はOUを作成せず、既定のComputersコンテナーにACEを付与します。
+    AD DSの起動完了まで待機してから実行し、既存のOU・ACEはスキップするため何度実行しても安全です。
+    """
+    ou_dn = delegation_target(domain_name, ou_name)
+    lines = [
+        "$ErrorActionPreference = 'Stop'",
+        f"$Deadline = (Get-Date).AddMinutes({wait_minutes})",
+        "while ($true) {",
+        "    try {",
+        "        Import-Module ActiveDirectory",
+        "        Get-ADDomain | Out-Null",
+        "        break",
+        "    } catch {",
+        "        if ((Get-Date) -gt $Deadline) { throw \"AD DS is not ready: $($_.Exception.Message)\" }",
+        "        Write-Host \"Waiting for AD DS to become ready...\"",
+        "        Start-Sleep -Seconds 30",
+        "    }",
+        "}",
+        "",
+        f"$OuDn = '{ou_dn}'",
+    ]
+    if ou_name:
+        lines += [
+            "if (-not (Get-ADOrganizationalUnit -Filter \"DistinguishedName -eq '$OuDn'\")) {",
+            f"    New-ADOrganizationalUnit -Name '{ou_name}' -Path '{domain_distinguished_name(domain_name)}' -ProtectedFromAccidentalDeletion $true",
+            "    Write-Host \"Created OU: $OuDn\"",
+            "}",
+        ]
+    lines += [
+        "",
+        f"$Account = Get-ADUser -Identity '{service_account}'",
+        "$Sid = New-Object System.Security.Principal.SecurityIdentifier($Account.SID)",
+        "$Acl = Get-Acl -Path \"AD:\\$OuDn\"",
+        "$Added = 0",
+        "function Add-DelegationAce([string]$Rights, [string]$ObjectType, [string]$Inheritance, [string]$InheritedObjectType) {",
+        "    $rule = New-Object System.DirectoryServices.ActiveDirectoryAccessRule(",
+        "        $Sid,",
+        "        [System.DirectoryServices.ActiveDirectoryRights]$Rights,",
+        "        [System.Security.AccessControl.AccessControlType]::Allow,",
+        "        [guid]$ObjectType,",
+        "        [System.DirectoryServices.ActiveDirectorySecurityInheritance]$Inheritance,",
+        "        [guid]$InheritedObjectType)",
+        "    $existing = $Acl.GetAccessRules($true, $false, [System.Security.Principal.SecurityIdentifier])",
+        "    $exists = $existing | Where-Object {",
+        "        $_.IdentityReference -eq $Sid -and",
+        "        $_.ActiveDirectoryRights -eq $rule.ActiveDirectoryRights -and",
+        "        $_.ObjectType -eq $rule.ObjectType -and",
+        "        $_.InheritedObjectType -eq $rule.InheritedObjectType",
+        "    }",
+        "    if (-not $exists) {",
+        "        $Acl.AddAccessRule($rule)",
+        "        $script:Added++",
+        "    }",
+        "}",
+    ]
+    for ace in delegation_aces():
+        lines += [
+            f"# {ace.description}",
+            f"Add-DelegationAce '{ace.rights}' '{ace.object_type}' '{ace.inheritance}' '{ace.inherited_object_type}'",
+        ]
+    lines += [
+        "if ($Added -gt 0) {",
+        "    Set-Acl -Path \"AD:\\$OuDn\" -AclObject $Acl",
+        "}",
+        f"Write-Host \"Delegation to {service_account} on ${{OuDn}}: $Added ACE(s) added\"",
+    ]
+    return lines
+
+
+def delegation_automation_document(domain_name, instance_id, ou_name=DEFAULT_OU_NAME,
+                                   service_account=DEFAULT_SERVICE_ACCOUNT):
+    """
+    AD DC上で委任スクリプトを実行するSSM Automationドキュメント（schemaVersion 0.3）
+
+    AD DCはフォレスト作成時に再起動するため、Run Commandステップは再試行可能にしています。
+    """
+    if ou_name:
+        description = f"Create the {ou_name} OU and delegate FSx permissions to {service_account}"
+    else:
+        description = f"Delegate FSx permissions to {service_account} on the {COMPUTERS_CONTAINER_NAME} container"
+    return {
+        "schemaVersion": "0.3",
+        "description": description,
+        "parameters": {
+            "InstanceId": {
+                "type": "String",
+                "description": "AD Domain Controller instance ID",
+                "default": instance_id
+            }
+        },
+        "mainSteps": [
+            {
+                "name": "DelegateFsxPermissions",
+                "action": "aws:runCommand",
+                "maxAttempts": 3,
+                "timeoutSeconds": 3600,
+                "inputs": {
+                    "DocumentName": "AWS-RunPowerShellScript",
+                    "InstanceIds": ["{{ InstanceId }}"],
+                    "Parameters": {
+                        "commands": render_delegation_script(domain_name, ou_name, service_account),
+                        "executionTimeout": "3600"
+                    }
+                }
+            }
+        ]
+    }
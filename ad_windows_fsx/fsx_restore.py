@@ -0,0 +1,190 @@
+"""
+FSxのバックアップからの環境の複製
+
+cdk.jsonの fsx-backup-id を指定すると、Application StackのFSxを空のファイルシステムではなくバックアップから作成します。
+データの再投入なしに、復元の時間で性能テスト・ステージング環境を用意できます。
+- "backup-0123..." : 指定したバックアップ
+- "latest"         : fsx-restore-source の環境（ユーザー名）の最新のバックアップ
+
+"latest" はCDKのコンテキストルックアップと同じく cdk.context.json にキャッシュした値を使います。
+合成のたびに新しいバックアップに切り替わる（FSxが置き換わる）ことを避けるため、
+キャッシュの作成・更新はこのツールで明示的に行います。
+
+ストレージ容量はバックアップ元の値を引き継ぎ、fsx-storage-capacity がそれより大きい場合のみ拡張します（縮小は不可）。
+ストレージタイプ・スループット容量・SSD IOPSはcdk.jsonの値で上書きされます。
+既存の環境で fsx-backup-id を変更するとFSxが置き換え（再作成）になる点に注意してください。
+
+使用例:
+    python -m ad_windows_fsx.fsx_restore list --source alice --profile your-profile-name
+    python -m ad_windows_fsx.fsx_restore resolve --source alice --profile your-profile-name
+    python -m ad_windows_fsx.fsx_restore resolve --file-system-id fs-0123456789abcdef0 --source alice
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+APPLICATION_STACK_PREFIX = "AdWindowsFsxApplicationStack-"
+
+CONTEXT_FILE = "cdk.context.json"
+
+_BACKUP_ID_PATTERN = re.compile(r"^backup-[0-9a-f]{8,17}$")
+
+
+def context_key(source):
+    """cdk.context.json に保存する最新バックアップのキー"""
+    return f"fsx-latest-backup:{source}"
+
+
+def _created(backup):
+    value = backup["CreationTime"]
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).astimezone()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def available_backups(backups):
+    """利用可能なバックアップ（新しい順）"""
+    return sorted(
+        (b for b in backups if b.get("Lifecycle") == "AVAILABLE"),
+        key=_created,
+        reverse=True
+    )
+
+
+def backup_record(backup):
+    """合成時に使うバックアップの情報（cdk.context.json に保存）"""
+    file_system = backup.get("FileSystem", {})
+    windows = file_system.get("WindowsConfiguration", {})
+    return {
+        "BackupId": backup["BackupId"],
+        "CreationTime": _created(backup).isoformat(),
+        "Type": backup.get("Type"),
+        "FileSystemId": file_system.get("FileSystemId"),
+        "StorageCapacity": file_system.get("StorageCapacity"),
+        "StorageType": file_system.get("StorageType"),
+        "DeploymentType": windows.get("DeploymentType"),
+        "ThroughputCapacity": windows.get("ThroughputCapacity"),
+    }
+
+
+def resolve_backup(backup_id, source=None, cached=None):
+    """
+    fsx-backup-id の値からバックアップの情報を返す（未指定の場合は None）
+
+    "latest" の場合は cdk.context.json にキャッシュした fsx_restore resolve の結果（cached）を使います。
+    """
+    if not backup_id:
+        return None
+    if backup_id == "latest":
+        if not source:
+            raise ValueError("fsx-backup-id 'latest' requires fsx-restore-source (user name of the source environment)")
+        if not cached:
+            raise ValueError(
+                f"No cached backup for {source!r}; run "
+                f"'python -m ad_windows_fsx.fsx_restore resolve --source {source}' to look it up"
+            )
+        return cached
+    if not _BACKUP_ID_PATTERN.match(backup_id):
+        raise ValueError(f"Invalid fsx-backup-id: {backup_id!r} (use 'backup-...' or 'latest')")
+    return {"BackupId": backup_id}
+
+
+def restore_storage_capacity(record, storage_capacity):
+    """
+    復元時に指定するストレージ容量（None の場合は省略してバックアップ元の容量を引き継ぐ）
+
+    バックアップ元より大きい場合のみ拡張として指定します。
+    バックアップ元の容量が分からない場合（IDを直接指定した場合）は拡張できないため引き継ぎます。
+    """
+    source_capacity = record.get("StorageCapacity")
+    if source_capacity is None or storage_capacity <= source_capacity:
+        return None
+    return storage_capacity
+
+
+def write_context(path, key, record):
+    """cdk.context.json に値を保存（他のルックアップ結果は保持）"""
+    data = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    data[key] = record
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def _aws(args, *command):
+    options = (["--profile", args.profile] if args.profile else []) + (["--region", args.region] if args.region else [])
+    result = subprocess.run(
+        ["aws", *command, *options, "--output", "json"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"aws {' '.join(command[:2])} failed")
+    return json.loads(result.stdout or "{}")
+
+
+def source_file_system_id(args):
+    """バックアップ元の環境（Application Stack）の出力 FsxFileSystemId"""
+    stack_name = f"{APPLICATION_STACK_PREFIX}{args.source}"
+    stacks = _aws(args, "cloudformation", "describe-stacks", "--stack-name", stack_name)["Stacks"]
+    for output in stacks[0].get("Outputs", []):
+        if output["OutputKey"] == "FsxFileSystemId":
+            return output["OutputValue"]
+    raise RuntimeError(f"{stack_name} has no FsxFileSystemId output")
+
+
+def format_backups(backups):
+    rows = [("BACKUP ID", "CREATED", "TYPE", "GiB", "STORAGE", "DEPLOYMENT")]
+    for backup in backups:
+        record = backup_record(backup)
+        rows.append((
+            record["BackupId"], record["CreationTime"], str(record["Type"]), str(record["StorageCapacity"]),
+            str(record["StorageType"]), str(record["DeploymentType"]),
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find FSx backups of an environment for cloning")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("list", "list available backups of the source environment"),
+                            ("resolve", f"cache the latest backup in {CONTEXT_FILE} for fsx-backup-id 'latest'")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--source", required=True, help="user name of the source environment")
+        sub.add_argument("--file-system-id", help="source file system (default: FsxFileSystemId of the source stack)")
+        sub.add_argument("--profile", help="AWS profile name")
+        sub.add_argument("--region", help="AWS region")
+    subparsers.choices["resolve"].add_argument("--context-file", default=CONTEXT_FILE)
+    subparsers.choices["resolve"].add_argument("--dry-run", action="store_true", help="print without saving")
+    args = parser.parse_args(argv)
+
+    file_system_id = args.file_system_id or source_file_system_id(args)
+    backups = available_backups(_aws(
+        args, "fsx", "describe-backups", "--filters", f"Name=file-system-id,Values={file_system_id}"
+    ).get("Backups", []))
+
+    if args.command == "list":
+        print(format_backups(backups))
+        return 0
+
+    if not backups:
+        print(f"No available backups for {file_system_id}", file=sys.stderr)
+        return 1
+    record = backup_record(backups[0])
+    print(json.dumps(record, indent=2))
+    if not args.dry_run:
+        write_context(args.context_file, context_key(args.source), record)
+        print(f"Saved {context_key(args.source)} to {args.context_file}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+FSxのSMB共有の一括作成・更新（宣言的な共有リスト）
+
+cdk.jsonの fsx-shares に記述した共有を、Windows EC2からFSxのリモート管理エンドポイント（PowerShell）に
+1つのセッションで接続して作成・更新します（State Managerで定期的に再適用）。
+    "fsx-shares": [
+        {"name": "projects", "access-based-enumeration": true, "encrypt-data": true},
+        {"name": "sql", "path": "D:\\\\sql", "continuous-availability": true, "caching-mode": "None"}
+    ]
+- path: 共有するフォルダー（デフォルトは D:\\<name>、作成時にフォルダーも作成）
+- description: 説明
+- continuous-availability: 継続的可用性（SQL Server等、Multi-AZでのフェイルオーバー時にハンドルを維持）
+- access-based-enumeration: アクセスベースの列挙（アクセス権のないフォルダーを表示しない）
+- encrypt-data: SMB暗号化の必須化
+- caching-mode: オフラインキャッシュ（None / Manual / Documents / Programs / BranchCache）
+  未指定の場合は既存の共有の値を変更しません（新規作成時はFSxの既定値 Manual、BranchCacheが設定した値も維持）
+
+差分に基づいて適用します。既存の共有を取得して設定を比較し、ない共有は作成、設定が異なる共有のみ更新します。
+リストにない共有（既定の share 等）は変更・削除しません。パスが異なる場合は置き換えずにスキップして報告します。
+"""
+
+import re
+from collections import namedtuple
+
+from aws_cdk import (
+    Aws,
+    aws_iam as iam,
+)
+from constructs import Construct
+
+from .config_documents import ConfigAssociation, _run_powershell, build_document
+from .powershell_script import ps_quote
+
+CACHING_MODES = ["None", "Manual", "Documents", "Programs", "BranchCache"]
+
+# caching-mode 未指定で共有を新規作成する場合の値（FSxの既定値）
+DEFAULT_CACHING_MODE = "Manual"
+
+# 共有の確認・再適用の間隔（手動変更の修正、ドメイン参加前は何もしない）
+APPLY_SCHEDULE = "rate(30 minutes)"
+
+# 比較・更新する設定（Get-FSxSmbShare のプロパティ名）
+SETTINGS = ["Description", "ContinuouslyAvailable", "FolderEnumerationMode", "EncryptData", "CachingMode"]
+
+Share = namedtuple("Share", ["name", "path", "description", "continuously_available",
+                             "folder_enumeration_mode", "encrypt_data", "caching_mode"])
+
+_KEYS = {"name", "path", "description", "continuous-availability", "access-based-enumeration",
+         "encrypt-data", "caching-mode"}
+
+_SHARE_NAME_PATTERN = re.compile(r'^[^\\/:*?"<>|]{1,80}$')
+
+
+def parse_shares(entries):
+    """cdk.jsonの fsx-shares を検証して [Share] に変換"""
+    shares = []
+    names = set()
+    for entry in entries or []:
+        unknown = set(entry) - _KEYS
+        if unknown:
+            raise ValueError(f"Unknown fsx-shares keys: {', '.join(sorted(unknown))}")
+        name = entry.get("name")
+        if not name or not _SHARE_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid share name: {name!r}")
+        if name.lower() in names:
+            raise ValueError(f"Duplicate share name: {name}")
+        names.add(name.lower())
+        path = entry.get("path") or f"D:\\{name}"
+        if not path.upper().startswith("D:\\"):
+            raise ValueError(f"Share {name}: path must be on the D: drive of the file system ({path})")
+        caching_mode = entry.get("caching-mode")
+        if caching_mode is not None and caching_mode not in CACHING_MODES:
+            raise ValueError(f"Share {name}: caching-mode must be one of {', '.join(CACHING_MODES)}")
+        shares.append(Share(
+            name=name,
+            path=path,
+            description=entry.get("description", ""),
+            continuously_available=bool(entry.get("continuous-availability", False)),
+            folder_enumeration_mode="AccessBased" if entry.get("access-based-enumeration") else "Unrestricted",
+            encrypt_data=bool(entry.get("encrypt-data", False)),
+            caching_mode=caching_mode,
+        ))
+    return shares
+
+
+def _literal(value):
+    if value is None:
+        return "$null"
+    if isinstance(value, bool):
+        return "$true" if value else "$false"
+    return ps_quote(value)
+
+
+def share_literal(share):
+    """共有の設定をPowerShellのハッシュテーブルに変換"""
+    fields = [
+        ("Name", share.name),
+        ("Path", share.path),
+        ("Description", share.description),
+        ("ContinuouslyAvailable", share.continuously_available),
+        ("FolderEnumerationMode", share.folder_enumeration_mode),
+        ("EncryptData", share.encrypt_data),
+        ("CachingMode", share.caching_mode),
+    ]
+    return "@{ " + "; ".join(f"{key} = {_literal(value)}" for key, value in fields) + " }"
+
+
+def _setting_parameters():
+    return " ".join(f"-{name} $using:{name}" for name in SETTINGS)
+
+
+def apply_commands(domain_name, shares):
+    """
+    共有を差分に基づいて作成・更新するPowerShell
+
+    比較はローカルで行い、リモート管理エンドポイント（JEA）ではFSxのコマンドレットのみを実行します。
+    """
+    return [
+        "$ErrorActionPreference = 'Stop'",
+        "if (-not (Get-WmiObject -Class Win32_ComputerSystem).PartOfDomain) {",
+        "    Write-Host 'Not joined to the domain yet; shares will be applied on the next run'",
+        "    exit 0",
+        "}",
+        "$Shares = @(",
+        *[f"    {share_literal(share)}" for share in shares],
+        ")",
+        "$Endpoint = (Get-FSXFileSystem -FileSystemId '{{ FileSystemId }}' -Region '{{ Region }}').WindowsConfiguration.RemoteAdministrationEndpoint",
+        "$Password = ConvertTo-SecureString 'Password123!' -AsPlainText -Force",
+        f"$Credential = New-Object System.Management.Automation.PSCredential('Administrator@{domain_name}', $Password)",
+        "$Session = New-PSSession -ComputerName $Endpoint -ConfigurationName FSxRemoteAdmin -Credential $Credential",
+        "try {",
+        "    $Current = @{}",
+        "    foreach ($Existing in @(Invoke-Command -Session $Session -ScriptBlock { Get-FSxSmbShare })) {",
+        "        $Current[$Existing.Name] = $Existing",
+        "    }",
+        "    $Summary = @{ created = 0; updated = 0; unchanged = 0; skipped = 0 }",
+        "    foreach ($Share in $Shares) {",
+        "        $Existing = $Current[$Share.Name]",
+        "        # caching-mode 未指定: 既存の共有の値を維持（BranchCache等の他の設定と競合させない）",
+        "        if ($null -eq $Share.CachingMode) {",
+        f"            $Share.CachingMode = if ($Existing) {{ \"$($Existing.CachingMode)\" }} else {{ {ps_quote(DEFAULT_CACHING_MODE)} }}",
+        "        }",
+        "        $Name = $Share.Name",
+        "        $Path = $Share.Path",
+        *[f"        ${name} = $Share.{name}" for name in SETTINGS],
+        "        if (-not $Existing) {",
+        "            Invoke-Command -Session $Session -ScriptBlock {",
+        f"                New-FSxSmbShare -Name $using:Name -Path $using:Path {_setting_parameters()} -Credential $using:Credential",
+        "            } | Out-Null",
+        "            Write-Host \"created    $Name ($Path)\"",
+        "            $Summary.created++",
+        "            continue",
+        "        }",
+        "        if ($Existing.Path.TrimEnd('\\') -ne $Path.TrimEnd('\\')) {",
+        "            Write-Host \"skipped    $Name (existing path $($Existing.Path) differs from $Path; recreate the share to move it)\"",
+        "            $Summary.skipped++",
+        "            continue",
+        "        }",
+        f"        $Changes = @(foreach ($Setting in @({', '.join(ps_quote(name) for name in SETTINGS)})) {{",
+        "            if (\"$($Existing.$Setting)\" -ne \"$($Share[$Setting])\") {",
+        "                \"$Setting $($Existing.$Setting) -> $($Share[$Setting])\"",
+        "            }",
+        "        })",
+        "        if ($Changes.Count -eq 0) {",
+        "            $Summary.unchanged++",
+        "            continue",
+        "        }",
+        "        Invoke-Command -Session $Session -ScriptBlock {",
+        f"            Set-FSxSmbShare -Name $using:Name {_setting_parameters()} -Force",
+        "        } | Out-Null",
+        "        Write-Host \"updated    $Name ($($Changes -join ', '))\"",
+        "        $Summary.updated++",
+        "    }",
+        "    Write-Host \"Shares: $($Summary.created) created, $($Summary.updated) updated, $($Summary.unchanged) unchanged, $($Summary.skipped) skipped\"",
+        "} finally {",
+        "    Remove-PSSession -Session $Session",
+        "}",
+    ]
+
+
+def shares_document(domain_name, shares):
+    return build_document(
+        "Create or update the SMB shares of the FSx file system from the fsx-shares list",
+        [_run_powershell("ApplyFsxShares", apply_commands(domain_name, shares))],
+        parameters={
+            "FileSystemId": "FSx file system ID",
+            "Region": "Region of the FSx file system",
+        }
+    )
+
+
+class FsxShares(Construct):
+    """
+    fsx-shares の共有をWindows EC2からFSxのリモート管理エンドポイントで作成・更新するState Manager関連付け
+
+    共有リストはドキュメントに埋め込むため、リストの変更時は関連付けが即時に再適用されます。
+    """
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 shares: list,
+                 domain_name: str,
+                 instance_id: str,
+                 role: iam.IRole,
+                 file_system_id: str) -> None:
+        super().__init__(scope, construct_id)
+
+        self.association = ConfigAssociation(
+            self, "FsxShares",
+            document=shares_document(domain_name, shares),
+            instance_id=instance_id,
+            parameters={"FileSystemId": file_system_id, "Region": Aws.REGION},
+            schedule_expression=APPLY_SCHEDULE
+        )
+
+        # リモート管理エンドポイントの取得
+        role.add_to_principal_policy(iam.PolicyStatement(
+            actions=["fsx:DescribeFileSystems"],
+            resources=["*"]
+        ))
@@ -0,0 +1,107 @@
+"""
+AD DC・Windows EC2のインスタンスプロファイルとネットワーク帯域チェック
+
+cdk.json の instance-profile でロールごとのインスタンスタイプの組み合わせを選択し、
+dc-instance-type / client-instance-type で個別に上書きできます。
+合成時に組み込みの帯域表を参照し、クライアントのベースライン帯域がFSxのスループット容量を
+下回る場合やAD DCがバースト可能インスタンスの場合に警告を出します。
+"""
+
+from collections import namedtuple
+
+from aws_cdk import Annotations
+
+# ロール別インスタンスタイプのプリセット
+INSTANCE_PROFILES = {
+    # 開発・検証用（バースト可能インスタンス、従来の構成）
+    "dev": {"dc": "t3.medium", "client": "t3.large"},
+    # 常時負荷向け（CPUクレジットに依存しない汎用インスタンス）
+    "steady": {"dc": "m6i.large", "client": "m6i.xlarge"},
+    # 高スループット向け（ネットワーク最適化インスタンス）
+    "network": {"dc": "m6i.large", "client": "m6in.xlarge"},
+}
+
+DEFAULT_INSTANCE_PROFILE = "dev"
+
+# baseline_gbps: ベースライン帯域、burst_gbps: 最大（バースト）帯域、burstable_cpu: CPUクレジット制
+Bandwidth = namedtuple("Bandwidth", ["baseline_gbps", "burst_gbps", "burstable_cpu"])
+
+# 主要インスタンスタイプのネットワーク帯域（EC2ドキュメントの公表値）
+BANDWIDTH_TABLE = {
+    "t3.medium": Bandwidth(0.256, 5.0, True),
+    "t3.large": Bandwidth(0.512, 5.0, True),
+    "t3.xlarge": Bandwidth(1.024, 5.0, True),
+    "t3.2xlarge": Bandwidth(2.048, 5.0, True),
+    "m5.large": Bandwidth(0.75, 10.0, False),
+    "m5.xlarge": Bandwidth(1.25, 10.0, False),
+    "m5.2xlarge": Bandwidth(2.5, 10.0, False),
+    "m5.4xlarge": Bandwidth(5.0, 10.0, False),
+    "m6i.large": Bandwidth(0.781, 12.5, False),
+    "m6i.xlarge": Bandwidth(1.562, 12.5, False),
+    "m6i.2xlarge": Bandwidth(3.125, 12.5, False),
+    "m6i.4xlarge": Bandwidth(6.25, 12.5, False),
+    "m7i.large": Bandwidth(0.781, 12.5, False),
+    "m7i.xlarge": Bandwidth(1.562, 12.5, False),
+    "m7i.2xlarge": Bandwidth(3.125, 12.5, False),
+    "r6i.large": Bandwidth(0.781, 12.5, False),
+    "r6i.xlarge": Bandwidth(1.562, 12.5, False),
+    "m6in.large": Bandwidth(3.125, 25.0, False),
+    "m6in.xlarge": Bandwidth(6.25, 30.0, False),
+    "m6in.2xlarge": Bandwidth(12.5, 40.0, False),
+    "c6in.large": Bandwidth(3.125, 25.0, False),
+    "c6in.xlarge": Bandwidth(6.25, 30.0, False),
+    "c6in.2xlarge": Bandwidth(12.5, 40.0, False),
+}
+
+
+def resolve_instance_type(role, profile=DEFAULT_INSTANCE_PROFILE, override=None):
+    """ロールのインスタンスタイプ（個別指定 > プロファイル）"""
+    if profile not in INSTANCE_PROFILES:
+        raise ValueError(f"Unknown instance-profile: {profile!r} (allowed: {', '.join(INSTANCE_PROFILES)})")
+    return override or INSTANCE_PROFILES[profile][role]
+
+
+def baseline_mbps(instance_type):
+    """ベースライン帯域（MB/s）。帯域表にない場合は None"""
+    bandwidth = BANDWIDTH_TABLE.get(instance_type)
+    return bandwidth.baseline_gbps * 1000 / 8 if bandwidth else None
+
+
+def client_bandwidth_findings(instance_type, fsx_throughput_capacity):
+    """クライアントの帯域チェック結果（(level, message) のリスト）"""
+    mbps = baseline_mbps(instance_type)
+    if mbps is None:
+        return [("info", f"{instance_type}: network bandwidth is not in the built-in table; skipped bandwidth check")]
+    findings = []
+    if mbps < fsx_throughput_capacity:
+        findings.append((
+            "warning",
+            f"{instance_type} baseline network bandwidth is about {mbps:.0f} MB/s, below the FSx throughput "
+            f"capacity of {fsx_throughput_capacity} MB/s; sustained transfers will be limited by the client"
+        ))
+    if BANDWIDTH_TABLE[instance_type].burstable_cpu:
+        findings.append((
+            "warning",
+            f"{instance_type} is a burstable instance; SMB throughput drops when CPU credits are exhausted"
+        ))
+    return findings
+
+
+def domain_controller_findings(instance_type):
+    """AD DCのチェック結果（(level, message) のリスト）"""
+    bandwidth = BANDWIDTH_TABLE.get(instance_type)
+    if bandwidth and bandwidth.burstable_cpu:
+        return [(
+            "warning",
+            f"{instance_type} is a burstable instance; authentication storms can exhaust CPU credits on the domain controller"
+        )]
+    return []
+
+
+def annotate(scope, findings):
+    """チェック結果を合成時のメッセージとして出力"""
+    for level, message in findings:
+        if level == "warning":
+            Annotations.of(scope).add_warning_v2("ad-windows-fsx:instance-sizing", message)
+        else:
+            Annotations.of(scope).add_info(message)
@@ -0,0 +1,239 @@
+"""
+FSxのバックアップ・メンテナンスウィンドウの選定
+
+FSxの DataReadBytes / DataWriteBytes（1時間ごとのSum）をCloudWatchからエクスポートしたJSONを読み込み、
+指定したタイムゾーンで (曜日, 時) ごとの平均転送量を集計して、最も負荷の低い時間帯を選びます。
+- 日次バックアップ: 全曜日の合計が最小の時
+- 週次メンテナンス: バックアップウィンドウと重ならない（前後に間隔を空けた）(曜日, 時) のうち最小のもの
+結果はFSxの形式（UTC）に変換し、cdk.json に貼り付けられるコンテキストとして出力します。
+
+使用例:
+    # CloudWatchからのエクスポート（過去28日分）
+    python -m ad_windows_fsx.maintenance_windows --print-query fs-0123456789abcdef0 > query.json
+    aws cloudwatch get-metric-data --cli-input-json file://query.json > metrics.json
+    python -m ad_windows_fsx.maintenance_windows metrics.json --time-zone Asia/Tokyo
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# ウィンドウの長さ（分）。重なりの判定に使用
+BACKUP_WINDOW_MINUTES = 60
+MAINTENANCE_WINDOW_MINUTES = 30
+
+# バックアップとメンテナンスの間に空ける時間（時）
+MIN_GAP_HOURS = 1
+
+DEFAULT_TIME_ZONE = "Asia/Tokyo"
+
+# 集計対象のメトリクス（AWS/FSx）
+METRICS = ["DataReadBytes", "DataWriteBytes"]
+
+# FSxの時刻形式（UTC）: 日次 "HH:MM"、週次 "d:HH:MM"（d: 1=月曜 ... 7=日曜）
+_DAILY_FORMAT = re.compile(r"^([01]\d|2[0-3]):([0-5]\d)$")
+_WEEKLY_FORMAT = re.compile(r"^([1-7]):([01]\d|2[0-3]):([0-5]\d)$")
+
+_MINUTES_PER_DAY = 24 * 60
+_MINUTES_PER_WEEK = 7 * _MINUTES_PER_DAY
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# backup_hour: ローカル時刻の時、maintenance: (曜日 0=月曜, 時)
+Windows = namedtuple("Windows", ["backup_hour", "maintenance", "backup_load", "maintenance_load"])
+
+
+def metric_data_query(file_system_id, days=28, end=None):
+    """aws cloudwatch get-metric-data --cli-input-json 用の入力"""
+    end = (end or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    return {
+        "MetricDataQueries": [
+            {
+                "Id": metric.lower(),
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": "AWS/FSx",
+                        "MetricName": metric,
+                        "Dimensions": [{"Name": "FileSystemId", "Value": file_system_id}]
+                    },
+                    "Period": 3600,
+                    "Stat": "Sum"
+                }
+            }
+            for metric in METRICS
+        ],
+        "StartTime": (end - timedelta(days=days)).isoformat(),
+        "EndTime": end.isoformat(),
+    }
+
+
+def load_samples(export):
+    """get-metric-data の出力から (UTC時刻, バイト数) を返す（複数メトリクスは同じ時刻で合算される）"""
+    for result in export.get("MetricDataResults", []):
+        for timestamp, value in zip(result["Timestamps"], result["Values"]):
+            yield datetime.fromisoformat(timestamp.replace("Z", "+00:00")), value
+
+
+def hourly_profile(samples, time_zone=DEFAULT_TIME_ZONE):
+    """
+    (曜日, 時) ごとの1時間あたり平均転送量（ローカル時刻）
+
+    各 (曜日, 時) の合計を、観測期間 [最初, 最後] にその時間帯が現れた回数で割ります（期間内でデータのない時間は0）。
+    すべての曜日を観測できるよう、1週間（168時間）以上のデータが必要です。
+    """
+    tz = ZoneInfo(time_zone)
+    totals = {}
+    hours = set()
+    for timestamp, value in samples:
+        local = timestamp.astimezone(tz)
+        key = (local.weekday(), local.hour)
+        totals[key] = totals.get(key, 0) + value
+        hours.add(timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0))
+    if not hours:
+        raise ValueError("No metric samples found")
+    first, last = min(hours), max(hours)
+    span_hours = int((last - first).total_seconds() // 3600) + 1
+    if span_hours < 7 * 24:
+        raise ValueError(
+            f"Metric samples cover only {span_hours} hours; export at least one full week (168 hours)"
+        )
+    # 各 (曜日, 時) が観測期間中に何回あったか（UTCの1時間刻みで数えるため夏時間の切り替えにも対応）
+    occurrences = {}
+    for offset in range(span_hours):
+        local = (first + timedelta(hours=offset)).astimezone(tz)
+        key = (local.weekday(), local.hour)
+        occurrences[key] = occurrences.get(key, 0) + 1
+    return {
+        key: totals.get(key, 0) / occurrences[key]
+        for key in ((weekday, hour) for weekday in range(7) for hour in range(24))
+    }
+
+
+def _hour_distance(a, b):
+    diff = abs(a - b) % 24
+    return min(diff, 24 - diff)
+
+
+def select_windows(profile, min_gap_hours=MIN_GAP_HOURS):
+    """最も負荷の低いバックアップ時刻とメンテナンス (曜日, 時) を選択（同値の場合は早い時刻）"""
+    daily = {hour: sum(profile[(weekday, hour)] for weekday in range(7)) / 7 for hour in range(24)}
+    backup_hour = min(daily, key=lambda hour: (daily[hour], hour))
+
+    candidates = [
+        key for key in sorted(profile)
+        if _hour_distance(key[1], backup_hour) > min_gap_hours
+    ]
+    maintenance = min(candidates, key=lambda key: (profile[key], key))
+    return Windows(backup_hour, maintenance, daily[backup_hour], profile[maintenance])
+
+
+def to_fsx_times(windows, time_zone=DEFAULT_TIME_ZONE, reference=None):
+    """
+    ローカル時刻のウィンドウをFSxの形式（UTC）に変換
+
+    夏時間のあるタイムゾーンでは reference（デフォルトは現在）の週のオフセットで変換します。
+    """
+    tz = ZoneInfo(time_zone)
+    reference = (reference or datetime.now(tz)).astimezone(tz)
+    monday = (reference - timedelta(days=reference.weekday())).date()
+
+    backup = datetime(monday.year, monday.month, monday.day, windows.backup_hour, tzinfo=tz).astimezone(timezone.utc)
+    weekday, hour = windows.maintenance
+    day = monday + timedelta(days=weekday)
+    maintenance = datetime(day.year, day.month, day.day, hour, tzinfo=tz).astimezone(timezone.utc)
+    return backup.strftime("%H:%M"), f"{maintenance.isoweekday()}:{maintenance.strftime('%H:%M')}"
+
+
+def _parse_daily(value):
+    match = _DAILY_FORMAT.match(value)
+    if not match:
+        raise ValueError(f"Invalid daily backup start time {value!r} (expected HH:MM in UTC)")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def _parse_weekly(value):
+    match = _WEEKLY_FORMAT.match(value)
+    if not match:
+        raise ValueError(f"Invalid weekly maintenance start time {value!r} (expected d:HH:MM in UTC, 1=Monday)")
+    day, hour, minute = (int(group) for group in match.groups())
+    return (day - 1) * _MINUTES_PER_DAY + hour * 60 + minute
+
+
+def validate_fsx_windows(backup_start_time, maintenance_start_time):
+    """
+    FSxのウィンドウの形式と、週次メンテナンスが日次バックアップと重ならないことを確認
+
+    重なる場合は ValueError。
+    """
+    backup = _parse_daily(backup_start_time)
+    maintenance = _parse_weekly(maintenance_start_time)
+    for day in range(7):
+        start = day * _MINUTES_PER_DAY + backup
+        # 週をまたぐ場合も考慮して前後の週と比較
+        for offset in (-_MINUTES_PER_WEEK, 0, _MINUTES_PER_WEEK):
+            m_start = maintenance + offset
+            if m_start < start + BACKUP_WINDOW_MINUTES and start < m_start + MAINTENANCE_WINDOW_MINUTES:
+                raise ValueError(
+                    f"Weekly maintenance window {maintenance_start_time} overlaps "
+                    f"the daily backup window {backup_start_time} (UTC)"
+                )
+    return backup_start_time, maintenance_start_time
+
+
+def format_profile(profile, windows):
+    """時刻ごとの平均負荷（全曜日平均）と選択結果"""
+    daily = [sum(profile[(weekday, hour)] for weekday in range(7)) / 7 for hour in range(24)]
+    peak = max(daily) or 1
+    lines = [f"{'hour':<6} {'avg bytes/h':>16}"]
+    for hour, value in enumerate(daily):
+        marker = " <- backup" if hour == windows.backup_hour else ""
+        lines.append(f"{hour:02d}:00  {value:>16,.0f} {'#' * round(value / peak * 30)}{marker}")
+    weekday, hour = windows.maintenance
+    lines.append(f"maintenance: {WEEKDAY_NAMES[weekday]} {hour:02d}:00 ({windows.maintenance_load:,.0f} bytes/h)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Select low-traffic FSx backup and maintenance windows")
+    parser.add_argument("export", nargs="?", help="output of aws cloudwatch get-metric-data (JSON)")
+    parser.add_argument("--time-zone", help="IANA time zone for the analysis (default: cdk.json fsx-window-time-zone)")
+    parser.add_argument("--print-query", metavar="FILE_SYSTEM_ID",
+                        help="print the get-metric-data input for the file system and exit")
+    parser.add_argument("--days", type=int, default=28, help="days of history for --print-query")
+    args = parser.parse_args(argv)
+
+    if args.print_query:
+        print(json.dumps(metric_data_query(args.print_query, args.days), indent=2))
+        return 0
+    if not args.export:
+        parser.error("a metrics export is required")
+
+    time_zone = args.time_zone
+    if not time_zone and os.path.exists("cdk.json"):
+        with open("cdk.json", encoding="utf-8") as f:
+            time_zone = json.load(f).get("context", {}).get("fsx-window-time-zone")
+    time_zone = time_zone or DEFAULT_TIME_ZONE
+
+    with open(args.export, encoding="utf-8") as f:
+        profile = hourly_profile(load_samples(json.load(f)), time_zone)
+    windows = select_windows(profile)
+    backup, maintenance = validate_fsx_windows(*to_fsx_times(windows, time_zone))
+
+    print(f"Time zone: {time_zone}")
+    print(format_profile(profile, windows))
+    print()
+    print("cdk.json context:")
+    print(json.dumps({
+        "fsx-backup-start-time": backup,
+        "fsx-maintenance-start-time": maintenance,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+NATトポロジー設定とエグレス経路の見積もり
+
+cdk.json の nat-topology で以下のいずれかを選択します。
+- single:   NAT Gateway 1つ（AZ-Aに配置、AZ-BはAZ間通信でAZ-AのNATを経由）
+- per-az:   AZごとにNAT Gateway（AZ間通信なし）
+- instance: NATインスタンス 1台（開発用の低コスト構成、AZ-BはAZ間通信）
+
+使用例:
+    python -m ad_windows_fsx.network_topology            # 全モードの比較
+    python -m ad_windows_fsx.network_topology per-az     # 指定モードのみ
+"""
+
+import sys
+
+NAT_TOPOLOGIES = ("single", "per-az", "instance")
+DEFAULT_NAT_TOPOLOGY = "single"
+
+# Network Stackの出力名と合わせたAZラベル
+AZ_LABELS = ("AZ-A", "AZ-B")
+
+
+def validate_topology(topology):
+    if topology not in NAT_TOPOLOGIES:
+        raise ValueError(f"Unknown nat-topology: {topology!r} (allowed: {', '.join(NAT_TOPOLOGIES)})")
+    return topology
+
+
+def nat_count(topology, az_count=len(AZ_LABELS)):
+    """作成するNAT Gateway / NATインスタンスの数"""
+    validate_topology(topology)
+    return az_count if topology == "per-az" else 1
+
+
+def egress_paths(topology, availability_zones=AZ_LABELS):
+    """
+    プライベートサブネットごとのインターネット向け経路を返す
+
+    CDKはNATを先頭のパブリックサブネットから順に配置し、NATのないAZは先頭のNATへルーティングします。
+    """
+    count = nat_count(topology, len(availability_zones))
+    kind = "NAT instance" if topology == "instance" else "NAT gateway"
+    paths = []
+    for index, az in enumerate(availability_zones):
+        nat_az = availability_zones[index] if index < count else availability_zones[0]
+        paths.append({
+            "subnet": f"PrivateWithEgress ({az})",
+            "az": az,
+            "via": f"{kind} ({nat_az})",
+            "nat_az": nat_az,
+            "cross_az": nat_az != az,
+        })
+    return paths
+
+
+def format_egress_paths(topology, availability_zones=AZ_LABELS):
+    """エグレス経路の一覧（1行1サブネット）"""
+    lines = []
+    for path in egress_paths(topology, availability_zones):
+        hop = "cross-AZ" if path["cross_az"] else "same-AZ"
+        lines.append(f"{path['subnet']} -> {path['via']} [{hop}]")
+    return "; ".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    topologies = [validate_topology(t) for t in argv] or list(NAT_TOPOLOGIES)
+    for topology in topologies:
+        paths = egress_paths(topology)
+        cross = sum(1 for p in paths if p["cross_az"])
+        print(f"[{topology}] NAT: {nat_count(topology)}, cross-AZ subnets: {cross}")
+        for path in paths:
+            hop = "cross-AZ" if path["cross_az"] else "same-AZ"
+            print(f"  {path['subnet']:<28} -> {path['via']:<28} {hop}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+PowerShellユーザーデータ生成ライブラリ
+
+ユーザーデータを文字列リテラルの羅列ではなく、型付きのステップの組み合わせとして構築します。
+- 各ステップは開始・終了時刻と所要時間を構造化ログ（JSON Lines）として出力
+- 互換性のある連続ステップ（Install-WindowsFeature など）は1回の実行にマージ
+- 16KBのユーザーデータ上限を超える場合はS3アセットに自動退避
+"""
+
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aws_cdk import (
+    Fn,
+    aws_ec2 as ec2,
+    aws_iam as iam,
+    aws_s3_assets as s3_assets,
+)
+from constructs import Construct
+
+# EC2ユーザーデータの上限（Base64エンコード前）
+USER_DATA_LIMIT_BYTES = 16 * 1024
+
+# Fn::Sub 置換後に値が伸びる分の余裕（IPアドレス等）
+SUBSTITUTION_MARGIN_BYTES = 256
+
+# ec2.UserData.for_windows() が付与する <powershell> タグ分のバイト数
+_WINDOWS_WRAPPER_BYTES = len("<powershell>\n</powershell>")
+
+_STEP_NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9]*$")
+_VARIABLE_NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9]*$")
+
+_INDENT = "    "
+
+
+def ps_quote(value: str) -> str:
+    """PowerShellの単一引用符リテラルに変換"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+@dataclass
+class ScriptStep:
+    """名前付きのスクリプトステップ（構造化ログとタイミング計測付きで実行される）"""
+
+    name: str
+    commands: List[str]
+    description: str = ""
+
+    def __post_init__(self):
+        if not _STEP_NAME_PATTERN.match(self.name):
+            raise ValueError(f"Invalid step name: {self.name!r} (use alphanumeric PascalCase)")
+
+    def merge(self, other: "ScriptStep") -> Optional["ScriptStep"]:
+        """直後のステップとマージできる場合はマージ後のステップを返す"""
+        return None
+
+    def render_commands(self) -> List[str]:
+        return list(self.commands)
+
+
+@dataclass
+class FeatureInstallStep(ScriptStep):
+    """Install-WindowsFeature ステップ（連続する機能インストールは1回にまとめる）"""
+
+    name: str = "InstallWindowsFeatures"
+    commands: List[str] = field(default_factory=list)
+    features: List[str] = field(default_factory=list)
+    include_management_tools: bool = True
+
+    def merge(self, other: ScriptStep) -> Optional[ScriptStep]:
+        if not isinstance(other, FeatureInstallStep):
+            return None
+        if other.include_management_tools != self.include_management_tools:
+            return None
+        features = self.features + [f for f in other.features if f not in self.features]
+        return FeatureInstallStep(
+            name=self.name,
+            description=self.description or other.description,
+            features=features,
+            include_management_tools=self.include_management_tools
+        )
+
+    def render_commands(self) -> List[str]:
+        names = ",".join(ps_quote(f) for f in self.features)
+        label = ", ".join(self.features)
+        tools = " -IncludeManagementTools" if self.include_management_tools else ""
+        return [
+            f"Write-Host \"Installing Windows features: {label}\"",
+            f"$featureResult = Install-WindowsFeature -Name {names}{tools}",
+            "if ($featureResult.Success) {",
+            f"    Write-Host \"Windows feature installation ({label}): SUCCESS\"",
+            "} else {",
+            f"    Write-Host \"Windows feature installation ({label}): FAILED\"",
+            "    Write-Host \"Exit Code: $($featureResult.ExitCode)\"",
+            "    throw \"Install-WindowsFeature failed with exit code $($featureResult.ExitCode)\"",
+            "}",
+        ]
+
+
+def feature_install(*features: str, description: str = "") -> FeatureInstallStep:
+    """Windows機能インストールステップ"""
+    return FeatureInstallStep(features=list(features), description=description)
+
+
+def local_user(user_name: str, password: str, groups: List[str], description: str = "") -> ScriptStep:
+    """ローカルユーザー作成ステップ"""
+    step_name = "CreateLocalUser" + re.sub(r"[^A-Za-z0-9]", "", user_name.title())
+    commands = [f"net user {user_name} {password} /add"]
+    for group in groups:
+        group_arg = f"\"{group}\"" if " " in group else group
+        commands.append(f"net localgroup {group_arg} {user_name} /add")
+    return ScriptStep(name=step_name, commands=commands, description=description)
+
+
+class PowerShellScript:
+    """
+    ステップを組み合わせてPowerShellユーザーデータを構築するビルダー
+
+    variables に指定した値はスクリプト先頭で $名前 として定義され、
+    Fn::Sub のプレースホルダ（例: "${AdDcPrivateIp}"）を渡すとデプロイ時に置換されます。
+    本体のステップはプレースホルダを含まない静的なテキストになるため、S3退避後もそのまま実行できます。
+    """
+
+    def __init__(self, name: str, transcript_path: str, step_log_path: str,
+                 variables: Optional[Dict[str, str]] = None) -> None:
+        if not _STEP_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid script name: {name!r}")
+        for variable in (variables or {}):
+            if not _VARIABLE_NAME_PATTERN.match(variable):
+                raise ValueError(f"Invalid variable name: {variable!r}")
+        self.name = name
+        self.transcript_path = transcript_path
+        self.step_log_path = step_log_path
+        self.variables = dict(variables or {})
+        self.steps: List[ScriptStep] = []
+
+    def add(self, *steps: ScriptStep) -> "PowerShellScript":
+        """ステップを追加（直前のステップとマージ可能ならマージ）"""
+        for step in steps:
+            merged = self.steps[-1].merge(step) if self.steps else None
+            if merged is not None:
+                self.steps[-1] = merged
+                continue
+            if any(existing.name == step.name for existing in self.steps):
+                raise ValueError(f"Duplicate step name: {step.name}")
+            self.steps.append(step)
+        return self
+
+    def render_header(self) -> str:
+        """変数定義部分（Fn::Sub による置換対象）"""
+        return "\n".join(
+            f"${name} = {ps_quote(value)}" for name, value in self.variables.items()
+        )
+
+    def render_body(self) -> str:
+        """本体（構造化ログ関数と各ステップ）"""
+        lines = [
+            f"# {self.name}",
+            f"Start-Transcript -Path {ps_quote(self.transcript_path)} -Append",
+            f"$StepLogPath = {ps_quote(self.step_log_path)}",
+            "function Write-StepLog {",
+            "    param([string]$Step, [string]$Phase, [string]$Status = '', [long]$ElapsedMs = 0, [string]$Message = '')",
+            "    $entry = [ordered]@{",
+            "        timestamp = (Get-Date).ToUniversalTime().ToString('o')",
+            f"        script = {ps_quote(self.name)}",
+            "        step = $Step",
+            "        phase = $Phase",
+            "        status = $Status",
+            "        elapsed_ms = $ElapsedMs",
+            "        message = $Message",
+            "    }",
+            "    $line = $entry | ConvertTo-Json -Compress",
+            "    Add-Content -Path $StepLogPath -Value $line",
+            "    Write-Host $line",
+            "}",
+        ]
+        for step in self.steps:
+            lines += [
+                "",
+                f"# --- {step.name} ---",
+            ]
+            if step.description:
+                lines.append(f"# {step.description}")
+            lines += [
+                f"Write-StepLog -Step {ps_quote(step.name)} -Phase 'start'",
+                "$StepTimer = [System.Diagnostics.Stopwatch]::StartNew()",
+                "try {",
+            ]
+            lines += [(_INDENT + c) if c else "" for c in step.render_commands()]
+            lines += [
+                f"{_INDENT}Write-StepLog -Step {ps_quote(step.name)} -Phase 'end' -Status 'success' -ElapsedMs $StepTimer.ElapsedMilliseconds",
+                "} catch {",
+                f"{_INDENT}Write-StepLog -Step {ps_quote(step.name)} -Phase 'end' -Status 'failed' -ElapsedMs $StepTimer.ElapsedMilliseconds -Message $_.Exception.Message",
+                "}",
+            ]
+        lines += [
+            "",
+            "Stop-Transcript",
+        ]
+        return "\n".join(lines)
+
+    def render(self) -> str:
+        """ヘッダーと本体を結合したスクリプト全体"""
+        header = self.render_header()
+        body = self.render_body()
+        return f"{header}\n{body}" if header else body
+
+    def user_data_size(self) -> int:
+        """<powershell>タグを含むユーザーデータのバイト数（置換前）"""
+        return _WINDOWS_WRAPPER_BYTES + len(self.render().encode("utf-8"))
+
+    def fits_inline(self) -> bool:
+        return self.user_data_size() + SUBSTITUTION_MARGIN_BYTES <= USER_DATA_LIMIT_BYTES
+
+    def to_user_data(self, scope: Construct, construct_id: str,
+                     role: Optional[iam.IRole] = None,
+                     substitutions: Optional[Dict[str, str]] = None) -> ec2.UserData:
+        """
+        ec2.UserData を生成
+
+        substitutions は変数定義部分にのみ Fn::Sub で適用されます。
+        上限を超える場合は本体をS3アセットとしてアップロードし、
+        ユーザーデータには変数定義とダウンロード・実行処理のみを残します（roleに読み取り権限を付与）。
+        """
+        user_data = ec2.UserData.for_windows()
+        header = self.render_header()
+        if header:
+            user_data.add_commands(Fn.sub(header, substitutions) if substitutions else header)
+
+        if self.fits_inline():
+            user_data.add_commands(self.render_body())
+        else:
+            if role is None:
+                raise ValueError(
+                    f"{self.name} user data exceeds {USER_DATA_LIMIT_BYTES} bytes; "
+                    "a role is required to offload it to S3"
+                )
+            asset_dir = tempfile.mkdtemp(prefix=f"{self.name}-")
+            script_path = os.path.join(asset_dir, f"{self.name}.ps1")
+            with open(script_path, "w", encoding="utf-8-sig") as f:
+                f.write(self.render_body())
+            asset = s3_assets.Asset(scope, f"{construct_id}Script", path=script_path)
+            asset.grant_read(role)
+
+            local_path = user_data.add_s3_download_command(
+                bucket=asset.bucket,
+                bucket_key=asset.s3_object_key
+            )
+            # 子スコープでも親スコープの変数は参照可能
+            user_data.add_execute_file_command(file_path=local_path)
+
+        return user_data
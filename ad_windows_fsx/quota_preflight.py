@@ -0,0 +1,313 @@
+"""
+サービスクォータのプリフライトチェック（デプロイ前）
+
+合成したテンプレートからクォータごとの需要を集計し、クォータのスナップショット（上限値と現在の使用量）と比較して、
+不足するクォータをPhase 1の開始前に報告します（長時間のデプロイが途中でクォータ超過により失敗することを防ぐため）。
+- vpcs / elastic-ips: アカウント（リージョン）単位。環境ごとのVPCとNATゲートウェイのEIP
+- interface-endpoints-per-vpc: VPC単位のインターフェースエンドポイント
+- rules-per-security-group: セキュリティグループ・方向（インバウンド / アウトバウンド）ごとのルール数
+  （Network Stackのグループに Security Rules Stack が追加するルールをエクスポート名で対応付けて合算）
+- fsx-windows-storage / fsx-windows-throughput: アカウント単位のFSx for Windowsのストレージ・スループット容量
+  （バックアップから容量を引き継ぐ場合のストレージは需要に含まれません）
+
+アカウント単位の使用量からはデプロイする環境自身のスタック（aws:cloudformation:stack-name タグ）のリソースを除くため、
+既存の環境の再デプロイで二重に数えることはありません。VPC・グループ単位の需要はテンプレートが全体を定義しています。
+
+スナップショットは --live でAWS CLI（Service Quotas、EC2、FSx）から取得するか、保存したJSONを使います（オフライン）。
+クォータがService Quotasに見つからない場合は既定値（DEFAULT_QUOTAS）を使います。
+テンプレートを指定しない場合はcdk.json（と cdk.context.json）のコンテキストで各スタックをプロセス内で合成します。
+不足がある場合は終了コード1を返します（使用率が WARN_RATIO 以上の場合は警告のみ）。
+
+使用例:
+    python -m ad_windows_fsx.quota_preflight --live --profile your-profile-name
+    python -m ad_windows_fsx.quota_preflight --live --save-snapshot quotas.json --stacks network security-rules
+    python -m ad_windows_fsx.quota_preflight --snapshot quotas.json --templates cdk.out
+"""
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .assembly_cache import load_context
+from .stack_graph import STACK_APPS
+
+ACCOUNT = "account"
+VPC = "vpc"
+SECURITY_GROUP = "security-group"
+
+# service_code / name_pattern はService Quotasのクォータ名との照合に使用
+Quota = namedtuple("Quota", ["scope", "service_code", "name_pattern", "default", "unit"])
+
+QUOTAS = {
+    "vpcs": Quota(ACCOUNT, "vpc", r"^VPCs per Region$", 5, ""),
+    "elastic-ips": Quota(ACCOUNT, "ec2", r"^EC2-VPC Elastic IPs$", 5, ""),
+    "interface-endpoints-per-vpc": Quota(VPC, "vpc", r"^Interface VPC endpoints per VPC$", 50, ""),
+    "rules-per-security-group": Quota(SECURITY_GROUP, "vpc", r"^Inbound or outbound rules per security group$", 60, ""),
+    "fsx-windows-storage": Quota(ACCOUNT, "fsx", r"(?i)^(?=.*windows)(?=.*storage)", 524288, "GiB"),
+    "fsx-windows-throughput": Quota(ACCOUNT, "fsx", r"(?i)^(?=.*windows)(?=.*throughput)", 10240, "MBps"),
+}
+
+DEFAULT_QUOTAS = {name: quota.default for name, quota in QUOTAS.items()}
+
+# この使用率以上は警告（不足ではない）
+WARN_RATIO = 0.8
+
+STACK_NAME_PREFIXES = {
+    "network": "AdWindowsFsxNetworkStack-",
+    "security-rules": "AdWindowsFsxSecurityRulesStack-",
+    "domain": "AdWindowsFsxDomainStack-",
+    "application": "AdWindowsFsxApplicationStack-",
+}
+
+Demand = namedtuple("Demand", ["quota", "scope", "amount"])
+Check = namedtuple("Check", ["quota", "scope", "in_use", "demand", "limit", "status"])
+
+
+def _resources(template, resource_type):
+    for logical_id, resource in template.get("Resources", {}).items():
+        if resource.get("Type") == resource_type:
+            yield logical_id, resource.get("Properties", {})
+
+
+def export_targets(templates):
+    """エクスポート名 → "スタック/論理ID"（Ref / Fn::GetAtt をエクスポートしている出力）"""
+    targets = {}
+    for stack, template in templates.items():
+        for output in template.get("Outputs", {}).values():
+            name = output.get("Export", {}).get("Name")
+            value = output.get("Value")
+            if not isinstance(name, str) or not isinstance(value, dict):
+                continue
+            if "Ref" in value:
+                targets[name] = f"{stack}/{value['Ref']}"
+            elif "Fn::GetAtt" in value:
+                targets[name] = f"{stack}/{value['Fn::GetAtt'][0]}"
+    return targets
+
+
+def _reference(stack, value, targets):
+    """リソースへの参照（Ref / Fn::GetAtt / Fn::ImportValue）をスタックをまたいで同じキーに正規化"""
+    if isinstance(value, dict):
+        if "Ref" in value:
+            return f"{stack}/{value['Ref']}"
+        if "Fn::GetAtt" in value:
+            return f"{stack}/{value['Fn::GetAtt'][0]}"
+        if isinstance(value.get("Fn::ImportValue"), str):
+            return targets.get(value["Fn::ImportValue"], value["Fn::ImportValue"])
+    return json.dumps(value, sort_keys=True)
+
+
+def demands(templates):
+    """テンプレート（スタック名 → テンプレート）からクォータごとの需要 [Demand]"""
+    targets = export_targets(templates)
+    totals = defaultdict(int)
+
+    for stack, template in templates.items():
+        totals[("vpcs", ACCOUNT)] += sum(1 for _ in _resources(template, "AWS::EC2::VPC"))
+        totals[("elastic-ips", ACCOUNT)] += sum(1 for _ in _resources(template, "AWS::EC2::EIP"))
+
+        for _, props in _resources(template, "AWS::EC2::VPCEndpoint"):
+            if props.get("VpcEndpointType", "Gateway") == "Interface":
+                totals[("interface-endpoints-per-vpc", _reference(stack, props.get("VpcId"), targets))] += 1
+
+        for logical_id, props in _resources(template, "AWS::EC2::SecurityGroup"):
+            group = f"{stack}/{logical_id}"
+            totals[("rules-per-security-group", f"{group} inbound")] += len(props.get("SecurityGroupIngress", []))
+            totals[("rules-per-security-group", f"{group} outbound")] += len(props.get("SecurityGroupEgress", []))
+        for resource_type, direction in (("AWS::EC2::SecurityGroupIngress", "inbound"),
+                                         ("AWS::EC2::SecurityGroupEgress", "outbound")):
+            for _, props in _resources(template, resource_type):
+                group = _reference(stack, props.get("GroupId"), targets)
+                totals[("rules-per-security-group", f"{group} {direction}")] += 1
+
+        for _, props in _resources(template, "AWS::FSx::FileSystem"):
+            if props.get("FileSystemType") != "WINDOWS":
+                continue
+            capacity = props.get("StorageCapacity")
+            throughput = props.get("WindowsConfiguration", {}).get("ThroughputCapacity")
+            totals[("fsx-windows-storage", ACCOUNT)] += capacity if isinstance(capacity, int) else 0
+            totals[("fsx-windows-throughput", ACCOUNT)] += throughput if isinstance(throughput, int) else 0
+
+    return [Demand(quota, scope, amount) for (quota, scope), amount in sorted(totals.items()) if amount]
+
+
+def check(demand_list, snapshot):
+    """需要とスナップショット（quotas: 上限値、usage: アカウント単位の使用量）の比較"""
+    quotas = {**DEFAULT_QUOTAS, **snapshot.get("quotas", {})}
+    usage = snapshot.get("usage", {})
+    results = []
+    for demand in demand_list:
+        limit = quotas[demand.quota]
+        in_use = usage.get(demand.quota, 0) if QUOTAS[demand.quota].scope == ACCOUNT else 0
+        total = in_use + demand.amount
+        if total > limit:
+            status = "SHORT"
+        elif total >= limit * WARN_RATIO:
+            status = "WARN"
+        else:
+            status = "OK"
+        results.append(Check(demand.quota, demand.scope, in_use, demand.amount, limit, status))
+    return results
+
+
+def shortfalls(results):
+    return [result for result in results if result.status == "SHORT"]
+
+
+def format_report(results):
+    rows = [("QUOTA", "SCOPE", "IN USE", "DEMAND", "LIMIT", "STATUS")]
+    for result in results:
+        unit = QUOTAS[result.quota].unit
+        rows.append((
+            result.quota, result.scope, str(result.in_use), str(result.demand),
+            f"{result.limit} {unit}".strip(), result.status,
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = ["  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in rows]
+    for result in shortfalls(results):
+        needed = result.in_use + result.demand
+        lines.append(f"!! {result.quota} ({result.scope}): needs {needed}, limit {result.limit}"
+                     f" — request an increase via Service Quotas ({QUOTAS[result.quota].service_code})")
+    return "\n".join(lines)
+
+
+class AwsCliQuotas:
+    """AWS CLI によるクォータ・使用量の取得"""
+
+    def __init__(self, profile=None, region=None):
+        self.options = (["--profile", profile] if profile else []) + (["--region", region] if region else [])
+
+    def call(self, *args):
+        result = subprocess.run(["aws", *args, *self.options, "--output", "json"], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"aws {' '.join(args[:2])} failed")
+        return json.loads(result.stdout or "{}")
+
+    def service_quotas(self, service_code):
+        return self.call("service-quotas", "list-service-quotas", "--service-code", service_code).get("Quotas", [])
+
+    def vpcs(self):
+        return self.call("ec2", "describe-vpcs").get("Vpcs", [])
+
+    def addresses(self):
+        return self.call("ec2", "describe-addresses").get("Addresses", [])
+
+    def file_systems(self):
+        return self.call("fsx", "describe-file-systems").get("FileSystems", [])
+
+
+def _stack_tag(resource):
+    for tag in resource.get("Tags", []):
+        if tag.get("Key") == "aws:cloudformation:stack-name":
+            return tag.get("Value")
+    return None
+
+
+def match_quotas(service_quotas):
+    """Service Quotasの一覧（サービスコード → Quotas）から QUOTAS の上限値"""
+    values = {}
+    for name, quota in QUOTAS.items():
+        for item in service_quotas.get(quota.service_code, []):
+            if re.search(quota.name_pattern, item.get("QuotaName", "")):
+                values[name] = int(item["Value"])
+                break
+    return values
+
+
+def collect_snapshot(client, own_stacks=()):
+    """クォータと使用量のスナップショット（own_stacks のリソースは使用量から除外）"""
+    service_codes = sorted({quota.service_code for quota in QUOTAS.values()})
+    with ThreadPoolExecutor(max_workers=len(service_codes) + 3) as pool:
+        quota_futures = {code: pool.submit(client.service_quotas, code) for code in service_codes}
+        vpcs = pool.submit(client.vpcs)
+        addresses = pool.submit(client.addresses)
+        file_systems = pool.submit(client.file_systems)
+
+        def others(items):
+            return [item for item in items if _stack_tag(item) not in own_stacks]
+
+        windows = [fs for fs in others(file_systems.result()) if fs.get("FileSystemType") == "WINDOWS"
+                   and fs.get("Lifecycle") != "DELETING"]
+        return {
+            "quotas": match_quotas({code: future.result() for code, future in quota_futures.items()}),
+            "usage": {
+                "vpcs": len(others(vpcs.result())),
+                "elastic-ips": len(others(addresses.result())),
+                "fsx-windows-storage": sum(fs.get("StorageCapacity", 0) for fs in windows),
+                "fsx-windows-throughput": sum(
+                    fs.get("WindowsConfiguration", {}).get("ThroughputCapacity", 0) for fs in windows
+                ),
+            },
+        }
+
+
+def load_templates(paths):
+    """テンプレートファイル、またはクラウドアセンブリのディレクトリ（*.template.json）を読み込む"""
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.template.json"))) if os.path.isdir(path) else [path])
+    templates = {}
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            templates[os.path.basename(path).removesuffix(".template.json").removesuffix(".json")] = json.load(f)
+    return templates
+
+
+def synthesize(keys, root="."):
+    """cdk.json（と cdk.context.json）のコンテキストでスタックをプロセス内で合成"""
+    import aws_cdk as cdk
+
+    context = load_context(root)
+    templates = {}
+    with tempfile.TemporaryDirectory(prefix="quota-preflight-") as outdir:
+        for key in keys:
+            app_module = importlib.import_module(STACK_APPS[key])
+            app = cdk.App(context=context, outdir=os.path.join(outdir, key))
+            stack = app_module.build(app)
+            templates[stack.stack_name] = app.synth().get_stack_by_name(stack.stack_name).template
+    return templates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check service quotas against the synthesized stacks before deploying")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--live", action="store_true", help="read quotas and usage with the AWS CLI")
+    source.add_argument("--snapshot", help="recorded quota snapshot (JSON)")
+    parser.add_argument("--save-snapshot", help="write the live snapshot to this file")
+    parser.add_argument("--templates", nargs="+", help="template files or cloud assembly directories")
+    parser.add_argument("--stacks", nargs="+", choices=list(STACK_APPS), default=list(STACK_APPS),
+                        help="stacks to synthesize when --templates is not given")
+    parser.add_argument("--user", default=os.getenv("USER", "Unknown").replace(".", "-"),
+                        help="environment whose own resources are excluded from the usage")
+    parser.add_argument("--profile", help="AWS profile name")
+    parser.add_argument("--region", help="AWS region")
+    args = parser.parse_args(argv)
+
+    templates = load_templates(args.templates) if args.templates else synthesize(args.stacks)
+
+    if args.live:
+        own_stacks = [prefix + args.user for prefix in STACK_NAME_PREFIXES.values()]
+        snapshot = collect_snapshot(AwsCliQuotas(args.profile, args.region), own_stacks)
+        if args.save_snapshot:
+            with open(args.save_snapshot, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+                f.write("\n")
+    else:
+        with open(args.snapshot, encoding="utf-8") as f:
+            snapshot = json.load(f)
+
+    results = check(demands(templates), snapshot)
+    print(format_report(results))
+    return 1 if shortfalls(results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
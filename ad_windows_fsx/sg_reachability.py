@@ -0,0 +1,317 @@
+"""
+セキュリティグループ到達性シミュレーター（オフライン）
+
+合成済みのCloudFormationテンプレート（Network Stack・Security Rules Stack など）から
+セキュリティグループのグラフ（インバウンド・アウトバウンド、CIDR・SGピア）を構築し、
+FSx→AD、Windows EC2→AD、Windows EC2→FSx の必須通信がすべて許可されているかを評価します。
+FSxのドメイン参加失敗（30分以上かかる）をデプロイ前に検出するためのツールです。
+
+参考: https://docs.aws.amazon.com/fsx/latest/WindowsGuide/limit-access-security-groups.html
+
+使用例:
+    python -m ad_windows_fsx.sg_reachability                      # スタックをその場で合成して評価
+    python -m ad_windows_fsx.sg_reachability cdk.out/*.template.json
+"""
+
+import ipaddress
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+# セキュリティグループの役割とNetwork Stackのエクスポート名
+ROLE_EXPORTS = {
+    "ad": "AdWindowsFsx-AdSecurityGroupId",
+    "client": "AdWindowsFsx-WindowsSecurityGroupId",
+    "fsx": "AdWindowsFsx-FsxSecurityGroupId",
+    "resolver": "AdWindowsFsx-ResolverSecurityGroupId",
+}
+
+# 任意のセキュリティグループ（テンプレートに存在しない場合は関連する通信を評価しない）
+OPTIONAL_ROLES = {"resolver"}
+
+RPC_DYNAMIC_PORTS = (49152, 65535)
+
+# AD DCに対する必須ポート（FSxのセルフマネージドAD要件）
+AD_TCP_PORTS = [
+    (53, "DNS"),
+    (88, "Kerberos"),
+    (135, "RPC Endpoint Mapper"),
+    (389, "LDAP"),
+    (445, "SMB"),
+    (464, "Kerberos Password Change"),
+    (636, "LDAPS"),
+    (3268, "Global Catalog"),
+    (3269, "Global Catalog SSL"),
+]
+AD_UDP_PORTS = [
+    (53, "DNS"),
+    (88, "Kerberos"),
+    (123, "NTP"),
+    (389, "LDAP"),
+    (464, "Kerberos Password Change"),
+]
+
+# 評価対象の通信（name, 送信元, 宛先, プロトコル, (開始ポート, 終了ポート)）
+Flow = namedtuple("Flow", ["name", "source", "destination", "protocol", "ports"])
+
+# セキュリティグループルール（peer は ("sg", ノードID) または ("cidr", IPv4Network)）
+Rule = namedtuple("Rule", ["logical_id", "direction", "group", "protocol", "ports", "peer", "description"])
+
+Finding = namedtuple("Finding", ["kind", "flow", "detail", "rule"])
+
+_PROTOCOL_NUMBERS = {"6": "tcp", "17": "udp", "1": "icmp"}
+_ANY_IPV4 = ipaddress.ip_network("0.0.0.0/0")
+
+
+def _ad_flows(source, label):
+    flows = [Flow(f"{label} to AD - {desc} (TCP {port})", source, "ad", "tcp", (port, port))
+             for port, desc in AD_TCP_PORTS]
+    flows += [Flow(f"{label} to AD - {desc} (UDP {port})", source, "ad", "udp", (port, port))
+              for port, desc in AD_UDP_PORTS]
+    flows.append(Flow(f"{label} to AD - RPC dynamic ports", source, "ad", "tcp", RPC_DYNAMIC_PORTS))
+    return flows
+
+
+def required_flows():
+    """FSx要件表に基づく必須通信の一覧"""
+    flows = _ad_flows("fsx", "FSx")
+    flows.append(Flow("FSx to AD - AD DS Web Services (TCP 9389)", "fsx", "ad", "tcp", (9389, 9389)))
+    flows += _ad_flows("client", "Windows EC2")
+    flows.append(Flow("Windows EC2 to FSx - SMB (TCP 445)", "client", "fsx", "tcp", (445, 445)))
+    flows += [Flow(f"Resolver endpoint to AD - DNS ({protocol.upper()} 53)", "resolver", "ad", protocol, (53, 53))
+              for protocol in ("tcp", "udp")]
+    return flows
+
+
+class SecurityGroupGraph:
+    """合成済みテンプレートから構築したセキュリティグループのグラフ"""
+
+    def __init__(self, templates):
+        """templates: {スタック名: テンプレート辞書}"""
+        self.templates = templates
+        self.exports = {}
+        for stack, template in templates.items():
+            for output in template.get("Outputs", {}).values():
+                name = output.get("Export", {}).get("Name")
+                if isinstance(name, str):
+                    self.exports[name] = (stack, output["Value"])
+
+        self.groups = set()
+        self.vpc_cidrs = []
+        self.rules = []
+        for stack, template in templates.items():
+            for logical_id, resource in template.get("Resources", {}).items():
+                if resource["Type"] == "AWS::EC2::SecurityGroup":
+                    self.groups.add(f"{stack}/{logical_id}")
+                elif resource["Type"] == "AWS::EC2::VPC":
+                    self.vpc_cidrs.append(ipaddress.ip_network(resource["Properties"]["CidrBlock"]))
+        for stack, template in templates.items():
+            self._load_rules(stack, template)
+
+        self.roles = {}
+        for role, export_name in ROLE_EXPORTS.items():
+            if export_name in self.exports:
+                self.roles[role] = self._resolve(*reversed(self.exports[export_name]))
+
+    def _resolve(self, value, stack):
+        """値を SG ノードID・CIDR（IPv4Network）・文字列のいずれかに解決"""
+        if isinstance(value, str):
+            try:
+                return ipaddress.ip_network(value)
+            except ValueError:
+                return value
+        if "Fn::ImportValue" in value:
+            name = value["Fn::ImportValue"]
+            if name not in self.exports:
+                raise KeyError(f"Export not found in loaded templates: {name}")
+            export_stack, export_value = self.exports[name]
+            return self._resolve(export_value, export_stack)
+        if "Fn::GetAtt" in value:
+            logical_id, attribute = value["Fn::GetAtt"]
+            resource = self.templates[stack]["Resources"][logical_id]
+            if attribute == "GroupId":
+                return f"{stack}/{logical_id}"
+            if attribute == "CidrBlock":
+                return self._resolve(resource["Properties"]["CidrBlock"], stack)
+        if "Ref" in value and f"{stack}/{value['Ref']}" in self.groups:
+            return f"{stack}/{value['Ref']}"
+        raise ValueError(f"Unsupported reference in {stack}: {value}")
+
+    def _rule(self, stack, logical_id, direction, group, props):
+        protocol = str(props["IpProtocol"])
+        protocol = _PROTOCOL_NUMBERS.get(protocol, protocol)
+        if protocol in ("tcp", "udp"):
+            ports = (int(props.get("FromPort", 0)), int(props.get("ToPort", 65535)))
+        else:
+            ports = (0, 65535)
+        if direction == "ingress":
+            peer_ref = props.get("SourceSecurityGroupId") or props.get("CidrIp")
+        else:
+            peer_ref = props.get("DestinationSecurityGroupId") or props.get("CidrIp")
+        peer = self._resolve(peer_ref, stack)
+        peer = ("cidr", peer) if isinstance(peer, ipaddress.IPv4Network) else ("sg", peer)
+        return Rule(logical_id, direction, group, protocol, ports, peer, props.get("Description", ""))
+
+    def _load_rules(self, stack, template):
+        for logical_id, resource in template.get("Resources", {}).items():
+            props = resource.get("Properties", {})
+            if resource["Type"] == "AWS::EC2::SecurityGroup":
+                group = f"{stack}/{logical_id}"
+                for index, entry in enumerate(props.get("SecurityGroupIngress", [])):
+                    self.rules.append(self._rule(stack, f"{logical_id}[ingress:{index}]", "ingress", group, entry))
+                for index, entry in enumerate(props.get("SecurityGroupEgress", [])):
+                    self.rules.append(self._rule(stack, f"{logical_id}[egress:{index}]", "egress", group, entry))
+            elif resource["Type"] == "AWS::EC2::SecurityGroupIngress":
+                group = self._resolve(props["GroupId"], stack)
+                self.rules.append(self._rule(stack, logical_id, "ingress", group, props))
+            elif resource["Type"] == "AWS::EC2::SecurityGroupEgress":
+                group = self._resolve(props["GroupId"], stack)
+                self.rules.append(self._rule(stack, logical_id, "egress", group, props))
+
+    def _peer_matches(self, peer, group):
+        """ピアが指定SGのENIを含むか（ENIのアドレスはVPC CIDR内のどこかとみなす）"""
+        kind, value = peer
+        if kind == "sg":
+            return value == group
+        return any(value.supernet_of(cidr) for cidr in self.vpc_cidrs)
+
+    def matching_rules(self, direction, group, peer_group, protocol):
+        return [
+            rule for rule in self.rules
+            if rule.direction == direction and rule.group == group
+            and rule.protocol in (protocol, "-1")
+            and self._peer_matches(rule.peer, peer_group)
+        ]
+
+    def applicable_flows(self, flows=None):
+        """評価対象の通信（存在しない任意SGに関わる通信を除く）"""
+        absent = OPTIONAL_ROLES - set(self.roles)
+        return [f for f in (flows or required_flows()) if not {f.source, f.destination} & absent]
+
+    def evaluate(self, flows=None):
+        """必須通信を評価し、不足（missing）と過剰に広いルール（over-broad）を返す"""
+        findings = []
+        used_rules = {}
+        for flow in self.applicable_flows(flows):
+            if flow.source not in self.roles or flow.destination not in self.roles:
+                findings.append(Finding("missing", flow, "security group not found in templates", None))
+                continue
+            source = self.roles[flow.source]
+            destination = self.roles[flow.destination]
+            for direction, group, peer_group in (("egress", source, destination),
+                                                 ("ingress", destination, source)):
+                rules = self.matching_rules(direction, group, peer_group, flow.protocol)
+                gaps = _uncovered(flow.ports, [r.ports for r in rules])
+                if gaps:
+                    findings.append(Finding("missing", flow, f"{direction} on {flow.destination if direction == 'ingress' else flow.source} "
+                                            f"does not allow {_format_ports(flow.protocol, gaps)}", None))
+                for rule in rules:
+                    if _overlaps(rule.ports, flow.ports):
+                        used_rules.setdefault(rule, []).append(flow)
+
+        role_groups = set(self.roles.values())
+        for rule in self.rules:
+            if rule.group not in role_groups:
+                continue
+            kind, peer = rule.peer
+            if rule.direction == "ingress" and kind == "cidr" and peer == _ANY_IPV4:
+                findings.append(Finding("over-broad", None, "ingress open to 0.0.0.0/0", rule))
+            elif rule.protocol == "-1":
+                findings.append(Finding("over-broad", None, "allows all protocols", rule))
+            elif kind == "cidr" and peer != _ANY_IPV4 and rule in used_rules:
+                # 必須通信をVPC内のCIDRで許可している（SG参照で十分）
+                # インターネット向けのアウトバウンド（0.0.0.0/0）は外部DNS・NTP等のため対象外
+                findings.append(Finding("over-broad", used_rules[rule][0],
+                                        f"CIDR peer {peer} where a security group reference would do", rule))
+        return findings
+
+
+def _uncovered(ports, ranges):
+    """ports の範囲のうち ranges で覆われていない部分"""
+    low, high = ports
+    gaps = []
+    for start, end in sorted(ranges):
+        if end < low:
+            continue
+        if start > low:
+            gaps.append((low, min(start - 1, high)))
+        low = max(low, end + 1)
+        if low > high:
+            return gaps
+    if low <= high:
+        gaps.append((low, high))
+    return gaps
+
+
+def _overlaps(a, b):
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+def _format_ports(protocol, ranges):
+    return ", ".join(
+        f"{protocol.upper()} {start}" if start == end else f"{protocol.upper()} {start}-{end}"
+        for start, end in ranges
+    )
+
+
+def format_report(findings):
+    lines = []
+    missing = [f for f in findings if f.kind == "missing"]
+    broad = [f for f in findings if f.kind == "over-broad"]
+    lines.append(f"Missing: {len(missing)}")
+    for finding in missing:
+        lines.append(f"  - {finding.flow.name}: {finding.detail}")
+    lines.append(f"Over-broad: {len(broad)}")
+    for finding in broad:
+        lines.append(f"  - {finding.rule.logical_id} ({finding.rule.description}): {finding.detail}")
+    return "\n".join(lines)
+
+
+def synthesize_templates(dns_forwarding=False):
+    """Network Stack と Security Rules Stack をその場で合成してテンプレートを返す"""
+    import aws_cdk as cdk
+    from .ad_network_stack import AdNetworkStack
+    from .ad_security_rules_stack import AdSecurityRulesStack
+
+    templates = {}
+    for stack_class, name in ((AdNetworkStack, "Network"), (AdSecurityRulesStack, "SecurityRules")):
+        app = cdk.App()
+        stack_class(app, name, dns_forwarding=dns_forwarding)
+        templates[name] = app.synth().get_stack_by_name(name).template
+    return templates
+
+
+def load_templates(paths):
+    templates = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            templates[path] = json.load(f)
+    return templates
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        templates = load_templates(argv)
+    else:
+        # cdk.json の dns-forwarding に合わせて合成
+        context = {}
+        if os.path.exists("cdk.json"):
+            with open("cdk.json", encoding="utf-8") as f:
+                context = json.load(f).get("context", {})
+        templates = synthesize_templates(str(context.get("dns-forwarding")).lower() == "true")
+
+    started = time.perf_counter()
+    graph = SecurityGroupGraph(templates)
+    findings = graph.evaluate()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(format_report(findings))
+    print(f"Evaluated {len(graph.applicable_flows())} flows in {elapsed_ms:.1f} ms")
+    return 1 if any(f.kind == "missing" for f in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+SMBレイテンシーカナリア
+
+Windows EC2上のスケジュールタスクで1分ごとにFSx共有の小さなプローブファイル群を
+書き込み・オープン・読み取り・一覧・削除し、操作ごとのレイテンシーを高解像度（1秒）の
+CloudWatchカスタムメトリクスとして送信します。ベンチマークでは分からない日常的なレイテンシーの劣化を、
+操作ごとのp99のSLOアラームで検出します。
+
+State Managerの最短スケジュールは30分のため、関連付けはカナリアスクリプトの配置とスケジュールタスクの
+登録のみを行います（ドキュメント変更時に再適用）。メトリクスの送信にはAMIに含まれる AWS Tools for PowerShell を使用します。
+"""
+
+from aws_cdk import (
+    Aws,
+    Duration,
+    aws_cloudwatch as cloudwatch,
+    aws_iam as iam,
+)
+from constructs import Construct
+
+from .config_documents import ConfigAssociation, _run_powershell, build_document
+
+NAMESPACE = "AdWindowsFsx/SmbCanary"
+
+# 計測する操作（メトリクス Latency のディメンション Operation）
+OPERATIONS = ["Write", "Open", "Read", "List", "Delete"]
+
+# 操作ごとのp99のSLO（ミリ秒、cdk.jsonのsmb-canary-slo-msで上書き）
+DEFAULT_SLO_MS = {
+    "Write": 100,
+    "Open": 50,
+    "Read": 50,
+    "List": 100,
+    "Delete": 50,
+}
+
+# プローブファイルの数とサイズ（1分ごとに操作あたり PROBE_FILES 件のサンプル）
+PROBE_FILES = 5
+PROBE_SIZE_KB = 64
+
+# アラームの評価（5分のうち3分でp99がSLOを超えた場合）
+EVALUATION_PERIODS = 5
+DATAPOINTS_TO_ALARM = 3
+
+INSTALL_DIR = "C:\\ProgramData\\SmbCanary"
+TASK_NAME = "SmbLatencyCanary"
+
+
+def validate_slo(slo_ms):
+    """SLOの指定（不明な操作・0以下の値はエラー）"""
+    unknown = sorted(set(slo_ms) - set(OPERATIONS))
+    if unknown:
+        raise ValueError(f"Unknown smb-canary-slo-ms operations: {', '.join(unknown)} (allowed: {', '.join(OPERATIONS)})")
+    invalid = [op for op, value in slo_ms.items() if not isinstance(value, (int, float)) or value <= 0]
+    if invalid:
+        raise ValueError(f"smb-canary-slo-ms must be positive milliseconds: {', '.join(invalid)}")
+    return {**DEFAULT_SLO_MS, **slo_ms}
+
+
+def canary_script(namespace=NAMESPACE, probe_files=PROBE_FILES, probe_size_kb=PROBE_SIZE_KB):
+    """1回分の計測と送信を行うPowerShellスクリプト（行のリスト、StorageResolution 1 の高解像度メトリクス）"""
+    return [
+        "param([string]$FileSystemId, [string]$SharePath, [string]$Region)",
+        "$ErrorActionPreference = 'Stop'",
+        "Import-Module AWSPowerShell -ErrorAction SilentlyContinue",
+        "$ProbeDir = Join-Path $SharePath \"canary\\$env:COMPUTERNAME\"",
+        f"$Payload = New-Object byte[] ({probe_size_kb} * 1KB)",
+        "(New-Object System.Random).NextBytes($Payload)",
+        "$Samples = New-Object System.Collections.Generic.List[object]",
+        "$Errors = 0",
+        "function Measure-Operation([string]$Operation, [scriptblock]$Action) {",
+        "    $Stopwatch = [System.Diagnostics.Stopwatch]::StartNew()",
+        "    try {",
+        "        & $Action",
+        "        $Samples.Add([pscustomobject]@{ Operation = $Operation; Milliseconds = $Stopwatch.Elapsed.TotalMilliseconds })",
+        "    } catch {",
+        "        $script:Errors++",
+        "        Write-Warning \"$Operation failed: $($_.Exception.Message)\"",
+        "    }",
+        "}",
+        "try {",
+        "    New-Item -ItemType Directory -Force -Path $ProbeDir | Out-Null",
+        f"    $Files = 0..{probe_files - 1} | ForEach-Object {{ Join-Path $ProbeDir \"probe-$_.bin\" }}",
+        "    foreach ($File in $Files) {",
+        "        Measure-Operation 'Write' { [System.IO.File]::WriteAllBytes($File, $Payload) }",
+        "        Measure-Operation 'Open' { [System.IO.File]::Open($File, 'Open', 'Read', 'Read').Dispose() }",
+        "        Measure-Operation 'Read' { [void][System.IO.File]::ReadAllBytes($File) }",
+        "        Measure-Operation 'List' { [void][System.IO.Directory]::GetFiles($ProbeDir) }",
+        "    }",
+        "    foreach ($File in $Files) {",
+        "        Measure-Operation 'Delete' { [System.IO.File]::Delete($File) }",
+        "    }",
+        "} catch {",
+        "    $Errors++",
+        "    Write-Warning \"Probe directory is not available: $($_.Exception.Message)\"",
+        "}",
+        "function New-Datum([string]$Name, [double]$Value, [string]$Unit, [hashtable]$Dimensions) {",
+        "    $Datum = New-Object Amazon.CloudWatch.Model.MetricDatum",
+        "    $Datum.MetricName = $Name",
+        "    $Datum.Value = $Value",
+        "    $Datum.Unit = $Unit",
+        "    $Datum.StorageResolution = 1",
+        "    $Datum.TimestampUtc = [DateTime]::UtcNow",
+        "    foreach ($Key in $Dimensions.Keys) {",
+        "        $Datum.Dimensions.Add((New-Object Amazon.CloudWatch.Model.Dimension -Property @{ Name = $Key; Value = $Dimensions[$Key] }))",
+        "    }",
+        "    return $Datum",
+        "}",
+        "$Data = @($Samples | ForEach-Object {",
+        "    New-Datum 'Latency' $_.Milliseconds 'Milliseconds' @{ FileSystemId = $FileSystemId; Operation = $_.Operation }",
+        "})",
+        "$Data += New-Datum 'Errors' $Errors 'Count' @{ FileSystemId = $FileSystemId }",
+        f"Write-CWMetricData -Namespace '{namespace}' -MetricData $Data -Region $Region",
+    ]
+
+
+def install_commands(script_lines, install_dir=INSTALL_DIR, task_name=TASK_NAME):
+    """カナリアスクリプトを配置し、1分ごとのスケジュールタスク（SYSTEM）を登録するPowerShell"""
+    script_path = f"{install_dir}\\canary.ps1"
+    arguments = (
+        f"-NoProfile -ExecutionPolicy Bypass -File \"{script_path}\" "
+        "-FileSystemId {{ FileSystemId }} -SharePath \\\\{{ FsxDnsName }}\\share -Region {{ Region }}"
+    )
+    return [
+        f"New-Item -ItemType Directory -Force -Path '{install_dir}' | Out-Null",
+        f"Set-Content -Path '{script_path}' -Encoding UTF8 -Value @'",
+        *script_lines,
+        "'@",
+        f"$Action = New-ScheduledTaskAction -Execute 'powershell.exe' -Argument '{arguments}'",
+        "$Trigger = New-ScheduledTaskTrigger -Once -At (Get-Date) -RepetitionInterval (New-TimeSpan -Minutes 1)",
+        "$Settings = New-ScheduledTaskSettingsSet -MultipleInstances IgnoreNew -ExecutionTimeLimit (New-TimeSpan -Seconds 50)",
+        f"Register-ScheduledTask -TaskName '{task_name}' -Action $Action -Trigger $Trigger -Settings $Settings "
+        "-User 'SYSTEM' -RunLevel Highest -Force | Out-Null",
+        f"Write-Host \"SMB canary scheduled: $((Get-ScheduledTask -TaskName '{task_name}').State)\"",
+    ]
+
+
+def smb_canary_document(namespace=NAMESPACE):
+    """カナリアを配置・登録する構成ドキュメント"""
+    return build_document(
+        "Install the SMB latency canary as a scheduled task",
+        [_run_powershell("InstallSmbCanary", install_commands(canary_script(namespace)))],
+        parameters={
+            "FileSystemId": "FSx file system ID (metric dimension)",
+            "FsxDnsName": "FSx DNS name",
+            "Region": "Region for CloudWatch metrics",
+        }
+    )
+
+
+class SmbCanary(Construct):
+    """SMBレイテンシーカナリアの構成ドキュメント、メトリクス送信権限、操作ごとのp99 SLOアラーム"""
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 instance_id: str,
+                 role: iam.IRole,
+                 file_system_id: str,
+                 fsx_dns_name: str,
+                 slo_ms: dict = None) -> None:
+        super().__init__(scope, construct_id)
+
+        slo_ms = validate_slo(slo_ms or {})
+
+        self.config = ConfigAssociation(
+            self, "SmbCanaryInstall",
+            document=smb_canary_document(),
+            instance_id=instance_id,
+            parameters={
+                "FileSystemId": file_system_id,
+                "FsxDnsName": fsx_dns_name,
+                "Region": Aws.REGION,
+            }
+        )
+
+        # インポートしたロールにメトリクス送信の権限を追加（名前空間を限定）
+        role.add_to_principal_policy(iam.PolicyStatement(
+            actions=["cloudwatch:PutMetricData"],
+            resources=["*"],
+            conditions={"StringEquals": {"cloudwatch:namespace": NAMESPACE}}
+        ))
+
+        self.alarms = {}
+        for operation in OPERATIONS:
+            metric = cloudwatch.Metric(
+                namespace=NAMESPACE,
+                metric_name="Latency",
+                dimensions_map={"FileSystemId": file_system_id, "Operation": operation},
+                statistic="p99",
+                period=Duration.minutes(1),
+                unit=cloudwatch.Unit.MILLISECONDS
+            )
+            self.alarms[operation] = metric.create_alarm(
+                self, f"{operation}LatencyAlarm",
+                alarm_description=f"SMB {operation} p99 latency above {slo_ms[operation]} ms (SLO)",
+                threshold=slo_ms[operation],
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                evaluation_periods=EVALUATION_PERIODS,
+                datapoints_to_alarm=DATAPOINTS_TO_ALARM,
+                # ドメイン参加前などカナリアが送信していない間はアラームにしない
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING
+            )
+
+        # プローブ自体の失敗（共有に到達できない等）
+        self.alarms["Errors"] = cloudwatch.Metric(
+            namespace=NAMESPACE,
+            metric_name="Errors",
+            dimensions_map={"FileSystemId": file_system_id},
+            statistic="Sum",
+            period=Duration.minutes(1)
+        ).create_alarm(
+            self, "ErrorsAlarm",
+            alarm_description="SMB canary probes are failing",
+            threshold=0,
+            comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+            evaluation_periods=EVALUATION_PERIODS,
+            datapoints_to_alarm=DATAPOINTS_TO_ALARM,
+            treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING
+        )
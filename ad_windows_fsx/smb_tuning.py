@@ -0,0 +1,144 @@
+"""
+SMBクライアントのチューニングプロファイル
+
+Windows EC2に適用するSMBクライアント・ネットワークアダプター設定をデータとして定義し、
+State Managerの構成ドキュメント用PowerShellを生成します。
+各設定は「現在値の取得 → 異なる場合のみ適用 → 再取得して検証」の順で実行され、
+検証に失敗した設定があればコマンドは失敗として終了します（関連付けの状態で確認可能）。
+
+SMBマルチチャネルはFSxのデプロイメントタイプが SINGLE_AZ_2 / MULTI_AZ_1 の場合のみ有効化します。
+"""
+
+from collections import namedtuple
+
+from .powershell_script import ps_quote
+
+# SMBマルチチャネルに対応するFSxのデプロイメントタイプ
+MULTICHANNEL_DEPLOYMENT_TYPES = {"SINGLE_AZ_2", "MULTI_AZ_1"}
+
+DEFAULT_SMB_PROFILE = "baseline"
+
+# name: 表示名、get: 現在値を返す式、set: 適用コマンド、expected: 検証時に期待する文字列
+Setting = namedtuple("Setting", ["name", "get", "set", "expected"])
+
+
+def _ps_literal(value):
+    if isinstance(value, bool):
+        return "$true" if value else "$false"
+    return str(value)
+
+
+def smb_client_setting(parameter, value):
+    """Set-SmbClientConfiguration の設定"""
+    return Setting(
+        name=f"SmbClient.{parameter}",
+        get=f"(Get-SmbClientConfiguration).{parameter}",
+        set=f"Set-SmbClientConfiguration -{parameter} {_ps_literal(value)} -Confirm:$false",
+        expected=str(value),
+    )
+
+
+def adapter_property_setting(display_name, display_value):
+    """ENAアダプターの詳細プロパティ（変更時はアダプターが数秒間再起動する）"""
+    return Setting(
+        name=f"Adapter.{display_name.replace(' ', '')}",
+        get=f"(Get-NetAdapterAdvancedProperty -Name $Adapter.Name -DisplayName {ps_quote(display_name)}).DisplayValue",
+        set=f"Set-NetAdapterAdvancedProperty -Name $Adapter.Name -DisplayName {ps_quote(display_name)} -DisplayValue {ps_quote(display_value)}",
+        expected=display_value,
+    )
+
+
+def rss_setting():
+    """Receive Side Scaling の有効化"""
+    return Setting(
+        name="Adapter.Rss",
+        get="(Get-NetAdapterRss -Name $Adapter.Name).Enabled",
+        set="Enable-NetAdapterRss -Name $Adapter.Name",
+        expected="True",
+    )
+
+
+# プロファイル定義（マルチチャネル関連の設定は multichannel に分けて定義）
+SMB_PROFILES = {
+    # 従来の設定（マルチチャネルとセッションタイムアウトのみ）
+    "baseline": {
+        "settings": [
+            smb_client_setting("SessionTimeout", 60),
+        ],
+        "multichannel": [
+            smb_client_setting("EnableMultiChannel", True),
+        ],
+    },
+    # 大きなファイルの読み書き向け（Large MTU、ジャンボフレーム、RSS、RSSインターフェースごとの接続数）
+    "throughput": {
+        "settings": [
+            smb_client_setting("SessionTimeout", 60),
+            smb_client_setting("EnableLargeMtu", True),
+            adapter_property_setting("Jumbo Packet", "9015"),
+            rss_setting(),
+        ],
+        "multichannel": [
+            smb_client_setting("EnableMultiChannel", True),
+            smb_client_setting("ConnectionCountPerRssNetworkInterface", 8),
+        ],
+    },
+    # 多数の小さなファイル・ディレクトリ一覧向け（ディレクトリ・ファイル情報キャッシュの拡大）
+    "metadata": {
+        "settings": [
+            smb_client_setting("SessionTimeout", 60),
+            smb_client_setting("DirectoryCacheEntriesMax", 1024),
+            smb_client_setting("DirectoryCacheEntrySizeMax", 262144),
+            smb_client_setting("DirectoryCacheLifetime", 30),
+            smb_client_setting("FileInfoCacheEntriesMax", 4096),
+            smb_client_setting("FileInfoCacheLifetime", 30),
+            smb_client_setting("FileNotFoundCacheEntriesMax", 2048),
+            rss_setting(),
+        ],
+        "multichannel": [
+            smb_client_setting("EnableMultiChannel", True),
+        ],
+    },
+}
+
+
+def profile_settings(profile=DEFAULT_SMB_PROFILE, deployment_type="SINGLE_AZ_2"):
+    """プロファイルとFSxデプロイメントタイプに応じた設定一覧"""
+    if profile not in SMB_PROFILES:
+        raise ValueError(f"Unknown smb-client-profile: {profile!r} (allowed: {', '.join(SMB_PROFILES)})")
+    definition = SMB_PROFILES[profile]
+    settings = list(definition["settings"])
+    if deployment_type in MULTICHANNEL_DEPLOYMENT_TYPES:
+        settings += definition["multichannel"]
+    return settings
+
+
+def render_tuning_commands(profile=DEFAULT_SMB_PROFILE, deployment_type="SINGLE_AZ_2"):
+    """プロファイルを適用・検証するPowerShell（行のリスト）"""
+    lines = [
+        f"# SMB client profile: {profile} (FSx deployment type: {deployment_type})",
+        "$Adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'} | Select-Object -First 1",
+        "if (-not $Adapter) { throw \"No ENA network adapter found\" }",
+        "$Failed = @()",
+    ]
+    for setting in profile_settings(profile, deployment_type):
+        lines += [
+            "",
+            f"# {setting.name}",
+            f"if (\"$({setting.get})\" -ne {ps_quote(setting.expected)}) {{",
+            f"    {setting.set}",
+            f"    Write-Host \"Applied {setting.name} = {setting.expected}\"",
+            "}",
+            f"$Actual = \"$({setting.get})\"",
+            f"if ($Actual -ne {ps_quote(setting.expected)}) {{",
+            f"    $Failed += \"{setting.name}: expected {setting.expected}, actual $Actual\"",
+            "}",
+        ]
+    lines += [
+        "",
+        "if ($Failed.Count -gt 0) {",
+        "    $Failed | ForEach-Object { Write-Host \"VERIFY FAILED: $_\" }",
+        "    exit 1",
+        "}",
+        f"Write-Host \"SMB client profile {profile}: verified\"",
+    ]
+    return lines
@@ -0,0 +1,104 @@
+"""
+スタックとソースファイルの依存関係
+
+各スタックのエントリーポイント（app_*.py）からリポジトリ内モジュールのimportをたどり、
+スタックごとに合成結果に影響するソースファイルを求めます。
+開発用のウォッチモード（dev_watch.py）で変更の影響を受けるスタックだけを再合成するために使用します。
+"""
+
+import ast
+import os
+
+# スタックのキーとエントリーポイント（デプロイ順）
+STACK_APPS = {
+    "network": "app_network",
+    "security-rules": "app_security_rules",
+    "domain": "app_domain",
+    "application": "app_application",
+}
+
+# すべてのスタックの合成結果に影響するファイル（コンテキストとルックアップ結果のキャッシュ）
+SHARED_INPUTS = ["cdk.json", "cdk.context.json"]
+
+
+def module_path(root, module):
+    """モジュール名に対応するリポジトリ内のファイル（外部ライブラリの場合は None）"""
+    base = os.path.join(root, *module.split("."))
+    for path in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def local_imports(root, module):
+    """モジュールが直接importしているリポジトリ内モジュール"""
+    path = module_path(root, module)
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    package = module if path.endswith("__init__.py") else module.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".")
+                base = ".".join(parts[:len(parts) - node.level + 1])
+                target = f"{base}.{node.module}" if node.module else base
+            else:
+                target = node.module
+            names.add(target)
+            # from package import module 形式
+            names.update(f"{target}.{alias.name}" for alias in node.names)
+    return {name for name in names if name != module and module_path(root, name)}
+
+
+def import_graph(root="."):
+    """エントリーポイントから到達できるモジュールの依存グラフ {モジュール: 直接importするモジュール}"""
+    graph = {}
+    pending = list(STACK_APPS.values())
+    while pending:
+        module = pending.pop()
+        if module in graph:
+            continue
+        graph[module] = local_imports(root, module)
+        pending.extend(graph[module])
+    return graph
+
+
+def closure(graph, module):
+    """モジュールと、その推移的な依存モジュール"""
+    seen = set()
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current not in seen:
+            seen.add(current)
+            pending.extend(graph.get(current, ()))
+    return seen
+
+
+def stack_modules(root=".", graph=None):
+    """スタックごとの依存モジュール {スタック: {モジュール}}"""
+    graph = graph or import_graph(root)
+    return {key: closure(graph, app) for key, app in STACK_APPS.items()}
+
+
+def stack_sources(root=".", graph=None):
+    """スタックごとの入力ファイル（リポジトリルートからの相対パス、共通の入力を含む）"""
+    return {
+        key: sorted(
+            [os.path.relpath(module_path(root, module), root) for module in modules] + SHARED_INPUTS
+        )
+        for key, modules in stack_modules(root, graph).items()
+    }
+
+
+def affected_stacks(changed_paths, sources):
+    """変更されたファイルの影響を受けるスタック（デプロイ順）"""
+    changed = {os.path.normpath(path) for path in changed_paths}
+    return [
+        key for key in STACK_APPS
+        if changed & {os.path.normpath(path) for path in sources[key]}
+    ]
@@ -2,38 +2,104 @@
 import os
 import aws_cdk as cdk
 from ad_windows_fsx.ad_application_stack import AdApplicationStack
+from ad_windows_fsx.fsx_restore import context_key, resolve_backup
+from ad_windows_fsx.instance_profiles import resolve_instance_type
 
-app = cdk.App()
-
-# CDKコンテキストからパラメータを取得（cdk.jsonで一元管理）
-windows_version = app.node.try_get_context("windows-version") or "2022"
-windows_language = app.node.try_get_context("windows-language") or "Japanese"
-key_pair_name = app.node.try_get_context("key-pair-name")
-
-# FSx設定をコンテキストから取得（cdk.jsonで一元管理）
-fsx_storage_capacity = app.node.try_get_context("fsx-storage-capacity") or 32
-fsx_storage_type = app.node.try_get_context("fsx-storage-type") or "SSD"
-fsx_deployment_type = app.node.try_get_context("fsx-deployment-type") or "SINGLE_AZ_2"
-fsx_throughput_capacity = app.node.try_get_context("fsx-throughput-capacity") or 8
-
-# Stack名にユーザー名を追加（リソース名の一意性確保）
-# スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
-stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
-
-AdApplicationStack(
-    app, f"AdWindowsFsxApplicationStack-{stack_suffix}",
-    windows_version=windows_version,
-    windows_language=windows_language,
-    key_pair_name=key_pair_name,
-    fsx_storage_capacity=fsx_storage_capacity,
-    fsx_storage_type=fsx_storage_type,
-    fsx_deployment_type=fsx_deployment_type,
-    fsx_throughput_capacity=fsx_throughput_capacity,
-    description="Application stack with Windows EC2 and FSx",
-    env=cdk.Environment(
-        account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
-        region=os.getenv('CDK_DEFAULT_REGION')
+
+def build(app):
+    """cdk.jsonのコンテキストからスタックを構築（dev_watch等から同じ定義で合成するために分離）"""
+    # CDKコンテキストからパラメータを取得（cdk.jsonで一元管理）
+    windows_version = app.node.try_get_context("windows-version") or "2022"
+    windows_language = app.node.try_get_context("windows-language") or "Japanese"
+    key_pair_name = app.node.try_get_context("key-pair-name")
+
+    # FSx設定をコンテキストから取得（cdk.jsonで一元管理）
+    fsx_storage_capacity = app.node.try_get_context("fsx-storage-capacity") or 32
+    fsx_storage_type = app.node.try_get_context("fsx-storage-type") or "SSD"
+    fsx_deployment_type = app.node.try_get_context("fsx-deployment-type") or "SINGLE_AZ_2"
+    fsx_throughput_capacity = app.node.try_get_context("fsx-throughput-capacity") or 8
+    fsx_ssd_iops = app.node.try_get_context("fsx-ssd-iops")
+    # バックアップ・メンテナンスウィンドウ（UTC、maintenance_windows.pyで選定）
+    fsx_backup_start_time = app.node.try_get_context("fsx-backup-start-time") or "17:00"
+    fsx_maintenance_start_time = app.node.try_get_context("fsx-maintenance-start-time") or "6:19:00"
+    # バックアップからの復元（"backup-..." または fsx-restore-source の環境の "latest"、fsx_restore.pyで解決）
+    fsx_restore_source = app.node.try_get_context("fsx-restore-source")
+    fsx_backup = resolve_backup(
+        app.node.try_get_context("fsx-backup-id"),
+        fsx_restore_source,
+        app.node.try_get_context(context_key(fsx_restore_source)) if fsx_restore_source else None
     )
-)
 
-app.synth()
\ No newline at end of file
+    # Route 53 ResolverによるADドメインのDNS転送（Network・Security Rules・Domain・Applicationで共通）
+    dns_forwarding = str(app.node.try_get_context("dns-forwarding")).lower() == "true"
+
+    # SMBクライアントのチューニングプロファイル（baseline / throughput / metadata）
+    smb_client_profile = app.node.try_get_context("smb-client-profile") or "baseline"
+
+    # インスタンスプロファイル（dev / steady / network）とロール別の個別指定
+    instance_profile = app.node.try_get_context("instance-profile") or "dev"
+    client_instance_type = resolve_instance_type("client", instance_profile, app.node.try_get_context("client-instance-type"))
+
+    # ウォームプール付きWindowsクライアントフリート（最大台数0で無効）
+    client_fleet_max_size = int(app.node.try_get_context("client-fleet-max-size") or 0)
+    client_warm_pool_size = int(app.node.try_get_context("client-warm-pool-size") or 1)
+    client_warm_pool_state = app.node.try_get_context("client-warm-pool-state") or "Hibernated"
+
+    # SMBレイテンシーカナリアとp99 SLOアラーム（操作ごとのSLOはミリ秒で上書き可能）
+    smb_canary = str(app.node.try_get_context("smb-canary")).lower() != "false"
+    smb_canary_slo_ms = app.node.try_get_context("smb-canary-slo-ms") or {}
+
+    # 起動タイムライン（ステップログと起動イベント）のCloudWatch Logsへの送信（Domain・Applicationで共通）
+    boot_timeline = str(app.node.try_get_context("boot-timeline")).lower() != "false"
+
+    # fsxuserの委任先とFSxの参加先を専用OU（OU=FSx）にする（Domain・Applicationで共通）
+    # 既存のFSxでは変更すると置き換え（ファイルシステムの再作成とデータの消失）になるため新規環境のみ有効化
+    fsx_delegated_ou = str(app.node.try_get_context("fsx-delegated-ou")).lower() == "true"
+
+    # BranchCache（off / distributed / hosted、Security Rules・Applicationで共通）
+    branch_cache = app.node.try_get_context("branch-cache") or "off"
+
+    # SMB共有の宣言的なリスト（Security Rules Stackでリモート管理用のWinRMを許可）
+    fsx_shares = app.node.try_get_context("fsx-shares") or []
+
+    # Stack名にユーザー名を追加（リソース名の一意性確保）
+    # スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
+    stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
+
+    return AdApplicationStack(
+        app, f"AdWindowsFsxApplicationStack-{stack_suffix}",
+        windows_version=windows_version,
+        windows_language=windows_language,
+        key_pair_name=key_pair_name,
+        fsx_storage_capacity=fsx_storage_capacity,
+        fsx_storage_type=fsx_storage_type,
+        fsx_deployment_type=fsx_deployment_type,
+        fsx_throughput_capacity=fsx_throughput_capacity,
+        fsx_ssd_iops=fsx_ssd_iops,
+        fsx_backup_start_time=fsx_backup_start_time,
+        fsx_maintenance_start_time=fsx_maintenance_start_time,
+        fsx_backup=fsx_backup,
+        dns_forwarding=dns_forwarding,
+        smb_client_profile=smb_client_profile,
+        instance_type=client_instance_type,
+        client_fleet_max_size=client_fleet_max_size,
+        client_warm_pool_size=client_warm_pool_size,
+        client_warm_pool_state=client_warm_pool_state,
+        smb_canary=smb_canary,
+        smb_canary_slo_ms=smb_canary_slo_ms,
+        boot_timeline=boot_timeline,
+        fsx_delegated_ou=fsx_delegated_ou,
+        branch_cache=branch_cache,
+        fsx_shares=fsx_shares,
+        description="Application stack with Windows EC2 and FSx",
+        env=cdk.Environment(
+            account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
+            region=os.getenv('CDK_DEFAULT_REGION')
+        )
+    )
+
+
+if __name__ == "__main__":
+    app = cdk.App()
+    build(app)
+    app.synth()
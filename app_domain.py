@@ -2,28 +2,52 @@
 import os
 import aws_cdk as cdk
 from ad_windows_fsx.ad_domain_stack import AdDomainStack
+from ad_windows_fsx.instance_profiles import resolve_instance_type
 
-app = cdk.App()
-
-# CDKコンテキストからパラメータを取得（cdk.jsonで一元管理）
-windows_version = app.node.try_get_context("windows-version") or "2022"
-windows_language = app.node.try_get_context("windows-language") or "Japanese"
-key_pair_name = app.node.try_get_context("key-pair-name")
-
-# Stack名にユーザー名を追加（リソース名の一意性確保）
-# スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
-stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
-
-AdDomainStack(
-    app, f"AdWindowsFsxDomainStack-{stack_suffix}",
-    windows_version=windows_version,
-    windows_language=windows_language,
-    key_pair_name=key_pair_name,
-    description="Active Directory Domain Controller stack with verification",
-    env=cdk.Environment(
-        account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
-        region=os.getenv('CDK_DEFAULT_REGION')
+
+def build(app):
+    """cdk.jsonのコンテキストからスタックを構築（dev_watch等から同じ定義で合成するために分離）"""
+    # CDKコンテキストからパラメータを取得（cdk.jsonで一元管理）
+    windows_version = app.node.try_get_context("windows-version") or "2022"
+    windows_language = app.node.try_get_context("windows-language") or "Japanese"
+    key_pair_name = app.node.try_get_context("key-pair-name")
+
+    # Route 53 ResolverによるADドメインのDNS転送（Network・Security Rules・Domain・Applicationで共通）
+    dns_forwarding = str(app.node.try_get_context("dns-forwarding")).lower() == "true"
+
+    # インスタンスプロファイル（dev / steady / network）とロール別の個別指定
+    instance_profile = app.node.try_get_context("instance-profile") or "dev"
+    dc_instance_type = resolve_instance_type("dc", instance_profile, app.node.try_get_context("dc-instance-type"))
+
+    # 起動タイムライン（ステップログと起動イベント）のCloudWatch Logsへの送信（Domain・Applicationで共通）
+    boot_timeline = str(app.node.try_get_context("boot-timeline")).lower() != "false"
+
+    # fsxuserの委任先とFSxの参加先を専用OU（OU=FSx）にする（Domain・Applicationで共通）
+    # 既存のFSxでは変更すると置き換え（ファイルシステムの再作成とデータの消失）になるため新規環境のみ有効化
+    fsx_delegated_ou = str(app.node.try_get_context("fsx-delegated-ou")).lower() == "true"
+
+    # Stack名にユーザー名を追加（リソース名の一意性確保）
+    # スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
+    stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
+
+    return AdDomainStack(
+        app, f"AdWindowsFsxDomainStack-{stack_suffix}",
+        windows_version=windows_version,
+        windows_language=windows_language,
+        key_pair_name=key_pair_name,
+        dns_forwarding=dns_forwarding,
+        instance_type=dc_instance_type,
+        boot_timeline=boot_timeline,
+        fsx_delegated_ou=fsx_delegated_ou,
+        description="Active Directory Domain Controller stack with verification",
+        env=cdk.Environment(
+            account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
+            region=os.getenv('CDK_DEFAULT_REGION')
+        )
     )
-)
 
-app.synth()
\ No newline at end of file
+
+if __name__ == "__main__":
+    app = cdk.App()
+    build(app)
+    app.synth()
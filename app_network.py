@@ -3,24 +3,45 @@ import os
 import aws_cdk as cdk
 from ad_windows_fsx.ad_network_stack import AdNetworkStack
 
-app = cdk.App()
-
-# CDKコンテキストからパラメータを取得
-windows_version = app.node.try_get_context("windows-version") or "2022"
-windows_language = app.node.try_get_context("windows-language") or "Japanese"
-key_pair_name = app.node.try_get_context("key-pair-name")
-
-# Stack名にユーザー名を追加（リソース名の一意性確保）
-# スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
-stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
-
-AdNetworkStack(
-    app, f"AdWindowsFsxNetworkStack-{stack_suffix}",
-    description="Network infrastructure stack for AD + Windows + FSx environment",
-    env=cdk.Environment(
-        account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
-        region=os.getenv('CDK_DEFAULT_REGION')
+
+def build(app):
+    """cdk.jsonのコンテキストからスタックを構築（dev_watch等から同じ定義で合成するために分離）"""
+    # CDKコンテキストからパラメータを取得
+    windows_version = app.node.try_get_context("windows-version") or "2022"
+    windows_language = app.node.try_get_context("windows-language") or "Japanese"
+    key_pair_name = app.node.try_get_context("key-pair-name")
+
+    # 追加のVPCインターフェースエンドポイント（logs, monitoring, kms, secretsmanager, fsx）
+    vpc_interface_endpoints = app.node.try_get_context("vpc-interface-endpoints") or []
+
+    # NATトポロジー（single / per-az / instance）
+    nat_topology = app.node.try_get_context("nat-topology") or "single"
+
+    # Route 53 ResolverによるADドメインのDNS転送（Network・Security Rules・Domain・Applicationで共通）
+    dns_forwarding = str(app.node.try_get_context("dns-forwarding")).lower() == "true"
+
+    # VPCフローログ（S3に出力）
+    flow_logs = str(app.node.try_get_context("vpc-flow-logs")).lower() == "true"
+
+    # Stack名にユーザー名を追加（リソース名の一意性確保）
+    # スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
+    stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
+
+    return AdNetworkStack(
+        app, f"AdWindowsFsxNetworkStack-{stack_suffix}",
+        interface_endpoints=vpc_interface_endpoints,
+        nat_topology=nat_topology,
+        dns_forwarding=dns_forwarding,
+        flow_logs=flow_logs,
+        description="Network infrastructure stack for AD + Windows + FSx environment",
+        env=cdk.Environment(
+            account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
+            region=os.getenv('CDK_DEFAULT_REGION')
+        )
     )
-)
 
-app.synth()
\ No newline at end of file
+
+if __name__ == "__main__":
+    app = cdk.App()
+    build(app)
+    app.synth()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import os
+import aws_cdk as cdk
+from ad_windows_fsx.ad_security_rules_stack import AdSecurityRulesStack
+
+
+def build(app):
+    """cdk.jsonのコンテキストからスタックを構築（dev_watch等から同じ定義で合成するために分離）"""
+    # Route 53 ResolverによるADドメインのDNS転送（Network・Security Rules・Domain・Applicationで共通）
+    dns_forwarding = str(app.node.try_get_context("dns-forwarding")).lower() == "true"
+
+    # BranchCache（off / distributed / hosted、Security Rules・Applicationで共通）
+    branch_cache = app.node.try_get_context("branch-cache") or "off"
+
+    # FSxのリモート管理（BranchCacheの共有設定、fsx-sharesの共有の作成・更新）
+    fsx_remote_admin = branch_cache != "off" or bool(app.node.try_get_context("fsx-shares"))
+
+    # Stack名にユーザー名を追加（リソース名の一意性確保）
+    # スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
+    stack_suffix = os.getenv('USER', 'Unknown').replace('.', '-')
+
+    return AdSecurityRulesStack(
+        app, f"AdWindowsFsxSecurityRulesStack-{stack_suffix}",
+        dns_forwarding=dns_forwarding,
+        branch_cache=branch_cache,
+        fsx_remote_admin=fsx_remote_admin,
+        description="Security group rules stack for AD + Windows + FSx environment",
+        env=cdk.Environment(
+            account=os.getenv('CDK_DEFAULT_ACCOUNT'), 
+            region=os.getenv('CDK_DEFAULT_REGION')
+        )
+    )
+
+
+if __name__ == "__main__":
+    app = cdk.App()
+    build(app)
+    app.synth()
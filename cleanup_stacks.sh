@@ -89,6 +89,7 @@ echo -e "${BLUE}[INFO]${NC} Checking existing stacks..."
 STACKS_TO_DELETE=(
     "AdWindowsFsxApplicationStack-$USER_NAME"
     "AdWindowsFsxDomainStack-$USER_NAME" 
+    "AdWindowsFsxSecurityRulesStack-$USER_NAME"
     "AdWindowsFsxNetworkStack-$USER_NAME"
 )
 
@@ -185,6 +186,15 @@ for stack in "${EXISTING_STACKS[@]}"; do
     esac
 done
 
+# Security Rules Stack を削除
+for stack in "${EXISTING_STACKS[@]}"; do
+    case $stack in
+        *SecurityRulesStack*)
+            delete_stack "$stack" "Security Rules Stack (Security Group Rules)"
+            ;;
+    esac
+done
+
 # Network Stack を削除
 for stack in "${EXISTING_STACKS[@]}"; do
     case $stack in
@@ -13,6 +13,11 @@ AWS_PROFILE=""
 DRY_RUN=false
 MAX_PHASE=3
 INTERACTIVE=true
+RULES_ONLY=false
+USE_CACHE=true
+ALLOW_REPLACEMENT=false
+QUOTA_CHECK=true
+CACHE_DIR=".cdk-cache"
 
 # Color output definitions
 RED='\033[0;31m'
@@ -32,6 +37,10 @@ show_help() {
     echo "  --phase PHASE               Deploy up to specified phase (1, 2, or 3)"
     echo "  --dry-run                   Dry run mode (syntax check only)"
     echo "  --non-interactive, --batch  Non-interactive mode (for automation)"
+    echo "  --rules-only                Deploy Security Rules Stack only (port changes)"
+    echo "  --no-cache                  Always synthesize and deploy (ignore the assembly cache)"
+    echo "  --allow-replacement         Allow replacing the AD DC or FSx without confirmation"
+    echo "  --skip-quota-check          Skip the service quota preflight check"
     echo "  --help                      Show this help message"
     echo ""
     echo "Example:"
@@ -39,10 +48,13 @@ show_help() {
     echo "  $0 --profile cm --non-interactive   # For automation scripts"
     echo "  $0 --phase 1                        # Deploy Phase 1 only (Network)"
     echo "  $0 --phase 2                        # Deploy Phase 1-2 (Network + AD Domain)"
-    echo "  $0 --phase 3                        # Phase 3 only with manual confirmation"
+    echo "  $0 --phase 3                        # Deploy Phase 1-3 (delegation runs before FSx)"
     echo "  $0 --dry-run                        # Syntax check only"
+    echo "  $0 --rules-only                     # Apply security group rule changes only"
+    echo "  $0 --no-cache                       # Re-synthesize and deploy every stack"
     echo ""
-    echo "Note: Interactive mode is default due to mandatory manual FSx configuration steps."
+    echo "Note: FSx permission delegation and domain join are automated (SSM Automation / State Manager)."
+    echo "      Environments created before the Security Rules Stack are migrated automatically."
     echo ""
 }
 
@@ -69,6 +81,22 @@ while [[ $# -gt 0 ]]; do
             INTERACTIVE=false
             shift
             ;;
+        --rules-only)
+            RULES_ONLY=true
+            shift
+            ;;
+        --no-cache)
+            USE_CACHE=false
+            shift
+            ;;
+        --allow-replacement)
+            ALLOW_REPLACEMENT=true
+            shift
+            ;;
+        --skip-quota-check)
+            QUOTA_CHECK=false
+            shift
+            ;;
         --help)
             show_help
             exit 0
@@ -110,6 +138,7 @@ if [[ "$DRY_RUN" == "false" ]]; then
     ACCOUNT_ID=$(aws sts get-caller-identity $AWS_CLI_OPTS --query Account --output text)
     REGION=${AWS_DEFAULT_REGION:-$(aws configure get region $AWS_CLI_OPTS)}
     echo -e "${GREEN}[SUCCESS]${NC} AWS Account: $ACCOUNT_ID, Region: $REGION"
+    CDK_CLI_VERSION=$(cdk --version 2>/dev/null || echo "unknown")
 
     # Check CDK bootstrap
     echo -e "${BLUE}[INFO]${NC} Checking CDK bootstrap..."
@@ -128,21 +157,9 @@ echo "  - AWS Profile: ${AWS_PROFILE:-'default'}"
 echo "  - Max Phase: $MAX_PHASE"
 echo "  - Interactive Mode: $INTERACTIVE"
 echo "  - Dry Run: $DRY_RUN"
+echo "  - Assembly Cache: $USE_CACHE"
 echo ""
 
-# Warning for non-interactive mode
-if [[ "$INTERACTIVE" == "false" && "$DRY_RUN" == "false" ]]; then
-    echo -e "${YELLOW}[WARNING]${NC} Non-interactive mode detected!"
-    echo -e "${RED}[IMPORTANT]${NC} FSx for Windows Server requires mandatory manual configuration:"
-    echo "  1. AD DC full startup verification"
-    echo "  2. Service account permission delegation to 'fsxuser'"
-    echo "  3. Manual confirmation before Phase 3 execution"
-    echo ""
-    echo -e "${YELLOW}[NOTICE]${NC} Please ensure all manual steps are completed before deployment."
-    echo "Continuing in 10 seconds... (Ctrl+C to cancel)"
-    sleep 10
-fi
-
 # CDKコンテキスト設定（cdk.jsonで一元管理）
 CDK_CONTEXT=""
 
@@ -158,17 +175,78 @@ if [[ "$DRY_RUN" == "true" ]]; then
     echo -e "${BLUE}[INFO]${NC} Checking Network Stack syntax..."
     cdk synth -a "python app_network.py" $CDK_CONTEXT $profile_opt --quiet
     
+    echo -e "${BLUE}[INFO]${NC} Checking Security Rules Stack syntax..."
+    cdk synth -a "python app_security_rules.py" $CDK_CONTEXT $profile_opt --quiet
+    
     echo -e "${BLUE}[INFO]${NC} Checking Domain Stack syntax..."
     cdk synth -a "python app_domain.py" $CDK_CONTEXT $profile_opt --quiet
     
     echo -e "${BLUE}[INFO]${NC} Checking Application Stack syntax..."
     cdk synth -a "python app_application.py" $CDK_CONTEXT $profile_opt --quiet
     
+    echo -e "${BLUE}[INFO]${NC} Checking security group reachability (FSx/Windows EC2 to AD)..."
+    if ! python -m ad_windows_fsx.sg_reachability; then
+        echo -e "${RED}[ERROR]${NC} Required security group rules are missing"
+        exit 1
+    fi
+    
     echo -e "${GREEN}[SUCCESS]${NC} All stacks passed syntax check!"
     exit 0
 fi
 
+# 置き換えの影響と所要時間の予測（ad_windows_fsx/deploy_impact.py）
+# AD DC（AdDcInstance）・FSx（FsxFileSystem）の置き換え・削除には明示的な確認が必要
+check_replacement_impact() {
+    local stack_name=$1
+    local template_file=$2
+    
+    if ! aws cloudformation get-template $profile_opt --stack-name "$stack_name" --template-stage Original \
+        --output json > "$CACHE_DIR/deployed.template.json" 2>/dev/null; then
+        return 0  # 未デプロイ
+    fi
+    aws cloudformation describe-stacks $profile_opt --stack-name "$stack_name" \
+        --query 'Stacks[0].Parameters' --output json > "$CACHE_DIR/deployed.parameters.json"
+    # デプロイ時に解決されるSSMパラメータ（最新のWindows AMI）の現在の値
+    local ssm_names=$(python -m ad_windows_fsx.deploy_impact ssm-names "$template_file")
+    if [[ -n "$ssm_names" ]]; then
+        aws ssm get-parameters $profile_opt --names $ssm_names --output json > "$CACHE_DIR/ssm.parameters.json"
+    else
+        echo '{"Parameters": []}' > "$CACHE_DIR/ssm.parameters.json"
+    fi
+    
+    echo -e "${BLUE}[INFO]${NC} Predicting replacements and duration for $stack_name..."
+    local status=0
+    python -m ad_windows_fsx.deploy_impact analyze "$CACHE_DIR/deployed.template.json" "$template_file" \
+        --deployed-parameters "$CACHE_DIR/deployed.parameters.json" \
+        --ssm-parameters "$CACHE_DIR/ssm.parameters.json" \
+        --history "$CACHE_DIR/deploy-timings.json" || status=$?
+    echo ""
+    
+    if [[ $status -eq 2 ]]; then
+        if [[ "$ALLOW_REPLACEMENT" == "true" ]]; then
+            echo -e "${YELLOW}[WARN]${NC} Replacing critical resources (--allow-replacement)"
+        elif [[ "$INTERACTIVE" == "true" ]]; then
+            echo -e "${RED}[CONFIRM]${NC} This deploy replaces the AD DC or the FSx file system."
+            read -p "Type the stack name to continue: " -r
+            if [[ "$REPLY" != "$stack_name" ]]; then
+                echo -e "${BLUE}[INFO]${NC} Deployment cancelled by user."
+                exit 0
+            fi
+        else
+            echo -e "${RED}[ERROR]${NC} This deploy replaces the AD DC or the FSx file system. Re-run with --allow-replacement to proceed."
+            exit 1
+        fi
+    elif [[ $status -ne 0 ]]; then
+        echo -e "${RED}[ERROR]${NC} Failed to analyze the template changes"
+        exit 1
+    fi
+}
+
 # デプロイ実行関数
+# 入力（ソース、コンテキスト、ライブラリ、上流のエクスポート）のハッシュが最後に成功したデプロイと同じ場合はスキップし、
+# 合成済みのアセンブリがキャッシュにある場合は合成せずにデプロイする（ad_windows_fsx/assembly_cache.py）
+LAST_DEPLOY_SKIPPED=false
+DOMAIN_SKIPPED=false
 deploy_stack() {
     local stack_name=$1
     local app_file=$2
@@ -181,10 +259,61 @@ deploy_stack() {
     if [[ -n "$AWS_PROFILE" ]]; then
         profile_opt="--profile $AWS_PROFILE"
     fi
-    echo "Command: cdk deploy -a \"python $app_file\" $CDK_CONTEXT $profile_opt --require-approval never"
+    LAST_DEPLOY_SKIPPED=false
+    mkdir -p "$CACHE_DIR"
+    
+    local cache_key=""
+    local assembly_dir="$CACHE_DIR/uncached"
+    if [[ "$USE_CACHE" == "true" ]]; then
+        # 上流スタックのエクスポート値（直前のフェーズのデプロイ結果を反映するため毎回取得）
+        if ! aws cloudformation list-exports $profile_opt --output json > "$CACHE_DIR/exports.json" 2>/dev/null; then
+            echo '{"Exports": []}' > "$CACHE_DIR/exports.json"
+        fi
+        cache_key=$(python -m ad_windows_fsx.assembly_cache --cache-dir "$CACHE_DIR" key "$app_file" \
+            --exports "$CACHE_DIR/exports.json" --account "$ACCOUNT_ID" --region "$REGION" \
+            --cli-version "$CDK_CLI_VERSION")
+        echo "Cache key: $cache_key"
+        
+        local stack_status=$(aws cloudformation describe-stacks $profile_opt --stack-name "$stack_name" \
+            --query 'Stacks[0].StackStatus' --output text 2>/dev/null || echo "NOT_FOUND")
+        if [[ "$stack_status" == "CREATE_COMPLETE" || "$stack_status" == "UPDATE_COMPLETE" ]] \
+            && python -m ad_windows_fsx.assembly_cache --cache-dir "$CACHE_DIR" deployed "$stack_name" "$cache_key"; then
+            echo -e "${GREEN}[SKIPPED]${NC} $description is unchanged since the last successful deploy ($stack_status)"
+            echo ""
+            LAST_DEPLOY_SKIPPED=true
+            return 0
+        fi
+        assembly_dir=$(python -m ad_windows_fsx.assembly_cache --cache-dir "$CACHE_DIR" lookup "$cache_key") || true
+    else
+        rm -rf "$assembly_dir"
+    fi
+    
+    if [[ -f "$assembly_dir/manifest.json" ]]; then
+        echo "Using cached assembly: $assembly_dir"
+    else
+        echo "Command: cdk synth -a \"python $app_file\" $CDK_CONTEXT $profile_opt --quiet -o $assembly_dir"
+        if ! cdk synth -a "python $app_file" $CDK_CONTEXT $profile_opt --quiet -o "$assembly_dir"; then
+            rm -rf "$assembly_dir"
+            echo -e "${RED}[ERROR]${NC} Failed to synthesize $description"
+            exit 1
+        fi
+    fi
+    
+    check_replacement_impact "$stack_name" "$assembly_dir/$stack_name.template.json"
+    
+    echo "Command: cdk deploy -a $assembly_dir $profile_opt --require-approval never"
     echo ""
     
-    if cdk deploy -a "python $app_file" $CDK_CONTEXT $profile_opt --require-approval never; then
+    if cdk deploy -a "$assembly_dir" $profile_opt --require-approval never; then
+        if [[ -n "$cache_key" ]]; then
+            python -m ad_windows_fsx.assembly_cache --cache-dir "$CACHE_DIR" record "$stack_name" "$cache_key"
+        fi
+        # リソースごとの所要時間を記録（次回以降の見積もりに使用）
+        if aws cloudformation describe-stack-events $profile_opt --stack-name "$stack_name" \
+            --output json > "$CACHE_DIR/events.json" 2>/dev/null; then
+            python -m ad_windows_fsx.deploy_impact record "$CACHE_DIR/events.json" \
+                --history "$CACHE_DIR/deploy-timings.json" || true
+        fi
         echo -e "${GREEN}[SUCCESS]${NC} $description deployed successfully!"
         echo ""
     else
@@ -209,66 +338,58 @@ confirm_continue() {
     fi
 }
 
-# FSx前提条件チェック関数
+# FSx前提条件の自動設定関数（OU作成・fsxuserへの権限委任）
 check_fsx_prerequisites() {
     local stack_name="$1"
     
-    echo -e "${BLUE}[INFO]${NC} FSx for Windows Server prerequisites check..."
+    echo -e "${BLUE}[INFO]${NC} FSx for Windows Server prerequisites (automated delegation)..."
     
-    # Get AD DC instance ID
     profile_opt=""
     if [[ -n "$AWS_PROFILE" ]]; then
         profile_opt="--profile $AWS_PROFILE"
     fi
     
+    local domain_stack="AdWindowsFsxDomainStack-$USER_NAME"
     local ad_instance_id=$(aws cloudformation describe-stacks $profile_opt \
-        --stack-name "AdWindowsFsxDomainStack-$USER_NAME" \
+        --stack-name "$domain_stack" \
         --query 'Stacks[0].Outputs[?OutputKey==`AdDcInstanceId`].OutputValue' \
         --output text 2>/dev/null || echo "")
+    local document_name=$(aws cloudformation describe-stacks $profile_opt \
+        --stack-name "$domain_stack" \
+        --query 'Stacks[0].Outputs[?OutputKey==`FsxDelegationDocumentName`].OutputValue' \
+        --output text 2>/dev/null || echo "")
     
-    if [[ -z "$ad_instance_id" ]]; then
-        echo -e "${RED}[ERROR]${NC} AD DC instance ID not found. Please verify that Domain Stack is deployed successfully."
+    if [[ -z "$ad_instance_id" || -z "$document_name" || "$document_name" == "None" ]]; then
+        echo -e "${RED}[ERROR]${NC} AD DC instance ID or delegation document not found. Please verify that Domain Stack is deployed successfully."
         return 1
     fi
     
     echo -e "${GREEN}[SUCCESS]${NC} AD DC instance ID: $ad_instance_id"
+    echo -e "${BLUE}[INFO]${NC} Running SSM Automation: $document_name"
+    echo "   (waits for AD DS to finish forest creation, then creates the FSx OU and delegates permissions to 'fsxuser')"
     
-    # Display FSx important requirements
-    echo ""
-    echo -e "${RED}[IMPORTANT]${NC} The following manual steps are required for FSx for Windows Server:"
-    echo ""
-    echo -e "${YELLOW}1. Verify AD DC full startup${NC}"
-    echo "   Connect via SSM and confirm domain creation completion:"
-    echo "   aws ssm start-session --target $ad_instance_id $profile_opt"
-    echo ""
-    echo -e "${YELLOW}2. Delegate permissions to 'fsxuser' account${NC}"
-    echo "   Set the following permissions in Active Directory Users and Computers:"
-    echo "   - Reset Password"
-    echo "   - Read and write Account Restrictions"
-    echo "   - Validated write to DNS host name"
-    echo "   - Validated write to service principal name"
-    echo "   - Create Computer Objects"
-    echo "   - Delete Computer Objects"
-    echo ""
-    echo -e "${YELLOW}3. Configuration guide${NC}"
-    echo "   Detailed steps: https://docs.aws.amazon.com/fsx/latest/WindowsGuide/assign-permissions-to-service-account.html"
-    echo ""
+    local execution_id=$(aws ssm start-automation-execution $profile_opt \
+        --document-name "$document_name" \
+        --parameters "InstanceId=$ad_instance_id" \
+        --query 'AutomationExecutionId' --output text)
     
-    if [[ "$INTERACTIVE" == "true" ]]; then
-        echo -e "${RED}[WARNING]${NC} FSx creation will fail if the above manual configuration is not completed."
-        echo ""
-        read -p "Have you completed the manual configuration? (y/N): " -n 1 -r
-        echo ""
-        if [[ ! $REPLY =~ ^[Yy]$ ]]; then
-            echo -e "${BLUE}[INFO]${NC} Please complete manual configuration and then resume FSx deployment with:"
-            echo "./deploy_stacks.sh --phase 3 $([[ -n "$AWS_PROFILE" ]] && echo "--profile $AWS_PROFILE")"
-            exit 0
-        fi
-    else
-        echo -e "${YELLOW}[NOTICE]${NC} Non-interactive mode. Please ensure manual configuration is completed."
-        echo "Continuing deployment in 5 seconds..."
-        sleep 5
+    local status="InProgress"
+    while [[ "$status" == "Pending" || "$status" == "InProgress" || "$status" == "Waiting" ]]; do
+        sleep 30
+        status=$(aws ssm get-automation-execution $profile_opt \
+            --automation-execution-id "$execution_id" \
+            --query 'AutomationExecution.AutomationExecutionStatus' --output text)
+        echo "   Automation status: $status"
+    done
+    
+    if [[ "$status" != "Success" ]]; then
+        echo -e "${RED}[ERROR]${NC} FSx permission delegation failed (execution: $execution_id, status: $status)"
+        echo "   Check the execution in the Systems Manager console, or delegate manually:"
+        echo "   https://docs.aws.amazon.com/fsx/latest/WindowsGuide/assign-permissions-to-service-account.html"
+        exit 1
     fi
+    
+    echo -e "${GREEN}[SUCCESS]${NC} FSx permissions delegated to 'fsxuser'"
 }
 
 # スタック状態確認関数
@@ -293,67 +414,112 @@ check_stack_status() {
     fi
 }
 
+# スタック状態取得関数（存在しない場合は NOT_FOUND）
+get_stack_status() {
+    local stack_name=$1
+    
+    profile_opt=""
+    if [[ -n "$AWS_PROFILE" ]]; then
+        profile_opt="--profile $AWS_PROFILE"
+    fi
+    aws cloudformation describe-stacks $profile_opt --stack-name "$stack_name" --query 'Stacks[0].StackStatus' --output text 2>/dev/null || echo "NOT_FOUND"
+}
+
 # ユーザー名取得（スタック名に使用）
 # スタック名は英数字とハイフンのみ許可されるため、ドットをハイフンに置換
 USER_NAME=${USER:-"Unknown"}
 USER_NAME=${USER_NAME//\./-}
 
+# Security Rules Stack導入前の環境からの移行判定
+# 旧構成ではDomain/Application Stackがルールを保持しているため、同一ルールが重複しないよう
+# 既存のDomain/Application Stackを更新して旧ルールを削除してからSecurity Rules Stackを作成する
+MIGRATE_RULES=false
+DOMAIN_EXISTS=false
+APP_EXISTS=false
+RULES_STACK_STATUS=$(get_stack_status "AdWindowsFsxSecurityRulesStack-$USER_NAME")
+if [[ "$RULES_STACK_STATUS" == "ROLLBACK_COMPLETE" ]]; then
+    # 重複ルールで作成に失敗したスタック（リソースなし）は更新できないため削除して作り直す
+    echo -e "${YELLOW}[WARN]${NC} AdWindowsFsxSecurityRulesStack-$USER_NAME is in ROLLBACK_COMPLETE; deleting it before migration..."
+    aws cloudformation delete-stack $profile_opt --stack-name "AdWindowsFsxSecurityRulesStack-$USER_NAME"
+    aws cloudformation wait stack-delete-complete $profile_opt --stack-name "AdWindowsFsxSecurityRulesStack-$USER_NAME"
+    RULES_STACK_STATUS="NOT_FOUND"
+fi
+if [[ "$RULES_STACK_STATUS" == "NOT_FOUND" ]]; then
+    [[ "$(get_stack_status "AdWindowsFsxDomainStack-$USER_NAME")" != "NOT_FOUND" ]] && DOMAIN_EXISTS=true
+    [[ "$(get_stack_status "AdWindowsFsxApplicationStack-$USER_NAME")" != "NOT_FOUND" ]] && APP_EXISTS=true
+    if [[ "$DOMAIN_EXISTS" == "true" || "$APP_EXISTS" == "true" ]]; then
+        MIGRATE_RULES=true
+        echo -e "${YELLOW}[MIGRATE]${NC} Existing Domain/Application Stacks hold the security group rules."
+        echo "  They are updated first to remove the old rules, then the Security Rules Stack is created."
+        echo ""
+    fi
+fi
+
+# 移行時にSecurity Rules Stackを作成できるか（旧ルールを持つ既存スタックがすべて今回のフェーズで更新されるか）
+rules_stack_ready() {
+    [[ "$MIGRATE_RULES" == "false" ]] && return 0
+    [[ "$DOMAIN_EXISTS" == "true" && $MAX_PHASE -lt 2 ]] && return 1
+    [[ "$APP_EXISTS" == "true" && $MAX_PHASE -lt 3 ]] && return 1
+    return 0
+}
+
+# セキュリティグループルールのみ更新（ステートフルなリソースには触れない）
+if [[ "$RULES_ONLY" == "true" ]]; then
+    if [[ "$MIGRATE_RULES" == "true" ]]; then
+        echo -e "${RED}[ERROR]${NC} Existing Domain/Application Stacks still hold the security group rules."
+        echo "Run ./deploy_stacks.sh without --rules-only to migrate them to the Security Rules Stack."
+        exit 1
+    fi
+    deploy_stack "AdWindowsFsxSecurityRulesStack-$USER_NAME" "app_security_rules.py" "Security Group Rules"
+    echo -e "${GREEN}=== Security Group Rules Updated Successfully! ===${NC}"
+    exit 0
+fi
+
 # デプロイ開始
 echo -e "${BLUE}[INFO]${NC} Starting deployment (Phase 1-$MAX_PHASE)..."
 echo "User: $USER_NAME"
 echo "Max Phase: $MAX_PHASE"
 echo ""
 
+# サービスクォータのプリフライトチェック（ad_windows_fsx/quota_preflight.py）
+# デプロイするフェーズまでのスタックを合成し、VPC・EIP・エンドポイント・SGルール・FSx容量の不足をPhase 1の前に検出
+if [[ "$QUOTA_CHECK" == "true" ]]; then
+    preflight_stacks="network security-rules"
+    [[ $MAX_PHASE -ge 2 ]] && preflight_stacks="$preflight_stacks domain"
+    [[ $MAX_PHASE -ge 3 ]] && preflight_stacks="$preflight_stacks application"
+    preflight_profile=""
+    if [[ -n "$AWS_PROFILE" ]]; then
+        preflight_profile="--profile $AWS_PROFILE"
+    fi
+    mkdir -p "$CACHE_DIR"
+    echo -e "${BLUE}[INFO]${NC} Checking service quotas ($preflight_stacks)..."
+    if ! python -m ad_windows_fsx.quota_preflight --live $preflight_profile --user "$USER_NAME" \
+        --stacks $preflight_stacks --save-snapshot "$CACHE_DIR/quota-snapshot.json"; then
+        echo -e "${RED}[ERROR]${NC} Service quotas are insufficient. Request increases or re-run with --skip-quota-check."
+        exit 1
+    fi
+    echo ""
+fi
+
 # Phase 1: Network Stack
 echo -e "${YELLOW}=== Phase 1: Network Infrastructure ===${NC}"
 confirm_continue "Deploy Network Stack."
 deploy_stack "AdWindowsFsxNetworkStack-$USER_NAME" "app_network.py" "Network Infrastructure"
+if [[ "$MIGRATE_RULES" == "false" ]]; then
+    deploy_stack "AdWindowsFsxSecurityRulesStack-$USER_NAME" "app_security_rules.py" "Security Group Rules"
+else
+    echo -e "${BLUE}[INFO]${NC} Security Rules Stack is deployed after the existing Domain/Application Stacks (migration)"
+fi
 
 if [[ $MAX_PHASE -ge 2 ]]; then
     # Phase 2: AD Domain Stack
     echo -e "${YELLOW}=== Phase 2: Active Directory Domain ===${NC}"
     confirm_continue "Deploy AD Domain Controller Stack."
     deploy_stack "AdWindowsFsxDomainStack-$USER_NAME" "app_domain.py" "Active Directory Domain Controller"
+    DOMAIN_SKIPPED=$LAST_DEPLOY_SKIPPED
 
-    # AD Domain creation verification (up to 15 minutes wait)
+    # AD Domain creation is verified by the delegation automation before Phase 3
     echo -e "${BLUE}[INFO]${NC} AD Domain creation is in progress (up to ~15 minutes)..."
-    echo -e "${YELLOW}[IMPORTANT]${NC} Please wait for AD DC full startup and domain creation completion."
-    
-    if [[ $MAX_PHASE -ge 3 ]]; then
-        echo ""
-        echo -e "${RED}[NEXT STEPS]${NC} Manual configuration required before Phase 3 (FSx) execution:"
-        echo ""
-        
-        # Get and display AD DC instance ID
-        profile_opt=""
-        if [[ -n "$AWS_PROFILE" ]]; then
-            profile_opt="--profile $AWS_PROFILE"
-        fi
-        
-        echo "1. Connect to AD DC via SSM and confirm domain creation completion:"
-        ad_instance_id=$(aws cloudformation describe-stacks $profile_opt \
-            --stack-name "AdWindowsFsxDomainStack-$USER_NAME" \
-            --query 'Stacks[0].Outputs[?OutputKey==`AdDcInstanceId`].OutputValue' \
-            --output text 2>/dev/null || echo "<Retrieving...>")
-        echo "   aws ssm start-session --target $ad_instance_id $profile_opt"
-        echo ""
-        echo "2. Delegate permissions to 'fsxuser' account in Active Directory Users and Computers:"
-        echo "   Detailed steps: See 'FSx Service Account Permissions' in README.md"
-        echo ""
-        
-        if [[ "$INTERACTIVE" == "true" ]]; then
-            echo -e "${YELLOW}[CHOICE]${NC} Do you want to continue with Phase 3 (FSx) deployment?"
-            echo "y: Execute Phase 3 (with manual configuration confirmation)"
-            echo "n: Stop at Phase 2 (manually execute Phase 3 later)"
-            read -p "Please choose (y/N): " -n 1 -r
-            echo ""
-            if [[ ! $REPLY =~ ^[Yy]$ ]]; then
-                MAX_PHASE=2
-                echo -e "${BLUE}[INFO]${NC} Stopping at Phase 2. Continue after manual configuration with:"
-                echo "./deploy_stacks.sh --phase 3 $([[ -n "$AWS_PROFILE" ]] && echo "--profile $AWS_PROFILE")"
-            fi
-        fi
-    fi
 else
     echo -e "${BLUE}[INFO]${NC} Stopping at Phase 1 as requested (--phase $MAX_PHASE)"
 fi
@@ -362,8 +528,13 @@ if [[ $MAX_PHASE -ge 3 ]]; then
     # Phase 3: Application Stack
     echo -e "${YELLOW}=== Phase 3: Application Layer ===${NC}"
     
-    # FSx前提条件チェック
-    check_fsx_prerequisites "AdWindowsFsxApplicationStack-$USER_NAME"
+    # FSx前提条件チェック（Domain Stackが前回から変更されておらず、Application Stackのデプロイ実績がある場合は委任済み）
+    if [[ "$DOMAIN_SKIPPED" == "true" ]] \
+        && python -m ad_windows_fsx.assembly_cache --cache-dir "$CACHE_DIR" deployed "AdWindowsFsxApplicationStack-$USER_NAME"; then
+        echo -e "${BLUE}[INFO]${NC} Skipping FSx permission delegation (Domain Stack unchanged, delegated before)"
+    else
+        check_fsx_prerequisites "AdWindowsFsxApplicationStack-$USER_NAME"
+    fi
     
     confirm_continue "Deploy FSx for Windows Server and Windows EC2 Stack."
     deploy_stack "AdWindowsFsxApplicationStack-$USER_NAME" "app_application.py" "Application Layer (Windows EC2, FSx)"
@@ -371,11 +542,23 @@ else
     echo -e "${BLUE}[INFO]${NC} Stopping at Phase $MAX_PHASE as requested"
 fi
 
+# 移行: 旧ルールを削除した後でSecurity Rules Stackを作成
+if [[ "$MIGRATE_RULES" == "true" ]]; then
+    if rules_stack_ready; then
+        echo -e "${YELLOW}=== Security Group Rules Migration ===${NC}"
+        deploy_stack "AdWindowsFsxSecurityRulesStack-$USER_NAME" "app_security_rules.py" "Security Group Rules"
+    else
+        echo -e "${YELLOW}[WARN]${NC} Security Rules Stack not created: existing stacks beyond Phase $MAX_PHASE still hold the old rules."
+        echo "  Run ./deploy_stacks.sh --phase 3 to complete the migration."
+    fi
+fi
+
 # 最終確認
 echo -e "${GREEN}=== Deployment Completed Successfully (Phase 1-$MAX_PHASE)! ===${NC}"
 echo ""
 echo "Deployed Stacks:"
 echo "1. Network Stack: AdWindowsFsxNetworkStack-$USER_NAME"
+echo "   Rules Stack:   AdWindowsFsxSecurityRulesStack-$USER_NAME"
 if [[ $MAX_PHASE -ge 2 ]]; then
     echo "2. Domain Stack:  AdWindowsFsxDomainStack-$USER_NAME"
 fi
@@ -393,32 +576,12 @@ if [[ $MAX_PHASE -eq 1 ]]; then
     echo "   ./deploy_stacks.sh --interactive $([[ -n "$AWS_PROFILE" ]] && echo "--profile $AWS_PROFILE") # Recommended"
 elif [[ $MAX_PHASE -eq 2 ]]; then
     echo -e "${BLUE}[Next Steps]${NC}"
-    echo -e "${RED}[IMPORTANT]${NC} Manual configuration required before FSx deployment:"
-    echo ""
-    echo "1. Verify AD DC full startup (wait 5-15 minutes):"
-    profile_opt=""
-    if [[ -n "$AWS_PROFILE" ]]; then
-        profile_opt="--profile $AWS_PROFILE"
-    fi
-    ad_instance_id=$(aws cloudformation describe-stacks $profile_opt \
-        --stack-name "AdWindowsFsxDomainStack-$USER_NAME" \
-        --query 'Stacks[0].Outputs[?OutputKey==`AdDcInstanceId`].OutputValue' \
-        --output text 2>/dev/null || echo "<Retrieval failed>")
-    echo "   aws ssm start-session --target $ad_instance_id $profile_opt"
-    echo ""
-    echo "2. Delegate permissions to 'fsxuser' account (Active Directory Users and Computers):"
-    echo "   Detailed steps: See '3. FSx Service Account Permissions' in README.md"
-    echo ""
-    echo "3. Execute FSx deployment after manual configuration:"
+    echo "1. Execute FSx deployment (AD readiness and fsxuser delegation are handled automatically):"
     echo "   ./deploy_stacks.sh --phase 3 $([[ -n "$AWS_PROFILE" ]] && echo "--profile $AWS_PROFILE")"
-    echo "   or"
-    echo "   ./deploy_stacks.sh --phase 3 --interactive $([[ -n "$AWS_PROFILE" ]] && echo "--profile $AWS_PROFILE") # Recommended"
 else
     echo -e "${BLUE}[Next Steps]${NC}"
-    echo "1. Verify AD DC domain creation completion (if needed)"
-    echo "2. Join Windows EC2 to domain (manual):"
-    echo "   Add-Computer -DomainName example.com -Credential (Get-Credential) -Restart"
-    echo "3. Mount FSx file system:"
+    echo "1. Windows EC2 joins the domain automatically (State Manager association, retried every 30 minutes)"
+    echo "2. Mount FSx file system:"
     echo "   net use Z: \\\\fs-<fsxid>.example.com\\share"
     echo ""
     echo -e "${GREEN}[COMPLETED]${NC} All stacks have been deployed successfully!"
@@ -0,0 +1,84 @@
+"""
+スタックテンプレートの共有フィクスチャ
+
+jsiiによる合成がテスト時間の大半を占めるため、同じスタック・同じパラメータの組み合わせは
+プロセス内で1回だけ合成し、スタックと Template を共有します（テスト側では変更しないこと）。
+pytest-xdist（python -m pytest -n auto）ではワーカープロセスごとに1回ずつ合成されます。
+
+ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit
+"""
+
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.ad_application_stack import AdApplicationStack
+from ad_windows_fsx.ad_domain_stack import AdDomainStack
+from ad_windows_fsx.ad_network_stack import AdNetworkStack
+from ad_windows_fsx.ad_security_rules_stack import AdSecurityRulesStack
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+STACKS = {
+    "network": AdNetworkStack,
+    "security-rules": AdSecurityRulesStack,
+    "ad-domain": AdDomainStack,
+    "application": AdApplicationStack,
+}
+
+Synthesized = namedtuple("Synthesized", ["stack", "template"])
+
+_cache = {}
+
+
+def synthesize(kind, **options):
+    """スタックを合成（同じ kind・options の組み合わせはキャッシュを返す）"""
+    key = (kind, json.dumps(options, sort_keys=True))
+    if key not in _cache:
+        # Template.from_stack はスタックごとに別のAppを必要とする
+        app = core.App()
+        stack = STACKS[kind](app, kind, **options)
+        _cache[key] = Synthesized(stack, assertions.Template.from_stack(stack))
+    return _cache[key]
+
+
+@pytest.fixture(scope="session")
+def synth():
+    """パラメータを指定して合成する関数（synth("network", nat_topology="per-az")）"""
+    return synthesize
+
+
+@pytest.fixture(scope="session")
+def network_template():
+    return synthesize("network").template
+
+
+@pytest.fixture(scope="session")
+def security_rules_template():
+    return synthesize("security-rules").template
+
+
+@pytest.fixture(scope="session")
+def domain_template():
+    return synthesize("ad-domain").template
+
+
+@pytest.fixture(scope="session")
+def application_template():
+    return synthesize("application").template
+
+
+@pytest.fixture(scope="session")
+def assert_golden():
+    """生成結果をゴールデンファイル（tests/unit/golden）と比較する関数"""
+    def check(name, rendered):
+        path = GOLDEN_DIR / name
+        if os.environ.get("UPDATE_GOLDEN"):
+            path.write_text(rendered, encoding="utf-8")
+        assert rendered == path.read_text(encoding="utf-8")
+    return check
@@ -0,0 +1,68 @@
+# AdDcSetup
+Start-Transcript -Path 'C:\Windows\Temp\ad-setup.log' -Append
+$StepLogPath = 'C:\Windows\Temp\ad-setup-steps.jsonl'
+function Write-StepLog {
+    param([string]$Step, [string]$Phase, [string]$Status = '', [long]$ElapsedMs = 0, [string]$Message = '')
+    $entry = [ordered]@{
+        timestamp = (Get-Date).ToUniversalTime().ToString('o')
+        script = 'AdDcSetup'
+        step = $Step
+        phase = $Phase
+        status = $Status
+        elapsed_ms = $ElapsedMs
+        message = $Message
+    }
+    $line = $entry | ConvertTo-Json -Compress
+    Add-Content -Path $StepLogPath -Value $line
+    Write-Host $line
+}
+
+# --- InstallWindowsFeatures ---
+# Active Directory Domain Services の機能をインストール
+Write-StepLog -Step 'InstallWindowsFeatures' -Phase 'start'
+$StepTimer = [System.Diagnostics.Stopwatch]::StartNew()
+try {
+    Write-Host "Installing Windows features: AD-Domain-Services, DNS"
+    $featureResult = Install-WindowsFeature -Name 'AD-Domain-Services','DNS' -IncludeManagementTools
+    if ($featureResult.Success) {
+        Write-Host "Windows feature installation (AD-Domain-Services, DNS): SUCCESS"
+    } else {
+        Write-Host "Windows feature installation (AD-Domain-Services, DNS): FAILED"
+        Write-Host "Exit Code: $($featureResult.ExitCode)"
+        throw "Install-WindowsFeature failed with exit code $($featureResult.ExitCode)"
+    }
+    Write-StepLog -Step 'InstallWindowsFeatures' -Phase 'end' -Status 'success' -ElapsedMs $StepTimer.ElapsedMilliseconds
+} catch {
+    Write-StepLog -Step 'InstallWindowsFeatures' -Phase 'end' -Status 'failed' -ElapsedMs $StepTimer.ElapsedMilliseconds -Message $_.Exception.Message
+}
+
+# --- CreateLocalUserFsxuser ---
+# 管理者用ユーザーを作成（フォレスト作成後はドメインユーザーになる）
+Write-StepLog -Step 'CreateLocalUserFsxuser' -Phase 'start'
+$StepTimer = [System.Diagnostics.Stopwatch]::StartNew()
+try {
+    net user fsxuser Password123! /add
+    net localgroup administrators fsxuser /add
+    net localgroup "Remote Desktop Users" fsxuser /add
+    Write-StepLog -Step 'CreateLocalUserFsxuser' -Phase 'end' -Status 'success' -ElapsedMs $StepTimer.ElapsedMilliseconds
+} catch {
+    Write-StepLog -Step 'CreateLocalUserFsxuser' -Phase 'end' -Status 'failed' -ElapsedMs $StepTimer.ElapsedMilliseconds -Message $_.Exception.Message
+}
+
+# --- InstallAdForest ---
+# 新しいフォレストとドメインを作成（完了後に自動再起動）
+Write-StepLog -Step 'InstallAdForest' -Phase 'start'
+$StepTimer = [System.Diagnostics.Stopwatch]::StartNew()
+try {
+    $DomainName = 'example.com'
+    $SafeModePassword = ConvertTo-SecureString 'Password123!' -AsPlainText -Force
+    Import-Module ADDSDeployment
+    Write-Host "Installing AD Forest: $DomainName"
+    Install-ADDSForest -DomainName $DomainName -SafeModeAdministratorPassword $SafeModePassword -DomainMode WinThreshold -ForestMode WinThreshold -InstallDns:$true -Force
+    Write-Host "AD Forest installation command executed - server will restart"
+    Write-StepLog -Step 'InstallAdForest' -Phase 'end' -Status 'success' -ElapsedMs $StepTimer.ElapsedMilliseconds
+} catch {
+    Write-StepLog -Step 'InstallAdForest' -Phase 'end' -Status 'failed' -ElapsedMs $StepTimer.ElapsedMilliseconds -Message $_.Exception.Message
+}
+
+Stop-Transcript
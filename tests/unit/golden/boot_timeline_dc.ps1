@@ -0,0 +1,75 @@
+$ErrorActionPreference = 'Stop'
+Import-Module AWSPowerShell -ErrorAction SilentlyContinue
+$LogGroupName = '{{ LogGroupName }}'
+$StepLogPath = '{{ StepLogPath }}'
+$StatePath = 'C:\ProgramData\BootTimeline\state.json'
+New-Item -ItemType Directory -Force -Path 'C:\ProgramData\BootTimeline' | Out-Null
+$Token = Invoke-RestMethod -Method Put -Uri 'http://169.254.169.254/latest/api/token' -Headers @{ 'X-aws-ec2-metadata-token-ttl-seconds' = '60' }
+function Get-Metadata([string]$Path) {
+    Invoke-RestMethod -Uri "http://169.254.169.254/latest/meta-data/$Path" -Headers @{ 'X-aws-ec2-metadata-token' = $Token }
+}
+$InstanceId = Get-Metadata 'instance-id'
+$Region = Get-Metadata 'placement/region'
+if (Test-Path $StatePath) {
+    $State = Get-Content -Path $StatePath -Raw | ConvertFrom-Json
+} else {
+    # 初回はインスタンスのセットアップ（sysprepの特殊化）以降のイベントのみ（AMI作成時のイベントを除外）
+    $InstallDate = (Get-CimInstance Win32_OperatingSystem).InstallDate.ToUniversalTime().AddMinutes(-10)
+    $State = [pscustomobject]@{ Lines = 0; EventsAfter = $InstallDate.ToString('o'); Identified = $false }
+}
+$Records = New-Object System.Collections.Generic.List[object]
+function Add-Record([datetime]$Time, [System.Collections.IDictionary]$Fields) {
+    $Time = $Time.ToUniversalTime()
+    $Fields['timestamp'] = $Time.ToString('o')
+    $Records.Add([pscustomobject]@{ Time = $Time; Message = ($Fields | ConvertTo-Json -Compress) })
+}
+if (-not $State.Identified) {
+    Add-Record (Get-Date) ([ordered]@{ script = 'Instance'; step = 'Instance'; phase = 'event'; ami_id = (Get-Metadata 'ami-id'); instance_type = (Get-Metadata 'instance-type') })
+}
+# ステップログ（前回までに送信した行は除く）
+$LineCount = [int]$State.Lines
+if (Test-Path $StepLogPath) {
+    $Lines = @(Get-Content -Path $StepLogPath | Where-Object { $_ })
+    foreach ($Line in ($Lines | Select-Object -Skip $LineCount)) {
+        $Records.Add([pscustomobject]@{ Time = ([datetime]($Line | ConvertFrom-Json).timestamp).ToUniversalTime(); Message = $Line })
+    }
+    $LineCount = $Lines.Count
+}
+# 起動・シャットダウン・再起動要求・Readyのイベント
+$EventsAfter = [datetime]$State.EventsAfter
+$Latest = $EventsAfter
+$Markers = @(
+    @{ Step = 'Boot'; LogName = 'System'; ProviderName = 'Microsoft-Windows-Kernel-General'; Id = @(12) },
+    @{ Step = 'Shutdown'; LogName = 'System'; ProviderName = 'Microsoft-Windows-Kernel-General'; Id = @(13) },
+    @{ Step = 'RestartRequested'; LogName = 'System'; ProviderName = 'User32'; Id = @(1074) },
+    @{ Step = 'Ready'; LogName = 'Active Directory Web Services'; ProviderName = 'ADWS'; Id = @(1200) }
+)
+foreach ($Marker in $Markers) {
+    $Filter = @{ LogName = $Marker.LogName; ProviderName = $Marker.ProviderName; Id = $Marker.Id; StartTime = $EventsAfter }
+    foreach ($WinEvent in @(Get-WinEvent -FilterHashtable $Filter -ErrorAction SilentlyContinue)) {
+        Add-Record $WinEvent.TimeCreated ([ordered]@{ script = 'System'; step = $Marker.Step; phase = 'event'; message = ("$($WinEvent.Message)" -split "`r?`n")[0] })
+        if ($WinEvent.TimeCreated -gt $Latest) { $Latest = $WinEvent.TimeCreated }
+    }
+}
+if ($Records.Count -gt 0) {
+    try {
+        New-CWLLogStream -LogGroupName $LogGroupName -LogStreamName $InstanceId -Region $Region
+    } catch {
+        if ("$($_.Exception.Message)" -notlike '*already exists*') { throw }
+    }
+    # PutLogEvents は時刻順のイベントを要求する
+    $Sorted = @($Records | Sort-Object Time)
+    for ($Index = 0; $Index -lt $Sorted.Count; $Index += 500) {
+        $Batch = $Sorted[$Index..([Math]::Min($Index + 499, $Sorted.Count - 1))] | ForEach-Object {
+            $LogEvent = New-Object Amazon.CloudWatchLogs.Model.InputLogEvent
+            $LogEvent.Timestamp = $_.Time
+            $LogEvent.Message = $_.Message
+            $LogEvent
+        }
+        Write-CWLLogEvent -LogGroupName $LogGroupName -LogStreamName $InstanceId -LogEvent $Batch -Region $Region | Out-Null
+    }
+}
+# StartTime は境界を含むため、最後のイベントの直後から次回の対象とする
+[pscustomobject]@{ Lines = $LineCount; EventsAfter = $Latest.ToUniversalTime().AddMilliseconds(1).ToString('o'); Identified = $true } |
+    ConvertTo-Json | Set-Content -Path $StatePath
+Write-Host "Shipped $($Records.Count) boot timeline records to $LogGroupName/$InstanceId"
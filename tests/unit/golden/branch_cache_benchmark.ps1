@@ -0,0 +1,51 @@
+$ErrorActionPreference = 'Stop'
+$Mode = [string](Get-BCStatus).ClientConfiguration.CurrentClientMode
+$Dir = "\\{{ FsxDnsName }}\share\branchcache-benchmark\$env:COMPUTERNAME"
+$Local = Join-Path $env:TEMP 'branchcache-benchmark'
+New-Item -ItemType Directory -Force -Path $Dir | Out-Null
+# どのキャッシュにも存在しない新しい内容のファイル
+$Name = "bench-$([guid]::NewGuid().ToString('N')).bin"
+$Buffer = New-Object byte[] (1MB)
+$Random = New-Object System.Random
+$Stream = [System.IO.File]::Create((Join-Path $Dir $Name))
+try {
+    for ($i = 0; $i -lt {{ FileSizeMb }}; $i++) { $Random.NextBytes($Buffer); $Stream.Write($Buffer, 0, $Buffer.Length) }
+} finally {
+    $Stream.Dispose()
+}
+# パフォーマンスカウンター（WMIのクラス名・プロパティ名はOSの言語に依存しない）
+function Get-Transfer {
+    $Counters = Get-CimInstance -ClassName Win32_PerfRawData_PeerDistSvc_BranchCache
+    $Network = (Get-NetAdapterStatistics | Measure-Object -Property ReceivedBytes -Sum).Sum
+    @{ Server = [long]$Counters.SMBBytesfromserver; Cache = [long]$Counters.SMBBytesfromcache; Network = [long]$Network }
+}
+function Measure-Read([string]$Phase) {
+    Remove-Item -Recurse -Force $Local -ErrorAction SilentlyContinue
+    $Before = Get-Transfer
+    $Timer = [System.Diagnostics.Stopwatch]::StartNew()
+    # /J: バッファーなしI/O（クライアントのファイルキャッシュから読み取らない）
+    robocopy $Dir $Local $Name /J /NJH /NJS /NP /R:0 | Out-Null
+    if ($LASTEXITCODE -ge 8) { throw "robocopy failed with exit code $LASTEXITCODE" }
+    $Seconds = $Timer.Elapsed.TotalSeconds
+    $After = Get-Transfer
+    [ordered]@{
+        seconds = [math]::Round($Seconds, 2)
+        bytes_from_server = $After.Server - $Before.Server
+        bytes_from_cache = $After.Cache - $Before.Cache
+        network_bytes = $After.Network - $Before.Network
+    }
+}
+try {
+    Clear-BCCache -Force
+    $Cold = Measure-Read 'cold'
+    if ($Mode -eq 'HostedCacheClient') {
+        # ホスト型キャッシュへの提供を待ち、ローカルキャッシュを消去してホスト型キャッシュからの取得を計測
+        Start-Sleep -Seconds {{ WaitSeconds }}
+        Clear-BCCache -Force
+    }
+    $Warm = Measure-Read 'warm'
+} finally {
+    Remove-Item -Force (Join-Path $Dir $Name) -ErrorAction SilentlyContinue
+    Remove-Item -Recurse -Force $Local -ErrorAction SilentlyContinue
+}
+[ordered]@{ mode = $Mode; file_mb = {{ FileSizeMb }}; cold = $Cold; warm = $Warm } | ConvertTo-Json -Compress
@@ -0,0 +1,28 @@
+$ErrorActionPreference = 'Stop'
+Import-Module GroupPolicy
+function Set-ManagedGpo([string]$Name, [string]$Target, [string[]]$ManagedKeys, [object[]]$Values) {
+    if (-not (Get-GPO -Name $Name -ErrorAction SilentlyContinue)) {
+        New-GPO -Name $Name -Comment 'Managed by AdWindowsFsx (branch-cache)' | Out-Null
+    }
+    # モード変更時に前の値が残らないよう、管理対象のキーを削除してから設定する
+    foreach ($Key in $ManagedKeys) {
+        Remove-GPRegistryValue -Name $Name -Key $Key -ErrorAction SilentlyContinue | Out-Null
+    }
+    foreach ($Value in $Values) {
+        Set-GPRegistryValue -Name $Name -Key $Value.Key -ValueName $Value.ValueName -Type $Value.Type -Value $Value.Value | Out-Null
+    }
+    if (-not ((Get-GPInheritance -Target $Target).GpoLinks | Where-Object { $_.DisplayName -eq $Name })) {
+        New-GPLink -Name $Name -Target $Target | Out-Null
+    }
+    Write-Host "GPO '$Name': $($Values.Count) values, linked to $Target"
+}
+Set-ManagedGpo -Name 'AdWindowsFsx BranchCache Clients' -Target 'DC=example,DC=com' -ManagedKeys @('HKLM\Software\Policies\Microsoft\PeerDist', 'HKLM\Software\Policies\Microsoft\Windows\NetCache') -Values @(
+    @{ Key = 'HKLM\Software\Policies\Microsoft\PeerDist\Service'; ValueName = 'Enable'; Type = 'DWord'; Value = 1 },
+    @{ Key = 'HKLM\Software\Policies\Microsoft\PeerDist\Service\Versioning'; ValueName = 'PreferredContentInformationVersion'; Type = 'DWord'; Value = 2 },
+    @{ Key = 'HKLM\Software\Policies\Microsoft\Windows\NetCache'; ValueName = 'PeerCachingLatencyThreshold'; Type = 'DWord'; Value = 0 },
+    @{ Key = 'HKLM\Software\Policies\Microsoft\PeerDist\HostedCache\Connection'; ValueName = 'Location'; Type = 'String'; Value = '{{ HostedCacheLocation }}' }
+)
+Set-ManagedGpo -Name 'AdWindowsFsx BranchCache Hash Publication' -Target 'OU=FSx,DC=example,DC=com' -ManagedKeys @('HKLM\Software\Policies\Microsoft\Windows\LanmanServer') -Values @(
+    @{ Key = 'HKLM\Software\Policies\Microsoft\Windows\LanmanServer'; ValueName = 'HashPublicationForPeerCaching'; Type = 'DWord'; Value = 0 },
+    @{ Key = 'HKLM\Software\Policies\Microsoft\Windows\LanmanServer'; ValueName = 'HashSupportVersion'; Type = 'DWord'; Value = 3 }
+)
@@ -0,0 +1,64 @@
+$ErrorActionPreference = 'Stop'
+if (-not (Get-WmiObject -Class Win32_ComputerSystem).PartOfDomain) {
+    Write-Host 'Not joined to the domain yet; shares will be applied on the next run'
+    exit 0
+}
+$Shares = @(
+    @{ Name = 'projects'; Path = 'D:\projects'; Description = 'Project files'; ContinuouslyAvailable = $false; FolderEnumerationMode = 'AccessBased'; EncryptData = $true; CachingMode = $null }
+    @{ Name = 'sql'; Path = 'D:\sql'; Description = ''; ContinuouslyAvailable = $true; FolderEnumerationMode = 'Unrestricted'; EncryptData = $false; CachingMode = 'None' }
+)
+$Endpoint = (Get-FSXFileSystem -FileSystemId '{{ FileSystemId }}' -Region '{{ Region }}').WindowsConfiguration.RemoteAdministrationEndpoint
+$Password = ConvertTo-SecureString 'Password123!' -AsPlainText -Force
+$Credential = New-Object System.Management.Automation.PSCredential('Administrator@example.com', $Password)
+$Session = New-PSSession -ComputerName $Endpoint -ConfigurationName FSxRemoteAdmin -Credential $Credential
+try {
+    $Current = @{}
+    foreach ($Existing in @(Invoke-Command -Session $Session -ScriptBlock { Get-FSxSmbShare })) {
+        $Current[$Existing.Name] = $Existing
+    }
+    $Summary = @{ created = 0; updated = 0; unchanged = 0; skipped = 0 }
+    foreach ($Share in $Shares) {
+        $Existing = $Current[$Share.Name]
+        # caching-mode 未指定: 既存の共有の値を維持（BranchCache等の他の設定と競合させない）
+        if ($null -eq $Share.CachingMode) {
+            $Share.CachingMode = if ($Existing) { "$($Existing.CachingMode)" } else { 'Manual' }
+        }
+        $Name = $Share.Name
+        $Path = $Share.Path
+        $Description = $Share.Description
+        $ContinuouslyAvailable = $Share.ContinuouslyAvailable
+        $FolderEnumerationMode = $Share.FolderEnumerationMode
+        $EncryptData = $Share.EncryptData
+        $CachingMode = $Share.CachingMode
+        if (-not $Existing) {
+            Invoke-Command -Session $Session -ScriptBlock {
+                New-FSxSmbShare -Name $using:Name -Path $using:Path -Description $using:Description -ContinuouslyAvailable $using:ContinuouslyAvailable -FolderEnumerationMode $using:FolderEnumerationMode -EncryptData $using:EncryptData -CachingMode $using:CachingMode -Credential $using:Credential
+            } | Out-Null
+            Write-Host "created    $Name ($Path)"
+            $Summary.created++
+            continue
+        }
+        if ($Existing.Path.TrimEnd('\') -ne $Path.TrimEnd('\')) {
+            Write-Host "skipped    $Name (existing path $($Existing.Path) differs from $Path; recreate the share to move it)"
+            $Summary.skipped++
+            continue
+        }
+        $Changes = @(foreach ($Setting in @('Description', 'ContinuouslyAvailable', 'FolderEnumerationMode', 'EncryptData', 'CachingMode')) {
+            if ("$($Existing.$Setting)" -ne "$($Share[$Setting])") {
+                "$Setting $($Existing.$Setting) -> $($Share[$Setting])"
+            }
+        })
+        if ($Changes.Count -eq 0) {
+            $Summary.unchanged++
+            continue
+        }
+        Invoke-Command -Session $Session -ScriptBlock {
+            Set-FSxSmbShare -Name $using:Name -Description $using:Description -ContinuouslyAvailable $using:ContinuouslyAvailable -FolderEnumerationMode $using:FolderEnumerationMode -EncryptData $using:EncryptData -CachingMode $using:CachingMode -Force
+        } | Out-Null
+        Write-Host "updated    $Name ($($Changes -join ', '))"
+        $Summary.updated++
+    }
+    Write-Host "Shares: $($Summary.created) created, $($Summary.updated) updated, $($Summary.unchanged) unchanged, $($Summary.skipped) skipped"
+} finally {
+    Remove-PSSession -Session $Session
+}
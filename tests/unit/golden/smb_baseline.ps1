@@ -0,0 +1,30 @@
+# SMB client profile: baseline (FSx deployment type: SINGLE_AZ_2)
+$Adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'} | Select-Object -First 1
+if (-not $Adapter) { throw "No ENA network adapter found" }
+$Failed = @()
+
+# SmbClient.SessionTimeout
+if ("$((Get-SmbClientConfiguration).SessionTimeout)" -ne '60') {
+    Set-SmbClientConfiguration -SessionTimeout 60 -Confirm:$false
+    Write-Host "Applied SmbClient.SessionTimeout = 60"
+}
+$Actual = "$((Get-SmbClientConfiguration).SessionTimeout)"
+if ($Actual -ne '60') {
+    $Failed += "SmbClient.SessionTimeout: expected 60, actual $Actual"
+}
+
+# SmbClient.EnableMultiChannel
+if ("$((Get-SmbClientConfiguration).EnableMultiChannel)" -ne 'True') {
+    Set-SmbClientConfiguration -EnableMultiChannel $true -Confirm:$false
+    Write-Host "Applied SmbClient.EnableMultiChannel = True"
+}
+$Actual = "$((Get-SmbClientConfiguration).EnableMultiChannel)"
+if ($Actual -ne 'True') {
+    $Failed += "SmbClient.EnableMultiChannel: expected True, actual $Actual"
+}
+
+if ($Failed.Count -gt 0) {
+    $Failed | ForEach-Object { Write-Host "VERIFY FAILED: $_" }
+    exit 1
+}
+Write-Host "SMB client profile baseline: verified"
@@ -0,0 +1,51 @@
+param([string]$FileSystemId, [string]$SharePath, [string]$Region)
+$ErrorActionPreference = 'Stop'
+Import-Module AWSPowerShell -ErrorAction SilentlyContinue
+$ProbeDir = Join-Path $SharePath "canary\$env:COMPUTERNAME"
+$Payload = New-Object byte[] (64 * 1KB)
+(New-Object System.Random).NextBytes($Payload)
+$Samples = New-Object System.Collections.Generic.List[object]
+$Errors = 0
+function Measure-Operation([string]$Operation, [scriptblock]$Action) {
+    $Stopwatch = [System.Diagnostics.Stopwatch]::StartNew()
+    try {
+        & $Action
+        $Samples.Add([pscustomobject]@{ Operation = $Operation; Milliseconds = $Stopwatch.Elapsed.TotalMilliseconds })
+    } catch {
+        $script:Errors++
+        Write-Warning "$Operation failed: $($_.Exception.Message)"
+    }
+}
+try {
+    New-Item -ItemType Directory -Force -Path $ProbeDir | Out-Null
+    $Files = 0..4 | ForEach-Object { Join-Path $ProbeDir "probe-$_.bin" }
+    foreach ($File in $Files) {
+        Measure-Operation 'Write' { [System.IO.File]::WriteAllBytes($File, $Payload) }
+        Measure-Operation 'Open' { [System.IO.File]::Open($File, 'Open', 'Read', 'Read').Dispose() }
+        Measure-Operation 'Read' { [void][System.IO.File]::ReadAllBytes($File) }
+        Measure-Operation 'List' { [void][System.IO.Directory]::GetFiles($ProbeDir) }
+    }
+    foreach ($File in $Files) {
+        Measure-Operation 'Delete' { [System.IO.File]::Delete($File) }
+    }
+} catch {
+    $Errors++
+    Write-Warning "Probe directory is not available: $($_.Exception.Message)"
+}
+function New-Datum([string]$Name, [double]$Value, [string]$Unit, [hashtable]$Dimensions) {
+    $Datum = New-Object Amazon.CloudWatch.Model.MetricDatum
+    $Datum.MetricName = $Name
+    $Datum.Value = $Value
+    $Datum.Unit = $Unit
+    $Datum.StorageResolution = 1
+    $Datum.TimestampUtc = [DateTime]::UtcNow
+    foreach ($Key in $Dimensions.Keys) {
+        $Datum.Dimensions.Add((New-Object Amazon.CloudWatch.Model.Dimension -Property @{ Name = $Key; Value = $Dimensions[$Key] }))
+    }
+    return $Datum
+}
+$Data = @($Samples | ForEach-Object {
+    New-Datum 'Latency' $_.Milliseconds 'Milliseconds' @{ FileSystemId = $FileSystemId; Operation = $_.Operation }
+})
+$Data += New-Datum 'Errors' $Errors 'Count' @{ FileSystemId = $FileSystemId }
+Write-CWMetricData -Namespace 'AdWindowsFsx/SmbCanary' -MetricData $Data -Region $Region
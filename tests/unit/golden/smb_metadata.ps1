@@ -0,0 +1,100 @@
+# SMB client profile: metadata (FSx deployment type: SINGLE_AZ_2)
+$Adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'} | Select-Object -First 1
+if (-not $Adapter) { throw "No ENA network adapter found" }
+$Failed = @()
+
+# SmbClient.SessionTimeout
+if ("$((Get-SmbClientConfiguration).SessionTimeout)" -ne '60') {
+    Set-SmbClientConfiguration -SessionTimeout 60 -Confirm:$false
+    Write-Host "Applied SmbClient.SessionTimeout = 60"
+}
+$Actual = "$((Get-SmbClientConfiguration).SessionTimeout)"
+if ($Actual -ne '60') {
+    $Failed += "SmbClient.SessionTimeout: expected 60, actual $Actual"
+}
+
+# SmbClient.DirectoryCacheEntriesMax
+if ("$((Get-SmbClientConfiguration).DirectoryCacheEntriesMax)" -ne '1024') {
+    Set-SmbClientConfiguration -DirectoryCacheEntriesMax 1024 -Confirm:$false
+    Write-Host "Applied SmbClient.DirectoryCacheEntriesMax = 1024"
+}
+$Actual = "$((Get-SmbClientConfiguration).DirectoryCacheEntriesMax)"
+if ($Actual -ne '1024') {
+    $Failed += "SmbClient.DirectoryCacheEntriesMax: expected 1024, actual $Actual"
+}
+
+# SmbClient.DirectoryCacheEntrySizeMax
+if ("$((Get-SmbClientConfiguration).DirectoryCacheEntrySizeMax)" -ne '262144') {
+    Set-SmbClientConfiguration -DirectoryCacheEntrySizeMax 262144 -Confirm:$false
+    Write-Host "Applied SmbClient.DirectoryCacheEntrySizeMax = 262144"
+}
+$Actual = "$((Get-SmbClientConfiguration).DirectoryCacheEntrySizeMax)"
+if ($Actual -ne '262144') {
+    $Failed += "SmbClient.DirectoryCacheEntrySizeMax: expected 262144, actual $Actual"
+}
+
+# SmbClient.DirectoryCacheLifetime
+if ("$((Get-SmbClientConfiguration).DirectoryCacheLifetime)" -ne '30') {
+    Set-SmbClientConfiguration -DirectoryCacheLifetime 30 -Confirm:$false
+    Write-Host "Applied SmbClient.DirectoryCacheLifetime = 30"
+}
+$Actual = "$((Get-SmbClientConfiguration).DirectoryCacheLifetime)"
+if ($Actual -ne '30') {
+    $Failed += "SmbClient.DirectoryCacheLifetime: expected 30, actual $Actual"
+}
+
+# SmbClient.FileInfoCacheEntriesMax
+if ("$((Get-SmbClientConfiguration).FileInfoCacheEntriesMax)" -ne '4096') {
+    Set-SmbClientConfiguration -FileInfoCacheEntriesMax 4096 -Confirm:$false
+    Write-Host "Applied SmbClient.FileInfoCacheEntriesMax = 4096"
+}
+$Actual = "$((Get-SmbClientConfiguration).FileInfoCacheEntriesMax)"
+if ($Actual -ne '4096') {
+    $Failed += "SmbClient.FileInfoCacheEntriesMax: expected 4096, actual $Actual"
+}
+
+# SmbClient.FileInfoCacheLifetime
+if ("$((Get-SmbClientConfiguration).FileInfoCacheLifetime)" -ne '30') {
+    Set-SmbClientConfiguration -FileInfoCacheLifetime 30 -Confirm:$false
+    Write-Host "Applied SmbClient.FileInfoCacheLifetime = 30"
+}
+$Actual = "$((Get-SmbClientConfiguration).FileInfoCacheLifetime)"
+if ($Actual -ne '30') {
+    $Failed += "SmbClient.FileInfoCacheLifetime: expected 30, actual $Actual"
+}
+
+# SmbClient.FileNotFoundCacheEntriesMax
+if ("$((Get-SmbClientConfiguration).FileNotFoundCacheEntriesMax)" -ne '2048') {
+    Set-SmbClientConfiguration -FileNotFoundCacheEntriesMax 2048 -Confirm:$false
+    Write-Host "Applied SmbClient.FileNotFoundCacheEntriesMax = 2048"
+}
+$Actual = "$((Get-SmbClientConfiguration).FileNotFoundCacheEntriesMax)"
+if ($Actual -ne '2048') {
+    $Failed += "SmbClient.FileNotFoundCacheEntriesMax: expected 2048, actual $Actual"
+}
+
+# Adapter.Rss
+if ("$((Get-NetAdapterRss -Name $Adapter.Name).Enabled)" -ne 'True') {
+    Enable-NetAdapterRss -Name $Adapter.Name
+    Write-Host "Applied Adapter.Rss = True"
+}
+$Actual = "$((Get-NetAdapterRss -Name $Adapter.Name).Enabled)"
+if ($Actual -ne 'True') {
+    $Failed += "Adapter.Rss: expected True, actual $Actual"
+}
+
+# SmbClient.EnableMultiChannel
+if ("$((Get-SmbClientConfiguration).EnableMultiChannel)" -ne 'True') {
+    Set-SmbClientConfiguration -EnableMultiChannel $true -Confirm:$false
+    Write-Host "Applied SmbClient.EnableMultiChannel = True"
+}
+$Actual = "$((Get-SmbClientConfiguration).EnableMultiChannel)"
+if ($Actual -ne 'True') {
+    $Failed += "SmbClient.EnableMultiChannel: expected True, actual $Actual"
+}
+
+if ($Failed.Count -gt 0) {
+    $Failed | ForEach-Object { Write-Host "VERIFY FAILED: $_" }
+    exit 1
+}
+Write-Host "SMB client profile metadata: verified"
@@ -0,0 +1,70 @@
+# SMB client profile: throughput (FSx deployment type: SINGLE_AZ_2)
+$Adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'} | Select-Object -First 1
+if (-not $Adapter) { throw "No ENA network adapter found" }
+$Failed = @()
+
+# SmbClient.SessionTimeout
+if ("$((Get-SmbClientConfiguration).SessionTimeout)" -ne '60') {
+    Set-SmbClientConfiguration -SessionTimeout 60 -Confirm:$false
+    Write-Host "Applied SmbClient.SessionTimeout = 60"
+}
+$Actual = "$((Get-SmbClientConfiguration).SessionTimeout)"
+if ($Actual -ne '60') {
+    $Failed += "SmbClient.SessionTimeout: expected 60, actual $Actual"
+}
+
+# SmbClient.EnableLargeMtu
+if ("$((Get-SmbClientConfiguration).EnableLargeMtu)" -ne 'True') {
+    Set-SmbClientConfiguration -EnableLargeMtu $true -Confirm:$false
+    Write-Host "Applied SmbClient.EnableLargeMtu = True"
+}
+$Actual = "$((Get-SmbClientConfiguration).EnableLargeMtu)"
+if ($Actual -ne 'True') {
+    $Failed += "SmbClient.EnableLargeMtu: expected True, actual $Actual"
+}
+
+# Adapter.JumboPacket
+if ("$((Get-NetAdapterAdvancedProperty -Name $Adapter.Name -DisplayName 'Jumbo Packet').DisplayValue)" -ne '9015') {
+    Set-NetAdapterAdvancedProperty -Name $Adapter.Name -DisplayName 'Jumbo Packet' -DisplayValue '9015'
+    Write-Host "Applied Adapter.JumboPacket = 9015"
+}
+$Actual = "$((Get-NetAdapterAdvancedProperty -Name $Adapter.Name -DisplayName 'Jumbo Packet').DisplayValue)"
+if ($Actual -ne '9015') {
+    $Failed += "Adapter.JumboPacket: expected 9015, actual $Actual"
+}
+
+# Adapter.Rss
+if ("$((Get-NetAdapterRss -Name $Adapter.Name).Enabled)" -ne 'True') {
+    Enable-NetAdapterRss -Name $Adapter.Name
+    Write-Host "Applied Adapter.Rss = True"
+}
+$Actual = "$((Get-NetAdapterRss -Name $Adapter.Name).Enabled)"
+if ($Actual -ne 'True') {
+    $Failed += "Adapter.Rss: expected True, actual $Actual"
+}
+
+# SmbClient.EnableMultiChannel
+if ("$((Get-SmbClientConfiguration).EnableMultiChannel)" -ne 'True') {
+    Set-SmbClientConfiguration -EnableMultiChannel $true -Confirm:$false
+    Write-Host "Applied SmbClient.EnableMultiChannel = True"
+}
+$Actual = "$((Get-SmbClientConfiguration).EnableMultiChannel)"
+if ($Actual -ne 'True') {
+    $Failed += "SmbClient.EnableMultiChannel: expected True, actual $Actual"
+}
+
+# SmbClient.ConnectionCountPerRssNetworkInterface
+if ("$((Get-SmbClientConfiguration).ConnectionCountPerRssNetworkInterface)" -ne '8') {
+    Set-SmbClientConfiguration -ConnectionCountPerRssNetworkInterface 8 -Confirm:$false
+    Write-Host "Applied SmbClient.ConnectionCountPerRssNetworkInterface = 8"
+}
+$Actual = "$((Get-SmbClientConfiguration).ConnectionCountPerRssNetworkInterface)"
+if ($Actual -ne '8') {
+    $Failed += "SmbClient.ConnectionCountPerRssNetworkInterface: expected 8, actual $Actual"
+}
+
+if ($Failed.Count -gt 0) {
+    $Failed | ForEach-Object { Write-Host "VERIFY FAILED: $_" }
+    exit 1
+}
+Write-Host "SMB client profile throughput: verified"
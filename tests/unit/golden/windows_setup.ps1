@@ -0,0 +1,52 @@
+$AdDcIp = '${AdDcPrivateIp}'
+# WindowsSetup
+Start-Transcript -Path 'C:\Windows\Temp\windows-setup.log' -Append
+$StepLogPath = 'C:\Windows\Temp\windows-setup-steps.jsonl'
+function Write-StepLog {
+    param([string]$Step, [string]$Phase, [string]$Status = '', [long]$ElapsedMs = 0, [string]$Message = '')
+    $entry = [ordered]@{
+        timestamp = (Get-Date).ToUniversalTime().ToString('o')
+        script = 'WindowsSetup'
+        step = $Step
+        phase = $Phase
+        status = $Status
+        elapsed_ms = $ElapsedMs
+        message = $Message
+    }
+    $line = $entry | ConvertTo-Json -Compress
+    Add-Content -Path $StepLogPath -Value $line
+    Write-Host $line
+}
+
+# --- CreateLocalUserWinuser ---
+# 一般ユーザーを作成
+Write-StepLog -Step 'CreateLocalUserWinuser' -Phase 'start'
+$StepTimer = [System.Diagnostics.Stopwatch]::StartNew()
+try {
+    net user winuser Password123! /add
+    net localgroup administrators winuser /add
+    net localgroup "Remote Desktop Users" winuser /add
+    Write-StepLog -Step 'CreateLocalUserWinuser' -Phase 'end' -Status 'success' -ElapsedMs $StepTimer.ElapsedMilliseconds
+} catch {
+    Write-StepLog -Step 'CreateLocalUserWinuser' -Phase 'end' -Status 'failed' -ElapsedMs $StepTimer.ElapsedMilliseconds -Message $_.Exception.Message
+}
+
+# --- SetDnsServer ---
+# DNS設定をAD DCに変更
+Write-StepLog -Step 'SetDnsServer' -Phase 'start'
+$StepTimer = [System.Diagnostics.Stopwatch]::StartNew()
+try {
+    Write-Host "Setting DNS server to AD DC: $AdDcIp"
+    $adapter = Get-NetAdapter | Where-Object {$_.Status -eq 'Up' -and $_.InterfaceDescription -like '*Elastic*'}
+    if (-not $adapter) {
+        throw "No suitable network adapter found"
+    }
+    Set-DnsClientServerAddress -InterfaceIndex $adapter.InterfaceIndex -ServerAddresses $AdDcIp
+    Write-Host "DNS server set successfully to: $AdDcIp"
+    Get-DnsClientServerAddress -AddressFamily IPv4
+    Write-StepLog -Step 'SetDnsServer' -Phase 'end' -Status 'success' -ElapsedMs $StepTimer.ElapsedMilliseconds
+} catch {
+    Write-StepLog -Step 'SetDnsServer' -Phase 'end' -Status 'failed' -ElapsedMs $StepTimer.ElapsedMilliseconds -Message $_.Exception.Message
+}
+
+Stop-Transcript
@@ -0,0 +1,115 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.ad_network_stack import AdNetworkStack
+
+# Network StackのVPCエンドポイント構成のテスト
+
+
+def endpoint_services(template):
+    """VPCエンドポイントのサービス名（region部分を除いた末尾）を種類別に返す"""
+    services = {}
+    for resource in template.find_resources("AWS::EC2::VPCEndpoint").values():
+        props = resource["Properties"]
+        name = props["ServiceName"]
+        if isinstance(name, dict):
+            name = "".join(part if isinstance(part, str) else "" for part in name["Fn::Join"][1])
+        services[name.rsplit(".", 1)[-1]] = props
+    return services
+
+
+def test_default_endpoints(network_template):
+    services = endpoint_services(network_template)
+
+    assert set(services) == {"ssm", "ssmmessages", "ec2", "s3"}
+    assert services["s3"]["VpcEndpointType"] == "Gateway"
+
+
+def test_s3_gateway_endpoint_on_both_private_route_tables(synth):
+    stack, template = synth("network")
+    s3 = endpoint_services(template)["s3"]
+
+    private_route_tables = [
+        stack.resolve(subnet.route_table.route_table_id) for subnet in stack.vpc.private_subnets
+    ]
+    assert len(private_route_tables) == 2
+    assert s3["RouteTableIds"] == private_route_tables
+
+
+def test_optional_interface_endpoints(synth):
+    template = synth("network", interface_endpoints=["logs", "monitoring", "kms", "secretsmanager", "fsx"]).template
+    services = endpoint_services(template)
+
+    assert {"logs", "monitoring", "kms", "secretsmanager", "fsx"} <= set(services)
+    for name in ["logs", "monitoring", "kms", "secretsmanager", "fsx"]:
+        assert services[name]["VpcEndpointType"] == "Interface"
+        assert services[name]["PrivateDnsEnabled"] is True
+
+
+def test_unknown_interface_endpoint_is_rejected():
+    app = core.App()
+    with pytest.raises(ValueError):
+        AdNetworkStack(app, "network", interface_endpoints=["dynamodb"])
+
+
+@pytest.mark.parametrize("topology,gateways,instances", [
+    ("single", 1, 0),
+    ("per-az", 2, 0),
+    ("instance", 0, 1),
+])
+def test_nat_topology(synth, topology, gateways, instances):
+    template = synth("network", nat_topology=topology).template
+
+    template.resource_count_is("AWS::EC2::NatGateway", gateways)
+    template.resource_count_is("AWS::EC2::Instance", instances)
+    template.has_output("EgressPaths", {})
+
+
+def test_nat_instance_accepts_only_vpc_traffic(synth):
+    template = synth("network", nat_topology="instance").template
+
+    template.has_resource_properties("AWS::EC2::SecurityGroup", {
+        "GroupDescription": "Security Group for NAT instances",
+        "SecurityGroupIngress": [{
+            "CidrIp": {"Fn::GetAtt": [assertions.Match.string_like_regexp("AdWindowsFsxVpc"), "CidrBlock"]},
+            "IpProtocol": "-1"
+        }]
+    })
+
+
+def test_unknown_nat_topology_is_rejected():
+    app = core.App()
+    with pytest.raises(ValueError):
+        AdNetworkStack(app, "network", nat_topology="none")
+
+
+def test_dns_forwarding_creates_resolver_endpoint_and_dhcp_options(synth):
+    template = synth("network", dns_forwarding=True).template
+
+    template.has_resource_properties("AWS::Route53Resolver::ResolverEndpoint", {
+        "Direction": "OUTBOUND",
+        "IpAddresses": assertions.Match.array_with([assertions.Match.object_like({})])
+    })
+    template.has_resource_properties("AWS::EC2::DHCPOptions", {
+        "DomainName": "example.com",
+        "DomainNameServers": ["AmazonProvidedDNS"]
+    })
+    template.resource_count_is("AWS::EC2::VPCDHCPOptionsAssociation", 1)
+    template.has_output("ResolverEndpointId", {"Export": {"Name": "AdWindowsFsx-ResolverEndpointId"}})
+
+
+def test_dns_forwarding_disabled_by_default(network_template):
+    network_template.resource_count_is("AWS::Route53Resolver::ResolverEndpoint", 0)
+    network_template.resource_count_is("AWS::EC2::DHCPOptions", 0)
+
+
+def test_flow_logs_use_custom_format(synth):
+    template = synth("network", flow_logs=True).template
+
+    template.has_resource_properties("AWS::EC2::FlowLog", {
+        "LogDestinationType": "s3",
+        "TrafficType": "ALL",
+        "LogFormat": assertions.Match.string_like_regexp(r"\$\{pkt-srcaddr\} \$\{pkt-dstaddr\}.*\$\{tcp-flags\}")
+    })
+    template.has_output("FlowLogBucketName", {})
@@ -0,0 +1,41 @@
+import aws_cdk.assertions as assertions
+
+# セキュリティグループルールがSecurity Rules Stackに集約されていることを確認するテスト
+
+
+def test_security_rules_stack_contains_only_rules(security_rules_template):
+    # ルール以外のリソース（インスタンス、FSxなど）を含まないこと
+    resource_types = {r["Type"] for r in security_rules_template.to_json()["Resources"].values()}
+    assert resource_types == {
+        "AWS::EC2::SecurityGroupIngress",
+        "AWS::EC2::SecurityGroupEgress",
+    }
+
+    # FSx→AD（Kerberos Password Change）のルールが含まれること
+    security_rules_template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "IpProtocol": "tcp",
+        "FromPort": 464,
+        "ToPort": 464,
+        "Description": "Kerberos Password Change - FSx to AD (TCP)"
+    })
+
+
+def test_domain_stack_has_no_security_rules(domain_template):
+    domain_template.resource_count_is("AWS::EC2::SecurityGroupIngress", 0)
+    domain_template.resource_count_is("AWS::EC2::SecurityGroupEgress", 0)
+    domain_template.resource_count_is("AWS::EC2::Instance", 1)
+
+
+def test_domain_stack_forwards_ad_domain_to_dc(synth):
+    template = synth("ad-domain", dns_forwarding=True).template
+
+    template.has_resource_properties("AWS::Route53Resolver::ResolverRule", {
+        "DomainName": "example.com",
+        "RuleType": "FORWARD",
+        "ResolverEndpointId": {"Fn::ImportValue": "AdWindowsFsx-ResolverEndpointId"},
+        "TargetIps": [{
+            "Ip": {"Fn::GetAtt": [assertions.Match.string_like_regexp("AdDcInstance"), "PrivateIp"]},
+            "Port": "53"
+        }]
+    })
+    template.resource_count_is("AWS::Route53Resolver::ResolverRuleAssociation", 1)
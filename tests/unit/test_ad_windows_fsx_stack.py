@@ -1,51 +1,64 @@
-import aws_cdk as core
-import aws_cdk.assertions as assertions
+import json
 
-from ad_windows_fsx.ad_windows_fsx_stack import AdWindowsFsxStack
+import pytest
 
-# サンプルテスト。
-# これを実行するには、プロジェクトのルートディレクトリから `python -m pytest` を実行してください
+# 分割後の各スタック（Network / Security Rules / Domain / Application）のテンプレートテスト
+# テンプレートは conftest.py のセッションスコープのフィクスチャで1回だけ合成されます。
+# スナップショットを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_ad_windows_fsx_stack.py
 
-def test_vpc_created():
-    app = core.App()
-    stack = AdWindowsFsxStack(app, "ad-windows-fsx")
-    template = assertions.Template.from_stack(stack)
+# スナップショットを取る構成（名前, スタック, パラメータ）
+SNAPSHOT_VARIANTS = [
+    ("network", "network", {}),
+    ("network-production", "network", {"nat_topology": "per-az", "dns_forwarding": True, "flow_logs": True}),
+    ("security-rules", "security-rules", {}),
+    ("ad-domain", "ad-domain", {}),
+    ("application", "application", {}),
+    ("application-fleet", "application", {
+        "fsx_deployment_type": "MULTI_AZ_1",
+        "fsx_throughput_capacity": 512,
+        "client_fleet_max_size": 4,
+    }),
+]
 
+
+def test_vpc_created(network_template):
     # VPCが作成されることを確認
-    template.has_resource_properties("AWS::EC2::VPC", {
+    network_template.has_resource_properties("AWS::EC2::VPC", {
         "CidrBlock": "10.0.0.0/16"
     })
 
-def test_ec2_instances_created():
-    app = core.App()
-    stack = AdWindowsFsxStack(app, "ad-windows-fsx")
-    template = assertions.Template.from_stack(stack)
 
-    # AD DCとWindows EC2インスタンスが作成されることを確認
-    template.resource_count_is("AWS::EC2::Instance", 2)
+def test_ec2_instances_created(domain_template, application_template):
+    # AD DCとWindows EC2インスタンスがそれぞれのスタックに作成されることを確認
+    domain_template.resource_count_is("AWS::EC2::Instance", 1)
+    application_template.resource_count_is("AWS::EC2::Instance", 1)
 
-def test_fsx_file_system_created():
-    app = core.App()
-    stack = AdWindowsFsxStack(app, "ad-windows-fsx")
-    template = assertions.Template.from_stack(stack)
 
+def test_fsx_file_system_created(application_template):
     # FSx File Systemが作成されることを確認
-    template.has_resource_properties("AWS::FSx::FileSystem", {
+    application_template.has_resource_properties("AWS::FSx::FileSystem", {
         "FileSystemType": "WINDOWS"
     })
 
-def test_security_groups_created():
-    app = core.App()
-    stack = AdWindowsFsxStack(app, "ad-windows-fsx")
-    template = assertions.Template.from_stack(stack)
 
-    # セキュリティグループが適切に作成されることを確認（3つ：AD、Windows、FSx）
-    template.resource_count_is("AWS::EC2::SecurityGroup", 3)
+def test_security_groups_created(network_template):
+    # AD、Windows、FSxのセキュリティグループと、インターフェースエンドポイント（SSM、SSM Messages、EC2 API）ごとに作成されるもの
+    network_template.resource_count_is("AWS::EC2::SecurityGroup", 6)
+
+
+def test_vpc_endpoints_created(network_template):
+    # VPCエンドポイントが作成されることを確認（インターフェース: SSM、SSM Messages、EC2 API、ゲートウェイ: S3）
+    network_template.resource_count_is("AWS::EC2::VPCEndpoint", 4)
+
+
+def test_security_rules_stack_has_no_groups(security_rules_template):
+    # セキュリティグループ本体はNetwork Stackにのみ作成される
+    security_rules_template.resource_count_is("AWS::EC2::SecurityGroup", 0)
+
 
-def test_vpc_endpoints_created():
-    app = core.App()
-    stack = AdWindowsFsxStack(app, "ad-windows-fsx")
-    template = assertions.Template.from_stack(stack)
+@pytest.mark.parametrize("name, kind, options", SNAPSHOT_VARIANTS, ids=[v[0] for v in SNAPSHOT_VARIANTS])
+def test_template_matches_snapshot(synth, assert_golden, name, kind, options):
+    template = synth(kind, **options).template
 
-    # VPCエンドポイントが作成されることを確認（SSM、SSM Messages）
-    template.resource_count_is("AWS::EC2::VPCEndpoint", 2)
\ No newline at end of file
+    rendered = json.dumps(template.to_json(), indent=1, sort_keys=True, ensure_ascii=False) + "\n"
+    assert_golden(f"{name}.template.json", rendered)
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+from ad_windows_fsx.assembly_cache import AssemblyCache, cache_key, imported_exports, key_inputs, resolve_stack
+from ad_windows_fsx.stack_graph import stack_sources
+
+# クラウドアセンブリのキャッシュのテスト
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+VERSIONS = {"python": "3.11", "aws-cdk-lib": "2.202.0"}
+
+
+def _copy_sources(tmp_path):
+    for name in os.listdir(ROOT):
+        if name.startswith("app_") or name == "cdk.json":
+            shutil.copy(os.path.join(ROOT, name), tmp_path / name)
+    shutil.copytree(os.path.join(ROOT, "ad_windows_fsx"), tmp_path / "ad_windows_fsx",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    return str(tmp_path)
+
+
+def _keys(root, exports=None):
+    return {stack: cache_key(key_inputs(root, stack, exports, versions=VERSIONS)) for stack in stack_sources(root)}
+
+
+def test_only_dependent_stack_keys_change(tmp_path):
+    root = _copy_sources(tmp_path)
+    before = _keys(root)
+
+    with open(os.path.join(root, "ad_windows_fsx", "client_fleet.py"), "a", encoding="utf-8") as f:
+        f.write("\n# changed\n")
+    after = _keys(root)
+
+    assert [stack for stack in before if before[stack] != after[stack]] == ["application"]
+
+
+def test_upstream_export_values_are_part_of_the_key():
+    files = stack_sources(ROOT)["domain"]
+    assert "AdWindowsFsx-VpcId" in imported_exports(ROOT, files)
+    assert "AdWindowsFsx-AdDcPrivateIp" not in imported_exports(ROOT, files)
+
+    def key(vpc_id):
+        exports = {"Exports": [{"Name": "AdWindowsFsx-VpcId", "Value": vpc_id}]}
+        return cache_key(key_inputs(ROOT, "domain", exports, versions=VERSIONS))
+
+    assert key("vpc-1") == key("vpc-1")
+    assert key("vpc-1") != key("vpc-2")
+
+
+def test_resolve_stack_accepts_entry_points():
+    assert resolve_stack("app_domain.py") == "domain"
+    assert resolve_stack("security-rules") == "security-rules"
+
+
+def test_prune_keeps_deployed_assemblies(tmp_path):
+    cache = AssemblyCache(str(tmp_path), max_mb=1)
+    for index, key in enumerate(["deployed", "old", "new"]):
+        path = tmp_path / "assemblies" / key
+        path.mkdir(parents=True)
+        (path / "manifest.json").write_bytes(b"0" * 400 * 1024)
+        os.utime(path, (index, index))
+    cache.record("AdWindowsFsxDomainStack-test", "deployed")
+
+    assert cache.prune() == ["old"]
+    assert cache.lookup("deployed") and cache.lookup("new")
+    assert cache.lookup("old") is None
+    assert cache.deployed_key("AdWindowsFsxDomainStack-test") == "deployed"
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import aws_cdk.assertions as assertions
+
+from ad_windows_fsx.boot_timeline import (
+    DOMAIN_CONTROLLER_READY, boot_timeline_document, build_timelines, compare, format_comparison,
+    format_timeline, load_records
+)
+
+# 起動タイムラインの収集・分析のテスト
+# ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_boot_timeline.py
+
+LAUNCH = datetime(2026, 10, 1, 0, 0, tzinfo=timezone.utc)
+
+
+def _dc_events(instance, instance_type, forest_seconds):
+    """AD DCの起動（フォレスト作成中の再起動を含む）を filter-log-events の形式で生成"""
+
+    def event(seconds, **fields):
+        fields["timestamp"] = (LAUNCH + timedelta(seconds=seconds)).isoformat().replace("+00:00", "Z")
+        return {"logStreamName": instance, "message": json.dumps(fields)}
+
+    def step(name, start, end, status="success"):
+        return [
+            event(start, script="AdDcSetup", step=name, phase="start"),
+            event(end, script="AdDcSetup", step=name, phase="end", status=status),
+        ]
+
+    events = [
+        event(0, script="System", step="Boot", phase="event"),
+        event(5, script="Instance", step="Instance", phase="event",
+              ami_id="ami-0aaaaaaaaaaaaaaaa", instance_type=instance_type),
+        *step("InstallWindowsFeatures", 90, 290),
+        *step("CreateLocalUserFsxuser", 290, 292),
+        event(292, script="AdDcSetup", step="InstallAdForest", phase="start"),
+        # Install-ADDSForest が再起動するため InstallAdForest の終了ログは出力されない
+        event(292 + forest_seconds, script="System", step="RestartRequested", phase="event"),
+        event(300 + forest_seconds, script="System", step="Shutdown", phase="event"),
+        event(360 + forest_seconds, script="System", step="Boot", phase="event"),
+        event(600 + forest_seconds, script="System", step="Ready", phase="event"),
+        event(9000, script="System", step="Ready", phase="event"),
+    ]
+    return events
+
+
+def _write_events(tmp_path, *instances):
+    path = tmp_path / "events.json"
+    path.write_text(json.dumps({"events": [e for events in instances for e in events]}), encoding="utf-8")
+    return path
+
+
+def test_shipping_document_matches_golden(assert_golden):
+    commands = boot_timeline_document(DOMAIN_CONTROLLER_READY)["mainSteps"][0]["inputs"]["runCommand"]
+    assert_golden("boot_timeline_dc.ps1", "\n".join(commands) + "\n")
+
+
+def test_timeline_spans_the_forest_restart(tmp_path):
+    path = _write_events(tmp_path, _dc_events("i-0123", "t3.medium", 600))
+
+    (timeline,) = build_timelines(load_records(path))
+
+    assert (timeline.role, timeline.instance_type, timeline.ready) == ("AdDcSetup", "t3.medium", 1200)
+    spans = {span.label: (span.start, span.end - span.start, span.status) for span in timeline.spans}
+    assert spans["InstallWindowsFeatures"] == (90, 200, "success")
+    assert spans["InstallAdForest"] == (292, 608, "interrupted")
+    assert spans["Boot#1 -> InstallWindowsFeatures"] == (0, 90, "")
+    assert spans["Shutdown -> Boot#2"] == (900, 60, "")
+    assert spans["Boot#2 -> Ready"] == (960, 240, "")
+    assert "ready 20:00" in format_timeline(timeline)
+
+
+def test_compare_by_instance_type_reports_medians_and_delta(tmp_path):
+    path = _write_events(
+        tmp_path,
+        _dc_events("i-small1", "t3.medium", 600),
+        _dc_events("i-small2", "t3.medium", 700),
+        _dc_events("i-large", "m6i.large", 300),
+    )
+
+    comparison = compare(build_timelines(load_records(path)), by="instance-type")
+
+    names, rows = comparison["AdDcSetup"]
+    assert names == ["m6i.large (n=1)", "t3.medium (n=2)"]
+    values = dict(rows)
+    assert values["InstallAdForest"] == {"m6i.large (n=1)": 308, "t3.medium (n=2)": 658}
+    assert values["TimeToReady"] == {"m6i.large (n=1)": 900, "t3.medium (n=2)": 1250}
+    assert "TimeToReady" in format_comparison(comparison).splitlines()[-1]
+    assert format_comparison(comparison).splitlines()[-1].endswith("5:50")
+
+
+def test_step_log_files_are_accepted(tmp_path):
+    path = tmp_path / "i-local.jsonl"
+    path.write_text("\n".join(json.dumps(json.loads(e["message"])) for e in _dc_events("x", "t3.medium", 600)[:4]),
+                    encoding="utf-8")
+
+    (timeline,) = build_timelines(load_records(path))
+
+    assert timeline.instance == "i-local"
+    assert timeline.ready is None
+
+
+def test_stacks_ship_boot_timelines(synth):
+    for kind in ("ad-domain", "application"):
+        template = synth(kind).template
+        template.has_resource_properties("AWS::Logs::LogGroup", {"RetentionInDays": 30})
+        template.has_resource_properties("AWS::SSM::Association", {
+            "ScheduleExpression": "rate(30 minutes)",
+            "Parameters": assertions.Match.object_like({"StepLogPath": assertions.Match.any_value()}),
+        })
+
+    synth("ad-domain", boot_timeline=False).template.resource_count_is("AWS::Logs::LogGroup", 0)
@@ -0,0 +1,82 @@
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.branch_cache import (
+    benchmark_commands, client_policy, format_report, group_policy_commands, parse_invocations
+)
+
+# BranchCacheのテスト
+# ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_branch_cache.py
+
+
+def test_group_policy_matches_golden(assert_golden):
+    commands = group_policy_commands("hosted", "DC=example,DC=com", "OU=FSx,DC=example,DC=com")
+    assert_golden("branch_cache_gpo_hosted.ps1", "\n".join(commands) + "\n")
+
+
+def test_benchmark_matches_golden(assert_golden):
+    assert_golden("branch_cache_benchmark.ps1", "\n".join(benchmark_commands()) + "\n")
+
+
+def test_client_policy_per_mode():
+    distributed = {(v.key.rsplit("\\", 1)[-1], v.name): v.value for v in client_policy("distributed")}
+    hosted = {(v.key.rsplit("\\", 1)[-1], v.name): v.value for v in client_policy("hosted")}
+
+    assert distributed[("NetCache", "PeerCachingLatencyThreshold")] == 0
+    assert distributed[("CooperativeCaching", "Enable")] == 1
+    assert ("Connection", "Location") not in distributed
+    assert hosted[("Connection", "Location")] == "{{ HostedCacheLocation }}"
+    with pytest.raises(ValueError):
+        client_policy("peer")
+
+
+def test_hosted_mode_adds_cache_server_and_benchmark(synth):
+    template = synth("application", branch_cache="hosted").template
+
+    template.resource_count_is("AWS::EC2::Instance", 2)
+    template.has_resource_properties("AWS::SSM::Association", {
+        "Targets": [{"Key": "InstanceIds", "Values": [{"Fn::ImportValue": "AdWindowsFsx-AdDcInstanceId"}]}],
+        "Parameters": {"HostedCacheLocation": [
+            {"Fn::GetAtt": [assertions.Match.string_like_regexp("BranchCacheHostedServer"), "PrivateIp"]}
+        ]},
+    })
+    template.has_resource_properties("AWS::SSM::Document", {
+        "Name": "application-BranchCacheBenchmark",
+        "Content": assertions.Match.object_like({"parameters": assertions.Match.object_like({
+            "FileSizeMb": {"type": "String", "description": "Size of the test file (MB)", "default": "512"},
+        })}),
+    })
+    synth("application").template.resource_count_is("AWS::EC2::Instance", 1)
+
+
+def test_security_rules_allow_retrieval_and_remote_admin(synth):
+    template = synth("security-rules", branch_cache="distributed").template
+
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {"FromPort": 80, "ToPort": 80})
+    template.has_resource_properties("AWS::EC2::SecurityGroupEgress", {"FromPort": 5985, "ToPort": 5985})
+    assert not synth("security-rules").template.find_resources(
+        "AWS::EC2::SecurityGroupIngress", {"Properties": {"FromPort": 5985}}
+    )
+
+
+def test_report_compares_cold_and_warm_origin_bytes():
+    mib = 1024 * 1024
+    output = json.dumps({
+        "mode": "HostedCacheClient", "file_mb": 512,
+        "cold": {"seconds": 6.1, "bytes_from_server": 512 * mib, "bytes_from_cache": 0, "network_bytes": 530 * mib},
+        "warm": {"seconds": 2.4, "bytes_from_server": 2 * mib, "bytes_from_cache": 510 * mib,
+                 "network_bytes": 515 * mib},
+    })
+    data = {"CommandInvocations": [{
+        "InstanceId": "i-0123",
+        "CommandPlugins": [{"Name": "BranchCacheBenchmark", "Output": f"Creating test file\n{output}\n"}],
+    }]}
+
+    (result,) = parse_invocations(data)
+
+    assert round(result.reduction, 3) == round(1 - 2 / 512, 3)
+    assert format_report([result]).splitlines()[1].split() == [
+        "i-0123", "HostedCacheClient", "512", "512.0", "2.0", "510.0", "6.1", "2.4", "100%"
+    ]
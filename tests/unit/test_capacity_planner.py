@@ -0,0 +1,58 @@
+import json
+
+from ad_windows_fsx.capacity_planner import load_workload, main, plan
+
+# キャパシティプランナーのテスト
+
+
+def test_small_workload_uses_minimum_tier():
+    result = plan(load_workload({"working_set_gb": 10, "peak_mbps": 5, "peak_iops": 50}))
+
+    assert result.shards == 1
+    assert result.context["fsx-deployment-type"] == "SINGLE_AZ_2"
+    assert result.context["fsx-throughput-capacity"] == 32
+    assert result.context["fsx-storage-capacity"] == 32
+    assert result.context["fsx-ssd-iops"] is None
+
+
+def test_recommendation_keeps_headroom():
+    result = plan(load_workload({
+        "active_users": 300, "working_set_gb": 800, "read_ratio": 0.8,
+        "peak_mbps": 400, "peak_iops": 12000, "highly_available": True,
+    }))
+
+    assert result.context["fsx-deployment-type"] == "MULTI_AZ_1"
+    assert result.context["dc-instance-type"] == "m6i.large"
+    assert result.context["smb-client-profile"] == "throughput"
+    # 自動プロビジョニング（3 IOPS/GiB）では不足するためSSD IOPSを指定
+    assert result.context["fsx-ssd-iops"] >= 12000
+    for item in result.headroom:
+        assert item.demand <= item.capacity, item
+
+
+def test_oversized_workload_is_sharded():
+    result = plan(load_workload({"working_set_gb": 200000, "peak_mbps": 50000, "peak_iops": 900000}))
+
+    assert result.shards > 1
+    assert any("split into" in note for note in result.notes)
+
+
+def test_main_prints_context_block(tmp_path, capsys):
+    spec = tmp_path / "workload.json"
+    spec.write_text(json.dumps({"working_set_gb": 100, "peak_mbps": 20, "peak_iops": 300}))
+
+    assert main([str(spec), "--peak-mbps", "60"]) == 0
+    output = capsys.readouterr().out
+    context = json.loads(output.split("cdk.json context:")[1])
+    assert context["fsx-throughput-capacity"] == 128
+    assert "fsx-ssd-iops" not in context
+
+
+def test_ssd_iops_context_sets_user_provisioned_iops(synth):
+    template = synth("application", fsx_ssd_iops=15000).template
+
+    template.has_resource_properties("AWS::FSx::FileSystem", {
+        "WindowsConfiguration": {
+            "DiskIopsConfiguration": {"Mode": "USER_PROVISIONED", "Iops": 15000}
+        }
+    })
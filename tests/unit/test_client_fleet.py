@@ -0,0 +1,76 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.ad_application_stack import AdApplicationStack
+from ad_windows_fsx.client_fleet import fleet_readiness_document, smb_validation_commands
+
+# ウォームプール付きクライアントフリートのテスト
+
+
+def _steps(document):
+    return {step["name"]: step for step in document["mainSteps"]}
+
+
+def test_resumed_instance_only_validates_smb():
+    document = fleet_readiness_document(
+        "example.com", "fs.example.com", "10.0.2.10", "JoinDoc", "ConfigDoc", "arn:aws:iam::123456789012:role/automation"
+    )
+    steps = _steps(document)
+
+    choice = steps["CheckOrigin"]["inputs"]["Choices"][0]
+    assert (choice["StringEquals"], choice["NextStep"]) == ("WarmPool", "ValidateSmb")
+    assert steps["CheckOrigin"]["inputs"]["Default"] == "JoinDomain"
+    assert steps["JoinDomain"]["inputs"]["DocumentName"] == "JoinDoc"
+    assert steps["ApplyConfig"]["inputs"]["DocumentName"] == "ConfigDoc"
+    # 検証失敗時はABANDONで置き換え
+    assert steps["ValidateSmb"]["onFailure"] == "step:AbandonLaunch"
+    assert steps["AbandonLaunch"]["inputs"]["LifecycleActionResult"] == "ABANDON"
+    assert steps["CompleteLaunch"]["inputs"]["LifecycleActionResult"] == "CONTINUE"
+
+
+def test_smb_validation_checks_secure_channel_and_share():
+    commands = "\n".join(smb_validation_commands("example.com", "fs.example.com"))
+
+    assert "Test-ComputerSecureChannel" in commands
+    assert "-Port 445" in commands
+    assert "Get-ChildItem -Path '\\\\fs.example.com\\share'" in commands
+
+
+def test_fleet_is_disabled_by_default(application_template):
+    application_template.resource_count_is("AWS::AutoScaling::AutoScalingGroup", 0)
+
+
+def test_fleet_uses_hibernated_warm_pool_and_launch_hook(synth):
+    template = synth("application", client_fleet_max_size=4, client_warm_pool_size=2).template
+
+    template.has_resource_properties("AWS::AutoScaling::AutoScalingGroup", {"MinSize": "0", "MaxSize": "4"})
+    template.has_resource_properties("AWS::AutoScaling::WarmPool", {
+        "MinSize": 2,
+        "PoolState": "Hibernated",
+        "InstanceReusePolicy": {"ReuseOnScaleIn": True}
+    })
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": assertions.Match.object_like({
+            "HibernationOptions": {"Configured": True},
+            "BlockDeviceMappings": [assertions.Match.object_like({
+                "Ebs": assertions.Match.object_like({"Encrypted": True})
+            })]
+        })
+    })
+    template.has_resource_properties("AWS::AutoScaling::LifecycleHook", {
+        "LifecycleTransition": "autoscaling:EC2_INSTANCE_LAUNCHING",
+        "DefaultResult": "ABANDON"
+    })
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": assertions.Match.object_like({
+            "detail-type": ["EC2 Instance-launch Lifecycle Action"]
+        })
+    })
+    template.has_resource_properties("AWS::SSM::Document", {"DocumentType": "Automation"})
+
+
+def test_unknown_pool_state_is_rejected():
+    app = core.App()
+    with pytest.raises(ValueError):
+        AdApplicationStack(app, "application", client_fleet_max_size=2, client_warm_pool_state="Frozen")
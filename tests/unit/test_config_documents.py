@@ -0,0 +1,61 @@
+from ad_windows_fsx import config_documents
+
+# State Manager用構成ドキュメント生成のテスト
+
+
+def test_client_document_structure():
+    document = config_documents.windows_client_document()
+
+    assert document["schemaVersion"] == "2.2"
+    assert document["parameters"] == {
+        "AdDcIp": {"type": "String", "description": "AD Domain Controller private IP address"}
+    }
+    step_names = [step["name"] for step in document["mainSteps"]]
+    assert step_names == [
+        "EnableRemoteDesktop",
+        "SetTimeZone",
+        "ConfigureSsmAgent",
+        "CheckWindowsUpdateService",
+        "CheckConnectivity",
+        "ConfigureSmbClient",
+    ]
+    assert all(step["action"] == "aws:runPowerShellScript" for step in document["mainSteps"])
+
+
+def test_connectivity_check_uses_document_parameter():
+    step = config_documents.connectivity_check_step("Check", [("{{ AdDcIp }}", 389, "AD DC")])
+    commands = step["inputs"]["runCommand"]
+
+    assert "    $result = Test-NetConnection -ComputerName '{{ AdDcIp }}' -Port 389 -WarningAction SilentlyContinue" in commands
+    assert "        Write-Host \"AD DC connectivity: SUCCESS\"" in commands
+
+
+def test_time_zone_change_changes_hash():
+    tokyo = config_documents.domain_controller_document()
+    utc = config_documents.domain_controller_document(time_zone="UTC")
+
+    assert config_documents.document_hash(tokyo) == config_documents.document_hash(
+        config_documents.domain_controller_document()
+    )
+    assert config_documents.document_hash(tokyo) != config_documents.document_hash(utc)
+
+
+def test_domain_stack_associates_config_document(domain_template):
+    document = config_documents.domain_controller_document()
+
+    domain_template.has_resource_properties("AWS::SSM::Document", {
+        "DocumentType": "Command",
+        "Name": "ad-domain-AdDcConfig",
+        "UpdateMethod": "NewVersion",
+        "Content": document
+    })
+    domain_template.has_resource_properties("AWS::SSM::Association", {
+        "AssociationName": f"ad-domain-AdDcConfig-{config_documents.document_hash(document)}",
+        "DocumentVersion": "$LATEST"
+    })
+
+    # ブートストラップ以外の設定はユーザーデータに含まれないこと
+    instance = domain_template.find_resources("AWS::EC2::Instance")
+    user_data = str(list(instance.values())[0]["Properties"]["UserData"])
+    assert "tzutil" not in user_data
+    assert "Install-ADDSForest" in user_data
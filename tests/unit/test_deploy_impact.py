@@ -0,0 +1,132 @@
+import copy
+import json
+from pathlib import Path
+
+from ad_windows_fsx.deploy_impact import (
+    IN_PLACE, INTERRUPTION, NO_OP, REPLACEMENT, blocking_changes, classify, estimate_duration, record_timings,
+    resolve_parameters, ssm_parameter_names, stack_operation_timings
+)
+
+# デプロイ前の置き換え影響・所要時間の予測のテスト
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+
+def _load(name):
+    return json.loads((GOLDEN_DIR / name).read_text(encoding="utf-8"))
+
+
+def _resource(template, resource_type):
+    return next(k for k, v in template["Resources"].items() if v["Type"] == resource_type)
+
+
+def _actions(changes):
+    return {c.logical_id: c.action for c in changes if c.action != NO_OP}
+
+
+def test_unchanged_template_is_no_op():
+    template = _load("application.template.json")
+
+    changes = classify(template, copy.deepcopy(template))
+
+    assert _actions(changes) == {}
+    assert estimate_duration(changes, template) == (0, [])
+
+
+def test_fsx_deployment_type_change_replaces_file_system():
+    old = _load("application.template.json")
+    new = copy.deepcopy(old)
+    new["Resources"]["FsxFileSystem"]["Properties"]["WindowsConfiguration"]["DeploymentType"] = "MULTI_AZ_1"
+    new["Resources"]["FsxFileSystem"]["Properties"]["WindowsConfiguration"]["ThroughputCapacity"] = 32
+
+    changes = classify(old, new)
+
+    assert _actions(changes) == {"FsxFileSystem": REPLACEMENT}
+    assert [c.logical_id for c in blocking_changes(changes)] == ["FsxFileSystem"]
+    # 作成30分 + 旧ファイルシステムの削除15分（既定値）
+    assert estimate_duration(changes, new) == (2700, ["FsxFileSystem"])
+
+
+def test_user_data_and_instance_type_changes_interrupt_the_dc():
+    old = _load("ad-domain.template.json")
+    new = copy.deepcopy(old)
+    dc = _resource(new, "AWS::EC2::Instance")
+    new["Resources"][dc]["Properties"]["UserData"] = {"Fn::Base64": "<powershell>Write-Host changed</powershell>"}
+    new["Resources"][dc]["Properties"]["InstanceType"] = "m6i.large"
+
+    changes = classify(old, new)
+
+    assert _actions(changes) == {dc: INTERRUPTION}
+    assert blocking_changes(changes) == []
+
+
+def test_new_windows_ami_replaces_the_dc():
+    old = _load("ad-domain.template.json")
+    new = copy.deepcopy(old)
+    (parameter,) = [name for name in ssm_parameter_names(new) if name.startswith("SsmParameterValue")]
+
+    changes = classify(resolve_parameters(old, {parameter: "ami-0aaaaaaaaaaaaaaaa"}),
+                       resolve_parameters(new, {parameter: "ami-0bbbbbbbbbbbbbbbb"}))
+
+    dc = _resource(new, "AWS::EC2::Instance")
+    assert _actions(changes) == {dc: REPLACEMENT}
+    assert [c.properties for c in blocking_changes(changes)] == [["ImageId"]]
+
+
+def test_block_device_change_replaces_the_dc():
+    old = _load("ad-domain.template.json")
+    dc = _resource(old, "AWS::EC2::Instance")
+    old["Resources"][dc]["Properties"]["BlockDeviceMappings"] = [
+        {"DeviceName": "/dev/sda1", "Ebs": {"VolumeSize": 50, "VolumeType": "gp3", "DeleteOnTermination": True}}
+    ]
+    resized = copy.deepcopy(old)
+    resized["Resources"][dc]["Properties"]["BlockDeviceMappings"][0]["Ebs"]["VolumeSize"] = 100
+    retained = copy.deepcopy(old)
+    retained["Resources"][dc]["Properties"]["BlockDeviceMappings"][0]["Ebs"]["DeleteOnTermination"] = False
+
+    changes = classify(old, resized)
+
+    assert _actions(changes) == {dc: REPLACEMENT}
+    assert [c.properties for c in blocking_changes(changes)] == [["BlockDeviceMappings"]]
+    # DeleteOnTermination のみの変更は中断なしの更新
+    assert [c.action for c in classify(old, retained) if c.logical_id == dc] == [IN_PLACE]
+
+
+def test_logical_id_change_is_reported_as_replacement():
+    old = {"Resources": {"AdDcInstanceE944E2FB": {
+        "Type": "AWS::EC2::Instance", "Metadata": {"aws:cdk:path": "Domain/AdDcInstance/Resource"}
+    }}}
+    new = {"Resources": {"AdDcInstance0123ABCD": {
+        "Type": "AWS::EC2::Instance", "Metadata": {"aws:cdk:path": "Domain/AdDcInstance/Resource"}
+    }}}
+
+    changes = classify(old, new)
+
+    assert _actions(changes) == {"AdDcInstanceE944E2FB": REPLACEMENT}
+    assert changes[0].properties == ["LogicalId -> AdDcInstance0123ABCD"]
+    assert blocking_changes(changes) == changes
+
+
+def test_history_from_stack_events_drives_the_estimate():
+    events = {"StackEvents": [
+        # describe-stack-events は新しい順
+        {"LogicalResourceId": "FsxFileSystem", "ResourceType": "AWS::FSx::FileSystem",
+         "ResourceStatus": "UPDATE_COMPLETE", "Timestamp": "2026-05-01T10:40:00+00:00"},
+        {"LogicalResourceId": "FsxFileSystem", "ResourceType": "AWS::FSx::FileSystem",
+         "ResourceStatus": "UPDATE_IN_PROGRESS", "Timestamp": "2026-05-01T10:00:00+00:00"},
+        {"LogicalResourceId": "Stack", "ResourceType": "AWS::CloudFormation::Stack",
+         "ResourceStatus": "UPDATE_IN_PROGRESS", "Timestamp": "2026-05-01T09:59:00+00:00"},
+        # 前回の操作は対象外
+        {"LogicalResourceId": "FsxFileSystem", "ResourceType": "AWS::FSx::FileSystem",
+         "ResourceStatus": "CREATE_COMPLETE", "Timestamp": "2026-04-01T10:30:00+00:00"},
+    ]}
+    history = record_timings({}, stack_operation_timings(events))
+    assert history == {"AWS::FSx::FileSystem": {"update": [2400.0]}}
+
+    old = _load("application.template.json")
+    new = copy.deepcopy(old)
+    new["Resources"]["FsxFileSystem"]["Properties"]["WindowsConfiguration"]["ThroughputCapacity"] = 16
+    changes = classify(old, new)
+
+    assert _actions(changes) == {"FsxFileSystem": INTERRUPTION}
+    assert estimate_duration(changes, new, history)[0] == 2400
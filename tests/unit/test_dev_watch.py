@@ -0,0 +1,85 @@
+import os
+
+from ad_windows_fsx import dev_watch
+from ad_windows_fsx.dev_watch import StackWatcher, reload_order, template_diff
+from ad_windows_fsx.fsx_restore import context_key
+from ad_windows_fsx.stack_graph import affected_stacks, import_graph, stack_sources
+
+# ウォッチモード（スタック単位の再合成）のテスト
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+def test_stack_sources_follow_imports():
+    sources = stack_sources(ROOT)
+
+    assert "ad_windows_fsx/ad_domain_stack.py" in sources["domain"]
+    assert "ad_windows_fsx/ad_application_stack.py" not in sources["domain"]
+    assert "ad_windows_fsx/client_fleet.py" in sources["application"]
+    assert all("cdk.json" in files and "cdk.context.json" in files for files in sources.values())
+
+
+def test_only_affected_stack_is_rebuilt():
+    sources = stack_sources(ROOT)
+
+    assert affected_stacks(["ad_windows_fsx/ad_domain_stack.py"], sources) == ["domain"]
+    assert affected_stacks(["cdk.json"], sources) == ["network", "security-rules", "domain", "application"]
+    assert affected_stacks(["cdk.context.json"], sources) == ["network", "security-rules", "domain", "application"]
+    assert affected_stacks(["README.md"], sources) == []
+
+
+def test_reload_order_puts_dependencies_first():
+    graph = import_graph(ROOT)
+    order = reload_order(graph, ["ad_windows_fsx.client_fleet"])
+
+    assert order.index("ad_windows_fsx.client_fleet") < order.index("ad_windows_fsx.ad_application_stack")
+    assert order.index("ad_windows_fsx.ad_application_stack") < order.index("app_application")
+    assert "app_domain" not in order
+
+
+def test_template_diff_reports_changed_lines():
+    old = {"Resources": {
+        "Dc": {"Type": "AWS::EC2::Instance", "Properties": {"InstanceType": "t3.medium"}},
+        "Old": {"Type": "AWS::SSM::Document"},
+    }}
+    new = {"Resources": {
+        "Dc": {"Type": "AWS::EC2::Instance", "Properties": {"InstanceType": "m5.large"}},
+        "New": {"Type": "AWS::SSM::Document"},
+    }}
+
+    lines = template_diff(old, new)
+
+    assert "~ Resources.Dc (AWS::EC2::Instance)" in lines
+    assert '    -    "InstanceType": "t3.medium"' in lines
+    assert '    +    "InstanceType": "m5.large"' in lines
+    assert "+ Resources.New (AWS::SSM::Document)" in lines
+    assert "- Resources.Old (AWS::SSM::Document)" in lines
+    assert template_diff(new, new) == []
+
+
+def test_watcher_rebuilds_only_changed_stack():
+    watcher = StackWatcher(ROOT, ["security-rules", "domain"])
+    watcher.synth("security-rules")
+    watcher.synth("domain")
+
+    results = watcher.rebuild(["ad_windows_fsx/ad_domain_stack.py"])
+
+    assert [(key, lines) for key, lines, _ in results] == [("domain", [])]
+
+
+def test_watcher_reloads_context_lookups(monkeypatch):
+    # fsx-backup-id "latest" は cdk.context.json にキャッシュしたバックアップで合成する
+    watcher = StackWatcher(ROOT, ["application"])
+    lookups = {
+        "fsx-backup-id": "latest",
+        "fsx-restore-source": "alice",
+        context_key("alice"): {"BackupId": "backup-0123456789abcdef0", "StorageCapacity": 32},
+    }
+    monkeypatch.setattr(dev_watch, "load_context", lambda root: {**watcher.context, **lookups})
+
+    results = watcher.rebuild(["cdk.context.json"])
+
+    assert [key for key, _, _ in results] == ["application"]
+    assert "! synth failed:" not in results[0][1]
+    (fsx,) = [r for r in watcher.templates["application"]["Resources"].values() if r["Type"] == "AWS::FSx::FileSystem"]
+    assert fsx["Properties"]["BackupId"] == "backup-0123456789abcdef0"
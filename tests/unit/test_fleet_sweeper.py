@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timezone
+
+from ad_windows_fsx.fleet_sweeper import format_table, sweep
+
+# 全ユーザー環境のスイープのテスト（ローカルのフェイクCloudFormationを使用）
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+class FakeCloudFormation:
+    """CloudFormationのフェイク（ドリフト検出は数回のポーリング後に完了する）"""
+
+    def __init__(self, stacks, drifts=None, polls=2):
+        self.stacks = stacks
+        self.drifts = drifts or {}
+        self.polls = polls
+        self.detections = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _enter(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+
+    async def list_stacks(self):
+        await self._enter()
+        return [
+            {"StackName": name, "StackStatus": status, "CreationTime": "2026-01-01T00:00:00Z",
+             "LastUpdatedTime": updated}
+            for name, (status, updated) in self.stacks.items()
+        ]
+
+    async def detect_stack_drift(self, stack_name):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        detection_id = f"detection-{stack_name}"
+        self.detections[detection_id] = [stack_name, self.polls]
+        return detection_id
+
+    async def describe_stack_drift_detection_status(self, detection_id):
+        await asyncio.sleep(0)
+        state = self.detections[detection_id]
+        state[1] -= 1
+        if state[1] > 0:
+            return {"DetectionStatus": "DETECTION_IN_PROGRESS"}
+        self.in_flight -= 1
+        drifted = bool(self.drifts.get(state[0]))
+        return {"DetectionStatus": "DETECTION_COMPLETE", "StackDriftStatus": "DRIFTED" if drifted else "IN_SYNC"}
+
+    async def describe_stack_resource_drifts(self, stack_name):
+        await self._enter()
+        return self.drifts.get(stack_name, [])
+
+
+def _environment(user, updated="2026-09-30T00:00:00Z", status="UPDATE_COMPLETE"):
+    return {
+        f"AdWindowsFsx{layer}Stack-{user}": (status, updated)
+        for layer in ("Network", "SecurityRules", "Domain", "Application")
+    }
+
+
+def test_sweep_reports_drift_failures_and_idle_environments():
+    stacks = {
+        **_environment("alice"),
+        **_environment("bob", updated="2026-08-01T00:00:00Z"),
+        "AdWindowsFsxApplicationStack-carol": ("UPDATE_ROLLBACK_FAILED", "2026-09-30T00:00:00Z"),
+        "UnrelatedStack": ("CREATE_COMPLETE", "2026-09-30T00:00:00Z"),
+    }
+    drifts = {"AdWindowsFsxSecurityRulesStack-alice": [{
+        "LogicalResourceId": "AdFromWindows", "ResourceType": "AWS::EC2::SecurityGroupIngress",
+        "StackResourceDriftStatus": "MODIFIED",
+        "PropertyDifferences": [{"PropertyPath": "/FromPort"}, {"PropertyPath": "/ToPort"}],
+    }]}
+    client = FakeCloudFormation(stacks, drifts)
+
+    found, findings = asyncio.run(sweep(client, concurrency=3, now=NOW, poll_interval=0))
+
+    assert len(found) == 9
+    assert [(f.user, f.kind, f.detail) for f in findings] == [
+        ("alice", "drift", "MODIFIED: /FromPort, /ToPort"),
+        ("bob", "idle", "no updates for 61 days (last 2026-08-01)"),
+        ("carol", "failed", "UPDATE_ROLLBACK_FAILED"),
+    ]
+    assert "AdFromWindows (AWS::EC2::SecurityGroupIngress)" in format_table(found, findings)
+
+
+def test_drift_detection_is_bounded():
+    stacks = {**_environment("alice"), **_environment("bob"), **_environment("dave")}
+    client = FakeCloudFormation(stacks, polls=3)
+
+    found, findings = asyncio.run(sweep(client, concurrency=2, now=NOW, poll_interval=0))
+
+    assert findings == []
+    assert client.max_in_flight == 2
+    assert format_table(found, findings).endswith("All stacks are in sync")
+
+
+def test_sweep_can_be_limited_to_users():
+    client = FakeCloudFormation({**_environment("alice"), **_environment("bob")})
+
+    found, _ = asyncio.run(sweep(client, users=["bob"], now=NOW, poll_interval=0))
+
+    assert {stack.user for stack in found} == {"bob"}
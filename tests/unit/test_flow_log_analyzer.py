@@ -0,0 +1,91 @@
+import gzip
+import shutil
+import tracemalloc
+from pathlib import Path
+
+from ad_windows_fsx.flow_log_analyzer import (
+    FLOW_LOG_FIELDS,
+    Stats,
+    aggregate,
+    analyze,
+    classify,
+    parse_records,
+)
+
+# VPCフローログ解析のテスト
+
+SAMPLE = Path(__file__).parent / "data" / "flow-log-sample.log"
+
+ROLES = {
+    "10.0.2.10": "ad",
+    "10.0.2.20": "client",
+    "10.0.3.30": "fsx",
+}
+
+
+def test_sample_file_is_aggregated_by_role_and_service():
+    totals = analyze([str(SAMPLE)], ROLES)
+
+    assert totals[("fsx", "SMB")] == Stats(bytes=2580060, packets=321, records=3, rejects=1)
+    assert totals[("ad", "LDAP")] == Stats(bytes=1500, packets=10, records=1, rejects=0)
+    assert totals[("ad", "Kerberos")] == Stats(bytes=400, packets=2, records=1, rejects=0)
+    assert totals[("ad", "RPC")] == Stats(bytes=7000, packets=14, records=2, rejects=0)
+    # 464（送信元のエフェメラルポートはRPC扱いしない）とNODATA行は集計対象外
+    assert set(totals) == {("fsx", "SMB"), ("ad", "LDAP"), ("ad", "Kerberos"), ("ad", "RPC")}
+
+
+def test_flow_logged_at_both_enis_is_counted_once():
+    header = " ".join(FLOW_LOG_FIELDS)
+    flow = "10.0.2.20 10.0.3.30 10.0.2.20 10.0.3.30 50123 445 6 10 1500 1700000000 1700000060 REJECT 2"
+    lines = [
+        header,
+        f"5 eni-client {flow} egress OK",
+        f"5 eni-fsx {flow} ingress OK",
+    ]
+
+    totals = aggregate(classify(parse_records(lines), ROLES))
+
+    assert totals == {("fsx", "SMB"): Stats(bytes=1500, packets=10, records=1, rejects=1)}
+
+
+def test_gzip_files_and_unknown_roles(tmp_path):
+    compressed = tmp_path / "sample.log.gz"
+    with open(SAMPLE, "rb") as src, gzip.open(compressed, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    totals = analyze([str(compressed)])
+
+    assert totals[("other", "SMB")].rejects == 1
+
+
+def test_header_defines_column_order():
+    lines = [
+        "version srcaddr dstaddr srcport dstport protocol packets bytes action interface-id",
+        "5 10.0.2.20 10.0.3.30 50000 445 6 4 800 ACCEPT eni-1",
+    ]
+
+    records = list(parse_records(lines))
+
+    assert records[0].dstport == 445
+    assert records[0].bytes == 800
+    assert records[0].interface_id == "eni-1"
+
+
+def test_streaming_uses_constant_memory():
+    line = " ".join([
+        "5", "eni-fsx", "10.0.2.20", "10.0.3.30", "10.0.2.20", "10.0.3.30",
+        "50123", "445", "6", "10", "1500", "1700000000", "1700000060", "ACCEPT", "2", "ingress", "OK",
+    ])
+    assert len(line.split()) == len(FLOW_LOG_FIELDS)
+
+    def lines(count):
+        for _ in range(count):
+            yield line
+
+    tracemalloc.start()
+    totals = aggregate(classify(parse_records(lines(200000)), ROLES))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert totals[("fsx", "SMB")].records == 200000
+    assert peak < 1024 * 1024
@@ -0,0 +1,84 @@
+from ad_windows_fsx import fsx_delegation
+from ad_windows_fsx.config_documents import domain_join_document
+
+# FSxサービスアカウントへの権限委任（ACE生成）のテスト
+
+
+def test_delegation_covers_required_permissions():
+    aces = {ace.description: ace for ace in fsx_delegation.delegation_aces()}
+
+    create_delete = aces["Create and delete computer objects"]
+    assert create_delete.rights == "CreateChild, DeleteChild"
+    assert create_delete.object_type == fsx_delegation.COMPUTER_OBJECT_GUID
+
+    # OU配下のコンピューターオブジェクトにのみ継承される権限
+    for description, object_type in [
+        ("Reset password", fsx_delegation.RESET_PASSWORD_GUID),
+        ("Read and write Account Restrictions", fsx_delegation.ACCOUNT_RESTRICTIONS_GUID),
+        ("Validated write to DNS host name", fsx_delegation.VALIDATED_DNS_HOST_NAME_GUID),
+        ("Validated write to service principal name", fsx_delegation.VALIDATED_SPN_GUID),
+    ]:
+        ace = aces[description]
+        assert ace.object_type == object_type
+        assert ace.inheritance == "Descendents"
+        assert ace.inherited_object_type == fsx_delegation.COMPUTER_OBJECT_GUID
+
+
+def test_distinguished_names():
+    assert fsx_delegation.domain_distinguished_name("corp.example.com") == "DC=corp,DC=example,DC=com"
+    assert fsx_delegation.ou_distinguished_name("example.com") == "OU=FSx,DC=example,DC=com"
+
+
+def test_delegation_script_is_idempotent_and_targets_ou():
+    lines = fsx_delegation.render_delegation_script("example.com", service_account="svc-fsx")
+
+    assert "$OuDn = 'OU=FSx,DC=example,DC=com'" in lines
+    assert "$Account = Get-ADUser -Identity 'svc-fsx'" in lines
+    assert sum(1 for line in lines if line.startswith("Add-DelegationAce ")) == 5
+    # 既存ACEがある場合はSet-Aclを実行しない
+    assert lines[-4:-1] == [
+        "if ($Added -gt 0) {",
+        "    Set-Acl -Path \"AD:\\$OuDn\" -AclObject $Acl",
+        "}",
+    ]
+
+
+def test_delegation_script_defaults_to_computers_container_without_ou():
+    lines = fsx_delegation.render_delegation_script("example.com", ou_name=None)
+
+    assert "$OuDn = 'CN=Computers,DC=example,DC=com'" in lines
+    assert not any("New-ADOrganizationalUnit" in line for line in lines)
+    assert sum(1 for line in lines if line.startswith("Add-DelegationAce ")) == 5
+
+
+def test_fsx_joins_delegated_ou_only_when_opted_in(synth):
+    # 既存のFSxではOUの変更が置き換えになるため、既定ではOUを指定しない
+    def ad_configuration(**options):
+        (fsx,) = synth("application", **options).template.find_resources("AWS::FSx::FileSystem").values()
+        return fsx["Properties"]["WindowsConfiguration"]["SelfManagedActiveDirectoryConfiguration"]
+
+    assert "OrganizationalUnitDistinguishedName" not in ad_configuration()
+    assert ad_configuration(fsx_delegated_ou=True)["OrganizationalUnitDistinguishedName"] == "OU=FSx,DC=example,DC=com"
+    synth("ad-domain").template.has_output("FsxOrganizationalUnit", {"Value": "CN=Computers,DC=example,DC=com"})
+    synth("ad-domain", fsx_delegated_ou=True).template.has_output(
+        "FsxOrganizationalUnit", {"Value": "OU=FSx,DC=example,DC=com"}
+    )
+
+
+def test_automation_document_runs_on_dc():
+    document = fsx_delegation.delegation_automation_document("example.com", "i-0123456789abcdef0")
+
+    assert document["schemaVersion"] == "0.3"
+    assert document["parameters"]["InstanceId"]["default"] == "i-0123456789abcdef0"
+    step = document["mainSteps"][0]
+    assert step["action"] == "aws:runCommand"
+    assert step["inputs"]["InstanceIds"] == ["{{ InstanceId }}"]
+    assert step["inputs"]["Parameters"]["commands"] == fsx_delegation.render_delegation_script("example.com")
+
+
+def test_domain_join_document_skips_joined_instances():
+    commands = domain_join_document("example.com")["mainSteps"][0]["inputs"]["runCommand"]
+
+    assert commands[0] == "if ((Get-WmiObject -Class Win32_ComputerSystem).PartOfDomain) {"
+    assert "Add-Computer -DomainName 'example.com' -Credential $credential -Force" in commands
+    assert commands[-1] == "exit 3010"
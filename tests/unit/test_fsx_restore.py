@@ -0,0 +1,68 @@
+import pytest
+
+from ad_windows_fsx.fsx_restore import (
+    available_backups, backup_record, context_key, resolve_backup, restore_storage_capacity, write_context
+)
+
+# FSxのバックアップからの環境の複製のテスト
+
+
+def _backup(backup_id, created, lifecycle="AVAILABLE", capacity=1024):
+    return {
+        "BackupId": backup_id, "Lifecycle": lifecycle, "Type": "AUTOMATIC", "CreationTime": created,
+        "FileSystem": {
+            "FileSystemId": "fs-0123456789abcdef0", "StorageCapacity": capacity, "StorageType": "SSD",
+            "WindowsConfiguration": {"DeploymentType": "SINGLE_AZ_2", "ThroughputCapacity": 32},
+        },
+    }
+
+
+def test_latest_available_backup_is_pinned(tmp_path):
+    backups = [
+        _backup("backup-0000000000000000a", "2026-10-17T17:05:00+00:00"),
+        _backup("backup-0000000000000000b", "2026-10-18T17:05:00+00:00"),
+        _backup("backup-0000000000000000c", "2026-10-19T17:05:00+00:00", lifecycle="CREATING"),
+    ]
+
+    record = backup_record(available_backups(backups)[0])
+    path = tmp_path / "cdk.context.json"
+    path.write_text('{"availability-zones:account=123:region=ap-northeast-1": ["a"]}', encoding="utf-8")
+    write_context(path, context_key("alice"), record)
+
+    assert record["BackupId"] == "backup-0000000000000000b"
+    assert (record["StorageCapacity"], record["ThroughputCapacity"]) == (1024, 32)
+    assert '"availability-zones' in path.read_text(encoding="utf-8")
+    assert resolve_backup("latest", "alice", record) == record
+
+
+def test_resolve_backup_errors():
+    assert resolve_backup(None) is None
+    assert resolve_backup("backup-0123456789abcdef0") == {"BackupId": "backup-0123456789abcdef0"}
+    with pytest.raises(ValueError, match="fsx_restore resolve --source alice"):
+        resolve_backup("latest", "alice", None)
+    with pytest.raises(ValueError, match="fsx-restore-source"):
+        resolve_backup("latest")
+    with pytest.raises(ValueError, match="Invalid"):
+        resolve_backup("fs-0123456789abcdef0")
+
+
+def test_storage_capacity_is_inherited_unless_grown():
+    record = {"BackupId": "backup-0123456789abcdef0", "StorageCapacity": 1024}
+
+    assert restore_storage_capacity(record, 32) is None
+    assert restore_storage_capacity(record, 2048) == 2048
+    assert restore_storage_capacity({"BackupId": "backup-0123456789abcdef0"}, 2048) is None
+
+
+def test_application_stack_restores_from_backup(synth):
+    record = {"BackupId": "backup-0123456789abcdef0", "StorageCapacity": 1024}
+    template = synth("application", fsx_backup=record, fsx_throughput_capacity=64).template
+
+    (fsx,) = template.find_resources("AWS::FSx::FileSystem").values()
+    assert fsx["Properties"]["BackupId"] == "backup-0123456789abcdef0"
+    assert "StorageCapacity" not in fsx["Properties"]
+    assert fsx["Properties"]["WindowsConfiguration"]["ThroughputCapacity"] == 64
+    template.has_output("FsxRestoredFromBackupId", {"Value": "backup-0123456789abcdef0"})
+    assert "BackupId" not in next(iter(
+        synth("application").template.find_resources("AWS::FSx::FileSystem").values()
+    ))["Properties"]
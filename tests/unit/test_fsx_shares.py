@@ -0,0 +1,71 @@
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.fsx_shares import apply_commands, parse_shares, share_literal
+
+# SMB共有の一括作成・更新のテスト
+# ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_fsx_shares.py
+
+SHARES = [
+    {"name": "projects", "description": "Project files", "access-based-enumeration": True, "encrypt-data": True},
+    {"name": "sql", "path": "D:\\sql", "continuous-availability": True, "caching-mode": "None"},
+]
+
+
+def test_batch_script_matches_golden(assert_golden):
+    commands = apply_commands("example.com", parse_shares(SHARES))
+    assert_golden("fsx_shares_apply.ps1", "\n".join(commands) + "\n")
+
+
+def test_share_defaults_and_quoting():
+    (share,) = parse_shares([{"name": "O'Brien", "description": "Team's files"}])
+
+    assert share_literal(share) == (
+        "@{ Name = 'O''Brien'; Path = 'D:\\O''Brien'; Description = 'Team''s files'; ContinuouslyAvailable = $false; "
+        "FolderEnumerationMode = 'Unrestricted'; EncryptData = $false; CachingMode = $null }"
+    )
+
+
+@pytest.mark.parametrize("entries, message", [
+    ([{"name": "a/b"}], "Invalid share name"),
+    ([{"name": "data"}, {"name": "DATA"}], "Duplicate"),
+    ([{"name": "data", "path": "C:\\data"}], "D: drive"),
+    ([{"name": "data", "caching-mode": "Offline"}], "caching-mode"),
+    ([{"name": "data", "encrypt": True}], "Unknown fsx-shares keys: encrypt"),
+])
+def test_invalid_shares_fail_at_synth(entries, message):
+    with pytest.raises(ValueError, match=message):
+        parse_shares(entries)
+
+
+def test_application_stack_applies_shares(synth):
+    template = synth("application", fsx_shares=SHARES).template
+
+    template.has_resource_properties("AWS::SSM::Association", {
+        "Name": {"Ref": assertions.Match.string_like_regexp("FsxShares")},
+        "Parameters": {"FileSystemId": [{"Ref": assertions.Match.string_like_regexp("FsxFileSystem")}],
+                       "Region": [{"Ref": "AWS::Region"}]},
+        "ScheduleExpression": "rate(30 minutes)",
+    })
+    with pytest.raises(ValueError, match="BranchCache"):
+        synth("application", branch_cache="distributed", fsx_shares=[{"name": "share", "caching-mode": "Manual"}])
+    # caching-mode 未指定の share はBranchCacheが設定した値を維持するため許可
+    synth("application", branch_cache="distributed", fsx_shares=[{"name": "share"}])
+
+
+def test_omitted_caching_mode_keeps_existing_value():
+    # BranchCacheが設定した share のキャッシュモードを Manual に戻さない（30分ごとの設定の往復を防ぐ）
+    commands = apply_commands("example.com", parse_shares([{"name": "share"}]))
+
+    keep = commands.index("        if ($null -eq $Share.CachingMode) {")
+    assert commands[keep + 1] == (
+        "            $Share.CachingMode = if ($Existing) { \"$($Existing.CachingMode)\" } else { 'Manual' }"
+    )
+    assert keep < commands.index("        $CachingMode = $Share.CachingMode")
+
+
+def test_security_rules_allow_remote_admin_for_shares(synth):
+    template = synth("security-rules", fsx_remote_admin=True).template
+
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {"FromPort": 5985, "ToPort": 5985})
+    assert not template.find_resources("AWS::EC2::SecurityGroupIngress", {"Properties": {"FromPort": 80}})
@@ -0,0 +1,56 @@
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.instance_profiles import (
+    BANDWIDTH_TABLE,
+    INSTANCE_PROFILES,
+    client_bandwidth_findings,
+    domain_controller_findings,
+    resolve_instance_type,
+)
+
+# インスタンスプロファイルと帯域チェックのテスト
+
+
+def test_override_takes_precedence_over_profile():
+    assert resolve_instance_type("client", "network") == "m6in.xlarge"
+    assert resolve_instance_type("client", "network", "c6in.large") == "c6in.large"
+
+    with pytest.raises(ValueError):
+        resolve_instance_type("dc", "huge")
+
+
+def test_client_below_fsx_throughput_is_reported():
+    levels = [level for level, _ in client_bandwidth_findings("t3.large", 128)]
+    assert levels == ["warning", "warning"]
+
+    assert client_bandwidth_findings("m6in.xlarge", 512) == []
+    assert client_bandwidth_findings("x2idn.large", 512)[0][0] == "info"
+
+
+def test_profiles_use_known_instance_types():
+    for roles in INSTANCE_PROFILES.values():
+        assert set(roles.values()) <= set(BANDWIDTH_TABLE)
+
+
+def test_dc_burstable_warning():
+    assert domain_controller_findings("t3.medium")
+    assert domain_controller_findings("m6i.large") == []
+
+
+def test_application_stack_warns_at_synth_time(synth):
+    stack, template = synth("application", instance_type="t3.large", fsx_throughput_capacity=512)
+    annotations = assertions.Annotations.from_stack(stack)
+
+    template.has_resource_properties("AWS::EC2::Instance", {"InstanceType": "t3.large"})
+    annotations.has_warning(
+        "/application/WindowsInstance",
+        assertions.Match.string_like_regexp("below the FSx throughput capacity of 512 MB/s")
+    )
+
+
+def test_domain_stack_uses_configured_instance_type(synth):
+    stack, template = synth("ad-domain", instance_type="m6i.large")
+
+    template.has_resource_properties("AWS::EC2::Instance", {"InstanceType": "m6i.large"})
+    assertions.Annotations.from_stack(stack).has_no_warning("*", assertions.Match.any_value())
@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import aws_cdk as core
+import pytest
+
+from ad_windows_fsx.ad_application_stack import AdApplicationStack
+from ad_windows_fsx.maintenance_windows import (
+    hourly_profile,
+    load_samples,
+    main,
+    select_windows,
+    to_fsx_times,
+    validate_fsx_windows,
+)
+
+# バックアップ・メンテナンスウィンドウ選定のテスト
+
+# 2024-01-01 00:00 JST（月曜）
+_START = datetime(2023, 12, 31, 15, tzinfo=timezone.utc)
+
+
+def _traffic(local_weekday, local_hour):
+    if local_hour == 3:
+        return 1_000
+    if (local_weekday, local_hour) == (6, 5):
+        return 500
+    if local_weekday < 5 and 9 <= local_hour < 18:
+        return 50_000_000
+    return 2_000_000
+
+
+def _export(days=14):
+    timestamps, values = [], []
+    for offset in range(days * 24):
+        timestamp = _START + timedelta(hours=offset)
+        local = timestamp + timedelta(hours=9)
+        timestamps.append(timestamp.isoformat().replace("+00:00", "Z"))
+        values.append(_traffic(local.weekday(), local.hour))
+    return {"MetricDataResults": [
+        {"Id": "datareadbytes", "Timestamps": timestamps, "Values": values},
+        {"Id": "datawritebytes", "Timestamps": timestamps, "Values": [v / 2 for v in values]},
+    ]}
+
+
+def test_selects_quietest_hours_in_local_time():
+    windows = select_windows(hourly_profile(load_samples(_export()), "Asia/Tokyo"))
+
+    assert windows.backup_hour == 3
+    assert windows.maintenance == (6, 5)
+    assert to_fsx_times(windows, "Asia/Tokyo", reference=_START) == ("18:00", "6:20:00")
+
+
+def test_uneven_span_averages_each_slot_by_its_occurrences():
+    # 10日間: 月〜水は2回、木〜日は1回ずつ観測される
+    profile = hourly_profile(load_samples(_export(days=10)), "Asia/Tokyo")
+
+    assert profile[(0, 12)] == _traffic(0, 12) * 1.5
+    assert profile[(4, 12)] == _traffic(4, 12) * 1.5
+    assert profile[(6, 5)] == _traffic(6, 5) * 1.5
+
+
+def test_less_than_one_week_is_rejected():
+    # 3日分では観測していない曜日が負荷0に見えるため選定しない
+    with pytest.raises(ValueError, match="at least one full week"):
+        hourly_profile(load_samples(_export(days=3)), "Asia/Tokyo")
+
+
+def test_maintenance_keeps_gap_from_backup():
+    profile = {(weekday, hour): 100 for weekday in range(7) for hour in range(24)}
+    for weekday in range(7):
+        profile[(weekday, 3)] = 0
+    profile[(2, 4)] = 1  # バックアップ直後は選ばない
+
+    windows = select_windows(profile)
+
+    assert windows.backup_hour == 3
+    assert abs(windows.maintenance[1] - 3) > 1
+
+
+def test_overlapping_windows_are_rejected():
+    with pytest.raises(ValueError):
+        validate_fsx_windows("03:00", "7:03:00")
+    # 日曜23:30のバックアップと月曜00:00のメンテナンス（週をまたぐ）
+    with pytest.raises(ValueError):
+        validate_fsx_windows("23:30", "1:00:00")
+    with pytest.raises(ValueError):
+        validate_fsx_windows("3:00", "6:19:00")
+
+    assert validate_fsx_windows("17:00", "6:19:00") == ("17:00", "6:19:00")
+
+
+def test_main_prints_context_block(tmp_path, capsys):
+    export = tmp_path / "metrics.json"
+    export.write_text(json.dumps(_export()))
+
+    assert main([str(export), "--time-zone", "Asia/Tokyo"]) == 0
+    context = json.loads(capsys.readouterr().out.split("cdk.json context:")[1])
+    assert context == {"fsx-backup-start-time": "18:00", "fsx-maintenance-start-time": "6:20:00"}
+
+
+def test_stack_rejects_overlapping_windows():
+    app = core.App()
+    with pytest.raises(ValueError):
+        AdApplicationStack(app, "application", fsx_backup_start_time="19:00", fsx_maintenance_start_time="6:19:00")
@@ -0,0 +1,29 @@
+import pytest
+
+from ad_windows_fsx.network_topology import egress_paths, format_egress_paths, nat_count
+
+# NATトポロジーごとのエグレス経路見積もりのテスト
+
+
+def test_single_nat_routes_second_az_across_zones():
+    paths = egress_paths("single")
+
+    assert [p["nat_az"] for p in paths] == ["AZ-A", "AZ-A"]
+    assert [p["cross_az"] for p in paths] == [False, True]
+
+
+def test_per_az_nat_keeps_traffic_in_zone():
+    paths = egress_paths("per-az")
+
+    assert nat_count("per-az") == 2
+    assert not any(p["cross_az"] for p in paths)
+
+
+def test_instance_mode_uses_single_nat_instance():
+    assert nat_count("instance") == 1
+    assert "NAT instance (AZ-A)" in format_egress_paths("instance")
+
+
+def test_unknown_topology():
+    with pytest.raises(ValueError):
+        egress_paths("none")
@@ -0,0 +1,94 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import aws_cdk.aws_iam as iam
+import pytest
+
+from ad_windows_fsx import bootstrap_scripts
+from ad_windows_fsx.powershell_script import (
+    USER_DATA_LIMIT_BYTES,
+    PowerShellScript,
+    ScriptStep,
+    feature_install,
+    ps_quote,
+)
+
+# PowerShellユーザーデータ生成ライブラリのテスト
+# ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_powershell_script.py
+
+
+@pytest.mark.parametrize("golden, factory", [
+    ("ad_dc_setup.ps1", bootstrap_scripts.domain_controller_script),
+    ("windows_setup.ps1", bootstrap_scripts.windows_client_script),
+])
+def test_bootstrap_script_matches_golden(assert_golden, golden, factory):
+    script = factory()
+
+    assert_golden(golden, script.render() + "\n")
+    assert script.fits_inline()
+
+
+def test_windows_client_script_without_dns_server_step():
+    script = bootstrap_scripts.windows_client_script(set_dns_server=False)
+
+    assert [step.name for step in script.steps] == ["CreateLocalUserWinuser"]
+
+
+def test_consecutive_feature_installs_are_merged():
+    script = PowerShellScript("Test", "C:\\t.log", "C:\\t.jsonl")
+    script.add(feature_install("AD-Domain-Services"), feature_install("DNS"))
+
+    assert len(script.steps) == 1
+    assert script.steps[0].features == ["AD-Domain-Services", "DNS"]
+    assert "Install-WindowsFeature -Name 'AD-Domain-Services','DNS' -IncludeManagementTools" in script.render()
+
+
+def test_invalid_and_duplicate_step_names_are_rejected():
+    with pytest.raises(ValueError):
+        ScriptStep(name="bad name", commands=[])
+
+    script = PowerShellScript("Test", "C:\\t.log", "C:\\t.jsonl")
+    script.add(ScriptStep(name="StepA", commands=[]))
+    with pytest.raises(ValueError):
+        script.add(ScriptStep(name="StepA", commands=[]))
+
+
+def test_ps_quote_escapes_single_quotes():
+    assert ps_quote("O'Brien") == "'O''Brien'"
+
+
+def test_oversized_script_is_offloaded_to_s3():
+    script = PowerShellScript("Large", "C:\\t.log", "C:\\t.jsonl", variables={"Ip": "${Ip}"})
+    script.add(ScriptStep(name="Padding", commands=["Write-Host 'x'"] * 1500))
+    assert not script.fits_inline()
+
+    app = core.App()
+    stack = core.Stack(app, "offload")
+    role = iam.Role(stack, "Role", assumed_by=iam.ServicePrincipal("ec2.amazonaws.com"))
+    user_data = script.to_user_data(stack, "LargeUserData", role=role, substitutions={"Ip": "10.0.0.1"})
+    rendered = stack.resolve(user_data.render())
+
+    # ユーザーデータ本体には変数定義とダウンロード処理のみが残る
+    rendered_text = str(rendered)
+    assert "Read-S3Object" in rendered_text
+    assert "Padding" not in rendered_text
+    assert "Fn::Sub" in rendered_text
+
+    template = assertions.Template.from_stack(stack)
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {
+            "Statement": assertions.Match.array_with([
+                assertions.Match.object_like({"Action": assertions.Match.array_with(["s3:GetObject*"])})
+            ])
+        }
+    })
+
+
+def test_offload_without_role_fails():
+    script = PowerShellScript("Large", "C:\\t.log", "C:\\t.jsonl")
+    script.add(ScriptStep(name="Padding", commands=["Write-Host 'x'"] * 1500))
+    assert script.user_data_size() > USER_DATA_LIMIT_BYTES
+
+    app = core.App()
+    stack = core.Stack(app, "offload")
+    with pytest.raises(ValueError):
+        script.to_user_data(stack, "LargeUserData")
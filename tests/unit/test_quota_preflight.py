@@ -0,0 +1,80 @@
+import json
+
+from ad_windows_fsx.quota_preflight import (
+    check, collect_snapshot, demands, format_report, load_templates, shortfalls
+)
+
+# サービスクォータのプリフライトチェックのテスト
+
+
+def _templates(synth, **network_options):
+    return {
+        "network": synth("network", **network_options).template.to_json(),
+        "security-rules": synth("security-rules").template.to_json(),
+        "application": synth("application").template.to_json(),
+    }
+
+
+def test_rules_added_by_the_rules_stack_count_against_the_network_group(synth):
+    templates = _templates(synth)
+    rules = {d.scope: d.amount for d in demands(templates) if d.quota == "rules-per-security-group"}
+
+    (ad_inbound,) = [scope for scope in rules if scope.startswith("network/AdSecurityGroup") and "inbound" in scope]
+    imported = [
+        r for r in templates["security-rules"]["Resources"].values()
+        if r["Type"] == "AWS::EC2::SecurityGroupIngress"
+        and r["Properties"]["GroupId"] == {"Fn::ImportValue": "AdWindowsFsx-AdSecurityGroupId"}
+    ]
+    assert rules[ad_inbound] == len(imported) > 0
+    assert not [scope for scope in rules if "ImportValue" in scope]
+
+
+def test_per_az_nat_runs_out_of_elastic_ips(synth):
+    snapshot = {"quotas": {"elastic-ips": 5}, "usage": {"elastic-ips": 4, "fsx-windows-throughput": 10236}}
+
+    results = check(demands(_templates(synth, nat_topology="per-az")), snapshot)
+
+    assert [(r.quota, r.in_use, r.demand, r.limit) for r in shortfalls(results)] == [
+        ("elastic-ips", 4, 2, 5), ("fsx-windows-throughput", 10236, 8, 10240)
+    ]
+    assert "!! elastic-ips (account): needs 6, limit 5" in format_report(results)
+    assert not shortfalls(check(demands(_templates(synth)), {"usage": {"elastic-ips": 3}}))
+
+
+class FakeQuotas:
+    def service_quotas(self, service_code):
+        return {
+            "ec2": [{"QuotaName": "EC2-VPC Elastic IPs", "Value": 10.0}],
+            "fsx": [{"QuotaName": "Total throughput capacity for Windows File Server (MBps)", "Value": 20480.0}],
+        }.get(service_code, [])
+
+    def vpcs(self):
+        return [{"VpcId": "vpc-default"}, {"VpcId": "vpc-mine", "Tags": [
+            {"Key": "aws:cloudformation:stack-name", "Value": "AdWindowsFsxNetworkStack-alice"}
+        ]}]
+
+    def addresses(self):
+        return [{"AllocationId": "eipalloc-1"}]
+
+    def file_systems(self):
+        return [
+            {"FileSystemType": "WINDOWS", "StorageCapacity": 2048, "WindowsConfiguration": {"ThroughputCapacity": 64}},
+            {"FileSystemType": "LUSTRE", "StorageCapacity": 1200},
+        ]
+
+
+def test_live_snapshot_excludes_own_stacks_and_can_be_replayed(tmp_path):
+    snapshot = collect_snapshot(FakeQuotas(), own_stacks=["AdWindowsFsxNetworkStack-alice"])
+
+    assert snapshot == {
+        "quotas": {"elastic-ips": 10, "fsx-windows-throughput": 20480},
+        "usage": {"vpcs": 1, "elastic-ips": 1, "fsx-windows-storage": 2048, "fsx-windows-throughput": 64},
+    }
+
+    (tmp_path / "network.template.json").write_text(json.dumps({"Resources": {
+        "Eip": {"Type": "AWS::EC2::EIP", "Properties": {"Domain": "vpc"}},
+    }}), encoding="utf-8")
+    (result,) = check(demands(load_templates([str(tmp_path)])), snapshot)
+    assert (result.quota, result.in_use, result.demand, result.limit, result.status) == (
+        "elastic-ips", 1, 1, 10, "OK"
+    )
@@ -0,0 +1,81 @@
+import copy
+import time
+
+import pytest
+
+from ad_windows_fsx.sg_reachability import SecurityGroupGraph, required_flows, synthesize_templates
+
+# セキュリティグループ到達性シミュレーターのテスト
+
+
+@pytest.fixture(scope="module")
+def templates():
+    return synthesize_templates()
+
+
+def missing(findings):
+    return [f for f in findings if f.kind == "missing"]
+
+
+def test_required_flows_are_allowed(templates):
+    findings = SecurityGroupGraph(templates).evaluate()
+
+    assert missing(findings) == []
+
+
+def test_evaluation_is_fast(templates):
+    started = time.perf_counter()
+    SecurityGroupGraph(templates).evaluate()
+
+    assert time.perf_counter() - started < 1.0
+
+
+def test_removed_rule_is_reported(templates):
+    broken = copy.deepcopy(templates)
+    del broken["SecurityRules"]["Resources"]["WindowsToAdRule464"]
+
+    findings = missing(SecurityGroupGraph(broken).evaluate())
+
+    assert [(f.flow.name, f.detail) for f in findings] == [
+        ("Windows EC2 to AD - Kerberos Password Change (TCP 464)", "ingress on ad does not allow TCP 464")
+    ]
+
+
+def test_partial_port_range_is_reported(templates):
+    broken = copy.deepcopy(templates)
+    broken["SecurityRules"]["Resources"]["FsxToAdRuleRpcDynamic"]["Properties"]["ToPort"] = 60000
+
+    findings = missing(SecurityGroupGraph(broken).evaluate())
+
+    assert len(findings) == 1
+    assert "TCP 60001-65535" in findings[0].detail
+
+
+def test_vpc_cidr_peer_is_reported_as_over_broad(templates):
+    findings = SecurityGroupGraph(templates).evaluate()
+    broad = {f.rule.logical_id for f in findings if f.kind == "over-broad"}
+
+    assert "WindowsToFsxRuleSMB" in broad
+    # インターネット向けのアウトバウンドは対象外
+    assert "WindowsEgressDns" not in broad
+
+
+def test_client_flows_cover_kerberos_password_change():
+    flows = {(f.source, f.destination, f.protocol, f.ports) for f in required_flows()}
+
+    assert ("client", "ad", "tcp", (464, 464)) in flows
+    assert ("client", "ad", "udp", (464, 464)) in flows
+
+
+def test_resolver_flows_with_dns_forwarding():
+    graph = SecurityGroupGraph(synthesize_templates(dns_forwarding=True))
+
+    assert "resolver" in graph.roles
+    assert missing(graph.evaluate()) == []
+    assert len(graph.applicable_flows()) == len(required_flows())
+
+
+def test_resolver_flows_skipped_without_dns_forwarding(templates):
+    graph = SecurityGroupGraph(templates)
+
+    assert all(f.source != "resolver" for f in graph.applicable_flows())
@@ -0,0 +1,63 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from ad_windows_fsx.ad_application_stack import AdApplicationStack
+from ad_windows_fsx.smb_canary import NAMESPACE, OPERATIONS, canary_script, smb_canary_document
+
+# SMBレイテンシーカナリアのテスト
+# ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_smb_canary.py
+
+
+def test_canary_script_matches_golden(assert_golden):
+    assert_golden("smb_canary.ps1", "\n".join(canary_script()) + "\n")
+
+
+def test_document_installs_minute_task_with_parameters():
+    commands = smb_canary_document()["mainSteps"][0]["inputs"]["runCommand"]
+    script = "\n".join(commands)
+
+    assert "-RepetitionInterval (New-TimeSpan -Minutes 1)" in script
+    assert "-SharePath \\\\{{ FsxDnsName }}\\share -Region {{ Region }}" in script
+    # スクリプト本体はヒアドキュメントで配置
+    assert commands[commands.index("'@") - 1].startswith("Write-CWMetricData")
+
+
+def test_every_operation_is_measured_and_published_high_resolution():
+    script = "\n".join(canary_script())
+
+    for operation in OPERATIONS:
+        assert f"Measure-Operation '{operation}'" in script
+    assert "$Datum.StorageResolution = 1" in script
+    assert f"-Namespace '{NAMESPACE}'" in script
+
+
+def test_stack_creates_p99_alarms_per_operation(synth):
+    template = synth("application", smb_canary_slo_ms={"Read": 20}).template
+
+    template.resource_count_is("AWS::CloudWatch::Alarm", len(OPERATIONS) + 1)
+    template.has_resource_properties("AWS::CloudWatch::Alarm", {
+        "Namespace": NAMESPACE,
+        "MetricName": "Latency",
+        "ExtendedStatistic": "p99",
+        "Period": 60,
+        "Threshold": 20,
+        "Dimensions": assertions.Match.array_with([{"Name": "Operation", "Value": "Read"}]),
+    })
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": assertions.Match.object_like({
+            "Statement": assertions.Match.array_with([assertions.Match.object_like({
+                "Action": "cloudwatch:PutMetricData",
+                "Condition": {"StringEquals": {"cloudwatch:namespace": NAMESPACE}},
+            })])
+        })
+    })
+
+
+def test_canary_can_be_disabled(synth):
+    synth("application", smb_canary=False).template.resource_count_is("AWS::CloudWatch::Alarm", 0)
+
+
+def test_unknown_operation_is_rejected():
+    with pytest.raises(ValueError):
+        AdApplicationStack(core.App(), "application", smb_canary_slo_ms={"Rename": 10})
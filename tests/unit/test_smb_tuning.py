@@ -0,0 +1,47 @@
+import pytest
+
+from ad_windows_fsx import config_documents
+from ad_windows_fsx.smb_tuning import SMB_PROFILES, profile_settings, render_tuning_commands
+
+# SMBクライアントのチューニングプロファイルのテスト
+# ゴールデンファイルを更新する場合: UPDATE_GOLDEN=1 python -m pytest tests/unit/test_smb_tuning.py
+
+
+@pytest.mark.parametrize("profile", sorted(SMB_PROFILES))
+def test_profile_matches_golden(assert_golden, profile):
+    rendered = "\n".join(render_tuning_commands(profile, "SINGLE_AZ_2")) + "\n"
+
+    assert_golden(f"smb_{profile}.ps1", rendered)
+
+
+@pytest.mark.parametrize("deployment_type, multichannel", [
+    ("SINGLE_AZ_1", False),
+    ("SINGLE_AZ_2", True),
+    ("MULTI_AZ_1", True),
+])
+def test_multichannel_follows_deployment_type(deployment_type, multichannel):
+    names = [s.name for s in profile_settings("throughput", deployment_type)]
+
+    assert ("SmbClient.EnableMultiChannel" in names) == multichannel
+    assert ("SmbClient.ConnectionCountPerRssNetworkInterface" in names) == multichannel
+
+
+def test_every_setting_is_verified():
+    commands = render_tuning_commands("metadata")
+
+    for setting in profile_settings("metadata"):
+        assert f"$Actual = \"$({setting.get})\"" in commands
+    assert commands[-2:] == ["}", "Write-Host \"SMB client profile metadata: verified\""]
+    assert "    exit 1" in commands
+
+
+def test_client_document_uses_selected_profile():
+    document = config_documents.windows_client_document(smb_profile="throughput", fsx_deployment_type="SINGLE_AZ_1")
+    step = next(s for s in document["mainSteps"] if s["name"] == "ConfigureSmbClient")
+
+    assert step["inputs"]["runCommand"] == render_tuning_commands("throughput", "SINGLE_AZ_1")
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        profile_settings("fast")